@@ -10,6 +10,8 @@ Usage:
     python main.py prod         # Production mode
     python main.py api-only     # Start only API server
     python main.py bot-only     # Start only Discord bot
+    python main.py prod --clusters 4 [--shards 16]
+                                # Run the bot as 4 sharded processes (see src/bot/launcher.py)
 """
 
 import os
@@ -40,9 +42,21 @@ async def main():
     parser.add_argument("mode", 
                        choices=["dev", "prod", "api-only", "bot-only"],
                        help="Mode to run the application in")
+    parser.add_argument("--clusters", type=int, default=1,
+                       help="Run the bot as this many sharded processes")
+    parser.add_argument("--shards", type=int, default=None,
+                       help="Total shard count (default: Discord's recommendation)")
     
     args = parser.parse_args()
     
+    if args.clusters > 1 and args.mode != "api-only":
+        # The launcher starts one process per cluster, each running this file again
+        from src.bot.launcher import ClusterLauncher
+        await ClusterLauncher(args.mode, args.clusters, args.shards).run()
+        return
+    if args.shards:
+        os.environ["CONTRO_SHARD_COUNT"] = str(args.shards)
+    
     # Set up signal handlers
     def signal_handler(signum, frame):
         print(f"\nReceived signal {signum}, shutting down...")
@@ -57,7 +71,8 @@ async def main():
         
         # Start services based on mode
         start_bot = args.mode not in ['api-only']
-        start_api = args.mode not in ['bot-only']
+        # Within a cluster, only the first process serves the API
+        start_api = args.mode not in ['bot-only'] and app_manager.config.sharding.cluster_id in (None, 0)
         
         await app_manager.start_services(start_bot=start_bot, start_api=start_api)
         
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure the per-message logging overhead seen by the caller (the event loop).
+
+Compares writing straight to a RotatingFileHandler with the queued pipeline
+from src/core/logger.py, for plain text and JSON output, with and without a
+rate limit on the hot logger.
+
+Usage:
+    python scripts/benchmark_logging.py [--messages 50000]
+"""
+
+import argparse
+import logging
+import logging.handlers
+import queue
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.logger import BoundedQueueHandler, BoundedQueueListener, JSONFormatter, LogRateLimiter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def build_file_handler(directory: str, json_output: bool) -> logging.Handler:
+    handler = logging.handlers.RotatingFileHandler(
+        Path(directory) / "bench.log",
+        maxBytes=10 * 1024 * 1024,
+        backupCount=2,
+        encoding='utf-8'
+    )
+    handler.setFormatter(JSONFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+    return handler
+
+
+def run_case(name: str, messages: int, json_output: bool, queued: bool, rate_limit: bool) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        logger = logging.getLogger(f"bench.{name}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+
+        file_handler = build_file_handler(directory, json_output)
+        listener = None
+        if queued:
+            handler = BoundedQueueHandler(queue.Queue(maxsize=10000))
+            listener = BoundedQueueListener(handler.queue, file_handler)
+            listener.start()
+        else:
+            handler = file_handler
+        if rate_limit:
+            handler.addFilter(LogRateLimiter(rate_limits={"bench": 100}))
+        logger.addHandler(handler)
+
+        samples = []
+        started = time.perf_counter()
+        for i in range(messages):
+            t0 = time.perf_counter_ns()
+            logger.info("Added %s XP to user %s in guild %s", 15, 1000 + i, 42)
+            samples.append(time.perf_counter_ns() - t0)
+        caller_seconds = time.perf_counter() - started
+
+        if listener is not None:
+            listener.stop()
+        logger.removeHandler(handler)
+        file_handler.close()
+
+    samples.sort()
+    return {
+        "case": name,
+        "mean_us": statistics.fmean(samples) / 1000,
+        "p50_us": samples[len(samples) // 2] / 1000,
+        "p99_us": samples[int(len(samples) * 0.99)] / 1000,
+        "max_us": samples[-1] / 1000,
+        "caller_seconds": caller_seconds,
+        "dropped": getattr(handler, "dropped", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging overhead per message")
+    parser.add_argument("--messages", type=int, default=50000)
+    args = parser.parse_args()
+
+    cases = [
+        ("direct_text", False, False, False),
+        ("direct_json", True, False, False),
+        ("queued_text", False, True, False),
+        ("queued_json", True, True, False),
+        ("queued_json_rate_limited", True, True, True),
+    ]
+
+    print(f"{'case':<26}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'max µs':>10}{'dropped':>10}")
+    for name, json_output, queued, rate_limit in cases:
+        result = run_case(name, args.messages, json_output, queued, rate_limit)
+        print(f"{result['case']:<26}{result['mean_us']:>10.2f}{result['p50_us']:>10.2f}"
+              f"{result['p99_us']:>10.2f}{result['max_us']:>10.1f}{result['dropped']:>10}")
+
+
+if __name__ == "__main__":
+    main()
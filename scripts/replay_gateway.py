@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+"""
+Replay recorded gateway traffic into a ControBot with its HTTP layer stubbed.
+
+Recordings come from the gateway recorder in src/bot/client.py (set
+PERFORMANCE_GATEWAY_RECORD_PATH, or call ``bot.start_recording(path)``), or
+are synthesized here for the traffic mixes we care about:
+
+    python scripts/replay_gateway.py synthesize raid data/recordings/raid.jsonl.gz
+    python scripts/replay_gateway.py synthesize voice data/recordings/voice.jsonl.gz --minutes 10
+    python scripts/replay_gateway.py replay data/recordings/raid.jsonl.gz --speed 10
+    python scripts/replay_gateway.py replay prod.jsonl.gz --speed max --json results.json
+
+Dispatches are fed to the connection state's parsers, the same entry point
+the websocket uses, at 1x-50x the recorded pace (or as fast as the loop
+allows with ``--speed max``). Discord REST calls are answered by a stub that
+counts them per route and can add latency. MongoDB and Redis are in-memory
+(mongomock, mongomock-motor, fakeredis) unless ``--mongo-uri`` points at a
+test database.
+
+The report covers throughput, how far the replay fell behind schedule,
+event loop lag, listener time per event, REST calls, Mongo operations and
+cache lookups.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import itertools
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import discord  # noqa: E402
+
+from src.core.metrics import get_registry  # noqa: E402
+
+DEFAULT_COGS = (
+    "community.leveling",
+    "community.autorole",
+    "community.welcome",
+    "moderation.logging",
+    "utility.starboard",
+    "utility.custom_commands_manager",
+)
+
+# ----------------------------------------------------------------------
+# Recording files
+# ----------------------------------------------------------------------
+def _open(path: str, mode: str):
+    return gzip.open(path, mode + 't', encoding='utf-8') if path.endswith('.gz') else open(path, mode, encoding='utf-8')
+
+
+def load_recording(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Tuple[float, str, Dict[str, Any]]]]:
+    """Returns the header, guild snapshots and (offset, event, payload) dispatches."""
+    header: Dict[str, Any] = {}
+    snapshots: List[Dict[str, Any]] = []
+    events: List[Tuple[float, str, Dict[str, Any]]] = []
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry['event'] == 'RECORDING':
+                header = entry['d']
+            elif entry['event'] == 'GUILD_SNAPSHOT':
+                snapshots.append(entry['d'])
+            else:
+                events.append((entry['t'], entry['event'], entry['d']))
+    events.sort(key=lambda item: item[0])
+    return header, snapshots, events
+
+
+def write_recording(path: str, snapshots: List[Dict[str, Any]], events: List[Tuple[float, str, Dict[str, Any]]],
+                    source: str) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with _open(path, 'w') as f:
+        header = {'version': 1, 'started_at': datetime.utcnow().isoformat(), 'source': source}
+        f.write(json.dumps({'event': 'RECORDING', 'd': header}) + '\n')
+        for snapshot in snapshots:
+            f.write(json.dumps({'t': 0.0, 'event': 'GUILD_SNAPSHOT', 'd': snapshot}) + '\n')
+        for offset, event, data in events:
+            f.write(json.dumps({'t': round(offset, 4), 'event': event, 'd': data}) + '\n')
+
+
+# ----------------------------------------------------------------------
+# Payload builders shared by the synthesizer and the HTTP stub
+# ----------------------------------------------------------------------
+_sequence = itertools.count()
+
+
+def snowflake() -> str:
+    return str(discord.utils.time_snowflake(datetime.now(timezone.utc)) | (next(_sequence) & 0x3FFFFF))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def user_payload(user_id: str, name: str, bot: bool = False) -> Dict[str, Any]:
+    return {'id': user_id, 'username': name, 'discriminator': '0', 'global_name': None, 'avatar': None, 'bot': bot}
+
+
+def member_payload(user: Dict[str, Any], roles: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    return {'user': user, 'roles': list(roles), 'joined_at': _now(), 'deaf': False, 'mute': False, 'flags': 0}
+
+
+def message_payload(channel_id: str, author: Dict[str, Any], content: str, guild_id: Optional[str] = None,
+                    message_id: Optional[str] = None) -> Dict[str, Any]:
+    data = {
+        'id': message_id or snowflake(),
+        'channel_id': channel_id,
+        'author': author,
+        'content': content,
+        'timestamp': _now(),
+        'edited_timestamp': None,
+        'tts': False,
+        'mention_everyone': False,
+        'mentions': [],
+        'mention_roles': [],
+        'attachments': [],
+        'embeds': [],
+        'pinned': False,
+        'type': 0,
+    }
+    if guild_id:
+        data['guild_id'] = guild_id
+        member = member_payload(author)
+        member.pop('user')
+        data['member'] = member
+    return data
+
+
+# ----------------------------------------------------------------------
+# Synthetic traffic
+# ----------------------------------------------------------------------
+CHAT_LINES = (
+    "hello everyone", "anyone up for a game tonight?", "lol", "gg", "ok", "!rules", "merhaba",
+    "can a mod check my ticket", "that patch broke everything", "brb", "who is streaming later",
+    "I just finished the new season, no spoilers but the ending was something else",
+)
+
+
+class _SyntheticGuild:
+    def __init__(self, rng: random.Random, members: int):
+        self.rng = rng
+        self.id = snowflake()
+        self.text_channels = [snowflake() for _ in range(4)]
+        self.voice_channels = [snowflake() for _ in range(3)]
+        self.users = [user_payload(snowflake(), f"member{i}") for i in range(members)]
+        self.in_voice: Dict[str, str] = {}
+
+    def snapshot(self) -> Dict[str, Any]:
+        channels = [{'id': cid, 'type': 0, 'name': f"text{i}", 'position': i, 'parent_id': None,
+                     'permission_overwrites': []} for i, cid in enumerate(self.text_channels)]
+        channels += [{'id': cid, 'type': 2, 'name': f"voice{i}", 'position': i, 'parent_id': None,
+                      'permission_overwrites': [], 'bitrate': 64000, 'user_limit': 0}
+                     for i, cid in enumerate(self.voice_channels)]
+        return {
+            'id': self.id, 'name': 'Synthetic Guild', 'owner_id': self.users[0]['id'],
+            'member_count': len(self.users), 'unavailable': False, 'channels': channels,
+            'roles': [{'id': self.id, 'name': '@everyone', 'position': 0, 'permissions': '104324673',
+                       'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+            'members': [], 'voice_states': [], 'presences': [], 'emojis': [], 'stickers': [],
+            'features': [], 'threads': [],
+        }
+
+    def message(self, user: Optional[Dict[str, Any]] = None, content: Optional[str] = None) -> Dict[str, Any]:
+        user = user or self.rng.choice(self.users)
+        return message_payload(self.rng.choice(self.text_channels), user, content or self.rng.choice(CHAT_LINES),
+                               guild_id=self.id)
+
+    def reaction(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        user = self.rng.choice(self.users)
+        return {'user_id': user['id'], 'channel_id': message['channel_id'], 'message_id': message['id'],
+                'guild_id': self.id, 'emoji': {'id': None, 'name': self.rng.choice(('⭐', '👍', '😂'))},
+                'member': member_payload(user), 'message_author_id': message['author']['id'], 'burst': False,
+                'type': 0}
+
+    def presence(self) -> Dict[str, Any]:
+        user = self.rng.choice(self.users)
+        return {'user': {'id': user['id']}, 'guild_id': self.id,
+                'status': self.rng.choice(('online', 'idle', 'dnd', 'offline')),
+                'activities': [{'type': 0, 'name': 'activity'}] if self.rng.random() < 0.4 else [],
+                'client_status': {'desktop': 'online'}}
+
+    def voice(self) -> Dict[str, Any]:
+        user = self.rng.choice(self.users)
+        current = self.in_voice.get(user['id'])
+        roll = self.rng.random()
+        if current is None:
+            channel_id = self.in_voice[user['id']] = self.rng.choice(self.voice_channels)
+        elif roll < 0.3:
+            channel_id = None
+            del self.in_voice[user['id']]
+        elif roll < 0.45:
+            channel_id = self.in_voice[user['id']] = self.rng.choice(self.voice_channels)
+        else:
+            channel_id = current
+        return {'guild_id': self.id, 'channel_id': channel_id, 'user_id': user['id'], 'member': member_payload(user),
+                'session_id': 'session', 'deaf': False, 'mute': False, 'self_deaf': False,
+                'self_mute': self.rng.random() < 0.5, 'self_video': False, 'suppress': False,
+                'request_to_speak_timestamp': None}
+
+    def join(self, index: int) -> Dict[str, Any]:
+        user = user_payload(snowflake(), f"newcomer{index}")
+        self.users.append(user)
+        data = member_payload(user)
+        data['guild_id'] = self.id
+        return data
+
+
+def synthesize(kind: str, minutes: float, rate: float, members: int, seed: int):
+    """Build a recording for a traffic mix. ``rate`` is the base events per second."""
+    rng = random.Random(seed)
+    guild = _SyntheticGuild(rng, members)
+    events: List[Tuple[float, str, Dict[str, Any]]] = []
+    recent: List[Dict[str, Any]] = []
+    duration = minutes * 60
+
+    def chat(at: float, user=None, content=None):
+        message = guild.message(user, content)
+        recent.append(message)
+        del recent[:-50]
+        events.append((at, 'MESSAGE_CREATE', message))
+
+    # The base mix: mostly chat, some reactions and presence churn
+    weights = {'chat': (0.6, 0.25, 0.15, 0.0), 'raid': (0.6, 0.25, 0.15, 0.0),
+               'voice': (0.25, 0.05, 0.2, 0.5)}[kind]
+    t = 0.0
+    while t < duration:
+        t += rng.expovariate(rate)
+        roll = rng.random()
+        if roll < weights[0] or not recent:
+            chat(t)
+        elif roll < weights[0] + weights[1]:
+            events.append((t, 'MESSAGE_REACTION_ADD', guild.reaction(rng.choice(recent))))
+        elif roll < weights[0] + weights[1] + weights[2]:
+            events.append((t, 'PRESENCE_UPDATE', guild.presence()))
+        else:
+            events.append((t, 'VOICE_STATE_UPDATE', guild.voice()))
+
+    if kind == 'raid':
+        # A join wave a quarter of the way in: joins at 20/s for 30s, each account posting a few times
+        start = duration / 4
+        for index in range(600):
+            at = start + index / 20
+            join = guild.join(index)
+            events.append((at, 'GUILD_MEMBER_ADD', join))
+            for burst in range(rng.randint(1, 3)):
+                chat(at + 0.2 + burst * 0.3, join['user'], "join my server discord.gg/xxxxxx")
+
+    events.sort(key=lambda item: item[0])
+    return [guild.snapshot()], events
+
+
+# ----------------------------------------------------------------------
+# Stubbed Discord REST
+# ----------------------------------------------------------------------
+class StubHTTP:
+    """Answers ``HTTPClient.request`` locally and counts calls per route."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.bot_user = user_payload(snowflake(), "Contro", bot=True)
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        self.calls[route.key] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        method, path = route.method, route.path
+        body = kwargs.get('json') or {}
+        last = route.url.rstrip('/').rsplit('/', 1)[-1]
+        if path == '/users/@me':
+            return self.bot_user
+        if path == '/oauth2/applications/@me':
+            return {'id': self.bot_user['id'], 'name': 'Contro', 'description': '', 'icon': None,
+                    'bot_public': True, 'bot_require_code_grant': False, 'verify_key': '', 'flags': 0,
+                    'owner': user_payload(snowflake(), "owner")}
+        if path.startswith('/channels/{channel_id}/messages') and method in ('POST', 'PATCH', 'GET'):
+            if path.endswith('/reactions/{emoji}/@me') or '/reactions' in path:
+                return None
+            message_id = None if method == 'POST' else last
+            return message_payload(str(route.channel_id), self.bot_user, body.get('content') or '',
+                                   message_id=message_id)
+        if path == '/channels/{channel_id}/webhooks':
+            if method == 'GET':
+                return []
+            return {'id': snowflake(), 'type': 1, 'channel_id': str(route.channel_id), 'name': body.get('name'),
+                    'token': 'stub', 'avatar': None, 'application_id': None, 'user': self.bot_user}
+        if path == '/guilds/{guild_id}/members/{user_id}' and method == 'GET':
+            return member_payload(user_payload(last, "member"))
+        if path.startswith('/webhooks/'):
+            return message_payload(snowflake(), self.bot_user, body.get('content') or '')
+        return None
+
+
+# ----------------------------------------------------------------------
+# In-memory databases with operation counts
+# ----------------------------------------------------------------------
+_MONGO_METHODS = frozenset({
+    'find', 'find_one', 'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'count_documents', 'aggregate', 'bulk_write', 'find_one_and_update',
+    'find_one_and_delete', 'find_one_and_replace', 'create_index', 'distinct',
+})
+
+
+class CountingCollection:
+    def __init__(self, collection, counts: Counter):
+        self._collection = collection
+        self._counts = counts
+
+    def __getattr__(self, attr):
+        value = getattr(self._collection, attr)
+        if attr not in _MONGO_METHODS:
+            return value
+        key = f"{self._collection.name}.{attr}"
+
+        def counted(*args, **kwargs):
+            self._counts[key] += 1
+            return value(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, db, counts: Counter):
+        self._db = db
+        self._counts = counts
+
+    def __getitem__(self, name: str) -> CountingCollection:
+        return CountingCollection(self._db[name], self._counts)
+
+    def get_collection(self, name: str, **kwargs) -> CountingCollection:
+        return CountingCollection(self._db.get_collection(name, **kwargs), self._counts)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        value = getattr(self._db, name)
+        if hasattr(value, 'find_one') and hasattr(value, 'insert_one'):
+            return CountingCollection(value, self._counts)
+        return value
+
+
+async def install_memory_backends(bot, counts: Counter) -> None:
+    """Point the connection helpers, the bot manager and the core cache at in-memory stores."""
+    import fakeredis
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+
+    from src.core import cache
+    from src.utils.core.manager import get_manager
+    from src.utils.database import connection
+
+    sync_db = CountingDatabase(mongomock.MongoClient()['contro_replay'], counts)
+    async_db = CountingDatabase(AsyncMongoMockClient()['contro_replay'], counts)
+
+    async def initialize_async_mongodb():
+        return async_db
+
+    connection.sync_db, connection.async_db = sync_db, async_db
+    connection.initialize_sync_mongodb = lambda: sync_db
+    connection.initialize_async_mongodb = initialize_async_mongodb
+    manager = get_manager()
+    manager._sync_db, manager._async_db = sync_db, async_db
+    bot.sync_db, bot.async_db = sync_db, async_db
+
+    cache_manager = cache.CacheManager()
+    cache_manager.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    cache._cache_manager = cache_manager
+
+
+# ----------------------------------------------------------------------
+# Replay
+# ----------------------------------------------------------------------
+class LoopLagSampler:
+    """Measures how late short sleeps wake up while the replay runs."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - expected, 0.0))
+
+
+def _metric_values() -> Dict[str, float]:
+    values = {}
+    for line in get_registry().render().splitlines():
+        if line and not line.startswith('#'):
+            key, _, value = line.rpartition(' ')
+            values[key] = float(value)
+    return values
+
+
+def _metric_delta(before: Dict[str, float], after: Dict[str, float], prefix: str, suffix: str = "") -> Dict[str, float]:
+    return {
+        key[len(prefix):]: round(value - before.get(key, 0.0), 6)
+        for key, value in after.items()
+        if key.startswith(prefix) and key.endswith(suffix) and value != before.get(key, 0.0)
+    }
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(int(fraction * (len(ordered) - 1)), len(ordered) - 1)]  # noqa: E731
+    return {'p50_ms': round(pick(0.5) * 1000, 3), 'p99_ms': round(pick(0.99) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3)}
+
+
+def seed_members(bot, events: List[Tuple[float, str, Dict[str, Any]]]) -> int:
+    """Add members the recording assumes were already cached (the gateway's member chunks)."""
+    state = bot._connection
+    seen = set()
+    added = 0
+    for _, event, data in events:
+        guild_id = data.get('guild_id')
+        if event == 'GUILD_MEMBER_ADD':
+            user, member = data['user'], data
+        elif event == 'MESSAGE_CREATE':
+            user, member = data['author'], dict(data.get('member') or {}, user=data['author'])
+        elif event in ('VOICE_STATE_UPDATE', 'MESSAGE_REACTION_ADD', 'MESSAGE_REACTION_REMOVE') and data.get('member'):
+            user, member = data['member']['user'], data['member']
+        elif event == 'PRESENCE_UPDATE':
+            user = data['user']
+            member = member_payload(user_payload(user['id'], f"member{user['id'][-4:]}"))
+        else:
+            continue
+        key = (guild_id, user['id'])
+        if key in seen:
+            continue
+        seen.add(key)
+        guild = bot.get_guild(int(guild_id)) if guild_id else None
+        if guild is None or event == 'GUILD_MEMBER_ADD' or guild.get_member(int(user['id'])):
+            continue
+        member.setdefault('roles', [])
+        member.setdefault('joined_at', _now())
+        guild._add_member(discord.Member(data=member, guild=guild, state=state))
+        added += 1
+    return added
+
+
+async def replay(args) -> Dict[str, Any]:
+    if args.mongo_uri:
+        # Read once when src.utils.database.connection is imported
+        os.environ['DB_URL'] = args.mongo_uri
+    from src.bot.client import ControBot
+
+    header, snapshots, events = load_recording(args.recording)
+    if args.limit:
+        events = events[:args.limit]
+    speed = None if args.speed == 'max' else float(args.speed)
+
+    bot = ControBot({'discord_prefix': args.prefix})
+    # Recordings may hold presence and voice traffic the production intents leave out
+    bot.intents.presences = bot.intents.voice_states = True
+    stub = StubHTTP(args.http_latency)
+    bot.http.request = stub.request
+    mongo_ops: Counter = Counter()
+    if not args.mongo_uri:
+        await install_memory_backends(bot, mongo_ops)
+
+    async def setup_hook():
+        # The application manager is not part of the replay; only the pieces listeners rely on
+        bot.start_metrics()
+
+    bot.setup_hook = setup_hook
+    await bot.login("replay")
+    for snapshot in snapshots:
+        bot._connection._add_guild_from_data(snapshot)
+    seeded = seed_members(bot, events)
+    for cog in args.cogs:
+        try:
+            await bot.load_extension(f"src.cogs.{cog}")
+        except Exception as e:
+            logging.error(f"Failed to load cog {cog}: {e}")
+    bot._ready.set()
+
+    parsers = bot._connection.parsers
+    loop = asyncio.get_running_loop()
+    sampler = LoopLagSampler()
+    metrics_before = _metric_values()
+    baseline_tasks = asyncio.all_tasks()
+    behind: List[float] = []
+    counts: Counter = Counter()
+
+    sampler.start()
+    started = loop.time()
+    for offset, event, data in events:
+        if speed:
+            delay = started + offset / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                behind.append(-delay)
+                await asyncio.sleep(0)
+        else:
+            await asyncio.sleep(0)
+        bot.dispatch('socket_event_type', event)
+        parsers[event](data)
+        counts[event] += 1
+    fed = loop.time() - started
+
+    # Let the listeners the last events started finish
+    deadline = loop.time() + args.drain
+    current = asyncio.current_task()
+    while loop.time() < deadline:
+        pending = [task for task in asyncio.all_tasks() - baseline_tasks if task is not current and not task.done()]
+        if len(pending) <= 1:  # the lag sampler
+            break
+        await asyncio.sleep(0.05)
+    elapsed = loop.time() - started
+    sampler.stop()
+    metrics_after = _metric_values()
+
+    await bot.close()
+
+    listener_seconds = _metric_delta(metrics_before, metrics_after, 'contro_listener_seconds_sum')
+    listener_calls = _metric_delta(metrics_before, metrics_after, 'contro_listener_seconds_count')
+    slowest = sorted(listener_seconds.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        'recording': args.recording,
+        'source': header.get('source', 'gateway'),
+        'speed': args.speed,
+        'events': dict(counts),
+        'seeded_members': seeded,
+        'recorded_seconds': round(events[-1][0], 3) if events else 0.0,
+        'feed_seconds': round(fed, 3),
+        'elapsed_seconds': round(elapsed, 3),
+        'events_per_second': round(len(events) / elapsed, 1) if elapsed else 0.0,
+        'behind_schedule': dict(_percentiles(behind), late_events=len(behind)),
+        'loop_lag': _percentiles(sampler.samples),
+        'listeners': {
+            key: {'calls': int(listener_calls.get(key, 0)), 'seconds': round(seconds, 4)} for key, seconds in slowest
+        },
+        'http_calls': dict(stub.calls.most_common()),
+        'mongo_ops': dict(mongo_ops.most_common()) if not args.mongo_uri else
+        _metric_delta(metrics_before, metrics_after, 'contro_mongo_command_seconds_count'),
+        'cache_requests': _metric_delta(metrics_before, metrics_after, 'contro_cache_requests_total'),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    total = sum(report['events'].values())
+    print(f"\nReplayed {total} events from {report['recording']} at speed {report['speed']}")
+    for event, count in sorted(report['events'].items()):
+        print(f"  {event:<24} {count}")
+    print(f"Recorded span {report['recorded_seconds']}s, fed in {report['feed_seconds']}s, "
+          f"done after {report['elapsed_seconds']}s ({report['events_per_second']} events/s)")
+    behind = report['behind_schedule']
+    print(f"Behind schedule: {behind['late_events']} events late, p99 {behind['p99_ms']} ms, max {behind['max_ms']} ms")
+    lag = report['loop_lag']
+    print(f"Loop lag: p50 {lag['p50_ms']} ms, p99 {lag['p99_ms']} ms, max {lag['max_ms']} ms")
+    for title, key in (("Slowest listeners (total seconds)", 'listeners'), ("REST calls", 'http_calls'),
+                       ("Mongo operations", 'mongo_ops'), ("Cache lookups", 'cache_requests')):
+        print(f"{title}:")
+        for name, value in list(report[key].items())[:15]:
+            print(f"  {name:<70} {value}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    replay_parser = commands.add_parser("replay", help="replay a recording into a stubbed bot")
+    replay_parser.add_argument("recording")
+    replay_parser.add_argument("--speed", default="1",
+                               help="multiple of the recorded pace (1-50), or 'max' for as fast as possible")
+    replay_parser.add_argument("--cogs", nargs="*", default=list(DEFAULT_COGS), help="extensions under src.cogs to load")
+    replay_parser.add_argument("--prefix", default=">", help="command prefix")
+    replay_parser.add_argument("--http-latency", type=float, default=0.0, help="seconds added to every REST call")
+    replay_parser.add_argument("--mongo-uri", help="use this (test) MongoDB instead of the in-memory one")
+    replay_parser.add_argument("--limit", type=int, default=0, help="replay only the first N events")
+    replay_parser.add_argument("--drain", type=float, default=10.0, help="seconds to wait for listeners after the last event")
+    replay_parser.add_argument("--json", help="also write the report to this file")
+    replay_parser.add_argument("--log-level", default="WARNING")
+
+    synth_parser = commands.add_parser("synthesize", help="generate a recording for a traffic mix")
+    synth_parser.add_argument("kind", choices=("chat", "raid", "voice"))
+    synth_parser.add_argument("output")
+    synth_parser.add_argument("--minutes", type=float, default=5.0)
+    synth_parser.add_argument("--rate", type=float, default=20.0, help="base events per second")
+    synth_parser.add_argument("--members", type=int, default=2000)
+    synth_parser.add_argument("--seed", type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.command == "synthesize":
+        snapshots, events = synthesize(args.kind, args.minutes, args.rate, args.members, args.seed)
+        write_recording(args.output, snapshots, events, f"synthetic:{args.kind}")
+        print(f"Wrote {len(events)} events over {events[-1][0]:.0f}s to {args.output}")
+        return 0
+
+    if args.speed != 'max' and not 1 <= float(args.speed) <= 50:
+        parser.error("--speed must be between 1 and 50, or 'max'")
+    logging.basicConfig(level=args.log_level.upper())
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    started = time.perf_counter()
+    # Some cogs print on every event; keep that out of the report
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        report = asyncio.run(replay(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f"\nTotal wall time {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
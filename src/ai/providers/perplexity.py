@@ -10,8 +10,35 @@ import logging
 from dataclasses import dataclass
 from enum import Enum
 
+from src.ai.providers.response_cache import ResponseCache, get_response_cache
+
 logger = logging.getLogger(__name__)
 
+# How long cached answers are reused, per method
+CACHE_TTLS = {
+    "generate_server_structure": 7 * 24 * 3600,
+    "analyze_content": 24 * 3600,
+    "suggest_optimizations": 24 * 3600,
+    "generate_welcome_message": 7 * 24 * 3600,
+}
+
+
+def _extract_json(response: str) -> Optional[dict]:
+    """The JSON object embedded in a model response, if there is one"""
+    json_start = response.find('{')
+    json_end = response.rfind('}') + 1
+    if json_start == -1 or json_end == 0:
+        return None
+    try:
+        return json.loads(response[json_start:json_end])
+    except ValueError:
+        return None
+
+
+def _has_json(response: str) -> bool:
+    return _extract_json(response) is not None
+
+
 class PerplexityModel(Enum):
     """Available Perplexity models"""
     LLAMA_3_1_SONAR_SMALL = "llama-3.1-sonar-small-128k-online"
@@ -40,11 +67,13 @@ class ContentAnalysis:
 class PerplexityProvider:
     """Perplexity AI provider for server design and content analysis"""
     
-    def __init__(self, api_key: str, model: PerplexityModel = PerplexityModel.LLAMA_3_1_SONAR_LARGE):
+    def __init__(self, api_key: str, model: PerplexityModel = PerplexityModel.LLAMA_3_1_SONAR_LARGE,
+                 cache: Optional[ResponseCache] = None):
         self.api_key = api_key
         self.model = model.value
         self.base_url = "https://api.perplexity.ai"
         self.session = None
+        self.cache = cache if cache is not None else get_response_cache()
         
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
@@ -96,6 +125,14 @@ class PerplexityProvider:
             logger.error(f"Error making Perplexity API request: {e}")
             raise
     
+    async def _cached_request(self, method: str, prompt: str, max_tokens: int = 4000, validate=None) -> str:
+        """``_make_request`` through the response cache; only answers ``validate`` accepts are kept"""
+        return await self.cache.get_or_compute(
+            method, self.model, f"{max_tokens}\n{prompt}",
+            lambda: self._make_request(prompt, max_tokens),
+            ttl=CACHE_TTLS[method], validate=validate,
+        )
+    
     async def generate_server_structure(self, description: str, server_type: str = "community") -> ServerStructure:
         """Generate complete server structure from description"""
         prompt = f"""
@@ -148,7 +185,7 @@ class PerplexityProvider:
         """
         
         try:
-            response = await self._make_request(prompt)
+            response = await self._cached_request("generate_server_structure", prompt, validate=_has_json)
             
             # Try to extract JSON from response
             json_start = response.find('{')
@@ -194,7 +231,7 @@ class PerplexityProvider:
         """
         
         try:
-            response = await self._make_request(prompt, max_tokens=500)
+            response = await self._cached_request("analyze_content", prompt, max_tokens=500, validate=_has_json)
             
             json_start = response.find('{')
             json_end = response.rfind('}') + 1
@@ -231,7 +268,7 @@ class PerplexityProvider:
         """Suggest server optimizations based on current structure"""
         prompt = f"""
         Analyze this Discord server structure and suggest optimizations:
-        {json.dumps(server_data, indent=2)}
+        {json.dumps(server_data, indent=2, sort_keys=True)}
         
         Provide suggestions in JSON format:
         {{
@@ -250,7 +287,7 @@ class PerplexityProvider:
         """
         
         try:
-            response = await self._make_request(prompt)
+            response = await self._cached_request("suggest_optimizations", prompt, validate=_has_json)
             
             json_start = response.find('{')
             json_end = response.rfind('}') + 1
@@ -285,7 +322,8 @@ class PerplexityProvider:
         """
         
         try:
-            response = await self._make_request(prompt, max_tokens=500)
+            response = await self._cached_request("generate_welcome_message", prompt, max_tokens=500,
+                                                  validate=bool)
             return response
         except Exception as e:
             logger.error(f"Error generating welcome message: {e}")
@@ -0,0 +1,241 @@
+"""
+Pooled Perplexity API client
+
+Every Perplexity request used to open its own ``aiohttp.ClientSession``, which
+meant a fresh TCP and TLS handshake per AI message and no bound on how many
+requests one busy guild could have in flight. ``PerplexityClientPool`` keeps
+one long-lived client per API key on a shared keep-alive connector, and runs
+every request under a per-guild and a global concurrency limit. A guild can
+only queue ``guild_limit`` requests for the global slots, so a single busy
+guild cannot starve the others. Requests time out, are retried with backoff
+on 429/5xx and connection errors, and report total latency and
+time-to-first-token metrics.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from src.core.metrics import get_registry, register_queue
+
+logger = logging.getLogger('perplexity_client')
+
+API_URL = "https://api.perplexity.ai/chat/completions"
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+REQUEST_SECONDS = get_registry().histogram(
+    "contro_perplexity_request_seconds", "Perplexity request latency, including retries and queueing",
+    ("kind", "status"), buckets=LLM_BUCKETS)
+FIRST_TOKEN_SECONDS = get_registry().histogram(
+    "contro_perplexity_first_token_seconds", "Time until the first streamed chunk arrived", buckets=LLM_BUCKETS)
+QUEUE_SECONDS = get_registry().histogram(
+    "contro_perplexity_queue_seconds", "Time spent waiting for a concurrency slot", buckets=LLM_BUCKETS)
+RETRIES = get_registry().counter(
+    "contro_perplexity_retries_total", "Retried Perplexity requests by reason", ("reason",))
+
+MAX_RETRIES = 3
+MAX_BACKOFF = 30.0
+
+
+class PerplexityError(ValueError):
+    """The API answered with an error status (after retries, when retryable)."""
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f"API error: {status} - {body[:500]}")
+        self.status = status
+        self.body = body
+
+
+class ConcurrencyLimiter:
+    """A global limit, entered only after a per-guild limit, both FIFO."""
+
+    def __init__(self, global_limit: int, guild_limit: int):
+        self.guild_limit = guild_limit
+        self._global = asyncio.Semaphore(global_limit)
+        self._guilds: Dict[Any, asyncio.Semaphore] = {}
+        self._users: Dict[Any, int] = {}
+        self.waiting = 0
+
+    @asynccontextmanager
+    async def slot(self, guild_id: Optional[int] = None):
+        semaphore = self._guilds.get(guild_id)
+        if semaphore is None:
+            semaphore = self._guilds[guild_id] = asyncio.Semaphore(self.guild_limit)
+        self._users[guild_id] = self._users.get(guild_id, 0) + 1
+        started = time.perf_counter()
+        self.waiting += 1
+        acquired = False
+        try:
+            async with semaphore:
+                async with self._global:
+                    self.waiting -= 1
+                    acquired = True
+                    QUEUE_SECONDS.observe(time.perf_counter() - started)
+                    yield
+        finally:
+            if not acquired:
+                self.waiting -= 1
+            self._users[guild_id] -= 1
+            if not self._users[guild_id]:
+                # Idle guilds do not keep a semaphore around
+                del self._users[guild_id]
+                del self._guilds[guild_id]
+
+
+class PerplexityStream:
+    """Raw lines of a streamed completion; records when the first one arrived."""
+
+    def __init__(self, response: aiohttp.ClientResponse, started: float):
+        self.response = response
+        self.started = started
+        self.first_chunk_at: Optional[float] = None
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for line in self.response.content:
+            if self.first_chunk_at is None and line.strip():
+                self.first_chunk_at = time.perf_counter()
+                FIRST_TOKEN_SECONDS.observe(self.first_chunk_at - self.started)
+            yield line
+
+
+class PerplexityClient:
+    """Requests for one API key over the pool's shared connector."""
+
+    def __init__(self, api_key: str, connector: aiohttp.TCPConnector, limiter: ConcurrencyLimiter,
+                 request_timeout: float = 90.0, max_retries: int = MAX_RETRIES):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=False,
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            # Streams can run long; only stalls between chunks and slow connects are cut off
+            timeout=aiohttp.ClientTimeout(total=None, connect=10, sock_read=60),
+        )
+
+    async def complete(self, messages: List[Dict[str, str]], *, model: str, guild_id: Optional[int] = None,
+                       **options) -> str:
+        """The assistant's full answer to ``messages``."""
+        payload = dict(options, model=model, messages=messages, stream=False)
+        started = time.perf_counter()
+        status = "error"
+        async with self.limiter.slot(guild_id):
+            try:
+                response = await self._post(payload, timeout=aiohttp.ClientTimeout(total=self.request_timeout))
+                async with response:
+                    status = str(response.status)
+                    data = await response.json()
+                return data["choices"][0]["message"]["content"]
+            finally:
+                REQUEST_SECONDS.labels("complete", status).observe(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def stream(self, messages: List[Dict[str, str]], *, model: str, guild_id: Optional[int] = None,
+                     **options) -> AsyncIterator[PerplexityStream]:
+        """A streamed completion; the concurrency slot is held until the block exits."""
+        payload = dict(options, model=model, messages=messages, stream=True)
+        started = time.perf_counter()
+        status = "error"
+        async with self.limiter.slot(guild_id):
+            try:
+                response = await self._post(payload)
+                status = str(response.status)
+                async with response:
+                    yield PerplexityStream(response, started)
+            finally:
+                REQUEST_SECONDS.labels("stream", status).observe(time.perf_counter() - started)
+
+    async def _post(self, payload: Dict[str, Any], timeout: Optional[aiohttp.ClientTimeout] = None
+                    ) -> aiohttp.ClientResponse:
+        """POST with retries on 429/5xx and connection errors. Returns a 200 response the caller releases."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.session.post(API_URL, json=payload, timeout=timeout)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    raise
+                RETRIES.labels("connection").inc()
+                logger.warning(f"Perplexity request failed ({e!r}), retrying")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status == 200:
+                return response
+            body = await response.text()
+            response.release()
+            if last_attempt or not (response.status == 429 or response.status >= 500):
+                raise PerplexityError(response.status, body)
+            RETRIES.labels(str(response.status)).inc()
+            delay = self._backoff(attempt, response.headers.get("Retry-After"))
+            logger.warning(f"Perplexity returned {response.status}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_BACKOFF)
+            except ValueError:
+                pass
+        return min(0.5 * 2 ** attempt, MAX_BACKOFF) * random.uniform(0.8, 1.2)
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+class PerplexityClientPool:
+    """Long-lived clients by API key, sharing one connection pool and one concurrency limiter."""
+
+    def __init__(self, global_limit: int = 8, guild_limit: int = 2, limit_per_host: int = 16):
+        self.global_limit = global_limit
+        self.guild_limit = guild_limit
+        self.limit_per_host = limit_per_host
+        self._connector: Optional[aiohttp.TCPConnector] = None
+        self._limiter: Optional[ConcurrencyLimiter] = None
+        self._clients: Dict[str, PerplexityClient] = {}
+
+    def get(self, api_key: str) -> PerplexityClient:
+        client = self._clients.get(api_key)
+        if client is None:
+            if self._connector is None or self._connector.closed:
+                # Created on first use, inside the running loop
+                self._connector = aiohttp.TCPConnector(
+                    limit_per_host=self.limit_per_host, ttl_dns_cache=300, keepalive_timeout=60)
+                self._limiter = ConcurrencyLimiter(self.global_limit, self.guild_limit)
+                register_queue("perplexity_requests", lambda: self._limiter.waiting if self._limiter else 0)
+            client = self._clients[api_key] = PerplexityClient(api_key, self._connector, self._limiter)
+        return client
+
+    async def discard(self, api_key: str) -> None:
+        """Close the client of a key that was replaced or revoked."""
+        client = self._clients.pop(api_key, None)
+        if client is not None:
+            await client.close()
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+        if self._connector is not None:
+            await self._connector.close()
+            self._connector = None
+
+
+_pool: Optional[PerplexityClientPool] = None
+
+
+def get_perplexity_pool() -> PerplexityClientPool:
+    """The process-wide Perplexity client pool."""
+    global _pool
+    if _pool is None:
+        _pool = PerplexityClientPool()
+    return _pool
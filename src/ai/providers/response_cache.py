@@ -0,0 +1,167 @@
+"""
+Response cache for LLM provider calls
+
+Analysis and generation calls are keyed by (method, model, normalized prompt
+hash). Answers are kept in an in-process LRU in front of a Mongo collection
+with a TTL index, so an unchanged guild or a repeated welcome theme is served
+without another API request, across restarts and clusters. Concurrent
+requests for the same key share one API call. Hits and misses are counted
+per method so the hit rate shows up in the metrics.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.core.metrics import get_registry
+
+logger = logging.getLogger('ai_response_cache')
+
+LOOKUPS = get_registry().counter(
+    "contro_ai_cache_total", "AI response cache lookups by method and outcome", ("method", "outcome"))
+
+# After a Mongo error the persistent layer is skipped for this long
+MONGO_RETRY_SECONDS = 60.0
+
+
+def cache_key(method: str, model: str, prompt: str) -> str:
+    """Hash of the call; whitespace differences in the prompt do not matter."""
+    normalized = " ".join(prompt.split())
+    return hashlib.sha256(f"{method}\0{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU over a Mongo TTL collection, with in-flight coalescing."""
+
+    def __init__(self, db=None, collection: str = "ai_response_cache", max_entries: int = 512):
+        self.db = db
+        self.collection = collection
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._index_ready = False
+        self._mongo_retry_at = 0.0
+        self.stats: Dict[str, int] = {"memory": 0, "mongo": 0, "coalesced": 0, "miss": 0}
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["memory"] + self.stats["mongo"] + self.stats["coalesced"]
+        total = hits + self.stats["miss"]
+        return hits / total if total else 0.0
+
+    async def get_or_compute(self, method: str, model: str, prompt: str, compute: Callable[[], Awaitable[str]],
+                             ttl: float, validate: Optional[Callable[[str], bool]] = None) -> str:
+        """The cached answer for the call, or ``compute()``'s, which is cached when ``validate`` accepts it."""
+        key = cache_key(method, model, prompt)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self._count(method, "memory")
+                return entry[1]
+            del self._entries[key]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._count(method, "coalesced")
+            return await asyncio.shield(future)
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            response = await self._load(key)
+            if response is not None:
+                self._count(method, "mongo")
+            else:
+                self._count(method, "miss")
+                response = await compute()
+                if validate is None or validate(response):
+                    await self._store(key, method, model, response, ttl)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters see the error; if there are none it must not be logged as never retrieved
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _count(self, method: str, outcome: str) -> None:
+        self.stats[outcome] += 1
+        LOOKUPS.labels(method, outcome).inc()
+
+    def _remember(self, key: str, expires: float, response: str) -> None:
+        self._entries[key] = (expires, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _mongo_available(self) -> bool:
+        return self.db is not None and time.monotonic() >= self._mongo_retry_at
+
+    def _mongo_failed(self, action: str, error: Exception) -> None:
+        logger.error(f"AI response cache could not {action} Mongo, using memory only for now: {error}")
+        self._mongo_retry_at = time.monotonic() + MONGO_RETRY_SECONDS
+
+    async def _load(self, key: str) -> Optional[str]:
+        if not self._mongo_available():
+            return None
+        try:
+            document = await asyncio.to_thread(
+                self.db[self.collection].find_one,
+                {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            )
+        except Exception as e:
+            self._mongo_failed("read from", e)
+            return None
+        if not document:
+            return None
+        expires_at = document["expires_at"]
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self._remember(key, expires_at.timestamp(), document["response"])
+        return document["response"]
+
+    async def _store(self, key: str, method: str, model: str, response: str, ttl: float) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        self._remember(key, expires_at.timestamp(), response)
+        if not self._mongo_available():
+            return
+        collection = self.db[self.collection]
+        try:
+            if not self._index_ready:
+                # Mongo drops documents once expires_at has passed
+                await asyncio.to_thread(collection.create_index, "expires_at", expireAfterSeconds=0)
+                self._index_ready = True
+            await asyncio.to_thread(
+                collection.replace_one,
+                {"_id": key},
+                {"method": method, "model": model, "response": response,
+                 "created_at": datetime.now(timezone.utc), "expires_at": expires_at},
+                upsert=True,
+            )
+        except Exception as e:
+            self._mongo_failed("write to", e)
+
+    def summary(self) -> Dict[str, Any]:
+        return dict(self.stats, entries=len(self._entries), hit_rate=round(self.hit_rate, 3))
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """The process-wide AI response cache, on the shared Mongo database."""
+    global _cache
+    if _cache is None:
+        from src.utils.database.connection import initialize_mongodb
+        _cache = ResponseCache(initialize_mongodb())
+    return _cache
@@ -5,7 +5,7 @@ Provides REST API endpoints for dashboard and external integrations
 
 import asyncio
 import time
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
 import threading
@@ -15,9 +15,11 @@ from src.core.config import get_config
 from src.core.logger import setup_logging, get_logger
 from src.core.database import get_database_manager
 from src.core.cache import get_cache_manager
+from src.core.metrics import API_SECONDS, get_registry
 from .middleware.auth import auth_middleware
 from .middleware.rate_limit import rate_limit_middleware
 from .routes.giveaway_api import giveaway_bp
+from .routes.shards import shards_bp
 
 
 def create_app() -> Flask:
@@ -35,7 +37,8 @@ def create_app() -> Flask:
     # Configure CORS
     CORS(app, origins=config.api.cors_origins)
     
-    # Register middleware
+    # Register middleware; metrics first so rejected requests are timed too
+    register_metrics(app)
     app.before_request(auth_middleware)
     app.before_request(rate_limit_middleware)
     
@@ -46,6 +49,7 @@ def create_app() -> Flask:
     from .routes import initialize_all_apis
     # Note: routes will be registered when bot is available
     app.register_blueprint(giveaway_bp, url_prefix="/api/giveaway")
+    app.register_blueprint(shards_bp, url_prefix="/api/shards")
     
     # Health check endpoint
     @app.route('/health')
@@ -69,6 +73,28 @@ def create_app() -> Flask:
     return app
 
 
+def register_metrics(app: Flask) -> None:
+    """Time API requests and expose the metrics registry at /metrics."""
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request_time(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # The URL rule keeps the label set small; unmatched paths share one label
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            API_SECONDS.labels(endpoint, request.method, response.status_code).observe(time.perf_counter() - started)
+        return response
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint."""
+        return Response(get_registry().render(), mimetype='text/plain; version=0.0.4')
+
+
 def register_error_handlers(app: Flask) -> None:
     """Register error handlers for the Flask app."""
     
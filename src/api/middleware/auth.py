@@ -15,6 +15,7 @@ def auth_middleware():
     # Skip auth for health check and public endpoints
     public_endpoints = [
         'health_check', 
+        'metrics',
         'static',
         'ping',
         'index'
@@ -25,6 +25,14 @@ async def initialize_autorole_api(bot):
     global bot_instance
     bot_instance = bot
 
+def notify_autorole_changed(guild_id: str):
+    """Make the bot drop its cached autorole rules for a guild (called from API threads)"""
+    if not bot_instance:
+        return
+    cog = bot_instance.get_cog('AutoRole')
+    if cog is not None:
+        bot_instance.loop.call_soon_threadsafe(cog.invalidate_rules, int(guild_id))
+
 @autorole_api.route('/settings/<guild_id>', methods=['GET'])
 @require_auth
 async def get_guild_autorole(guild_id):
@@ -65,6 +73,7 @@ def update_autorole_settings(guild_id: str):
 
         # Update settings in database
         result = asyncio.run(update_autorole_settings_in_db(guild_id, data))
+        notify_autorole_changed(guild_id)
         
         return jsonify({
             "success": True,
@@ -118,6 +127,7 @@ def create_autorole_rule(guild_id: str):
 
         # Create rule in database
         result = asyncio.run(create_autorole_rule_in_db(guild_id, data))
+        notify_autorole_changed(guild_id)
         
         return jsonify({
             "success": True,
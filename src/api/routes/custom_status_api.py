@@ -11,6 +11,14 @@ from ..middleware.auth import require_auth
 custom_status_bp = Blueprint('custom_status', __name__)
 logger = get_logger("custom_status_api")
 
+# Initialize bot reference
+bot_instance = None
+
+def initialize_custom_status_api(bot):
+    """Initialize the custom status API with bot reference"""
+    global bot_instance
+    bot_instance = bot
+
 
 @custom_status_bp.route('/<guild_id>', methods=['GET'])
 @require_auth
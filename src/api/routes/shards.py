@@ -0,0 +1,48 @@
+"""
+Shard API Routes
+Per shard latency and guild counts for every cluster
+"""
+
+import asyncio
+import logging
+
+from flask import Blueprint, jsonify
+
+from src.core.application import current_application_manager
+
+shards_bp = Blueprint('shards', __name__)
+
+logger = logging.getLogger('shards_api')
+
+# How long the API thread waits for the bot loop (and the IPC hub behind it)
+STATS_TIMEOUT = 5.0
+
+
+def _get_bot():
+    app_manager = current_application_manager()
+    return app_manager.get_bot() if app_manager else None
+
+
+@shards_bp.route('', methods=['GET'])
+def get_shards():
+    """Stats of every cluster and shard, keyed by cluster id."""
+    bot = _get_bot()
+    if bot is None or not hasattr(bot, 'cluster_stats') or not bot.is_ready():
+        return jsonify({"error": "Bot is not ready"}), 503
+
+    try:
+        # Shard objects live on the bot's event loop; read them there instead of from this thread
+        future = asyncio.run_coroutine_threadsafe(bot.cluster_stats(), bot.loop)
+        clusters = future.result(timeout=STATS_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Failed to collect shard stats: {e}")
+        return jsonify({"error": "Failed to collect shard stats"}), 500
+
+    shards = [shard for cluster in clusters.values() for shard in cluster.get('shards', {}).values()]
+    latencies = [shard['latency_ms'] for shard in shards if shard.get('latency_ms') is not None]
+    return jsonify({
+        "clusters": clusters,
+        "shard_count": bot.shard_count,
+        "guilds": sum(cluster.get('guilds', 0) for cluster in clusters.values()),
+        "average_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+    })
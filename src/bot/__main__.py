@@ -1,14 +1,14 @@
-"""Entry point for the bot application."""
+"""Entry point for the cluster launcher (python -m src.bot)."""
 
 import sys
 from pathlib import Path
 
-# Add src to Python path
-src_path = Path(__file__).parent.parent
-if str(src_path) not in sys.path:
-    sys.path.insert(0, str(src_path))
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-from bot.launcher import main
+from src.bot.launcher import main
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
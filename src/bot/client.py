@@ -9,16 +9,31 @@ from discord.ext import commands
 from typing import Optional, Dict, Any
 import os
 import sys
+import time
 
 from src.core.config import get_config
 from src.core.logger import get_logger, LoggerMixin
 from src.core.application import get_application_manager
+from src.core.message_pipeline import MessagePipeline
+from src.core.metrics import BotMetricsMixin
+from src.core.cluster import ClusterMixin
+from src.core.diagnostics import LoopStallWatchdog
+from src.core.gateway_recorder import GatewayRecorder, RECORDED_EVENTS
+from src.core.startup import ExtensionLoader, ImportProfiler, STARTUP_SECONDS
+from src.core.command_sync import create_command_sync
+from src.core.scheduler import create_scheduler
+from src.ai.providers.perplexity_client import get_perplexity_pool
+from src.utils.external.http import get_http_client
+from src.utils.database.connection import get_shared_sync_db, initialize_mongodb
+from src.core.message_cache import create_message_cache, dispatch_raw_delete, dispatch_raw_bulk_delete, dispatch_raw_edit
 
 
-class ControBot(commands.Bot, LoggerMixin):
+class ControBot(BotMetricsMixin, ClusterMixin, commands.AutoShardedBot, LoggerMixin):
     """Main Discord bot class with application manager integration."""
     
     def __init__(self, config):
+        self._created_at = time.perf_counter()
+        
         # Set up intents
         intents = discord.Intents.default()
         intents.message_content = True
@@ -41,18 +56,43 @@ class ControBot(commands.Bot, LoggerMixin):
                 prefix = config.get('discord_prefix', '!')
             self.config = config
         
-        # Initialize bot
+        # Initialize bot; Discord's recommended shard count unless the cluster launcher assigned shards
         super().__init__(
             command_prefix=prefix,
             intents=intents,
             help_command=None,
-            case_insensitive=True
+            case_insensitive=True,
+            **self.sharding_options()
         )
         
         self.app_manager = None
         self.sync_db = None
         self.async_db = None
         
+        # Message stages registered by cogs (see src/core/message_pipeline.py)
+        self.message_pipeline = MessagePipeline(self)
+        
+        # Compact copies of recent messages for edit/delete logging (see src/core/message_cache.py)
+        self.message_cache = create_message_cache()
+        
+        # Captures the stack of whatever blocks the event loop (see src/core/diagnostics.py)
+        self.stall_watchdog = LoopStallWatchdog(threshold=get_config().performance.loop_stall_threshold)
+        
+        # Anonymized gateway capture for scripts/replay_gateway.py (see src/core/gateway_recorder.py)
+        self.gateway_recorder = None
+        
+        # Only calls tree.sync() when the command set changed (see src/core/command_sync.py)
+        self.command_sync = create_command_sync(self, initialize_mongodb())
+        
+        # Durable delayed actions (temporary roles, unbans, channel deletions; see src/core/scheduler.py)
+        self.scheduler = create_scheduler(self, initialize_mongodb())
+        
+        # Shared outbound HTTP: pooled connections, response cache, per-host circuit breakers
+        self.http_client = get_http_client()
+        
+        self._db_warmup = None
+        self._startup_reported = False
+        
     async def setup_hook(self):
         """Called when the bot is starting up."""
         self.logger.info("Setting up bot...")
@@ -65,8 +105,31 @@ class ControBot(commands.Bot, LoggerMixin):
             self.async_db = self.app_manager.get_db_manager()
             self.sync_db = self.app_manager.get_sync_db_manager()
             
+            # Listener, command, gateway and loop lag metrics
+            self.start_metrics()
+            self.stall_watchdog.start()
+            
+            # Shard gauges, and the IPC link to the other clusters when started by the launcher
+            self.start_cluster()
+            
+            # Recovers persisted actions once the bot is ready, after cogs registered their handlers
+            self.scheduler.start()
+            
+            performance = get_config().performance
+            if performance.gateway_record_path:
+                self.start_recording(performance.gateway_record_path, max_events=performance.gateway_record_limit)
+            
+            # Connect the shared sync database while extensions import; cogs only touch it on first query
+            self._db_warmup = asyncio.create_task(self._warm_up_database())
+            
             # Load cogs
-            await self.load_cogs()
+            if performance.import_profile:
+                with ImportProfiler() as profiler:
+                    await self.load_cogs()
+                self.logger.info(f"Extension import profile:\n{profiler.report()}")
+            else:
+                await self.load_cogs()
+            STARTUP_SECONDS.labels("setup_hook").set(time.perf_counter() - self._created_at)
             
             self.logger.info("Bot setup completed successfully")
             
@@ -75,43 +138,51 @@ class ControBot(commands.Bot, LoggerMixin):
             raise
     
     async def load_cogs(self):
-        """Load all bot cogs."""
+        """Load all bot cogs concurrently (see src/core/startup.py)."""
         cogs_dir = os.path.join(os.path.dirname(__file__), '..', 'cogs')
         
         # Files to exclude from loading (these are not cogs)
         exclude_files = {'base.py', '__init__.py'}
         
-        for filename in os.listdir(cogs_dir):
-            if filename.endswith('.py') and filename not in exclude_files:
-                cog_name = filename[:-3]
-                try:
-                    await self.load_extension(f'src.cogs.{cog_name}')
-                    self.logger.info(f"Loaded cog: {cog_name}")
-                except Exception as e:
-                    self.logger.error(f"Failed to load cog {cog_name}: {e}")
-        
-        # Also load subdirectory cogs
-        await self._load_cogs_from_subdirs(cogs_dir)
-    
-    async def _load_cogs_from_subdirs(self, cogs_dir):
-        """Load cogs from subdirectories."""
-        for item in os.listdir(cogs_dir):
+        extensions = []
+        for item in sorted(os.listdir(cogs_dir)):
             item_path = os.path.join(cogs_dir, item)
-            if os.path.isdir(item_path) and not item.startswith('__'):
-                # Check if directory has __init__.py with setup function
-                init_file = os.path.join(item_path, '__init__.py')
-                if os.path.exists(init_file):
-                    try:
-                        await self.load_extension(f'src.cogs.{item}')
-                        self.logger.info(f"Loaded cog module: {item}")
-                    except Exception as e:
-                        self.logger.error(f"Failed to load cog module {item}: {e}")
+            if item.endswith('.py') and item not in exclude_files:
+                extensions.append(f'src.cogs.{item[:-3]}')
+            elif os.path.isdir(item_path) and not item.startswith('__'):
+                # Subdirectories with an __init__.py setup function are cog modules
+                if os.path.exists(os.path.join(item_path, '__init__.py')):
+                    extensions.append(f'src.cogs.{item}')
+        
+        loader = ExtensionLoader(self)
+        loaded = await loader.load(extensions)
+        for name in loaded:
+            self.logger.info(f"Loaded cog: {name} ({loader.timings[name]:.2f}s)")
+        for name, error in loader.failed.items():
+            self.logger.error(f"Failed to load cog {name}: {error}")
+    
+    async def _warm_up_database(self):
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(get_shared_sync_db)
+            STARTUP_SECONDS.labels("database").set(time.perf_counter() - started)
+        except Exception as e:
+            self.logger.error(f"Failed to connect the shared database: {e}")
     
     async def on_ready(self):
         """Called when the bot is ready."""
         self.logger.info(f"Bot is ready! Logged in as {self.user}")
         self.logger.info(f"Bot is in {len(self.guilds)} guilds")
         
+        if not self._startup_reported:
+            self._startup_reported = True
+            startup = time.perf_counter() - self._created_at
+            STARTUP_SECONDS.labels("ready").set(startup)
+            self.logger.info(f"Startup took {startup:.2f}s")
+            # Unchanged commands cost no API call, so this is free on a plain restart
+            if self.is_primary_cluster:
+                await self.command_sync.try_sync_commands()
+        
         # Set bot status based on environment
         if hasattr(self.config, 'environment'):
             environment = self.config.environment
@@ -141,6 +212,25 @@ class ControBot(commands.Bot, LoggerMixin):
             
         await self.change_presence(activity=activity)
     
+    async def on_message(self, message):
+        """Run commands, then the message stages the guild has enabled."""
+        self.message_cache.add(message)
+        await self.process_commands(message)
+        await self.message_pipeline.dispatch(message)
+    
+    async def on_raw_message_delete(self, payload):
+        dispatch_raw_delete(self, self.message_cache, payload)
+    
+    async def on_raw_bulk_message_delete(self, payload):
+        dispatch_raw_bulk_delete(self, self.message_cache, payload)
+    
+    async def on_raw_message_edit(self, payload):
+        dispatch_raw_edit(self, self.message_cache, payload)
+    
+    async def on_guild_remove(self, guild):
+        self.message_pipeline.invalidate(guild.id)
+        self.message_cache.forget_guild(guild.id)
+    
     async def on_command_error(self, ctx, error):
         """Handle command errors."""
         if isinstance(error, commands.CommandNotFound):
@@ -165,9 +255,36 @@ class ControBot(commands.Bot, LoggerMixin):
     async def close(self):
         """Called when the bot is shutting down."""
         self.logger.info("Shutting down bot...")
+        self.stop_metrics()
+        self.stall_watchdog.stop()
+        self.stop_recording()
+        if self.gateway_recorder:
+            await self.gateway_recorder.wait_closed()
+        await self.stop_cluster()
+        await self.scheduler.stop()
+        await get_perplexity_pool().close()
+        await self.http_client.close()
         await super().close()
         self.logger.info("Bot shutdown completed")
     
+    def start_recording(self, path: str, events=RECORDED_EVENTS, max_events: int = 100000):
+        """Start writing anonymized gateway dispatches to ``path``."""
+        if self.gateway_recorder and self.gateway_recorder.running:
+            self.logger.warning(f"Gateway recording already running to {self.gateway_recorder.path}")
+            return
+        try:
+            self.gateway_recorder = GatewayRecorder(path, events=events, max_events=max_events)
+            self.gateway_recorder.start(self)
+        except Exception as e:
+            self.logger.error(f"Failed to start gateway recording: {e}")
+            self.gateway_recorder = None
+    
+    def stop_recording(self) -> int:
+        """Stop the gateway recording, returning how many events were written."""
+        if not self.gateway_recorder:
+            return 0
+        return self.gateway_recorder.stop()
+    
     # Convenience methods for accessing application services
     def get_database(self):
         """Get database manager from application manager."""
@@ -1,135 +1,203 @@
-"""Bot launcher and initialization."""
+"""
+Cluster launcher for Contro Discord Bot
+
+Runs the bot as several processes ("clusters"), each owning a contiguous
+range of shards. The launcher asks Discord for the recommended shard count
+and identify concurrency, hosts the IPC hub the clusters talk through
+(src/core/ipc.py), starts the clusters one identify window apart, and
+restarts any that crash.
+
+Usage:
+    python main.py prod --clusters 4
+    python -m src.bot prod --clusters 4 --shards 16
+"""
+
+import argparse
+import asyncio
+import math
 import os
+import secrets
+import signal
 import sys
-import asyncio
-import logging
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
-import discord
-from discord.ext import commands
-
-from .client import ControBot
-from .constants import *
-from src.utils.core.manager import initialize_manager, cleanup_manager
-from src.utils.common.logger import setup_logger
-
-# Add parent directory to path for imports
-sys.path.append(str(Path(__file__).parent.parent.parent))
-
-logger = logging.getLogger(__name__)
-
-
-class BotLauncher:
-    """Handles bot initialization and startup."""
-    
-    def __init__(self):
-        """Initialize the launcher."""
-        self.bot = None
-        
-    async def setup_manager(self):
-        """Setup central manager with database and views."""
-        # Initialize central manager with the bot
-        success = await initialize_manager(self.bot, db_mode="auto")
-        if not success:
-            raise RuntimeError("Failed to initialize central manager")
-        
-        logger.info("Central manager setup complete")
-        
-    async def load_extensions(self):
-        """Load bot extensions/cogs."""
-        # Define cogs to load - scan directory for actual cogs
-        base_cogs = [
-            'src.cogs.community.registration',
-            'src.cogs.utility.ping',
-            # Add more cogs as they're discovered
-        ]
-        
-        # Try to auto-discover additional cogs
-        cogs_dir = Path(__file__).parent.parent / 'cogs'
-        if cogs_dir.exists():
-            for category_dir in cogs_dir.iterdir():
-                if category_dir.is_dir() and not category_dir.name.startswith('__'):
-                    for cog_file in category_dir.iterdir():
-                        if cog_file.is_file() and cog_file.suffix == '.py' and not cog_file.name.startswith('__'):
-                            cog_path = f'src.cogs.{category_dir.name}.{cog_file.stem}'
-                            if cog_path not in base_cogs:
-                                base_cogs.append(cog_path)
-        
-        loaded_count = 0
-        failed_count = 0
-        
-        for cog in base_cogs:
-            try:
-                await self.bot.load_extension(cog)
-                logger.info(f"Loaded cog: {cog}")
-                loaded_count += 1
-            except Exception as e:
-                logger.error(f"Failed to load cog {cog}: {e}")
-                failed_count += 1
-                
-        logger.info(f"Cog loading complete: {loaded_count} loaded, {failed_count} failed")
-                
-    async def start(self):
-        """Start the bot."""
-        # Setup logging
-        setup_logger()
-        
-        logger.info("Starting ControBot...")
-        
-        # Load configuration
-        token = os.getenv('DISCORD_TOKEN')
-        if not token:
-            raise ValueError("DISCORD_TOKEN environment variable not set")
-        
-        # Create bot instance
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.members = True
-        intents.guilds = True
-        
-        self.bot = ControBot(intents=intents)
-        
-        # Setup central manager (database + persistent views)
-        await self.setup_manager()
-        
-        # Load extensions
-        await self.load_extensions()
-        
-        # Start the bot
+import aiohttp
+
+from src.core.cluster import split_shards
+from src.core.config import reload_config
+from src.core.ipc import IPCServer
+from src.core.logger import get_logger
+
+logger = get_logger("launcher")
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+# Discord allows max_concurrency identifies per window
+IDENTIFY_WINDOW = 5.5
+# A cluster that stayed up this long before crashing restarts without backoff
+STABLE_UPTIME = 60.0
+MAX_RESTART_DELAY = 60.0
+
+
+async def fetch_gateway_sharding(token: str) -> Tuple[int, int]:
+    """Discord's recommended shard count and identify concurrency for ``token``."""
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
+        async with session.get(GATEWAY_BOT_URL, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+    limit = data.get("session_start_limit") or {}
+    return int(data["shards"]), int(limit.get("max_concurrency", 1))
+
+
+class ClusterLauncher:
+    """Spawns and supervises one ``main.py`` process per cluster."""
+
+    def __init__(self, mode: str, clusters: int, shard_count: Optional[int] = None,
+                 max_concurrency: Optional[int] = None, ipc_host: str = "127.0.0.1"):
+        self.mode = mode
+        self.clusters = clusters
+        self.shard_count = shard_count
+        self.max_concurrency = max_concurrency
+        self.ipc = IPCServer(ipc_host, 0, secrets.token_hex(32))
+        self.processes: Dict[int, asyncio.subprocess.Process] = {}
+        self._identify_lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+
+    async def _resolve_sharding(self) -> None:
+        if self.shard_count and self.max_concurrency:
+            return
+        # Same environment mapping as ApplicationManager._setup_config, so the right token is used
+        environment = {'dev': 'development', 'prod': 'production'}.get(self.mode, self.mode)
+        token = reload_config(environment).get_discord_token()
         try:
-            await self.bot.start(token)
-        except KeyboardInterrupt:
-            logger.info("Received interrupt signal")
+            recommended, concurrency = await fetch_gateway_sharding(token)
         except Exception as e:
-            logger.error(f"Bot crashed: {e}", exc_info=True)
+            if not self.shard_count:
+                raise RuntimeError(f"Could not fetch the recommended shard count: {e}") from e
+            logger.warning(f"Could not fetch identify concurrency, assuming 1: {e}")
+            recommended, concurrency = self.shard_count, 1
+        self.shard_count = self.shard_count or recommended
+        self.max_concurrency = self.max_concurrency or concurrency
+
+    def _environment(self, cluster_id: int, shard_ids: List[int]) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            "CONTRO_SHARD_COUNT": str(self.shard_count),
+            "CONTRO_SHARD_IDS": ",".join(str(shard) for shard in shard_ids),
+            "CONTRO_CLUSTER_ID": str(cluster_id),
+            "CONTRO_CLUSTER_COUNT": str(self.clusters),
+            "CONTRO_IPC_HOST": self.ipc.host,
+            "CONTRO_IPC_PORT": str(self.ipc.port),
+            "CONTRO_IPC_SECRET": self.ipc.secret,
+        })
+        return env
+
+    async def _spawn(self, cluster_id: int, shard_ids: List[int]) -> asyncio.subprocess.Process:
+        # Hold the identify window so clusters (and restarts) do not identify at the same time
+        async with self._identify_lock:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, str(PROJECT_ROOT / "main.py"), self.mode,
+                cwd=str(PROJECT_ROOT),
+                env=self._environment(cluster_id, shard_ids),
+            )
+            self.processes[cluster_id] = process
+            logger.info(f"Cluster {cluster_id} started (pid {process.pid}, shards {shard_ids[0]}-{shard_ids[-1]})")
+            windows = math.ceil(len(shard_ids) / self.max_concurrency)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=windows * IDENTIFY_WINDOW)
+            except asyncio.TimeoutError:
+                pass
+        return process
+
+    async def _supervise(self, cluster_id: int, shard_ids: List[int]) -> None:
+        delay = 0.5
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            process = await self._spawn(cluster_id, shard_ids)
+            code = await process.wait()
+            if self._stopping.is_set():
+                break
+            if code == 0:
+                logger.info(f"Cluster {cluster_id} shut down cleanly, not restarting it")
+                break
+            uptime = time.monotonic() - started
+            delay = 1.0 if uptime > STABLE_UPTIME else min(delay * 2, MAX_RESTART_DELAY)
+            logger.error(f"Cluster {cluster_id} exited with code {code} after {uptime:.0f}s, restarting in {delay:.0f}s")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        self.processes.pop(cluster_id, None)
+
+    def stop(self) -> None:
+        """Stop restarting clusters and ask the running ones to shut down."""
+        if self._stopping.is_set():
+            return
+        logger.info("Stopping clusters...")
+        self._stopping.set()
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+
+    async def _reap(self, timeout: float = 30.0) -> None:
+        running = [p for p in self.processes.values() if p.returncode is None]
+        if not running:
+            return
+        _, pending = await asyncio.wait([asyncio.create_task(p.wait()) for p in running], timeout=timeout)
+        if pending:
+            for process in running:
+                if process.returncode is None:
+                    logger.warning(f"Cluster process {process.pid} did not exit in {timeout:.0f}s, killing it")
+                    process.kill()
+
+    async def run(self) -> None:
+        await self._resolve_sharding()
+        groups = split_shards(self.shard_count, self.clusters)
+        if len(groups) < self.clusters:
+            logger.warning(f"Only {self.shard_count} shards, running {len(groups)} clusters")
+            self.clusters = len(groups)
+
+        await self.ipc.start()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except NotImplementedError:  # Windows
+                signal.signal(signum, lambda *_: loop.call_soon_threadsafe(self.stop))
+
+        logger.info(f"Launching {self.clusters} clusters for {self.shard_count} shards "
+                    f"(identify concurrency {self.max_concurrency})")
+        try:
+            await asyncio.gather(*(
+                self._supervise(cluster_id, shard_ids) for cluster_id, shard_ids in enumerate(groups)
+            ))
         finally:
-            await self.cleanup()
-            
-    async def cleanup(self):
-        """Cleanup resources."""
-        logger.info("Cleaning up...")
-        
-        if self.bot:
-            await self.bot.close()
-            
-        # Cleanup central manager
-        await cleanup_manager()
-            
-        logger.info("Cleanup complete")
+            self.stop()
+            await self._reap()
+            await self.ipc.close()
+            logger.info("All clusters stopped")
 
 
 def main():
     """Main entry point."""
-    launcher = BotLauncher()
-    
+    parser = argparse.ArgumentParser(description="Contro Discord Bot cluster launcher")
+    parser.add_argument("mode", choices=["dev", "prod", "bot-only"], help="Mode each cluster runs in")
+    parser.add_argument("--clusters", type=int, default=2, help="Number of bot processes")
+    parser.add_argument("--shards", type=int, default=None, help="Total shards (default: Discord's recommendation)")
+    args = parser.parse_args()
+
     try:
-        asyncio.run(launcher.start())
+        asyncio.run(ClusterLauncher(args.mode, args.clusters, args.shards).run())
     except KeyboardInterrupt:
-        print("\nBot stopped by user")
+        print("\nClusters stopped by user")
     except Exception as e:
         print(f"Fatal error: {e}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -5,9 +5,13 @@ from typing import Optional, List, Dict, Union
 import logging
 import json
 import os
+import io
 import datetime
+import threading
 
 from src.utils.core.formatting import create_embed
+from src.core.diagnostics import SamplingProfiler, profile_loop
+from src.ai.providers.response_cache import get_response_cache
 from src.utils.database.connection import initialize_mongodb, is_db_available
 from ..base import BaseCog
 
@@ -210,6 +214,167 @@ class BotSettings(BaseCog):
         super().__init__(bot)
         self.mongo_db = initialize_mongodb()
         self.versions_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'versions.json')
+        self.profiler: Optional[SamplingProfiler] = None
+    
+    @commands.group(name="diagnostics", invoke_without_command=True)
+    @commands.is_owner()
+    async def diagnostics(self, ctx):
+        """Olay döngüsü tıkanmalarını göster"""
+        watchdog = getattr(self.bot, 'stall_watchdog', None)
+        if watchdog is None:
+            return await ctx.send(embed=create_embed("❌ Döngü izleyici etkin değil.", discord.Color.red()))
+        
+        embed = discord.Embed(title="🩺 Olay Döngüsü", color=discord.Color.blue())
+        embed.add_field(name="İzleyici", value="Çalışıyor" if watchdog.running else "Durdu")
+        embed.add_field(name="Eşik", value=f"{watchdog.threshold:.2f}s")
+        embed.add_field(name="Kayıtlı Tıkanma", value=str(len(watchdog.stalls)))
+        for stall in list(watchdog.stalls)[-3:]:
+            embed.add_field(
+                name=f"{stall['started_at']} ({stall['duration']:.2f}s)",
+                value=f"```{stall['stack'][-900:]}```",
+                inline=False
+            )
+        await ctx.send(embed=embed)
+    
+    @diagnostics.command(name="profile")
+    @commands.is_owner()
+    async def diagnostics_profile(self, ctx, seconds: int = 30):
+        """Olay döngüsünü N saniye örnekle ve flamegraph dosyası gönder"""
+        if self.profiler is not None and self.profiler.running:
+            return await ctx.send(embed=create_embed("⚠️ Profil oluşturucu zaten çalışıyor.", discord.Color.orange()))
+        
+        seconds = max(1, min(seconds, 300))
+        # Commands run on the loop thread, which is the thread to sample
+        self.profiler = SamplingProfiler(threading.get_ident())
+        await ctx.send(embed=create_embed(f"⏱️ {seconds} saniye boyunca örnekleniyor...", discord.Color.blue()))
+        
+        try:
+            collapsed = await profile_loop(seconds, self.profiler)
+        except Exception as e:
+            logger.error(f"Error while profiling the event loop: {e}")
+            return await ctx.send(embed=create_embed(f"❌ Profil oluşturulamadı: {e}", discord.Color.red()))
+        
+        filename = f"profile-{datetime.datetime.utcnow():%Y%m%d-%H%M%S}.collapsed"
+        await ctx.send(
+            embed=create_embed(
+                f"✅ {self.profiler.sample_count} örnek, {self.profiler.duration:.1f}s. "
+                "Dosya flamegraph.pl veya speedscope ile açılabilir.",
+                discord.Color.green()
+            ),
+            file=discord.File(io.BytesIO(collapsed.encode("utf-8")), filename=filename)
+        )
+    
+    @diagnostics.command(name="stop")
+    @commands.is_owner()
+    async def diagnostics_stop(self, ctx):
+        """Çalışan profil oluşturucuyu erken durdur"""
+        if self.profiler is None or not self.profiler.running:
+            return await ctx.send(embed=create_embed("ℹ️ Çalışan bir profil oluşturucu yok.", discord.Color.blue()))
+        self.profiler.stop()
+        await ctx.send(embed=create_embed("⏹️ Profil oluşturucu durduruluyor.", discord.Color.blue()))
+    
+    @diagnostics.command(name="aicache")
+    @commands.is_owner()
+    async def diagnostics_aicache(self, ctx):
+        """AI yanıt önbelleğinin isabet oranını göster"""
+        summary = get_response_cache().summary()
+        embed = discord.Embed(title="🧠 AI Yanıt Önbelleği", color=discord.Color.blue())
+        embed.add_field(name="İsabet Oranı", value=f"{summary['hit_rate']:.1%}")
+        embed.add_field(name="Bellek", value=str(summary['memory']))
+        embed.add_field(name="MongoDB", value=str(summary['mongo']))
+        embed.add_field(name="Birleştirilen", value=str(summary['coalesced']))
+        embed.add_field(name="Iska", value=str(summary['miss']))
+        embed.add_field(name="Kayıt", value=str(summary['entries']))
+        await ctx.send(embed=embed)
+    
+    @commands.group(name="commandsync", invoke_without_command=True)
+    @commands.is_owner()
+    async def commandsync(self, ctx, scope: str = "global"):
+        """Senkronizasyonun neyi değiştireceğini göster (Discord'a istek atmaz)"""
+        command_sync = getattr(self.bot, 'command_sync', None)
+        if command_sync is None:
+            return await ctx.send(embed=create_embed("❌ Komut senkronizasyonu etkin değil.", discord.Color.red()))
+        
+        guild = ctx.guild if scope == "guild" else None
+        diff = await command_sync.diff(guild)
+        embed = discord.Embed(
+            title=f"🔄 Komut Farkı ({'sunucu' if guild else 'global'})",
+            description="Son senkronizasyondan beri değişiklik yok." if diff.empty else None,
+            color=discord.Color.blue()
+        )
+        for label, names in (("Eklenen", diff.added), ("Silinen", diff.removed), ("Değişen", diff.changed)):
+            if names:
+                embed.add_field(name=f"{label} ({len(names)})", value=", ".join(names)[:1024], inline=False)
+        await ctx.send(embed=embed)
+    
+    @commandsync.command(name="apply")
+    @commands.is_owner()
+    async def commandsync_apply(self, ctx, scope: str = "global", force: bool = False):
+        """Komutları yalnızca değiştiyse senkronize et (force ile her zaman)"""
+        command_sync = getattr(self.bot, 'command_sync', None)
+        if command_sync is None:
+            return await ctx.send(embed=create_embed("❌ Komut senkronizasyonu etkin değil.", discord.Color.red()))
+        
+        guild = ctx.guild if scope == "guild" else None
+        try:
+            result = await command_sync.sync(guild, force=force)
+        except Exception as e:
+            logger.error(f"Error while syncing commands: {e}")
+            return await ctx.send(embed=create_embed(f"❌ Senkronizasyon başarısız: {e}", discord.Color.red()))
+        
+        if result.synced:
+            message = f"✅ Senkronize edildi: {result.diff.summary()}"
+        elif result.reason == "cooldown":
+            message = "⏰ Global senkronizasyon bekleme süresinde."
+        else:
+            message = "ℹ️ Komutlar değişmemiş, senkronizasyon atlandı."
+        await ctx.send(embed=create_embed(message, discord.Color.green() if result.synced else discord.Color.blue()))
+
+    @commands.group(name="cluster", invoke_without_command=True)
+    @commands.is_owner()
+    async def cluster(self, ctx):
+        """Tüm cluster ve shard'ların gecikme ve sunucu sayılarını göster"""
+        if not hasattr(self.bot, 'cluster_stats'):
+            return await ctx.send(embed=create_embed("❌ Shard desteği etkin değil.", discord.Color.red()))
+
+        clusters = await self.bot.cluster_stats()
+        embed = discord.Embed(
+            title=f"🧩 Cluster Durumu ({self.bot.shard_count or 1} shard)",
+            color=discord.Color.blue()
+        )
+        for cluster_id, stats in sorted(clusters.items(), key=lambda item: int(item[0])):
+            lines = []
+            for shard_id, shard in stats.get('shards', {}).items():
+                latency = f"{shard['latency_ms']:.0f}ms" if shard.get('latency_ms') is not None else "?"
+                state = "🔴" if shard.get('closed') else "🟢"
+                lines.append(f"{state} Shard {shard_id}: {latency}, {shard.get('guilds', 0)} sunucu")
+            embed.add_field(
+                name=f"Cluster {cluster_id} ({stats.get('guilds', 0)} sunucu)",
+                value="\n".join(lines)[:1024] or "Shard yok",
+                inline=False
+            )
+        await ctx.send(embed=embed)
+
+    @cluster.command(name="run")
+    @commands.is_owner()
+    async def cluster_run(self, ctx, action: str, extension: str = None):
+        """Bir sahip komutunu tüm cluster'larda çalıştır (reload/load/unload/sync_commands)"""
+        if not hasattr(self.bot, 'run_owner_command'):
+            return await ctx.send(embed=create_embed("❌ Shard desteği etkin değil.", discord.Color.red()))
+        if action in ('reload', 'load', 'unload') and not extension:
+            return await ctx.send(embed=create_embed("❌ Bir eklenti adı belirtin.", discord.Color.red()))
+
+        try:
+            result = await self.bot.run_owner_command(action, extension)
+        except Exception as e:
+            logger.error(f"Error while running cluster command {action}: {e}")
+            return await ctx.send(embed=create_embed(f"❌ Komut başarısız: {e}", discord.Color.red()))
+        await ctx.send(embed=create_embed(f"✅ `{action}` tüm cluster'lara gönderildi ({result}).", discord.Color.green()))
+
+    async def cog_unload(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        await super().cog_unload()
     
     # REMOVED: These commands are now integrated into the unified /settings panel
     # @commands.group(name='botsettings')
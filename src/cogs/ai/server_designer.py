@@ -410,9 +410,11 @@ class ServerDesigner(BaseCog):
     
     async def _gather_server_data(self, guild: discord.Guild) -> Dict[str, Any]:
         """Gather current server data for analysis"""
+        member_count = guild.member_count or 0
         data = {
             "name": guild.name,
-            "member_count": guild.member_count,
+            # Two significant digits, so a join or leave does not miss the AI response cache
+            "member_count": round(member_count, -max(len(str(member_count)) - 2, 0)),
             "categories": [],
             "channels": [],
             "roles": [],
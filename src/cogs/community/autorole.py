@@ -2,26 +2,41 @@ import discord
 from discord.ext import commands, tasks
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import json
 
 from src.cogs.base import BaseCog
 from ...utils.core.manager import get_async_database
 from ...utils.helpers.discord import create_embed
 from ...bot.constants import Colors
+from ...utils.community.generic.role_assignment_engine import RoleAssignmentEngine
+from ...utils.community.generic.activity_counters import ActivityCounters, ThresholdTable
+from ...core.message_pipeline import Feature, invalidate_features
+from ...core.metrics import register_queue
 
 logger = logging.getLogger(__name__)
 
+# How long a guild's threshold table is reused before the rules are re-read
+THRESHOLD_CACHE_TTL = 300
+# Checkpoint counters every N one-minute ticks
+CHECKPOINT_TICKS = 5
+# Drop in-memory counters of members idle for this many minutes
+IDLE_EVICT_TICKS = 6 * 60
+
 class AutoRole(BaseCog):
     """Auto Role Management System - Automatically assign roles based on various triggers"""
     
     def __init__(self, bot):
         super().__init__(bot)
-        self.role_assignment_queue = asyncio.Queue()
-        self.message_counts: Dict[str, Dict[str, int]] = {}  # guild_id -> user_id -> count
-        self.voice_times: Dict[str, Dict[str, int]] = {}  # guild_id -> user_id -> minutes
-        self.active_timers: Dict[str, asyncio.Task] = {}
+        self.role_engine = RoleAssignmentEngine(bot)
+        self._assignment_tasks: set = set()
+        self.counters: Optional[ActivityCounters] = None  # Will be initialized in cog_load
+        # (guild id, trigger) -> (expires at, sorted thresholds)
+        self._thresholds: Dict[Tuple[int, str], Tuple[float, ThresholdTable]] = {}
+        # Members whose already-reached thresholds were re-checked since they were loaded
+        self._synced: set = set()
         self.cooldowns: Dict[str, datetime] = {}
         self._autorole_db = None  # Will be initialized in cog_load
         
@@ -34,48 +49,93 @@ class AutoRole(BaseCog):
             # Initialize database connection
             from src.utils.core.manager import get_async_database
             self._autorole_db = await get_async_database()
+            self.counters = ActivityCounters(self._autorole_db)
+            await self.counters.ensure_index()
+            
+            register_queue("role_assignments", self.role_engine.pending_count)
+            
+            # Join delays survive restarts (see src/core/scheduler.py)
+            scheduler = getattr(self.bot, 'scheduler', None)
+            if scheduler is not None:
+                scheduler.register("autorole.join_roles", self.scheduled_join_roles)
+            
+            pipeline = getattr(self.bot, 'message_pipeline', None)
+            if pipeline is not None:
+                pipeline.register("autorole", Feature.AUTOROLE, self.handle_message, self.counts_messages)
             
             logger.info("✅ AutoRole cog loaded successfully")
             # Start background tasks
-            self.process_role_queue.start()
+            self.activity_tick.start()
             self.cleanup_old_data.start()
         except Exception as e:
             logger.error(f"❌ Failed to load AutoRole cog: {e}")
     
-    def cog_unload(self):
+    async def cog_unload(self):
         """Cleanup when cog is unloaded"""
-        self.process_role_queue.cancel()
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.unregister("autorole")
+        scheduler = getattr(self.bot, 'scheduler', None)
+        if scheduler is not None:
+            scheduler.unregister("autorole.join_roles")
+        self.activity_tick.cancel()
         self.cleanup_old_data.cancel()
-        # Cancel all active timers
-        for timer in self.active_timers.values():
-            timer.cancel()
+        if self.counters:
+            await self.counters.flush()
+        for task in self._assignment_tasks:
+            task.cancel()
+        await self.role_engine.stop()
+    
+    def queue_assignment(self, assignment: Dict[str, Any]):
+        """Hand an assignment to the role engine without blocking the caller"""
+        task = asyncio.create_task(self.execute_role_assignment(assignment))
+        self._assignment_tasks.add(task)
+        task.add_done_callback(self._assignment_tasks.discard)
     
-    @tasks.loop(seconds=5.0)
-    async def process_role_queue(self):
-        """Process role assignment queue"""
+    @tasks.loop(minutes=1.0)
+    async def activity_tick(self):
+        """Advance the voice timer wheel and checkpoint counters"""
         try:
-            while not self.role_assignment_queue.empty():
-                assignment = await self.role_assignment_queue.get()
-                await self.execute_role_assignment(assignment)
+            for guild_id, user_id in self.counters.tick():
+                guild = self.bot.get_guild(guild_id)
+                member = guild.get_member(user_id) if guild else None
+                if member is None or not self.counters.in_voice(guild_id, user_id):
+                    continue
+                minutes = self.counters.voice_minutes(guild_id, user_id)
+                await self.queue_threshold_assignment(member, 'voice_time', minutes)
+                await self.schedule_voice_threshold(member)
+            
+            if self.counters.wheel.now % CHECKPOINT_TICKS == 0:
+                await self.counters.flush()
         except Exception as e:
-            logger.error(f"Error processing role queue: {e}")
+            logger.error(f"Error advancing auto role activity timers: {e}")
+    
+    @activity_tick.before_loop
+    async def before_activity_tick(self):
+        """Wait until bot is ready, then pick up members already in voice"""
+        await self.bot.wait_until_ready()
+        for guild in self.bot.guilds:
+            for channel in guild.voice_channels:
+                for member in channel.members:
+                    if not member.bot:
+                        await self.start_voice_session(member)
     
     @tasks.loop(hours=1.0)
     async def cleanup_old_data(self):
         """Clean up old analytics and temporary data"""
         try:
-            # Clean up old message counts (older than 30 days)
-            cutoff_date = datetime.utcnow() - timedelta(days=30)
-            # Implementation depends on your database structure
-            logger.debug("Cleaned up old auto role data")
+            # Counters are persisted, so idle members can be dropped from memory
+            evicted = self.counters.evict_idle(IDLE_EVICT_TICKS)
+            self._synced.clear()
+            now = datetime.utcnow()
+            self.cooldowns = {
+                key: at for key, at in self.cooldowns.items()
+                if now - at < timedelta(minutes=5)
+            }
+            logger.debug(f"Cleaned up old auto role data ({evicted} idle counters evicted)")
         except Exception as e:
             logger.error(f"Error cleaning up old data: {e}")
     
-    @process_role_queue.before_loop
-    async def before_process_role_queue(self):
-        """Wait until bot is ready"""
-        await self.bot.wait_until_ready()
-    
     @cleanup_old_data.before_loop
     async def before_cleanup_old_data(self):
         """Wait until bot is ready"""
@@ -95,7 +155,7 @@ class AutoRole(BaseCog):
                 return
             
             # Add to role assignment queue
-            await self.role_assignment_queue.put({
+            self.queue_assignment({
                 'type': 'member_join',
                 'member': member,
                 'settings': settings,
@@ -106,22 +166,35 @@ class AutoRole(BaseCog):
             logger.error(f"Error handling member join for {member}: {e}")
     
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Handle message events for message count tracking"""
-        if message.author.bot or not message.guild:
-            return
+    async def on_member_remove(self, member: discord.Member):
+        """Drop pending role edits of members who left"""
+        self.role_engine.forget_member(member.guild.id, member.id)
+        scheduler = getattr(self.bot, 'scheduler', None)
+        if scheduler is not None:
+            scheduler.cancel(self._join_key(member))
+        if self.counters:
+            self.counters.voice_leave(member.guild.id, member.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Stop the role lane of a guild the bot left"""
+        self.role_engine.forget_guild(guild.id)
+    
+    async def counts_messages(self, guild_id: int) -> bool:
+        """Whether the message pipeline should run the message count stage for a guild"""
+        return bool(await self.get_threshold_table(guild_id, 'message_count', raise_errors=True))
+    
+    async def handle_message(self, ctx):
+        """Message pipeline stage for message count tracking"""
+        message = ctx.message
         
         try:
             # Update message count
-            guild_id = str(message.guild.id)
-            user_id = str(message.author.id)
-            
-            if guild_id not in self.message_counts:
-                self.message_counts[guild_id] = {}
-            if user_id not in self.message_counts[guild_id]:
-                self.message_counts[guild_id][user_id] = 0
+            guild_id = message.guild.id
+            user_id = message.author.id
             
-            self.message_counts[guild_id][user_id] += 1
+            await self.counters.ensure_loaded(guild_id, user_id)
+            self.counters.add_message(guild_id, user_id)
             
             # Check for message count triggers
             await self.check_message_count_triggers(message.author)
@@ -136,29 +209,11 @@ class AutoRole(BaseCog):
             return
         
         try:
-            guild_id = str(member.guild.id)
-            user_id = str(member.id)
-            
-            # Initialize tracking if needed
-            if guild_id not in self.voice_times:
-                self.voice_times[guild_id] = {}
-            if user_id not in self.voice_times[guild_id]:
-                self.voice_times[guild_id][user_id] = 0
-            
-            # Track voice time
-            if before.channel != after.channel:
-                if before.channel:  # Left a channel
-                    # Stop tracking for this user
-                    timer_key = f"{guild_id}_{user_id}"
-                    if timer_key in self.active_timers:
-                        self.active_timers[timer_key].cancel()
-                        del self.active_timers[timer_key]
-                
-                if after.channel:  # Joined a channel
-                    # Start tracking voice time
-                    self.active_timers[f"{guild_id}_{user_id}"] = asyncio.create_task(
-                        self.track_voice_time(member)
-                    )
+            # Track voice time; moving between channels keeps the session going
+            if before.channel and not after.channel:  # Left voice
+                self.counters.voice_leave(member.guild.id, member.id)
+            elif after.channel and not before.channel:  # Joined voice
+                await self.start_voice_session(member)
             
         except Exception as e:
             logger.error(f"Error handling voice state update: {e}")
@@ -189,9 +244,9 @@ class AutoRole(BaseCog):
             member = assignment['member']
             assignment_type = assignment['type']
             
-            # Check cooldown
+            # Check cooldown (threshold triggers only fire when a threshold is reached)
             cooldown_key = f"{member.guild.id}_{member.id}_{assignment_type}"
-            if cooldown_key in self.cooldowns:
+            if assignment_type not in ('message_count', 'voice_time') and cooldown_key in self.cooldowns:
                 if datetime.utcnow() - self.cooldowns[cooldown_key] < timedelta(minutes=5):
                     return
             self.cooldowns[cooldown_key] = datetime.utcnow()
@@ -232,37 +287,58 @@ class AutoRole(BaseCog):
                 if default_role and default_role not in member.roles:
                     roles_to_add.append(default_role)
             
-            # Add roles with delay if configured
+            # Add roles with delay if configured; the delay is held by the scheduler or the engine, not this task
             if roles_to_add:
                 delay = settings.get('join_delay', 0)
-                if delay > 0:
-                    await asyncio.sleep(delay)
-                
-                await member.add_roles(*roles_to_add, reason="Auto Role: Default assignment")
-                logger.info(f"Assigned default roles to {member}: {[r.name for r in roles_to_add]}")
+                scheduler = getattr(self.bot, 'scheduler', None)
+                if delay > 0 and scheduler is not None:
+                    scheduler.schedule(
+                        "autorole.join_roles",
+                        {'guild_id': member.guild.id, 'user_id': member.id, 'role_ids': [r.id for r in roles_to_add]},
+                        delay=delay, key=self._join_key(member), guild_id=member.guild.id
+                    )
+                    return
+                applied = await self.role_engine.submit(
+                    member, add=roles_to_add, reason="Auto Role: Default assignment", delay=delay
+                )
+                if applied:
+                    logger.info(f"Assigned default roles to {member}: {[r.name for r in roles_to_add]}")
             
-        except discord.Forbidden:
-            logger.warning(f"Missing permissions to assign roles to {member} in {member.guild.name}")
         except Exception as e:
             logger.error(f"Error assigning default roles to {member}: {e}")
     
+    @staticmethod
+    def _join_key(member: discord.Member) -> str:
+        return f"autorole.join_roles:{member.guild.id}:{member.id}"
+    
+    async def scheduled_join_roles(self, payload: Dict[str, Any]):
+        """Hand delayed join roles to the engine once the join delay has passed"""
+        guild = self.bot.get_guild(payload['guild_id'])
+        member = guild.get_member(payload['user_id']) if guild else None
+        if member is None:
+            return
+        roles = [role for role in map(guild.get_role, payload['role_ids']) if role and role not in member.roles]
+        if roles:
+            self.role_engine.submit(member, add=roles, reason="Auto Role: Default assignment")
+            logger.info(f"Queued delayed default roles for {member}: {[r.name for r in roles]}")
+    
     async def assign_message_count_roles(self, member: discord.Member, count: int):
         """Assign roles based on message count"""
         try:
             # Get message count rules for this guild
-            rules = await self.get_auto_role_rules(member.guild.id, 'message_count')
+            table = await self.get_threshold_table(member.guild.id, 'message_count')
+            roles_to_add = []
             
-            for rule in rules:
-                if not rule.get('enabled', True):
-                    continue
-                
-                # Check if count meets the condition
-                required_count = rule.get('condition', {}).get('count', 0)
-                if count >= required_count:
-                    role = member.guild.get_role(int(rule['role_id']))
-                    if role and role not in member.roles:
-                        await member.add_roles(role, reason=f"Auto Role: Message count ({count})")
-                        logger.info(f"Assigned message count role {role.name} to {member}")
+            # Every rule whose count is met
+            for role_id in table.roles_up_to(count):
+                role = member.guild.get_role(role_id)
+                if role and role not in member.roles:
+                    roles_to_add.append(role)
+            
+            if roles_to_add and await self.role_engine.submit(
+                member, add=roles_to_add, reason=f"Auto Role: Message count ({count})"
+            ):
+                logger.info(f"Assigned message count roles {[r.name for r in roles_to_add]} to {member}")
             
         except Exception as e:
             logger.error(f"Error assigning message count roles to {member}: {e}")
@@ -271,19 +347,19 @@ class AutoRole(BaseCog):
         """Assign roles based on voice time"""
         try:
             # Get voice time rules for this guild
-            rules = await self.get_auto_role_rules(member.guild.id, 'voice_time')
+            table = await self.get_threshold_table(member.guild.id, 'voice_time')
+            roles_to_add = []
             
-            for rule in rules:
-                if not rule.get('enabled', True):
-                    continue
-                
-                # Check if voice time meets the condition
-                required_minutes = rule.get('condition', {}).get('minutes', 0)
-                if minutes >= required_minutes:
-                    role = member.guild.get_role(int(rule['role_id']))
-                    if role and role not in member.roles:
-                        await member.add_roles(role, reason=f"Auto Role: Voice time ({minutes} minutes)")
-                        logger.info(f"Assigned voice time role {role.name} to {member}")
+            # Every rule whose voice time is met
+            for role_id in table.roles_up_to(minutes):
+                role = member.guild.get_role(role_id)
+                if role and role not in member.roles:
+                    roles_to_add.append(role)
+            
+            if roles_to_add and await self.role_engine.submit(
+                member, add=roles_to_add, reason=f"Auto Role: Voice time ({minutes} minutes)"
+            ):
+                logger.info(f"Assigned voice time roles {[r.name for r in roles_to_add]} to {member}")
             
         except Exception as e:
             logger.error(f"Error assigning voice time roles to {member}: {e}")
@@ -293,8 +369,8 @@ class AutoRole(BaseCog):
         try:
             role = member.guild.get_role(int(role_id))
             if role and role not in member.roles:
-                await member.add_roles(role, reason="Auto Role: Reaction-based")
-                logger.info(f"Assigned reaction role {role.name} to {member}")
+                if await self.role_engine.submit(member, add=[role], reason="Auto Role: Reaction-based"):
+                    logger.info(f"Assigned reaction role {role.name} to {member}")
             
         except Exception as e:
             logger.error(f"Error assigning reaction role to {member}: {e}")
@@ -304,50 +380,56 @@ class AutoRole(BaseCog):
     async def check_message_count_triggers(self, member: discord.Member):
         """Check if member qualifies for message count roles"""
         try:
-            guild_id = str(member.guild.id)
-            user_id = str(member.id)
+            guild_id = member.guild.id
+            count = self.counters.messages(guild_id, member.id)
+            table = await self.get_threshold_table(guild_id, 'message_count')
+            if not table:
+                return
             
-            if guild_id in self.message_counts and user_id in self.message_counts[guild_id]:
-                count = self.message_counts[guild_id][user_id]
-                
-                # Add to role assignment queue
-                await self.role_assignment_queue.put({
-                    'type': 'message_count',
-                    'member': member,
-                    'count': count,
-                    'timestamp': datetime.utcnow()
-                })
+            # Fire when a threshold is reached, and once after loading to catch up on
+            # thresholds passed while the bot was offline or before the rule existed
+            key = (guild_id, member.id)
+            first_check = key not in self._synced
+            self._synced.add(key)
+            if table.hits(count) or (first_check and count >= table.thresholds[0]):
+                await self.queue_threshold_assignment(member, 'message_count', count)
             
         except Exception as e:
             logger.error(f"Error checking message count triggers: {e}")
     
-    async def track_voice_time(self, member: discord.Member):
-        """Track voice time for a member"""
-        try:
-            guild_id = str(member.guild.id)
-            user_id = str(member.id)
-            
-            while member.voice and member.voice.channel:
-                await asyncio.sleep(60)  # Update every minute
-                
-                if guild_id not in self.voice_times:
-                    self.voice_times[guild_id] = {}
-                if user_id not in self.voice_times[guild_id]:
-                    self.voice_times[guild_id][user_id] = 0
-                
-                self.voice_times[guild_id][user_id] += 1
-                
-                # Check for voice time triggers every 5 minutes
-                if self.voice_times[guild_id][user_id] % 5 == 0:
-                    await self.role_assignment_queue.put({
-                        'type': 'voice_time',
-                        'member': member,
-                        'minutes': self.voice_times[guild_id][user_id],
-                        'timestamp': datetime.utcnow()
-                    })
-            
-        except Exception as e:
-            logger.error(f"Error tracking voice time for {member}: {e}")
+    async def start_voice_session(self, member: discord.Member):
+        """Start counting voice minutes for a member and arm their next threshold"""
+        await self.counters.ensure_loaded(member.guild.id, member.id)
+        self.counters.voice_join(member.guild.id, member.id)
+        
+        table = await self.get_threshold_table(member.guild.id, 'voice_time')
+        minutes = self.counters.voice_minutes(member.guild.id, member.id)
+        if table and minutes >= table.thresholds[0]:
+            await self.queue_threshold_assignment(member, 'voice_time', minutes)
+        await self.schedule_voice_threshold(member)
+    
+    async def schedule_voice_threshold(self, member: discord.Member):
+        """Arm the timer wheel for the member's next voice time threshold"""
+        table = await self.get_threshold_table(member.guild.id, 'voice_time')
+        minutes = self.counters.voice_minutes(member.guild.id, member.id)
+        threshold = table.next_after(minutes)
+        if threshold is not None:
+            self.counters.schedule_voice_check(member.guild.id, member.id, threshold)
+    
+    async def queue_threshold_assignment(self, member: discord.Member, trigger: str, value: int):
+        """Queue a message count or voice time assignment if the system is enabled"""
+        settings = await self.get_auto_role_settings(member.guild.id)
+        if not settings or not settings.get('enabled', False):
+            return
+        
+        assignment = {
+            'type': trigger,
+            'member': member,
+            'settings': settings,
+            'timestamp': datetime.utcnow()
+        }
+        assignment['count' if trigger == 'message_count' else 'minutes'] = value
+        self.queue_assignment(assignment)
     
     async def check_reaction_role_triggers(self, payload: discord.RawReactionActionEvent):
         """Check if reaction should trigger role assignment"""
@@ -366,7 +448,7 @@ class AutoRole(BaseCog):
                     
                     member = payload.member
                     if member:
-                        await self.role_assignment_queue.put({
+                        self.queue_assignment({
                             'type': 'reaction',
                             'member': member,
                             'role_id': rule['role_id'],
@@ -396,26 +478,69 @@ class AutoRole(BaseCog):
     async def get_auto_role_rules(self, guild_id: int, trigger_type: str = None) -> List[Dict[str, Any]]:
         """Get auto role rules for a guild"""
         try:
-            if self._autorole_db is None:
-                logger.error("Database connection not available")
-                return []
-            
-            # Access the autorole_rules collection properly
-            rules_collection = self._autorole_db.get_collection('autorole_rules') if hasattr(self._autorole_db, 'get_collection') else self._autorole_db['autorole_rules']
-            
-            query = {"guild_id": str(guild_id)}
-            if trigger_type:
-                query["trigger"] = trigger_type
-            
-            # Use async iteration instead of to_list
-            rules = []
-            async for rule in rules_collection.find(query):
-                rules.append(rule)
-            return rules
+            return await self._load_auto_role_rules(guild_id, trigger_type)
         except Exception as e:
             logger.error(f"Error getting auto role rules for guild {guild_id}: {e}")
             return []
     
+    async def _load_auto_role_rules(self, guild_id: int, trigger_type: str = None) -> List[Dict[str, Any]]:
+        """Get auto role rules for a guild; raises when the database is unavailable"""
+        if self._autorole_db is None:
+            raise RuntimeError("Database connection not available")
+        
+        # Access the autorole_rules collection properly
+        rules_collection = self._autorole_db.get_collection('autorole_rules') if hasattr(self._autorole_db, 'get_collection') else self._autorole_db['autorole_rules']
+        
+        query = {"guild_id": str(guild_id)}
+        if trigger_type:
+            query["trigger"] = trigger_type
+        
+        # Use async iteration instead of to_list
+        rules = []
+        async for rule in rules_collection.find(query):
+            rules.append(rule)
+        return rules
+    
+    async def get_threshold_table(self, guild_id: int, trigger_type: str, raise_errors: bool = False) -> ThresholdTable:
+        """Get the sorted thresholds of a guild's message count or voice time rules
+        
+        When the rules cannot be read the table is empty (or, with raise_errors, the error
+        propagates) and nothing is cached.
+        """
+        cached = self._thresholds.get((guild_id, trigger_type))
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        condition_key = 'count' if trigger_type == 'message_count' else 'minutes'
+        pairs = []
+        try:
+            rules = await self._load_auto_role_rules(guild_id, trigger_type)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error getting auto role rules for guild {guild_id}: {e}")
+            return ThresholdTable([])
+        
+        for rule in rules:
+            if not rule.get('enabled', True):
+                continue
+            try:
+                pairs.append((int(rule.get('condition', {}).get(condition_key, 0)), int(rule['role_id'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+        
+        table = ThresholdTable(pairs)
+        self._thresholds[(guild_id, trigger_type)] = (now + THRESHOLD_CACHE_TTL, table)
+        return table
+    
+    def invalidate_rules(self, guild_id: int) -> None:
+        """Drop a guild's cached thresholds and pipeline features after its rules or settings changed"""
+        guild_id = int(guild_id)
+        for key in [key for key in self._thresholds if key[0] == guild_id]:
+            del self._thresholds[key]
+        invalidate_features(self.bot, guild_id)
+    
     async def log_role_assignment(self, member: discord.Member, assignment: Dict[str, Any], 
                                  success: bool, error: str = None):
         """Log role assignment attempt"""
@@ -459,6 +584,7 @@ class AutoRole(BaseCog):
                     "`/autorole status` - Check system status\n"
                     "`/autorole stats` - View assignment statistics\n"
                     "`/autorole test` - Test role assignment\n"
+                    "`/autorole metrics` - Role engine throughput\n"
                     "`/autorole reset` - Reset user data"
                 ),
                 inline=False
@@ -557,7 +683,7 @@ class AutoRole(BaseCog):
                 return
             
             # Add to role assignment queue
-            await self.role_assignment_queue.put({
+            self.queue_assignment({
                 'type': 'member_join',
                 'member': test_member,
                 'settings': settings,
@@ -575,6 +701,33 @@ class AutoRole(BaseCog):
             logger.error(f"Error in autorole test command: {e}")
             await ctx.send("❌ Error testing auto role assignment")
     
+    @autorole_group.command(name="metrics")
+    async def autorole_metrics(self, ctx: commands.Context):
+        """Show role engine throughput and backlog"""
+        try:
+            metrics = self.role_engine.get_metrics()
+            
+            embed = create_embed(
+                title="⚙️ Auto Role Engine",
+                description=f"Pending in this server: {self.role_engine.pending_count(ctx.guild.id)}",
+                color=Colors.INFO
+            )
+            embed.add_field(name="Submitted", value=str(metrics.get('submitted', 0)), inline=True)
+            embed.add_field(name="Coalesced", value=str(metrics.get('coalesced', 0)), inline=True)
+            embed.add_field(name="Role Edits", value=str(metrics.get('edits', 0)), inline=True)
+            embed.add_field(name="Edits / min", value=str(metrics.get('edits_per_minute', 0)), inline=True)
+            embed.add_field(name="Pending (all)", value=str(metrics.get('pending', 0)), inline=True)
+            embed.add_field(name="Max Lane Depth", value=str(metrics.get('max_lane_depth', 0)), inline=True)
+            embed.add_field(name="Rate Limit Waits", value=str(metrics.get('rate_limit_waits', 0)), inline=True)
+            embed.add_field(name="Retried", value=str(metrics.get('retried', 0)), inline=True)
+            embed.add_field(name="Failed", value=str(metrics.get('failed', 0)), inline=True)
+            
+            await ctx.send(embed=embed)
+            
+        except Exception as e:
+            logger.error(f"Error in autorole metrics command: {e}")
+            await ctx.send("❌ Error retrieving role engine metrics")
+    
     @autorole_group.command(name="reset")
     async def autorole_reset(self, ctx: commands.Context, member: discord.Member = None):
         """Reset auto role data for a member"""
@@ -583,22 +736,11 @@ class AutoRole(BaseCog):
                 await ctx.send("❌ Please specify a member to reset")
                 return
             
-            guild_id = str(ctx.guild.id)
-            user_id = str(member.id)
-            
-            # Reset message count
-            if guild_id in self.message_counts and user_id in self.message_counts[guild_id]:
-                del self.message_counts[guild_id][user_id]
-            
-            # Reset voice time
-            if guild_id in self.voice_times and user_id in self.voice_times[guild_id]:
-                del self.voice_times[guild_id][user_id]
-            
-            # Cancel active timer
-            timer_key = f"{guild_id}_{user_id}"
-            if timer_key in self.active_timers:
-                self.active_timers[timer_key].cancel()
-                del self.active_timers[timer_key]
+            # Reset message count and voice time
+            await self.counters.reset(ctx.guild.id, member.id)
+            self._synced.discard((ctx.guild.id, member.id))
+            if self.counters.in_voice(ctx.guild.id, member.id):
+                await self.schedule_voice_threshold(member)
             
             embed = create_embed(
                 title="🔄 Auto Role Reset",
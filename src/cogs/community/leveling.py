@@ -11,6 +11,7 @@ from src.utils.database.connection import initialize_mongodb, initialize_async_m
 from src.utils.community.generic.xp_manager import XPManager, XP_VOICE_PER_MINUTE
 from src.utils.community.generic.card_renderer import create_level_card, get_level_scheme, scheme_to_discord_color
 from src.cogs.base import BaseCog
+from src.core.message_pipeline import Feature
 
 logger = logging.getLogger('levelling')
 
@@ -112,35 +113,48 @@ class Levelling(commands.Cog):
                 
         return self.mongo_db
 
+    async def load_guild_settings(self, guild_id):
+        """Get levelling settings for a guild; raises when the database is unavailable"""
+        await self.ensure_database()
+        if self.mongo_db is None:
+            raise RuntimeError("Levelling database is not available")
+            
+        settings = await self.mongo_db.get_collection('levelling_settings').find_one({"guild_id": int(guild_id)})
+        if settings is None:
+            # Return default settings
+            return {
+                "enabled": True,
+                "message_xp_enabled": True,
+                "voice_xp_enabled": True,
+                "level_up_notifications": True,
+                "level_up_channel_id": None,
+                "xp_multiplier": 1.0,
+                "voice_xp_multiplier": 1.0,
+                "cooldown_seconds": 60,
+                "max_level": 100
+            }
+        return settings
+
     async def get_guild_settings(self, guild_id):
-        """Get levelling settings for a guild"""
+        """Get levelling settings for a guild, or {} when they cannot be read"""
         try:
-            await self.ensure_database()
-            if self.mongo_db is None:
-                return {}
-                
-            settings = await self.mongo_db.get_collection('levelling_settings').find_one({"guild_id": int(guild_id)})
-            if settings is None:
-                # Return default settings
-                return {
-                    "enabled": True,
-                    "message_xp_enabled": True,
-                    "voice_xp_enabled": True,
-                    "level_up_notifications": True,
-                    "level_up_channel_id": None,
-                    "xp_multiplier": 1.0,
-                    "voice_xp_multiplier": 1.0,
-                    "cooldown_seconds": 60,
-                    "max_level": 100
-                }
-            return settings
+            return await self.load_guild_settings(guild_id)
         except Exception as e:
             logger.error(f"Error getting guild settings: {e}")
             return {}
 
+    async def cog_load(self):
+        """Register the message XP stage with the bot's message pipeline"""
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.register("levelling", Feature.LEVELLING, self.handle_message, self.message_xp_enabled)
+
     def cog_unload(self):
         """Clean up when cog is unloaded"""
         try:
+            pipeline = getattr(self.bot, 'message_pipeline', None)
+            if pipeline is not None:
+                pipeline.unregister("levelling")
             self.check_voice_activity.cancel()
             logger.info("Levelling cog unloaded and tasks stopped")
         except Exception as e:
@@ -222,16 +236,26 @@ class Levelling(commands.Cog):
         """Wait until the bot is ready before starting the loop"""
         await self.bot.wait_until_ready()
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def message_xp_enabled(self, guild_id):
+        """The guild's settings when the message pipeline should run the XP stage, else None
+        
+        The pipeline caches the settings and hands them to handle_message as ctx.data["levelling"].
+        Database errors propagate so the pipeline does not cache them as "disabled".
+        """
+        settings = await self.load_guild_settings(guild_id)
+        if settings.get("enabled", True) and settings.get("message_xp_enabled", True):
+            return settings
+        return None
+
+    async def handle_message(self, ctx):
         """Process messages and award XP based on content"""
-        # Skip if message is from a bot or not in a guild
-        if message.author.bot or not message.guild:
-            return
+        message = ctx.message
         
         try:
-            # Check if levelling is enabled for this guild
-            settings = await self.get_guild_settings(message.guild.id)
+            # Settings the pipeline resolved (and cached) for this guild
+            settings = ctx.data.get("levelling")
+            if settings is None:
+                settings = await self.get_guild_settings(message.guild.id)
             if not settings.get("enabled", True) or not settings.get("message_xp_enabled", True):
                 return
             
@@ -10,6 +10,7 @@ from src.utils.database.connection import is_db_available
 from src.utils.core.formatting import create_embed
 from src.utils.core.error_handler import handle_interaction_error
 from src.utils.community.generic.card_renderer import create_register_card
+from src.utils.community.generic.register_reconciler import RegisterReconciler
 from src.utils.database.db_manager import db_manager
 from src.cogs.base import BaseCog
 
@@ -321,6 +322,11 @@ class RegisterModal(discord.ui.Modal, title="Kayıt Formu"):
                 upsert=True
             )
             
+            # Let the role reconciler know right away instead of at its next sweep
+            register_cog = interaction.client.get_cog("Register")
+            if register_cog:
+                register_cog.reconciler.record_registration(interaction.guild.id, interaction.user.id, age)
+            
             # Update daily registration stats
             await self.mongo_db.get_collection("register_stats").update_one(
                 {"guild_id": interaction.guild.id, "date": today},
@@ -529,25 +535,36 @@ class Register(BaseCog):
     def __init__(self, bot):
         super().__init__(bot)
         self.mongo_db = None
+        self.reconciler = RegisterReconciler(bot)
+        self._sweeps = 0
         
         # Start the background task for role verification
         self.check_members_roles.start()
         logger.info(f"Register cog initialized")
         
-    def cog_unload(self):
+    async def cog_unload(self):
         # Stop the background task when the cog is unloaded
         self.check_members_roles.cancel()
+        await self.reconciler.stop()
         
-    @tasks.loop(hours=6.0)
+    @tasks.loop(minutes=30.0)
     async def check_members_roles(self):
-        """Periodically check all registered members and ensure they have correct roles"""
-        logger.info("Starting periodic role check for registered members")
+        """Periodically pick up new registrations and ensure registered members have correct roles"""
+        # Every 12th sweep (6 hours) re-checks every registered member from memory
+        full = self._sweeps % 12 == 0
+        self._sweeps += 1
+        logger.info(f"Starting {'full' if full else 'incremental'} role check for registered members")
         try:
             # Get all guilds
             for guild in self.bot.guilds:
                 logger.debug(f"Checking roles for members in guild: {guild.name}")
-                await self._check_guild_members_roles(guild)
-            logger.info("Periodic role check completed")
+                await self._check_guild_members_roles(guild, full=full)
+            metrics = self.reconciler.get_metrics()
+            logger.info(
+                f"Periodic role check completed - queued: {metrics.get('fixes_queued', 0)}, "
+                f"applied: {metrics.get('fixes_applied', 0)}, failed: {metrics.get('fixes_failed', 0)}, "
+                f"pending: {metrics['fixes_pending']}"
+            )
         except Exception as e:
             logger.error(f"Error in periodic role check: {e}\n{traceback.format_exc()}")
             
@@ -557,8 +574,24 @@ class Register(BaseCog):
         await self.bot.wait_until_ready()
         logger.info("Bot is ready, role check task will start soon")
     
-    async def _check_guild_members_roles(self, guild):
-        """Check all registered members in a guild and ensure they have the correct roles"""
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """Restore registration roles as soon as a registered member loses one"""
+        if before.roles != after.roles:
+            # A short delay lets several role changes in a row settle into one edit
+            self.reconciler.check_member(after, delay=2.0)
+    
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        """Give registration roles back to registered members who rejoin"""
+        self.reconciler.check_member(member, delay=5.0)
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.reconciler.forget_guild(guild.id)
+    
+    async def _check_guild_members_roles(self, guild, full: bool = False):
+        """Sync new registrations of a guild and queue fixes for members missing their roles"""
         try:
             # Get MongoDB connection from central manager
             mongo_db = db_manager.get_database()
@@ -566,77 +599,14 @@ class Register(BaseCog):
                 logger.warning(f"No database connection available for guild {guild.name}")
                 return
             
-            # Get guild settings
-            settings = await mongo_db["register"].find_one({"guild_id": guild.id})
-            if not settings:
-                logger.debug(f"No registration settings found for guild: {guild.name}")
-                return
-                
-            # Get the roles to be assigned
-            main_role_id = settings.get("role_id")
-            adult_role_id = settings.get("adult_role_id")
-            minor_role_id = settings.get("minor_role_id")
-            bronze_role_id = settings.get("bronze_role_id")
-            
-            # Get role objects
-            main_role = guild.get_role(int(main_role_id)) if main_role_id else None
-            adult_role = guild.get_role(int(adult_role_id)) if adult_role_id else None
-            minor_role = guild.get_role(int(minor_role_id)) if minor_role_id else None
-            bronze_role = guild.get_role(int(bronze_role_id)) if bronze_role_id else None
-            
-            # Skip if no roles are configured
-            if not any([main_role, adult_role, minor_role, bronze_role]):
-                logger.debug(f"No roles configured for guild: {guild.name}")
-                return
-                
-            # Get all registered members
-            registered_users = []
-            async for user_doc in mongo_db["register_log"].find({"guild_id": guild.id}):
-                registered_users.append(user_doc)
-            
-            logger.info(f"Found {len(registered_users)} registered users in guild: {guild.name}")
-            
-            # Check each registered member
-            updated_count = 0
-            for user_data in registered_users:
-                user_id = user_data.get("user_id")
-                member = guild.get_member(int(user_id))
-                
-                # Skip if member is not in the guild anymore
-                if not member:
-                    continue
-                    
-                roles_to_add = []
-                
-                # Check if main role should be added
-                if main_role and main_role not in member.roles:
-                    roles_to_add.append(main_role)
-                
-                # Check age-based roles
-                age = user_data.get("age", 0)
-                if age >= 18 and adult_role and adult_role not in member.roles:
-                    roles_to_add.append(adult_role)
-                elif age < 18 and minor_role and minor_role not in member.roles:
-                    roles_to_add.append(minor_role)
-                
-                # Check bronze role
-                if bronze_role and bronze_role not in member.roles:
-                    roles_to_add.append(bronze_role)
-                
-                # Add missing roles
-                if roles_to_add:
-                    try:
-                        await member.add_roles(*roles_to_add)
-                        roles_text = ", ".join([role.name for role in roles_to_add])
-                        logger.debug(f"Added roles to {member}: {roles_text}")
-                        updated_count += 1
-                    except discord.Forbidden:
-                        logger.warning(f"Missing permissions to add roles to {member} in {guild.name}")
-                    except Exception as e:
-                        logger.error(f"Error adding roles to {member}: {e}")
-            
-            if updated_count > 0:
-                logger.info(f"Updated roles for {updated_count} members in guild: {guild.name}")
+            report = await self.reconciler.sweep_guild(guild, mongo_db, full=full)
+            if report.get('queued'):
+                logger.info(
+                    f"Queued role fixes for {report['queued']} of {report['checked']} checked members "
+                    f"in guild: {guild.name} ({report['new_registrations']} new registrations)"
+                )
+            else:
+                logger.debug(f"Role check for guild {guild.name}: {report}")
         
         except Exception as e:
             logger.error(f"Error checking roles for guild {guild.name}: {e}\n{traceback.format_exc()}")
@@ -4,7 +4,6 @@ from discord.ext import commands
 from discord import app_commands
 from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageOps, ImageFilter, ImageEnhance
 from io import BytesIO
-import requests
 import pymongo
 import base64
 import random
@@ -14,6 +13,7 @@ from typing import Optional, List, Union
 # Updated imports for new organization
 from src.utils.core.formatting import create_embed, hex_to_int
 from src.utils.database.connection import initialize_mongodb 
+from src.utils.external.http import get_http_client
 from src.utils.greeting.imaging import download_background
 
 # Import new view components from updated paths
@@ -102,9 +102,9 @@ class Welcomer(commands.Cog):
                 if background.startswith(('http://', 'https://')):
                     # Download from URL
                     try:
-                        response = requests.get(background, timeout=10)
+                        response = await get_http_client().get(background, timeout=10)
                         response.raise_for_status()
-                        background_image = Image.open(BytesIO(response.content)).convert("RGBA")
+                        background_image = Image.open(BytesIO(response.body)).convert("RGBA")
                     except Exception as e:
                         logger.error(f"Failed to download background from URL: {e}")
                         # Fallback to default
@@ -6,51 +6,66 @@ from datetime import datetime, timedelta, time
 from typing import List
 
 import aiohttp
-import asyncpraw
 import discord
 import dotenv
 import html_text
-import openai
 import rawg
-import requests
-import spotipy
 import tmdbsimple as tmdb
 from discord import app_commands
 from discord.ext import commands, tasks
-from spotipy.oauth2 import SpotifyClientCredentials
 from translate import Translator
 
 from src.utils.database.connection import initialize_mongodb
 from src.utils.core.formatting import create_embed
 from src.core.config import get_config
+from src.core.startup import lazy_import
+from src.utils.external.http import HTTPError, get_http_client
+
+# Only a few commands use these; import them when first needed
+asyncpraw = lazy_import('asyncpraw')
+openai = lazy_import('openai')
+spotipy = lazy_import('spotipy')
 
 config = get_config()
 tmdb.API_KEY = config.external_services.tmdb_api_key
-openai.api_key = config.external_services.openai_api_key
-
-# Initialize Spotify client only if credentials are available
-try:
-    sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=config.external_services.spotify_client_id,
-                                                               client_secret=config.external_services.spotify_client_secret))
-except Exception:
-    sp = None  # Will be checked before use
-
-# Initialize Reddit client only if credentials are available
-try:
-    if config.external_services.reddit_client_id and config.external_services.reddit_client_secret and config.external_services.reddit_username and config.external_services.reddit_password and config.external_services.reddit_user_agent:
-        reddit = asyncpraw.Reddit(
-            client_id=config.external_services.reddit_client_id, 
-            client_secret=config.external_services.reddit_client_secret,
-            username=config.external_services.reddit_username, 
-            password=config.external_services.reddit_password,
-            user_agent=config.external_services.reddit_user_agent
-        )
-    else:
-        reddit = None
-        print("Reddit credentials not configured, reddit commands will be disabled")
-except Exception as e:
-    reddit = None
-    print(f"Failed to initialize Reddit client: {e}")
+OPENAI_API_KEY = config.external_services.openai_api_key
+
+_clients = {}
+
+
+def _spotify_client():
+    """Spotify client, or None when credentials are missing. Built on first use."""
+    if 'spotify' not in _clients:
+        try:
+            from spotipy.oauth2 import SpotifyClientCredentials
+            _clients['spotify'] = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
+                client_id=config.external_services.spotify_client_id,
+                client_secret=config.external_services.spotify_client_secret))
+        except Exception:
+            _clients['spotify'] = None  # Will be checked before use
+    return _clients['spotify']
+
+
+def _reddit_client():
+    """Reddit client, or None when credentials are missing. Built on first use."""
+    if 'reddit' not in _clients:
+        try:
+            if config.external_services.reddit_client_id and config.external_services.reddit_client_secret and config.external_services.reddit_username and config.external_services.reddit_password and config.external_services.reddit_user_agent:
+                _clients['reddit'] = asyncpraw.Reddit(
+                    client_id=config.external_services.reddit_client_id, 
+                    client_secret=config.external_services.reddit_client_secret,
+                    username=config.external_services.reddit_username, 
+                    password=config.external_services.reddit_password,
+                    user_agent=config.external_services.reddit_user_agent,
+                    requestor_kwargs={"session": get_http_client().session}
+                )
+            else:
+                _clients['reddit'] = None
+                print("Reddit credentials not configured, reddit commands will be disabled")
+        except Exception as e:
+            _clients['reddit'] = None
+            print(f"Failed to initialize Reddit client: {e}")
+    return _clients['reddit']
 
 
 class Fun(commands.Cog):
@@ -180,7 +195,7 @@ class Fun(commands.Cog):
         
         try:
             # Check for OpenAI API key
-            if not openai.api_key:
+            if not OPENAI_API_KEY:
                 await interaction.followup.send(
                     embed=create_embed("OpenAI API key is not set up.", discord.Color.red())
                 )
@@ -190,7 +205,7 @@ class Fun(commands.Cog):
             try:
                 # For newer OpenAI API versions
                 from openai import OpenAI
-                client = OpenAI(api_key=openai.api_key)
+                client = OpenAI(api_key=OPENAI_API_KEY)
                 response = client.chat.completions.create(
                     model="gpt-3.5-turbo",
                     messages=[
@@ -202,6 +217,7 @@ class Fun(commands.Cog):
                 answer = response.choices[0].message.content
             except (ImportError, AttributeError):
                 # For older OpenAI API versions
+                openai.api_key = OPENAI_API_KEY
                 completion = openai.ChatCompletion.create(
                     model="gpt-3.5-turbo",
                     messages=[
@@ -232,10 +248,8 @@ class Fun(commands.Cog):
     @app_commands.describe(asset="The asset to get the price of.")
     async def crypto(self, ctx, asset):
         try:
-            response = requests.get(f"https://api.coincap.io/v2/assets/{asset}")
-            response.raise_for_status()  # Raise exception for non-200 responses
-            
-            data = response.json().get("data")
+            # Raises HTTPError for non-200 responses
+            data = (await get_http_client().get_json(f"https://api.coincap.io/v2/assets/{asset}")).get("data")
             if not data:
                 await ctx.send(embed=create_embed(f"Could not find data for {asset}", discord.Color.red()))
                 return
@@ -259,7 +273,7 @@ class Fun(commands.Cog):
                 embed.add_field(name="Max Supply", value="Unknown", inline=True)
                 
             await ctx.send(embed=embed)
-        except requests.RequestException as e:
+        except (HTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
             await ctx.send(embed=create_embed(f"Error retrieving crypto data: {str(e)}", discord.Color.red()))
         except (KeyError, ValueError) as e:
             await ctx.send(embed=create_embed(f"Error processing crypto data: {str(e)}", discord.Color.red()))
@@ -268,9 +282,8 @@ class Fun(commands.Cog):
     @app_commands.describe(link="The link to shorten.")
     async def shorten(self, ctx, link):
         await ctx.defer()
-        response = requests.get(f"https://api.shrtco.de/v2/shorten?url={link}/very/long/link.html")
-
         try:
+            response = await get_http_client().get(f"https://api.shrtco.de/v2/shorten?url={link}/very/long/link.html")
             response_json = response.json()
             short_link = response_json["result"]["full_short_link"]
             await ctx.send(f"**Short Link:** {short_link}")
@@ -314,68 +327,65 @@ class Fun(commands.Cog):
     @commands.hybrid_command(name="sentence", description="Fetches an example sentence.")
     @app_commands.describe(word="The word to fetch the example sentence of.")
     async def sentence(self, ctx, word):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    f"https://api.wordnik.com/v4/word.json/{word}/examples?includeDuplicates=false&useCanonical=false&limit=5&api_key=f92xh8ket8ue6gz0idhb2w8khifl29fudmopu83pnpoafdmmd") as response:
-                if response.status == 200:
-                    json_data = await response.json()
-                    examples = json_data.get("examples", [])
-
-                    if examples:
-                        random_example = random.choice(examples)["text"]
-                        await ctx.send(embed=create_embed(description=random_example.replace(word, f"**{word}**"),
-                                                          color=discord.Color.green()))
-                    else:
-                        await ctx.send(embed=create_embed(description=f"No examples found for the word **{word}**.",
-                                                          color=discord.Color.red()))
-                else:
-                    await ctx.send(embed=create_embed(description=f"Could not find the word **{word}**.",
-                                                      color=discord.Color.red()))
+        response = await get_http_client().get(
+            f"https://api.wordnik.com/v4/word.json/{word}/examples?includeDuplicates=false&useCanonical=false&limit=5&api_key=f92xh8ket8ue6gz0idhb2w8khifl29fudmopu83pnpoafdmmd")
+        if response.status == 200:
+            json_data = response.json()
+            examples = json_data.get("examples", [])
+
+            if examples:
+                random_example = random.choice(examples)["text"]
+                await ctx.send(embed=create_embed(description=random_example.replace(word, f"**{word}**"),
+                                                  color=discord.Color.green()))
+            else:
+                await ctx.send(embed=create_embed(description=f"No examples found for the word **{word}**.",
+                                                  color=discord.Color.red()))
+        else:
+            await ctx.send(embed=create_embed(description=f"Could not find the word **{word}**.",
+                                              color=discord.Color.red()))
 
     async def fetch_example(self, word):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    f"https://api.wordnik.com/v4/word.json/{word}/examples?includeDuplicates=false&useCanonical=false&limit=5&api_key=f92xh8ket8ue6gz0idhb2w8khifl29fudmopu83pnpoafdmmd") as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    examples = data["examples"]
-                    if examples:
-                        return examples[random.randint(0, len(examples) - 1)]["text"]
-                    else:
-                        return "Example sentence not found."
-                else:
-                    return "Example sentence not found."
+        resp = await get_http_client().get(
+            f"https://api.wordnik.com/v4/word.json/{word}/examples?includeDuplicates=false&useCanonical=false&limit=5&api_key=f92xh8ket8ue6gz0idhb2w8khifl29fudmopu83pnpoafdmmd")
+        if resp.status == 200:
+            data = resp.json()
+            examples = data["examples"]
+            if examples:
+                return examples[random.randint(0, len(examples) - 1)]["text"]
+            else:
+                return "Example sentence not found."
+        else:
+            return "Example sentence not found."
 
     @commands.hybrid_command(name="word", description="Fetches info about the word.")
     @app_commands.describe(word="The word to fetch the info of.")
     async def word(self, ctx, word):
         await ctx.defer()
 
-        async with aiohttp.ClientSession() as session:
-            # Fetch word meanings
-            async with session.get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}") as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    meanings = data[0]["meanings"]
-                else:
-                    await ctx.send(embed=create_embed(description=f"Could not find the word **{word}**.",
-                                                      color=discord.Color.red()))
-                    return
+        # Fetch word meanings
+        resp = await get_http_client().get(f"https://api.dictionaryapi.dev/api/v2/entries/en/{word}")
+        if resp.status == 200:
+            data = resp.json()
+            meanings = data[0]["meanings"]
+        else:
+            await ctx.send(embed=create_embed(description=f"Could not find the word **{word}**.",
+                                              color=discord.Color.red()))
+            return
 
-            # Prepare meanings
-            meaning_list = []
-            for meaning in meanings:
-                meaning_list.append(f"**{meaning['partOfSpeech']}**: {meaning['definitions'][0]['definition']}")
+        # Prepare meanings
+        meaning_list = []
+        for meaning in meanings:
+            meaning_list.append(f"**{meaning['partOfSpeech']}**: {meaning['definitions'][0]['definition']}")
 
-            # Translation
-            translator = Translator(to_lang="tr")
-            translation_tr = translator.translate(word)
+        # Translation
+        translator = Translator(to_lang="tr")
+        translation_tr = translator.translate(word)
 
-            translator = Translator(to_lang="de")
-            translation_de = translator.translate(word)
+        translator = Translator(to_lang="de")
+        translation_de = translator.translate(word)
 
-            # Fetch example sentences
-            random_example = await self.fetch_example(word)
+        # Fetch example sentences
+        random_example = await self.fetch_example(word)
 
         embed = discord.Embed(
             title=f"{word.capitalize()} || 🇹🇷 {translation_tr.lower()}  🇩🇪 {translation_de.lower()}||",
@@ -389,6 +399,7 @@ class Fun(commands.Cog):
         await ctx.defer()
         
         # Check if Reddit client is available
+        reddit = _reddit_client()
         if reddit is None:
             await ctx.send(
                 embed=create_embed(description="Reddit API is not configured. Please check your Reddit credentials in the environment variables.", color=discord.Color.red())
@@ -435,6 +446,7 @@ class Fun(commands.Cog):
         await ctx.defer()
         
         # Check if Spotify client is available
+        sp = _spotify_client()
         if sp is None:
             await ctx.send(
                 embed=create_embed(description="Spotify API is not configured. Please set SP_CLIENT_ID and SP_CLIENT_SECRET environment variables.", color=discord.Color.red())
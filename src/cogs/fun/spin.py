@@ -9,7 +9,6 @@ from datetime import datetime, timedelta
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageColor, ImageOps, ImageChops, ImageEnhance
 import math
 import colorsys
-import numpy as np
 
 from src.utils.database import initialize_mongodb
 from src.utils.community.generic.xp_manager import XPManager
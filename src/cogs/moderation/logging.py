@@ -1,6 +1,5 @@
 import asyncio
 import logging
-import time
 import traceback
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Union
@@ -9,77 +8,13 @@ import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+from src.core.command_sync import CommandSyncManager
 from src.utils.database.connection import initialize_mongodb
 from src.utils.core.formatting import calculate_how_long_ago_member_created, calculate_how_long_ago_member_joined, create_embed
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-class CommandSyncManager:
-    """Manages command syncing with rate limit handling"""
-    
-    def __init__(self):
-        self.last_sync_time = 0
-        self.sync_cooldown = 300  # 5 minutes cooldown between global syncs
-        self.sync_in_progress = False
-    
-    async def try_sync_commands(self, bot, guild_id=None):
-        """
-        Attempt to sync commands with proper rate limit handling
-        
-        Args:
-            bot: The Discord bot instance
-            guild_id: Optional guild ID to sync to only that guild
-            
-        Returns:
-            bool: Whether the sync was successful
-        """
-        current_time = time.time()
-        cooldown_remaining = self.last_sync_time + self.sync_cooldown - current_time
-        
-        # Check if we're on cooldown for global syncs
-        if not guild_id and cooldown_remaining > 0:
-            logger.warning(f"Global command sync on cooldown. Try again in {cooldown_remaining:.1f} seconds")
-            return False
-            
-        # Check if sync is already in progress
-        if self.sync_in_progress:
-            logger.warning("Command sync already in progress")
-            return False
-            
-        try:
-            self.sync_in_progress = True
-            
-            if guild_id:
-                # Sync to a specific guild
-                guild = bot.get_guild(guild_id)
-                if not guild:
-                    logger.error(f"Could not find guild with ID {guild_id}")
-                    return False
-                
-                logger.info(f"Syncing commands to guild: {guild.name} ({guild.id})")
-                await bot.tree.sync(guild=guild)
-            else:
-                # Global sync (affects all guilds)
-                logger.info("Syncing commands globally")
-                await bot.tree.sync()
-                
-                # Update cooldown timestamp
-                self.last_sync_time = time.time()
-                
-            logger.info("Command sync completed successfully")
-            return True
-            
-        except discord.HTTPException as e:
-            logger.error(f"Command sync failed due to Discord API error: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"Command sync failed with unexpected error: {e}", exc_info=True)
-            return False
-        finally:
-            self.sync_in_progress = False
-
-
 class EventLogger(commands.Cog, name="Events"):
     """
     Logs various Discord events to configured channels
@@ -95,7 +30,7 @@ class EventLogger(commands.Cog, name="Events"):
         self.bot = bot
         self.mongo_db = initialize_mongodb()
         self.webhooks = {}  # Store webhooks by guild_id
-        self.sync_manager = CommandSyncManager()
+        self.sync_manager = getattr(bot, 'command_sync', None) or CommandSyncManager(bot)
         self.rate_limited_events = set()  # Set to track rate-limited events
         
     async def get_or_create_webhook(self, channel):
@@ -695,67 +630,77 @@ class EventLogger(commands.Cog, name="Events"):
         
         await self.send_log(channel, embed)
 
+    def resolve_author(self, guild, author_id):
+        """Find the member or user behind a cached message, if the bot still knows them"""
+        return guild.get_member(author_id) or self.bot.get_user(author_id)
+
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
+    async def on_cached_message_delete(self, payload, record):
         """Log when a message is deleted"""
-        if not message.guild or message.author.bot:
+        # Only user messages are cached; anything else is unknown or from a bot
+        if not payload.guild_id or record is None:
             return
             
         # Check if this event should be logged
-        if not await self.should_log_event(message.guild.id, "message_delete"):
+        if not await self.should_log_event(payload.guild_id, "message_delete"):
             return
             
         # Get the appropriate channel
         channel_type = await self.get_event_channel_type("message_delete")
-        channel = await self.get_log_channel(message.guild.id, channel_type)
+        channel = await self.get_log_channel(payload.guild_id, channel_type)
         if not channel:
             return
             
         # Create embed
         embed = discord.Embed(
             title="Message Deleted",
-            description=f"**Message deleted in {message.channel.mention}**",
+            description=f"**Message deleted in <#{payload.channel_id}>**",
             color=discord.Color.red(),
             timestamp=datetime.now()
         )
         
-        embed.add_field(name="Author", value=f"{message.author.mention} (`{message.author.id}`)")
-        embed.add_field(name="Channel", value=f"{message.channel.mention}")
+        embed.add_field(name="Author", value=f"<@{record.author_id}> (`{record.author_id}`)")
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>")
         
-        if message.content:
-            content = message.content[:1024] + "..." if len(message.content) > 1024 else message.content
+        if record.content:
+            content = record.content[:1024] + "..." if len(record.content) > 1024 else record.content
             embed.add_field(name="Content", value=content, inline=False)
         
-        embed.set_author(name=str(message.author), icon_url=message.author.avatar.url if message.author.avatar else message.author.default_avatar.url)
+        if record.attachments:
+            embed.add_field(name="Attachments", value="\n".join(record.attachments)[:1024], inline=False)
+        
+        author = self.resolve_author(channel.guild, record.author_id)
+        if author:
+            embed.set_author(name=str(author), icon_url=author.display_avatar.url)
         
         await self.send_log(channel, embed)
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
+    async def on_cached_message_edit(self, payload, before, after):
         """Log when a message is edited"""
-        if not before.guild or before.author.bot or before.content == after.content:
+        if not payload.guild_id or before is None or before.content == after.content:
             return
             
         # Check if this event should be logged
-        if not await self.should_log_event(before.guild.id, "message_edit"):
+        if not await self.should_log_event(payload.guild_id, "message_edit"):
             return
             
         # Get the appropriate channel
         channel_type = await self.get_event_channel_type("message_edit")
-        channel = await self.get_log_channel(before.guild.id, channel_type)
+        channel = await self.get_log_channel(payload.guild_id, channel_type)
         if not channel:
             return
             
         # Create embed
         embed = discord.Embed(
             title="Message Edited",
-            description=f"**Message edited in {before.channel.mention}**\n[Jump to Message]({after.jump_url})",
+            description=f"**Message edited in <#{payload.channel_id}>**\n[Jump to Message]({after.jump_url})",
             color=discord.Color.blue(),
             timestamp=datetime.now()
         )
         
-        embed.add_field(name="Author", value=f"{before.author.mention} (`{before.author.id}`)")
-        embed.add_field(name="Channel", value=f"{before.channel.mention}")
+        embed.add_field(name="Author", value=f"<@{before.author_id}> (`{before.author_id}`)")
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>")
         
         before_content = before.content[:512] + "..." if len(before.content) > 512 else before.content
         after_content = after.content[:512] + "..." if len(after.content) > 512 else after.content
@@ -763,41 +708,41 @@ class EventLogger(commands.Cog, name="Events"):
         embed.add_field(name="Before", value=f"```{before_content}```", inline=False)
         embed.add_field(name="After", value=f"```{after_content}```", inline=False)
         
-        embed.set_author(name=str(before.author), icon_url=before.author.avatar.url if before.author.avatar else before.author.default_avatar.url)
+        author = self.resolve_author(channel.guild, before.author_id)
+        if author:
+            embed.set_author(name=str(author), icon_url=author.display_avatar.url)
         
         await self.send_log(channel, embed)
 
     @commands.Cog.listener()
-    async def on_bulk_message_delete(self, messages):
+    async def on_cached_bulk_message_delete(self, payload, records):
         """Log when messages are bulk deleted"""
-        if not messages or not messages[0].guild:
+        if not payload.guild_id or not payload.message_ids:
             return
-            
-        guild = messages[0].guild
         
         # Check if this event should be logged
-        if not await self.should_log_event(guild.id, "message_bulk_delete"):
+        if not await self.should_log_event(payload.guild_id, "message_bulk_delete"):
             return
             
         # Get the appropriate channel
         channel_type = await self.get_event_channel_type("message_bulk_delete")
-        channel = await self.get_log_channel(guild.id, channel_type)
+        channel = await self.get_log_channel(payload.guild_id, channel_type)
         if not channel:
             return
             
         # Create embed
         embed = discord.Embed(
             title="Bulk Message Delete",
-            description=f"**{len(messages)} messages deleted in {messages[0].channel.mention}**",
+            description=f"**{len(payload.message_ids)} messages deleted in <#{payload.channel_id}>**",
             color=discord.Color.dark_red(),
             timestamp=datetime.now()
         )
         
-        embed.add_field(name="Channel", value=f"{messages[0].channel.mention}")
-        embed.add_field(name="Message Count", value=str(len(messages)))
+        embed.add_field(name="Channel", value=f"<#{payload.channel_id}>")
+        embed.add_field(name="Message Count", value=str(len(payload.message_ids)))
         
-        # Count unique authors
-        authors = set(msg.author for msg in messages if not msg.author.bot)
+        # Count unique authors among the cached (user) messages
+        authors = set(record.author_id for record in records)
         embed.add_field(name="Affected Users", value=str(len(authors)))
         
         await self.send_log(channel, embed)
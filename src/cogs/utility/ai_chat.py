@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import aiohttp
 import asyncio
 import json
 import os
@@ -10,12 +9,17 @@ import datetime
 from typing import Dict, List, Optional, Union
 import time
 import random
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 from src.utils.core.formatting import create_embed
 from src.utils.database.connection import initialize_mongodb, is_db_available
 from src.utils.views.perplexity_settings import PerplexitySettingsView
+from src.utils.discord.streaming import StreamRenderer, iter_sse_text
+from src.utils.community.generic.credit_ledger import CreditLedger
+from src.ai.providers.perplexity_client import get_perplexity_pool
 from ...core.config import get_config
+from ...core.message_pipeline import Feature, invalidate_features
 
 # Configure logger
 logger = logging.getLogger('perplexity_chat')
@@ -24,6 +28,10 @@ logger = logging.getLogger('perplexity_chat')
 load_dotenv()
 config = get_config()
 PERPLEXITY_API_KEY = config.external_services.perplexity_api_key
+PERPLEXITY_MODEL = "sonar-medium-online"  # Solar model with internet access
+
+# Seconds a guild's perplexity_config stays cached; settings changes invalidate it right away
+CONFIG_CACHE_TTL = 60
 
 class PerplexityChat(commands.Cog):
     """🤖 AI Chat with Perplexity API
@@ -44,13 +52,25 @@ class PerplexityChat(commands.Cog):
         self.default_daily_reset = True  # Reset credits daily by default
         self.default_max_credits = 30  # Maximum credits users can accumulate
         self.streaming_responses = True  # Stream responses by default
+        self._config_cache = {}  # guild_id -> (expires_at, perplexity_config document or None)
+        self.credits_ledger = CreditLedger(self.mongo_db)
         
         # Initialize background tasks
         self.credit_reset_task = self.bot.loop.create_task(self.reset_credits_daily())
         self.cleanup_task = self.bot.loop.create_task(self.cleanup_old_chats())
     
+    async def cog_load(self):
+        """Register the reply chat stage with the bot's message pipeline"""
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.register("ai_chat", Feature.AI_CHAT, self.handle_message, self.chat_enabled)
+        await self.credits_ledger.ensure_index()
+    
     async def cog_unload(self):
         """Clean up tasks when cog is unloaded"""
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.unregister("ai_chat")
         if self.credit_reset_task:
             self.credit_reset_task.cancel()
         if self.cleanup_task:
@@ -68,20 +88,19 @@ class PerplexityChat(commands.Cog):
                 # Sleep until midnight
                 await asyncio.sleep(seconds_until_midnight)
                 
-                # Reset credits for all servers with daily reset enabled
-                server_configs = self.mongo_db.perplexity_config.find({"daily_reset": True})
+                # Reset credits for all servers with daily reset enabled, in one bulk write
+                server_configs = await asyncio.to_thread(
+                    lambda: list(self.mongo_db.perplexity_config.find(
+                        {"daily_reset": True}, {"guild_id": 1, "default_credits": 1}
+                    ))
+                )
+                defaults = {
+                    config["guild_id"]: config.get("default_credits", self.default_credits)
+                    for config in server_configs
+                }
                 
-                async for config in server_configs:
-                    guild_id = config["guild_id"]
-                    default_credits = config.get("default_credits", self.default_credits)
-                    
-                    # Update all users' credits in this guild
-                    await self.mongo_db.perplexity_credits.update_many(
-                        {"guild_id": guild_id},
-                        {"$set": {"credits": default_credits}}
-                    )
-                    
-                    logger.info(f"Reset credits for guild {guild_id}")
+                modified = await self.credits_ledger.reset(defaults)
+                logger.info(f"Reset credits for {len(defaults)} guilds ({modified} users)")
                 
             except Exception as e:
                 logger.error(f"Error in reset_credits_daily: {e}")
@@ -108,121 +127,96 @@ class PerplexityChat(commands.Cog):
                 logger.error(f"Error in cleanup_old_chats: {e}")
                 await asyncio.sleep(300)
     
+    async def get_credit_settings(self, guild_id: int):
+        """Get the server's (default_credits, max_credits)"""
+        server_config = await self.get_server_config(guild_id)
+        if not server_config:
+            return self.default_credits, self.default_max_credits
+        return (
+            server_config.get("default_credits", self.default_credits),
+            server_config.get("max_credits", self.default_max_credits),
+        )
+    
     async def get_user_credits(self, guild_id: int, user_id: int) -> int:
         """Get user's remaining credits"""
-        user_data = await self.mongo_db.perplexity_credits.find_one({
-            "guild_id": str(guild_id),
-            "user_id": str(user_id)
-        })
-        
-        if not user_data:
-            # Get server's default credit amount
-            server_config = await self.mongo_db.perplexity_config.find_one({"guild_id": str(guild_id)})
-            default_credits = server_config.get("default_credits", self.default_credits) if server_config else self.default_credits
-            
-            # Create new user entry
-            await self.mongo_db.perplexity_credits.insert_one({
-                "guild_id": str(guild_id),
-                "user_id": str(user_id),
-                "credits": default_credits,
-                "last_used": datetime.datetime.now().isoformat()
-            })
-            return default_credits
-        
-        return user_data.get("credits", 0)
+        default_credits, _ = await self.get_credit_settings(guild_id)
+        return await self.credits_ledger.balance(guild_id, user_id, default_credits)
     
     async def use_credit(self, guild_id: int, user_id: int) -> bool:
         """Use one credit for a user. Returns True if successful, False if not enough credits."""
-        credits = await self.get_user_credits(guild_id, user_id)
-        
-        if credits <= 0:
-            return False
-        
-        # Decrease credits by 1
-        await self.mongo_db.perplexity_credits.update_one(
-            {"guild_id": str(guild_id), "user_id": str(user_id)},
-            {"$inc": {"credits": -1}, "$set": {"last_used": datetime.datetime.now().isoformat()}}
+        default_credits, _ = await self.get_credit_settings(guild_id)
+        return await self.credits_ledger.spend(guild_id, user_id, default_credits)
+    
+    async def add_credits(self, guild_id: int, user_id: int, amount: int, capped: bool = True) -> int:
+        """Add credits to a user (a negative amount removes them). Returns new credit amount."""
+        default_credits, max_credits = await self.get_credit_settings(guild_id)
+        return await self.credits_ledger.adjust(
+            guild_id, user_id, amount, default_credits, max_credits if capped else None
         )
-        
-        return True
     
-    async def add_credits(self, guild_id: int, user_id: int, amount: int) -> int:
-        """Add credits to a user. Returns new credit amount."""
-        # Get server's max credit limit
-        server_config = await self.mongo_db.perplexity_config.find_one({"guild_id": str(guild_id)})
-        max_credits = server_config.get("max_credits", self.default_max_credits) if server_config else self.default_max_credits
-        
-        # Get current credits
-        current_credits = await self.get_user_credits(guild_id, user_id)
-        
-        # Calculate new amount, respecting the maximum
-        new_amount = min(current_credits + amount, max_credits)
-        
-        # Update in database
-        await self.mongo_db.perplexity_credits.update_one(
-            {"guild_id": str(guild_id), "user_id": str(user_id)},
-            {"$set": {"credits": new_amount}}
+    async def get_server_config(self, guild_id: int) -> Optional[dict]:
+        """Get the server's perplexity_config, cached for CONFIG_CACHE_TTL seconds"""
+        cached = self._config_cache.get(guild_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        server_config = await asyncio.to_thread(
+            self.mongo_db.perplexity_config.find_one, {"guild_id": str(guild_id)}
         )
-        
-        return new_amount
+        self._config_cache[guild_id] = (time.monotonic() + CONFIG_CACHE_TTL, server_config)
+        return server_config
+    
+    def invalidate_config(self, guild_id: int):
+        """Drop a guild's cached config after its settings changed"""
+        self._config_cache.pop(int(guild_id), None)
+        # Balances of users without a document were derived from the old default
+        self.credits_ledger.forget(guild_id)
     
     async def get_server_api_key(self, guild_id: int) -> str:
         """Get server-specific API key if set, otherwise use default"""
-        server_config = await self.mongo_db.perplexity_config.find_one({"guild_id": str(guild_id)})
+        server_config = await self.get_server_config(guild_id)
         
         if server_config and "api_key" in server_config and server_config["api_key"]:
             return server_config["api_key"]
         
         return PERPLEXITY_API_KEY
     
-    async def call_perplexity_api(self, prompt: str, guild_id: int, streaming=False):
-        """Call the Perplexity API with the given prompt"""
+    async def get_perplexity_client(self, guild_id: int):
+        """Pooled client for the server's API key"""
         api_key = await self.get_server_api_key(guild_id)
         
         if not api_key:
             raise ValueError("No Perplexity API key configured")
         
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "model": "sonar-medium-online",  # Using Solar model with internet access
-            "messages": [{"role": "user", "content": prompt}],
-            "stream": streaming
-        }
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://api.perplexity.ai/chat/completions", headers=headers, json=data) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise ValueError(f"API error: {response.status} - {error_text}")
-                
-                if streaming:
-                    return response  # Return the response object for streaming
-                else:
-                    data = await response.json()
-                    return data["choices"][0]["message"]["content"]
+        return get_perplexity_pool().get(api_key)
     
-    # Chat command that responds to any message with a reply using AI
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        # Ignore bot messages
-        if message.author.bot:
-            return
-        
-        # Check if this is a DM or a server message
-        if not message.guild:
-            return  # Ignore DMs for now
+    async def call_perplexity_api(self, prompt: str, guild_id: int) -> str:
+        """Call the Perplexity API with the given prompt"""
+        client = await self.get_perplexity_client(guild_id)
+        return await client.complete([{"role": "user", "content": prompt}], model=PERPLEXITY_MODEL, guild_id=guild_id)
+    
+    @asynccontextmanager
+    async def stream_perplexity_api(self, prompt: str, guild_id: int):
+        """Stream the Perplexity API's answer; yields the raw response lines"""
+        client = await self.get_perplexity_client(guild_id)
+        async with client.stream([{"role": "user", "content": prompt}], model=PERPLEXITY_MODEL, guild_id=guild_id) as response:
+            yield response
+    
+    async def chat_enabled(self, guild_id: int) -> bool:
+        """Whether the message pipeline should run the chat stage for a guild"""
+        server_config = await self.get_server_config(guild_id)
+        return bool(server_config) and server_config.get("enabled", True)
+    
+    # Chat stage that responds to any reply to the bot using AI
+    async def handle_message(self, ctx):
+        message = ctx.message
         
         # Check if the message is a reply to the bot
-        if not (message.reference and message.reference.resolved and 
-                message.reference.resolved.author.id == self.bot.user.id):
+        if not ctx.is_reply_to_bot:
             return
         
         # Get server settings
-        server_config = await self.mongo_db.perplexity_config.find_one({"guild_id": str(message.guild.id)})
+        server_config = await self.get_server_config(message.guild.id)
         
         # Check if Perplexity is enabled for this server
         if not server_config or not server_config.get("enabled", True):
@@ -258,48 +252,10 @@ class PerplexityChat(commands.Cog):
                     # Send initial message that we'll edit
                     response_message = await message.reply("*AI düşünüyor...*")
                     
-                    # Get streaming response
-                    response = await self.call_perplexity_api(message.content, message.guild.id, streaming=True)
-                    
-                    # Process the streaming response
-                    full_response = ""
-                    current_chunk = ""
-                    last_update = time.time()
-                    
-                    async for line in response.content:
-                        if line:
-                            try:
-                                data = json.loads(line.decode('utf-8').strip("data: "))
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    delta = data["choices"][0]["delta"]
-                                    if "content" in delta:
-                                        full_response += delta["content"]
-                                        current_chunk += delta["content"]
-                                        
-                                        # Update message every 1.5 seconds or when chunk gets large
-                                        current_time = time.time()
-                                        if current_time - last_update > 1.5 or len(current_chunk) > 50:
-                                            # Trim the message if it's getting too long for Discord
-                                            display_response = full_response
-                                            if len(display_response) > 1950:
-                                                display_response = full_response[-1950:] + "..."
-                                                
-                                            await response_message.edit(content=display_response)
-                                            last_update = current_time
-                                            current_chunk = ""
-                            except Exception as e:
-                                logger.error(f"Error processing streaming chunk: {e}")
-                    
-                    # Final update with the complete response
-                    # Break the response into multiple messages if too long
-                    if len(full_response) > 2000:
-                        chunks = [full_response[i:i+1990] for i in range(0, len(full_response), 1990)]
-                        await response_message.edit(content=chunks[0])
-                        
-                        for chunk in chunks[1:]:
-                            await message.channel.send(chunk)
-                    else:
-                        await response_message.edit(content=full_response)
+                    # Stream the answer into the message; long answers continue in follow-up messages
+                    renderer = StreamRenderer(response_message, message.channel.send, empty_text="❌ AI boş bir yanıt döndürdü.")
+                    async with self.stream_perplexity_api(message.content, message.guild.id) as response:
+                        await renderer.render(iter_sse_text(response))
                 else:
                     # Non-streaming mode
                     response_text = await self.call_perplexity_api(message.content, message.guild.id)
@@ -356,7 +312,7 @@ class PerplexityChat(commands.Cog):
         credits = await self.get_user_credits(ctx.guild.id, ctx.author.id)
         
         # Get server config for credit settings
-        server_config = await self.mongo_db.perplexity_config.find_one({"guild_id": str(ctx.guild.id)})
+        server_config = await self.get_server_config(ctx.guild.id)
         
         default_credits = server_config.get("default_credits", self.default_credits) if server_config else self.default_credits
         max_credits = server_config.get("max_credits", self.default_max_credits) if server_config else self.default_max_credits
@@ -417,7 +373,7 @@ class PerplexityChat(commands.Cog):
             return await ctx.send(embed=embed, ephemeral=True)
         
         # Get server settings
-        server_config = await self.mongo_db.perplexity_config.find_one({"guild_id": str(ctx.guild.id)})
+        server_config = await self.get_server_config(ctx.guild.id)
         
         # Typing indicator while processing
         async with ctx.typing():
@@ -430,48 +386,10 @@ class PerplexityChat(commands.Cog):
                     await ctx.defer()
                     response_message = await ctx.send("*AI düşünüyor...*")
                     
-                    # Get streaming response
-                    response = await self.call_perplexity_api(soru, ctx.guild.id, streaming=True)
-                    
-                    # Process the streaming response
-                    full_response = ""
-                    current_chunk = ""
-                    last_update = time.time()
-                    
-                    async for line in response.content:
-                        if line:
-                            try:
-                                data = json.loads(line.decode('utf-8').strip("data: "))
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    delta = data["choices"][0]["delta"]
-                                    if "content" in delta:
-                                        full_response += delta["content"]
-                                        current_chunk += delta["content"]
-                                        
-                                        # Update message every 1.5 seconds or when chunk gets large
-                                        current_time = time.time()
-                                        if current_time - last_update > 1.5 or len(current_chunk) > 50:
-                                            # Trim the message if it's getting too long for Discord
-                                            display_response = full_response
-                                            if len(display_response) > 1950:
-                                                display_response = full_response[-1950:] + "..."
-                                                
-                                            await response_message.edit(content=display_response)
-                                            last_update = current_time
-                                            current_chunk = ""
-                            except Exception as e:
-                                logger.error(f"Error processing streaming chunk: {e}")
-                    
-                    # Final update with the complete response
-                    # Break the response into multiple messages if too long
-                    if len(full_response) > 2000:
-                        chunks = [full_response[i:i+1990] for i in range(0, len(full_response), 1990)]
-                        await response_message.edit(content=chunks[0])
-                        
-                        for chunk in chunks[1:]:
-                            await ctx.send(chunk)
-                    else:
-                        await response_message.edit(content=full_response)
+                    # Stream the answer into the message; long answers continue in follow-up messages
+                    renderer = StreamRenderer(response_message, ctx.send, empty_text="❌ AI boş bir yanıt döndürdü.")
+                    async with self.stream_perplexity_api(soru, ctx.guild.id) as response:
+                        await renderer.render(iter_sse_text(response))
                 else:
                     # Non-streaming mode
                     await ctx.defer()
@@ -520,6 +438,8 @@ class PerplexityChat(commands.Cog):
                 "allowed_channels": []
             }
             await self.mongo_db.perplexity_config.insert_one(server_config)
+            self.invalidate_config(ctx.guild.id)
+            invalidate_features(self.bot, ctx.guild.id)
         
         # Create settings embed
         embed = discord.Embed(
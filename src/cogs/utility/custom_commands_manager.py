@@ -11,6 +11,7 @@ from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
 import uuid
 from src.core.logger import LoggerMixin
+from src.core.message_pipeline import Feature
 
 class CustomCommandsManager(commands.Cog, LoggerMixin):
     """Advanced Custom Commands System with scheduling, auto-responses, and event handling"""
@@ -33,19 +34,40 @@ class CustomCommandsManager(commands.Cog, LoggerMixin):
         await self.load_scheduled_commands()
         self.cleanup_cooldowns.start()
         
+        # Temporary roles and bans survive restarts (see src/core/scheduler.py)
+        timed_actions = getattr(self.bot, 'scheduler', None)
+        if timed_actions is not None:
+            timed_actions.register("custom_commands.remove_role", self.scheduled_remove_role)
+            timed_actions.register("custom_commands.unban", self.scheduled_unban)
+        
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.register("custom_commands", Feature.CUSTOM_COMMANDS, self.handle_message, self.has_message_commands)
+        
     async def cog_unload(self):
         """Cleanup on cog unload"""
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.unregister("custom_commands")
+        timed_actions = getattr(self.bot, 'scheduler', None)
+        if timed_actions is not None:
+            timed_actions.unregister("custom_commands.remove_role")
+            timed_actions.unregister("custom_commands.unban")
         self.cleanup_cooldowns.cancel()
         self.scheduler.shutdown()
         
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def has_message_commands(self, guild_id: int) -> bool:
+        """Whether a guild has any enabled text command or auto-response"""
+        commands = await self.get_guild_commands(str(guild_id))
+        return any(
+            cmd.get('enabled') and cmd.get('type') in ('text_command', 'auto_response')
+            for cmd in commands
+        )
+        
+    async def handle_message(self, ctx):
         """Handle text-based commands and auto-responses"""
-        if message.author.bot:
-            return
-            
-        await self.process_text_commands(message)
-        await self.process_auto_responses(message)
+        await self.process_text_commands(ctx.message)
+        await self.process_auto_responses(ctx.message)
         
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -417,7 +439,16 @@ class CustomCommandsManager(commands.Cog, LoggerMixin):
                 
                 if duration:
                     # Schedule role removal
-                    asyncio.create_task(self.remove_role_after_delay(user, role, duration))
+                    timed_actions = getattr(self.bot, 'scheduler', None)
+                    if timed_actions is not None:
+                        timed_actions.schedule(
+                            "custom_commands.remove_role",
+                            {'guild_id': guild.id, 'user_id': user.id, 'role_id': role.id},
+                            delay=duration, key=f"custom_commands.remove_role:{guild.id}:{user.id}:{role.id}",
+                            guild_id=guild.id
+                        )
+                    else:
+                        asyncio.create_task(self.remove_role_after_delay(user, role, duration))
                     
     async def remove_role_action(self, context: Dict, role_id: str):
         """Remove role from user"""
@@ -447,7 +478,14 @@ class CustomCommandsManager(commands.Cog, LoggerMixin):
             
             if duration:
                 # Schedule unban
-                asyncio.create_task(self.unban_user_after_delay(guild, user, duration))
+                timed_actions = getattr(self.bot, 'scheduler', None)
+                if timed_actions is not None:
+                    timed_actions.schedule(
+                        "custom_commands.unban", {'guild_id': guild.id, 'user_id': user.id},
+                        delay=duration, key=f"custom_commands.unban:{guild.id}:{user.id}", guild_id=guild.id
+                    )
+                else:
+                    asyncio.create_task(self.unban_user_after_delay(guild, user, duration))
                 
     async def send_dm_action(self, context: Dict, message: str):
         """Send DM to user"""
@@ -467,6 +505,25 @@ class CustomCommandsManager(commands.Cog, LoggerMixin):
         await asyncio.sleep(delay_seconds)
         await guild.unban(user)
         
+    async def scheduled_remove_role(self, payload: Dict):
+        """Remove a temporary role when its scheduled action is due"""
+        guild = self.bot.get_guild(payload['guild_id'])
+        member = guild.get_member(payload['user_id']) if guild else None
+        role = guild.get_role(payload['role_id']) if guild else None
+        if member and role and role in member.roles:
+            await member.remove_roles(role, reason="Custom command: temporary role expired")
+            
+    async def scheduled_unban(self, payload: Dict):
+        """Lift a temporary ban when its scheduled action is due"""
+        guild = self.bot.get_guild(payload['guild_id'])
+        if not guild:
+            return
+        try:
+            await guild.unban(discord.Object(id=payload['user_id']), reason="Custom command: temporary ban expired")
+        except discord.NotFound:
+            # Already unbanned by hand
+            pass
+        
     async def replace_variables(self, text: str, context: Dict) -> str:
         """Replace variables in text with actual values"""
         variables = {
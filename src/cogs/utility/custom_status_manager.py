@@ -1,18 +1,24 @@
 import discord
 from discord.ext import commands, tasks
 import asyncio
-import re
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set, Tuple
 import logging
-from urllib.parse import urlparse
+import time
 import json
 
 from utils.database.connection import get_database
 from utils.core.config import get_config
+from utils.helpers.status_rules import StatusRuleIndex, activity_key, changed_fields, extract_activity_data
 
 logger = logging.getLogger(__name__)
 
+# How long a member's activity has to settle before rules are evaluated
+DEBOUNCE_SECONDS = 3.0
+# How long a compiled rule index is reused before the settings are re-read
+RULE_CACHE_TTL = 60.0
+
+
 class CustomStatusManager(commands.Cog):
     """Custom Status Manager - Automatically assign roles based on user status"""
     
@@ -23,26 +29,114 @@ class CustomStatusManager(commands.Cog):
         self.active_timers: Dict[str, asyncio.Task] = {}
         self.cooldowns: Dict[str, datetime] = {}
         self.config = get_config()
+        self.db = None
+        # guild id -> (expires at, compiled index or None when the guild has no enabled rules)
+        self._rule_index: Dict[int, Tuple[float, Optional[StatusRuleIndex]]] = {}
+        # (guild id, member id) -> pending debounce timer
+        self._debounce: Dict[Tuple[int, int], asyncio.TimerHandle] = {}
+        # (guild id, member id) -> activity the rules were last evaluated against
+        self._last_data: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+        # Running rule checks, kept referenced until they finish
+        self._checks: Set[asyncio.Task] = set()
         
     async def cog_load(self):
         """Initialize database connection when cog loads"""
         try:
             self.db = await get_database()
+            # Temporary roles survive restarts (see src/core/scheduler.py)
+            scheduler = getattr(self.bot, 'scheduler', None)
+            if scheduler is not None:
+                scheduler.register("custom_status.remove_role", self.scheduled_remove_role)
             logger.info("✅ Custom Status Manager cog loaded successfully")
         except Exception as e:
             logger.error(f"❌ Failed to load Custom Status Manager cog: {e}")
+
+    async def cog_unload(self):
+        """Cancel pending debounce timers and running checks"""
+        for handle in self._debounce.values():
+            handle.cancel()
+        self._debounce.clear()
+        for task in self._checks:
+            task.cancel()
+        scheduler = getattr(self.bot, 'scheduler', None)
+        if scheduler is not None:
+            scheduler.unregister("custom_status.remove_role")
     
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
         """Handle member status changes"""
         if before.activity != after.activity or before.status != after.status:
-            await self.check_status_rules(after)
+            self.schedule_check(after)
     
     @commands.Cog.listener()
     async def on_presence_update(self, before: discord.Member, after: discord.Member):
         """Handle presence updates"""
         if before.activity != after.activity or before.status != after.status:
-            await self.check_status_rules(after)
+            self.schedule_check(after)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        """Drop per-member state when someone leaves"""
+        key = (member.guild.id, member.id)
+        handle = self._debounce.pop(key, None)
+        if handle:
+            handle.cancel()
+        self._last_data.pop(key, None)
+        self.cooldowns.pop(f"{member.guild.id}_{member.id}", None)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Drop cached rules and member state of a guild the bot left"""
+        self.invalidate(guild.id)
+        for key in [key for key in self._debounce if key[0] == guild.id]:
+            self._debounce.pop(key).cancel()
+        for key in [key for key in self._last_data if key[0] == guild.id]:
+            del self._last_data[key]
+
+    def invalidate(self, guild_id: int):
+        """Forget the compiled rules of a guild so the next check reloads them"""
+        self._rule_index.pop(guild_id, None)
+
+    async def get_rule_index(self, guild_id: int) -> Optional[StatusRuleIndex]:
+        """Get the compiled rule index of a guild, or None if it has no enabled rules"""
+        cached = self._rule_index.get(guild_id)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1]
+
+        settings = await self.db.custom_status_rules.find_one({"guild_id": str(guild_id)})
+        index = None
+        if settings and settings.get("enabled", False):
+            index = StatusRuleIndex(settings)
+            if not index.rules:
+                index = None
+        self._rule_index[guild_id] = (now + RULE_CACHE_TTL, index)
+        return index
+
+    def schedule_check(self, member: discord.Member):
+        """Evaluate the member's rules once their activity has been stable for a moment"""
+        if member.bot:
+            return
+        # Guilds known to have no rules never start a timer
+        cached = self._rule_index.get(member.guild.id)
+        if cached and cached[1] is None and cached[0] > time.monotonic():
+            return
+
+        key = (member.guild.id, member.id)
+        handle = self._debounce.pop(key, None)
+        if handle:
+            handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._debounce[key] = loop.call_later(DEBOUNCE_SECONDS, self._debounce_fired, key)
+
+    def _debounce_fired(self, key: Tuple[int, int]):
+        self._debounce.pop(key, None)
+        guild = self.bot.get_guild(key[0])
+        member = guild.get_member(key[1]) if guild else None
+        if member:
+            task = asyncio.create_task(self.check_status_rules(member))
+            self._checks.add(task)
+            task.add_done_callback(self._checks.discard)
     
     async def check_status_rules(self, member: discord.Member):
         """Check and apply status rules for a member"""
@@ -50,14 +144,21 @@ class CustomStatusManager(commands.Cog):
             return
         
         try:
-            # Get guild settings
-            settings = await self.db.custom_status_rules.find_one({"guild_id": str(member.guild.id)})
-            if not settings or not settings.get("enabled", False):
+            index = await self.get_rule_index(member.guild.id)
+            if index is None:
+                return
+
+            # Only evaluate rules whose inputs changed since the last evaluation
+            key = (member.guild.id, member.id)
+            activity_data = self.extract_activity_data(member)
+            current = activity_key(activity_data)
+            changed = changed_fields(self._last_data.get(key), current)
+            if not changed:
                 return
             
             # Check cooldown
             cooldown_key = f"{member.guild.id}_{member.id}"
-            cooldown_seconds = settings.get("settings", {}).get("cooldown_seconds", 30)
+            cooldown_seconds = index.cooldown_seconds
             
             if cooldown_key in self.cooldowns:
                 time_diff = datetime.now() - self.cooldowns[cooldown_key]
@@ -65,206 +166,21 @@ class CustomStatusManager(commands.Cog):
                     return
             
             self.cooldowns[cooldown_key] = datetime.now()
+            self._last_data[key] = current
             
-            # Prepare activity data
-            activity_data = self.extract_activity_data(member)
-            
-            # Check each rule
-            for rule in settings.get("rules", []):
-                if not rule.get("enabled", True):
-                    continue
-                
-                if await self.evaluate_rule(rule, activity_data):
-                    await self.apply_rule_actions(member, rule, activity_data)
-                    await self.log_rule_action(member, rule, activity_data)
-                    await self.update_statistics(settings, rule["id"])
-                    
-                    # Only apply one rule per check (highest priority)
-                    break
+            # Only apply one rule per check (highest priority)
+            match = index.match(activity_data, changed)
+            if match:
+                await self.apply_rule_actions(member, match.rule, activity_data)
+                await self.log_rule_action(member, match.rule, activity_data)
+                await self.update_statistics(index.settings, match.id)
                     
         except Exception as e:
             logger.error(f"Error checking status rules for {member}: {e}")
     
     def extract_activity_data(self, member: discord.Member) -> Dict[str, Any]:
         """Extract relevant data from member's activity"""
-        data = {
-            "status_text": "",
-            "game_name": "",
-            "url": "",
-            "activity_type": "",
-            "timestamp": datetime.now()
-        }
-        
-        if member.activity:
-            if isinstance(member.activity, discord.Game):
-                data["game_name"] = member.activity.name
-                data["activity_type"] = "playing"
-            elif isinstance(member.activity, discord.Streaming):
-                data["activity_type"] = "streaming"
-                data["url"] = member.activity.url
-            elif isinstance(member.activity, discord.Activity):
-                data["activity_type"] = member.activity.type.name
-                if member.activity.name:
-                    data["status_text"] = member.activity.name
-                if hasattr(member.activity, 'url') and member.activity.url:
-                    data["url"] = member.activity.url
-        
-        # Also check custom status
-        if member.activity and hasattr(member.activity, 'state') and member.activity.state:
-            data["status_text"] = member.activity.state
-        
-        return data
-    
-    async def evaluate_rule(self, rule: Dict, activity_data: Dict) -> bool:
-        """Evaluate if a rule matches the activity data"""
-        rule_type = rule.get("type")
-        conditions = rule.get("conditions", {})
-        
-        try:
-            if rule_type == "status_text":
-                return self.evaluate_status_text_rule(conditions, activity_data["status_text"])
-            elif rule_type == "game":
-                return self.evaluate_game_rule(conditions, activity_data["game_name"])
-            elif rule_type == "url":
-                return self.evaluate_url_rule(conditions, activity_data["url"])
-            elif rule_type == "keyword":
-                return self.evaluate_keyword_rule(conditions, activity_data["status_text"])
-            elif rule_type == "activity_type":
-                return self.evaluate_activity_type_rule(conditions, activity_data["activity_type"])
-            elif rule_type == "time_based":
-                return self.evaluate_time_based_rule(conditions)
-            else:
-                logger.warning(f"Unknown rule type: {rule_type}")
-                return False
-        except Exception as e:
-            logger.error(f"Error evaluating rule {rule.get('name', 'Unknown')}: {e}")
-            return False
-    
-    def evaluate_status_text_rule(self, conditions: Dict, status_text: str) -> bool:
-        """Evaluate status text rule"""
-        if not status_text:
-            return False
-        
-        # Check exact matches
-        if "status_exact" in conditions and conditions["status_exact"]:
-            if status_text in conditions["status_exact"]:
-                return True
-        
-        # Check contains
-        if "status_contains" in conditions and conditions["status_contains"]:
-            for phrase in conditions["status_contains"]:
-                if phrase.lower() in status_text.lower():
-                    return True
-        
-        # Check regex
-        if "status_regex" in conditions and conditions["status_regex"]:
-            try:
-                pattern = re.compile(conditions["status_regex"], re.IGNORECASE)
-                if pattern.search(status_text):
-                    return True
-            except re.error:
-                logger.error(f"Invalid regex pattern: {conditions['status_regex']}")
-        
-        return False
-    
-    def evaluate_game_rule(self, conditions: Dict, game_name: str) -> bool:
-        """Evaluate game rule"""
-        if not game_name:
-            return False
-        
-        if "game_names" in conditions and conditions["game_names"]:
-            for name in conditions["game_names"]:
-                if name.lower() in game_name.lower():
-                    return True
-        
-        return False
-    
-    def evaluate_url_rule(self, conditions: Dict, url: str) -> bool:
-        """Evaluate URL rule"""
-        if not url:
-            return False
-        
-        try:
-            parsed_url = urlparse(url)
-            
-            # Check domains
-            if "url_domains" in conditions and conditions["url_domains"]:
-                for domain in conditions["url_domains"]:
-                    if domain in parsed_url.netloc:
-                        return True
-            
-            # Check patterns
-            if "url_patterns" in conditions and conditions["url_patterns"]:
-                for pattern in conditions["url_patterns"]:
-                    if pattern in url:
-                        return True
-            
-            # Check keywords
-            if "url_keywords" in conditions and conditions["url_keywords"]:
-                for keyword in conditions["url_keywords"]:
-                    if keyword.lower() in url.lower():
-                        return True
-        except Exception:
-            return False
-        
-        return False
-    
-    def evaluate_keyword_rule(self, conditions: Dict, status_text: str) -> bool:
-        """Evaluate keyword rule"""
-        if not status_text or "keywords" not in conditions:
-            return False
-        
-        case_sensitive = conditions.get("case_sensitive", False)
-        text = status_text if case_sensitive else status_text.lower()
-        
-        for keyword in conditions["keywords"]:
-            search_keyword = keyword if case_sensitive else keyword.lower()
-            if search_keyword in text:
-                return True
-        
-        return False
-    
-    def evaluate_activity_type_rule(self, conditions: Dict, activity_type: str) -> bool:
-        """Evaluate activity type rule"""
-        if not activity_type or "activity_types" not in conditions:
-            return False
-        
-        return activity_type in conditions["activity_types"]
-    
-    def evaluate_time_based_rule(self, conditions: Dict) -> bool:
-        """Evaluate time-based rule"""
-        if "time_ranges" not in conditions:
-            return False
-        
-        now = datetime.now()
-        current_time = now.hour * 60 + now.minute
-        current_day = now.weekday()
-        
-        for time_range in conditions["time_ranges"]:
-            start_time = self.parse_time_to_minutes(time_range["start_time"])
-            end_time = self.parse_time_to_minutes(time_range["end_time"])
-            
-            # Check day of week
-            if "days_of_week" in time_range:
-                if current_day not in time_range["days_of_week"]:
-                    continue
-            
-            # Check time range
-            if start_time <= end_time:
-                # Same day range
-                if start_time <= current_time <= end_time:
-                    return True
-            else:
-                # Overnight range
-                if current_time >= start_time or current_time <= end_time:
-                    return True
-        
-        return False
-    
-    def parse_time_to_minutes(self, time_str: str) -> int:
-        """Parse time string (HH:MM) to minutes"""
-        hours, minutes = map(int, time_str.split(':'))
-        return hours * 60 + minutes
+        return extract_activity_data(member)
     
     async def apply_rule_actions(self, member: discord.Member, rule: Dict, activity_data: Dict):
         """Apply rule actions to the member"""
@@ -294,14 +210,24 @@ class CustomStatusManager(commands.Cog):
                 if role and role not in member.roles:
                     await member.add_roles(role, reason=f"Custom Status Rule: {rule['name']} (Temporary)")
                     
-                    # Schedule removal
+                    # Schedule removal; rescheduling the same key restarts the timer
                     timer_key = f"{member.guild.id}_{member.id}_{role_id}"
-                    if timer_key in self.active_timers:
-                        self.active_timers[timer_key].cancel()
-                    
-                    self.active_timers[timer_key] = asyncio.create_task(
-                        self.remove_temporary_role(member, role, duration_minutes, rule['name'])
-                    )
+                    scheduler = getattr(self.bot, 'scheduler', None)
+                    if scheduler is not None:
+                        scheduler.schedule(
+                            "custom_status.remove_role",
+                            {'guild_id': member.guild.id, 'user_id': member.id,
+                             'role_id': role.id, 'rule_name': rule['name']},
+                            delay=duration_minutes * 60, key=f"custom_status.remove_role:{timer_key}",
+                            guild_id=member.guild.id
+                        )
+                    else:
+                        if timer_key in self.active_timers:
+                            self.active_timers[timer_key].cancel()
+                        
+                        self.active_timers[timer_key] = asyncio.create_task(
+                            self.remove_temporary_role(member, role, duration_minutes, rule['name'])
+                        )
             
             # Send message
             if "send_message" in actions:
@@ -334,6 +260,15 @@ class CustomStatusManager(commands.Cog):
         except Exception as e:
             logger.error(f"Error removing temporary role: {e}")
     
+    async def scheduled_remove_role(self, payload: Dict):
+        """Remove a temporary role when its scheduled action is due"""
+        guild = self.bot.get_guild(payload['guild_id'])
+        member = guild.get_member(payload['user_id']) if guild else None
+        role = guild.get_role(payload['role_id']) if guild else None
+        if member and role and role in member.roles:
+            await member.remove_roles(role, reason=f"Custom Status Rule: {payload.get('rule_name')} (Temporary expired)")
+            logger.info(f"Removed temporary role {role.name} from {member}")
+    
     async def log_rule_action(self, member: discord.Member, rule: Dict, activity_data: Dict):
         """Log rule action to database"""
         if not self.db:
@@ -365,9 +300,11 @@ class CustomStatusManager(commands.Cog):
             await self.db.custom_status_rules.update_one(
                 {"guild_id": settings["guild_id"]},
                 {
-                    "$inc": {"statistics.total_actions": 1},
-                    "$set": {"statistics.last_action": datetime.now()},
-                    "$inc": {f"statistics.rules_triggered.{rule_id}": 1}
+                    "$inc": {
+                        "statistics.total_actions": 1,
+                        f"statistics.rules_triggered.{rule_id}": 1
+                    },
+                    "$set": {"statistics.last_action": datetime.now()}
                 }
             )
             
@@ -873,8 +873,13 @@ class Config(commands.Cog):
         try:
             await self.bot.wait_until_ready()
             # Only sync if we're in the primary bot instance to avoid rate limiting
-            if getattr(self.bot, 'is_primary_instance', True):
-                await self.bot.tree.sync()
+            if self.bot.is_primary_cluster:
+                command_sync = getattr(self.bot, 'command_sync', None)
+                if command_sync is not None:
+                    # Skips the API call when the commands did not change since the last sync
+                    await command_sync.sync()
+                else:
+                    await self.bot.tree.sync()
                 logger.info("Command tree successfully synced")
         except Exception as e:
             print(f"Error syncing command tree: {e}")
@@ -11,7 +11,7 @@ from pymongo import ReturnDocument
 
 from src.utils.database.connection import get_async_db, initialize_async_mongodb
 from src.utils.core.formatting import create_embed
-from src.utils.external.steam import SteamAPI
+from src.utils.external.steam import get_steam_api
 import os
 
 logger = logging.getLogger('interface')
@@ -270,9 +270,9 @@ class UserProfileView(discord.ui.View):
                 inline=True
             )
             
-            # Try to get more Steam details if SteamAPI is available
+            # Try to get more Steam details (cached, see src/utils/external/steam_cache.py)
             try:
-                steam_api = SteamAPI()
+                steam_api = get_steam_api()
                 steam_info = await steam_api.get_user_summary(game_data['steam_id'])
                 if steam_info:
                     embed.add_field(
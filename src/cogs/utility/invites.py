@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
 import asyncio
 from datetime import datetime
@@ -9,6 +9,7 @@ from discord import app_commands
 # Fix imports - replace utils with core modules
 from src.utils.core.formatting import create_embed
 from src.utils.database.connection import initialize_mongodb
+from src.utils.community.generic.invite_snapshots import InviteSnapshotManager
 
 # Set up logging
 logger = logging.getLogger('invites')
@@ -25,10 +26,27 @@ class InviteTracker(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.mongo_db = initialize_mongodb()
-        self.invite_cache = {}
+        self.snapshots = InviteSnapshotManager(bot, self.mongo_db)
         self.bot.loop.create_task(self.initialize_invite_cache())
+        self.flush_invite_stats.start()
         logger.info("InviteTracker cog initialized")
 
+    async def cog_unload(self):
+        """Flush buffered invite stats before the cog goes away"""
+        self.flush_invite_stats.cancel()
+        # Joins waiting on a diff would otherwise never finish
+        self.snapshots.close()
+        await self.snapshots.flush_stats()
+
+    @tasks.loop(seconds=10.0)
+    async def flush_invite_stats(self):
+        """Write buffered inviter stats to the database in one batch"""
+        await self.snapshots.flush_stats()
+
+    @flush_invite_stats.before_loop
+    async def before_flush_invite_stats(self):
+        await self.bot.wait_until_ready()
+
     async def initialize_invite_cache(self):
         """Initialize the invite cache when the bot starts"""
         await self.bot.wait_until_ready()
@@ -39,20 +57,8 @@ class InviteTracker(commands.Cog):
                 try:
                     # Only cache if the bot has the necessary permissions
                     if guild.me.guild_permissions.manage_guild:
-                        self.invite_cache[guild.id] = {}
-                        
-                        # Fetch and cache all invites
-                        invites = await guild.invites()
-                        for invite in invites:
-                            self.invite_cache[guild.id][invite.code] = {
-                                'uses': invite.uses,
-                                'creator': invite.inviter.id if invite.inviter else None,
-                                'created_at': invite.created_at,
-                                'max_uses': invite.max_uses,
-                                'max_age': invite.max_age
-                            }
-                        
-                        logger.info(f"Cached {len(invites)} invites for {guild.name} (ID: {guild.id})")
+                        count = await self.snapshots.prime(guild)
+                        logger.info(f"Cached {count} invites for {guild.name} (ID: {guild.id})")
                     else:
                         logger.warning(f"Missing 'Manage Server' permission in {guild.name} (ID: {guild.id}), cannot cache invites")
                         
@@ -73,16 +79,7 @@ class InviteTracker(commands.Cog):
     async def on_invite_create(self, invite):
         """Track when a new invite is created"""
         try:
-            if invite.guild.id not in self.invite_cache:
-                self.invite_cache[invite.guild.id] = {}
-                
-            self.invite_cache[invite.guild.id][invite.code] = {
-                'uses': invite.uses,
-                'creator': invite.inviter.id if invite.inviter else None,
-                'created_at': invite.created_at,
-                'max_uses': invite.max_uses,
-                'max_age': invite.max_age
-            }
+            self.snapshots.on_invite_create(invite)
             
             logger.info(f"New invite created in {invite.guild.name} (ID: {invite.guild.id}): {invite.code}")
             
@@ -107,14 +104,13 @@ class InviteTracker(commands.Cog):
     async def on_invite_delete(self, invite):
         """Track when an invite is deleted"""
         try:
-            if invite.guild.id in self.invite_cache and invite.code in self.invite_cache[invite.guild.id]:
-                del self.invite_cache[invite.guild.id][invite.code]
-                logger.info(f"Invite deleted in {invite.guild.name} (ID: {invite.guild.id}): {invite.code}")
-                
-                # Remove from database
-                await self.mongo_db.invites.delete_one(
-                    {"guild_id": invite.guild.id, "code": invite.code}
-                )
+            self.snapshots.on_invite_delete(invite)
+            logger.info(f"Invite deleted in {invite.guild.name} (ID: {invite.guild.id}): {invite.code}")
+            
+            # Remove from database
+            await self.mongo_db.invites.delete_one(
+                {"guild_id": invite.guild.id, "code": invite.code}
+            )
                 
         except Exception as e:
             logger.error(f"Error in on_invite_delete: {e}")
@@ -131,86 +127,41 @@ class InviteTracker(commands.Cog):
                 logger.warning(f"Missing 'Manage Server' permission in {member.guild.name}, cannot track invites")
                 return
                 
-            # Wait a bit for Discord's invite cache to update
-            await asyncio.sleep(1)
-            
-            # Get the invites after the member joined
+            # Joins landing in the same short window share one invites fetch
             try:
-                new_invites = await member.guild.invites()
+                attribution = await self.snapshots.resolve_join(member)
             except (discord.Forbidden, discord.HTTPException) as e:
                 logger.error(f"Could not fetch invites when {member} joined {member.guild.name}: {e}")
                 return
-                
-            # If we don't have a cache for this guild yet, create it
-            if member.guild.id not in self.invite_cache:
-                self.invite_cache[member.guild.id] = {}
-                for invite in new_invites:
-                    self.invite_cache[member.guild.id][invite.code] = {
-                        'uses': invite.uses - 1,  # Subtract 1 to account for the current join
-                        'creator': invite.inviter.id if invite.inviter else None,
-                        'created_at': invite.created_at,
-                        'max_uses': invite.max_uses,
-                        'max_age': invite.max_age
-                    }
-                logger.info(f"Created new invite cache for {member.guild.name} when {member} joined")
-                return
             
-            # Find which invite was used by comparing the cached uses to current uses
-            used_invite = None
-            invite_codes = list(self.invite_cache[member.guild.id].keys())
-            
-            for invite in new_invites:
-                if invite.code not in self.invite_cache[member.guild.id]:
-                    # This is a new invite created after we cached
-                    continue
-                    
-                cached_uses = self.invite_cache[member.guild.id][invite.code]['uses']
-                
-                if invite.uses > cached_uses:
-                    used_invite = invite
-                    # Update the cache
-                    self.invite_cache[member.guild.id][invite.code]['uses'] = invite.uses
-                    break
-            
-            # Check for new invites we didn't have cached
-            for invite in new_invites:
-                if invite.code not in invite_codes:
-                    self.invite_cache[member.guild.id][invite.code] = {
-                        'uses': invite.uses,
-                        'creator': invite.inviter.id if invite.inviter else None,
-                        'created_at': invite.created_at,
-                        'max_uses': invite.max_uses,
-                        'max_age': invite.max_age
-                    }
-            
-            # Update all invites in the cache
-            for invite in new_invites:
-                if invite.code in self.invite_cache[member.guild.id]:
-                    self.invite_cache[member.guild.id][invite.code]['uses'] = invite.uses
+            if attribution.source == "vanity":
+                logger.info(f"{member} joined {member.guild.name} using the vanity URL ({attribution.code})")
+            elif attribution.source == "widget":
+                logger.info(f"{member} joined {member.guild.name} through the server widget ({attribution.code})")
             
             # Handle the used invite information
-            if used_invite:
-                inviter = used_invite.inviter
-                logger.info(f"{member} joined {member.guild.name} using invite code {used_invite.code} created by {inviter}")
+            if attribution.source == "invite":
+                inviter = attribution.inviter or member.guild.get_member(attribution.inviter_id)
+                logger.info(f"{member} joined {member.guild.name} using invite code {attribution.code} created by {inviter}")
                 
                 # Store this join in the database
                 await self.mongo_db.invite_joins.insert_one({
                     "guild_id": member.guild.id,
                     "member_id": member.id,
                     "member_name": f"{member.name}#{member.discriminator}",
-                    "inviter_id": inviter.id if inviter else None,
+                    "inviter_id": attribution.inviter_id,
                     "inviter_name": f"{inviter.name}#{inviter.discriminator}" if inviter else "Unknown",
-                    "invite_code": used_invite.code,
-                    "invite_uses": used_invite.uses,
+                    "invite_code": attribution.code,
+                    "invite_uses": attribution.uses,
+                    "ambiguous": attribution.ambiguous,
                     "joined_at": datetime.utcnow(),
                 })
                 
-                # Update inviter's stats
-                if inviter:
-                    await self.mongo_db.invite_stats.update_one(
-                        {"guild_id": member.guild.id, "user_id": inviter.id},
-                        {"$inc": {"total_invites": 1, "regular_invites": 1}},
-                        upsert=True
+                # Update inviter's stats; a guess between several invites is not credited
+                if attribution.inviter_id and not attribution.ambiguous:
+                    self.snapshots.record_stat(
+                        member.guild.id, attribution.inviter_id,
+                        total_invites=1, regular_invites=1
                     )
                 
                 # Send welcome message if configured
@@ -225,7 +176,7 @@ class InviteTracker(commands.Cog):
                                 member_name=member.name,
                                 inviter_name=f"{inviter.name}#{inviter.discriminator}" if inviter else "Unknown",
                                 inviter_mention=inviter.mention if inviter else "Unknown",
-                                invite_uses=used_invite.uses
+                                invite_uses=attribution.uses
                             )
                             
                             embed = discord.Embed(
@@ -235,7 +186,7 @@ class InviteTracker(commands.Cog):
                             await welcome_channel.send(embed=embed)
                         except Exception as e:
                             logger.error(f"Error sending invite tracking welcome message: {e}")
-            else:
+            elif attribution.source == "unknown":
                 # Couldn't determine which invite was used
                 logger.warning(f"{member} joined {member.guild.name} but the invite used could not be determined")
                 
@@ -252,14 +203,14 @@ class InviteTracker(commands.Cog):
                 "member_id": member.id
             })
             
-            if join_info and join_info.get("inviter_id"):
+            # Ambiguous joins were never credited, so there is nothing to take back
+            if join_info and join_info.get("inviter_id") and not join_info.get("ambiguous"):
                 inviter_id = join_info["inviter_id"]
                 
                 # Decrement the inviter's regular_invites count and increment left_invites count
-                await self.mongo_db.invite_stats.update_one(
-                    {"guild_id": member.guild.id, "user_id": inviter_id},
-                    {"$inc": {"regular_invites": -1, "left_invites": 1}},
-                    upsert=True
+                self.snapshots.record_stat(
+                    member.guild.id, inviter_id,
+                    regular_invites=-1, left_invites=1
                 )
                 
                 logger.info(f"{member} left {member.guild.name}. Invite stats updated for inviter ID: {inviter_id}")
@@ -273,6 +224,9 @@ class InviteTracker(commands.Cog):
         try:
             target = member or ctx.author
             
+            # Make sure buffered increments are visible
+            await self.snapshots.flush_stats()
+            
             stats = await self.mongo_db.invite_stats.find_one({
                 "guild_id": ctx.guild.id,
                 "user_id": target.id
@@ -311,6 +265,8 @@ class InviteTracker(commands.Cog):
     async def invites_leaderboard(self, ctx):
         """Show the top inviters in the server"""
         try:
+            await self.snapshots.flush_stats()
+            
             # Get top 10 inviters
             cursor = self.mongo_db.invite_stats.find({"guild_id": ctx.guild.id}).sort("total_invites", -1).limit(10)
             
@@ -352,22 +308,11 @@ class InviteTracker(commands.Cog):
                 await ctx.send(embed=create_embed("I need the 'Manage Server' permission to refresh invites.", discord.Color.red()))
                 return
                 
-            # Fetch fresh invites
-            invites = await ctx.guild.invites()
-            
-            # Update the cache
-            self.invite_cache[ctx.guild.id] = {}
-            for invite in invites:
-                self.invite_cache[ctx.guild.id][invite.code] = {
-                    'uses': invite.uses,
-                    'creator': invite.inviter.id if invite.inviter else None,
-                    'created_at': invite.created_at,
-                    'max_uses': invite.max_uses,
-                    'max_age': invite.max_age
-                }
+            # Fetch fresh invites and replace the snapshot
+            count = await self.snapshots.prime(ctx.guild)
                 
-            logger.info(f"Manually refreshed invite cache for {ctx.guild.name} ({len(invites)} invites)")
-            await ctx.send(embed=create_embed(f"Successfully refreshed invite cache. Cached {len(invites)} invites.", discord.Color.green()))
+            logger.info(f"Manually refreshed invite cache for {ctx.guild.name} ({count} invites)")
+            await ctx.send(embed=create_embed(f"Successfully refreshed invite cache. Cached {count} invites.", discord.Color.green()))
             
         except discord.Forbidden:
             await ctx.send(embed=create_embed("I don't have permission to view invites.", discord.Color.red()))
@@ -375,27 +320,31 @@ class InviteTracker(commands.Cog):
             logger.error(f"Error refreshing invite cache: {e}")
             await ctx.send(embed=create_embed("An error occurred while refreshing invites.", discord.Color.red()))
 
+    @invites.command(name="metrics")
+    @commands.is_owner()
+    async def invites_metrics(self, ctx):
+        """Show invite tracking counters (joins handled, REST calls made and saved)"""
+        metrics = self.snapshots.get_metrics()
+        embed = discord.Embed(title="Invite Tracker Metrics", color=discord.Color.blue())
+        for name, value in sorted(metrics.items()):
+            embed.add_field(name=name.replace("_", " ").title(), value=str(value), inline=True)
+        await ctx.send(embed=embed)
+
     @commands.Cog.listener()
     async def on_guild_join(self, guild):
         """Initialize invite tracking when the bot joins a new server"""
         try:
             if guild.me.guild_permissions.manage_guild:
-                self.invite_cache[guild.id] = {}
-                invites = await guild.invites()
-                
-                for invite in invites:
-                    self.invite_cache[guild.id][invite.code] = {
-                        'uses': invite.uses,
-                        'creator': invite.inviter.id if invite.inviter else None,
-                        'created_at': invite.created_at,
-                        'max_uses': invite.max_uses,
-                        'max_age': invite.max_age
-                    }
-                    
-                logger.info(f"Initialized invite cache for new guild {guild.name} (ID: {guild.id}) with {len(invites)} invites")
+                count = await self.snapshots.prime(guild)
+                logger.info(f"Initialized invite cache for new guild {guild.name} (ID: {guild.id}) with {count} invites")
         except Exception as e:
             logger.error(f"Failed to initialize invite cache for {guild.name} (ID: {guild.id}): {e}")
 
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        """Drop the invite snapshot of a server the bot left"""
+        self.snapshots.forget(guild.id)
+
 
 async def setup(bot):
     await bot.add_cog(InviteTracker(bot))
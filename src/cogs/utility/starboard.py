@@ -131,37 +131,46 @@ class Starboard(commands.Cog):
             print(f"Error in starboard reaction remove: {e}")
 
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
-        if not message.guild:
+    async def on_raw_message_delete(self, payload):
+        if not payload.guild_id:
             return
 
-        starboard_data = self.mongo_db.starboard.find_one({"guild_id": str(message.guild.id)})
-        if not starboard_data:
+        starboard_data = self.mongo_db.starboard.find_one({"guild_id": str(payload.guild_id)})
+        if not starboard_data or str(payload.message_id) not in starboard_data.get("messages", {}):
             return
 
-        await self.remove_starboard_message(message, starboard_data)
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild:
+            await self.remove_starboard_message_by_id(guild, str(payload.message_id), starboard_data)
 
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if not before.guild:
+    async def on_cached_message_edit(self, payload, before, after):
+        if not payload.guild_id:
             return
 
-        starboard_data = self.mongo_db.starboard.find_one({"guild_id": str(before.guild.id)})
+        # The compact message cache tells embed unfurls and other edits that don't
+        # change what the starboard shows apart from real ones
+        if before is not None and before.content == after.content and before.attachments == after.attachments:
+            return
+
+        starboard_data = self.mongo_db.starboard.find_one({"guild_id": str(payload.guild_id)})
         if not starboard_data:
             return
 
         # Update starboard message if content changed
-        starboard_msg_id = starboard_data.get("messages", {}).get(str(before.id))
+        starboard_msg_id = starboard_data.get("messages", {}).get(str(payload.message_id))
         if starboard_msg_id:
             try:
+                channel = self.bot.get_channel(payload.channel_id)
+                message = await channel.fetch_message(payload.message_id)
                 starboard_channel = self.bot.get_channel(int(starboard_data["channel_id"]))
                 starboard_msg = await starboard_channel.fetch_message(starboard_msg_id)
                 
-                embed = await self.create_starboard_embed(after, starboard_data)
+                embed = await self.create_starboard_embed(message, starboard_data)
                 await starboard_msg.edit(embed=embed)
                 
                 # Update database
-                await self.update_starboard_message_in_db(after, starboard_data)
+                await self.update_starboard_message_in_db(message, starboard_data)
                 
             except Exception as e:
                 print(f"Error updating starboard message: {e}")
@@ -16,6 +16,10 @@ class TempChannelsManager:
         self.temp_channels = {}  # Maps channel_id -> {'creator_id': user_id, 'guild_id': guild_id}
         self.channel_timers = {}  # Maps channel_id -> deletion timer task
         self.mongo_db = initialize_mongodb()
+        # Delayed deletions survive restarts when the bot has the shared scheduler (see src/core/scheduler.py)
+        self.scheduler = getattr(bot, 'scheduler', None)
+        if self.scheduler is not None:
+            self.scheduler.register("temp_channels.delete", self._scheduled_delete)
     
     async def get_temp_channel_config(self, guild_id: int) -> Optional[Dict]:
         """Get temporary channel configuration for a guild"""
@@ -68,7 +72,10 @@ class TempChannelsManager:
                 await self.handle_channel_empty(before.channel, guild_config)
                 
             # User joined a channel that was scheduled for deletion - cancel deletion
-            if after.channel and after.channel.id in self.channel_timers:
+            if after.channel and self.scheduler is not None:
+                if self.scheduler.cancel(self._deletion_key(after.channel.id)):
+                    logger.info(f"Cancelled deletion timer for channel {after.channel.name} ({after.channel.id})")
+            elif after.channel and after.channel.id in self.channel_timers:
                 timer_task = self.channel_timers[after.channel.id]
                 if timer_task and not timer_task.done():
                     timer_task.cancel()
@@ -197,6 +204,15 @@ class TempChannelsManager:
     async def schedule_channel_deletion(self, channel, delay=15):
         """Schedule a channel for deletion after a delay (in seconds)"""
         try:
+            if self.scheduler is not None:
+                # Rescheduling the same key replaces any pending deletion
+                self.scheduler.schedule(
+                    "temp_channels.delete", {'channel_id': channel.id}, delay=delay,
+                    key=self._deletion_key(channel.id), guild_id=channel.guild.id
+                )
+                logger.info(f"Scheduled deletion of channel {channel.name} ({channel.id}) in {delay} seconds")
+                return
+            
             # Cancel any existing deletion timer
             if channel.id in self.channel_timers:
                 timer_task = self.channel_timers[channel.id]
@@ -211,6 +227,20 @@ class TempChannelsManager:
         except Exception as e:
             logger.error(f"Error scheduling channel deletion: {e}", exc_info=True)
     
+    @staticmethod
+    def _deletion_key(channel_id: int) -> str:
+        return f"temp_channels.delete:{channel_id}"
+    
+    async def _scheduled_delete(self, payload: Dict):
+        """Delete a temporary channel whose scheduled deletion is due, if it is still empty"""
+        channel = self.bot.get_channel(payload['channel_id'])
+        if channel is None:
+            # Deleted meanwhile
+            self.temp_channels.pop(payload['channel_id'], None)
+            return
+        if len(channel.members) == 0:
+            await self.delete_channel(channel)
+    
     async def _delete_after_delay(self, channel, delay):
         """Internal method to delete a channel after a delay"""
         try:
@@ -493,6 +523,10 @@ class TempChannels(commands.Cog):
         self.bot = bot
         self.manager = TempChannelsManager(bot)
     
+    async def cog_unload(self):
+        if self.manager.scheduler is not None:
+            self.manager.scheduler.unregister("temp_channels.delete")
+    
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         """Handle voice state updates for temporary channels"""
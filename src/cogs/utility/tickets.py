@@ -9,6 +9,7 @@ import os
 import asyncio
 import random
 import io
+import logging
 from datetime import datetime
 
 from src.utils.core.formatting import create_embed, hex_to_int
@@ -18,9 +19,13 @@ from src.utils.database import get_async_db
 from src.utils.views.ticket_views import (
     TicketDepartmentsView, DepartmentSelectView, TicketDepartment,
     TicketStatsView, TicketStatistics, TicketAutoClose,
-    update_ticket_activity, increment_ticket_messages
+    record_ticket_message
 )
+from src.utils.views.ticket_registry import ticket_registry
 from src.utils.common import error_embed, success_embed, info_embed
+from src.core.message_pipeline import Feature
+
+logger = logging.getLogger(__name__)
 
 TEXT_STYLE_MAPPING = {
     "short": discord.TextStyle.short,
@@ -103,6 +108,22 @@ class Ticket(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.mongodb = initialize_mongodb()
+    
+    async def cog_load(self):
+        """Warm the open ticket registry so button handlers don't hit the database."""
+        try:
+            await ticket_registry.load()
+        except Exception as e:
+            logger.error(f"Failed to load ticket registry: {e}")
+        
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.register("tickets", Feature.TICKETS, self.handle_message)
+    
+    def cog_unload(self):
+        pipeline = getattr(self.bot, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.unregister("tickets")
         
     @app_commands.command(
         name="ticket_panel",
@@ -262,16 +283,21 @@ class Ticket(commands.Cog):
                 ephemeral=True
             )
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def handle_message(self, ctx):
         """Track ticket activity."""
-        if message.author.bot or not message.guild:
-            return
-        
         # Check if this is a ticket channel
-        if message.channel.name.startswith(("ticket-", "🔵ticket-", "🟢ticket-", "🟠ticket-", "🔴ticket-")):
-            await update_ticket_activity(message.channel.id)
-            await increment_ticket_messages(message.channel.id)
+        if await ticket_registry.is_ticket(ctx.message.channel.id):
+            await record_ticket_message(ctx.message.channel.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Retire tickets whose channel was deleted by hand."""
+        if await ticket_registry.is_ticket(channel.id):
+            await ticket_registry.close(channel.id, {
+                "status": "closed",
+                "closed_at": datetime.utcnow(),
+                "close_reason": "Channel deleted"
+            })
     
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction):
@@ -4,9 +4,10 @@ Contains shared infrastructure: config, logger, database, cache, exceptions, app
 """
 
 from .config import Config, get_config
-from .logger import setup_logging, get_logger
+from .logger import setup_logging, shutdown_logging, get_logger, get_logging_stats
 from .database import DatabaseManager
 from .cache import CacheManager
+from .metrics import MetricsRegistry, get_registry
 from .exceptions import ControError
 from .application import ApplicationManager, get_application_manager, initialize_application, shutdown_application
 
@@ -14,9 +15,13 @@ __all__ = [
     'Config',
     'get_config', 
     'setup_logging',
+    'shutdown_logging',
     'get_logger',
+    'get_logging_stats',
     'DatabaseManager',
     'CacheManager',
+    'MetricsRegistry',
+    'get_registry',
     'ControError',
     'ApplicationManager',
     'get_application_manager',
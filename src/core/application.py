@@ -13,6 +13,7 @@ from .config import get_config, reload_config
 from .logger import setup_logging, get_logger, LoggerMixin
 from .database import get_database_manager, close_database, get_sync_database_manager
 from .cache import get_cache_manager, close_cache
+from .metrics import install_mongo_metrics
 
 
 class ApplicationManager(LoggerMixin):
@@ -78,6 +79,8 @@ class ApplicationManager(LoggerMixin):
     async def _setup_database(self) -> None:
         """Setup database connection."""
         self.logger.info("Setting up database connection...")
+        # Register the command listener before any client is created
+        install_mongo_metrics()
         self.db_manager = await get_database_manager()
         self.sync_db_manager = get_sync_database_manager()
         await self.db_manager.create_indexes()
@@ -221,6 +224,11 @@ async def get_application_manager() -> ApplicationManager:
     return _app_manager
 
 
+def current_application_manager() -> Optional[ApplicationManager]:
+    """The global application manager, if one exists, for code that cannot await (such as API threads)."""
+    return _app_manager
+
+
 async def initialize_application(mode: str = "development") -> ApplicationManager:
     """Initialize the global application manager."""
     app_manager = await get_application_manager()
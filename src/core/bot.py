@@ -19,9 +19,11 @@ from .logger import get_logger, setup_logging, LogContext
 from .exceptions import BotException, ConfigurationError
 from .database import get_database, close_database
 from .cache import get_cache, close_cache
+from .metrics import BotMetricsMixin, install_mongo_metrics
+from .command_sync import create_command_sync
 
 
-class ControBot(commands.Bot):
+class ControBot(BotMetricsMixin, commands.Bot):
     """Main bot class with enhanced functionality."""
     
     def __init__(self, config: Dict[str, Any]):
@@ -47,6 +49,9 @@ class ControBot(commands.Bot):
         # Services
         self.services: Dict[str, Any] = {}
         
+        # Hash-gated application command sync
+        self.command_sync = create_command_sync(self)
+        
         # Logging
         self.logger = get_logger("bot")
         
@@ -64,6 +69,11 @@ class ControBot(commands.Bot):
         # Set up error handling
         self._setup_error_handling()
     
+    async def setup_hook(self) -> None:
+        """Start collecting metrics before the gateway connects."""
+        install_mongo_metrics()
+        self.start_metrics()
+    
     def _setup_events(self) -> None:
         """Set up bot event handlers."""
         
@@ -246,12 +256,12 @@ class ControBot(commands.Bot):
                     guild = self.get_guild(guild_id)
                     if guild:
                         self.tree.copy_global_to(guild=guild)
-                        await self.tree.sync(guild=guild)
-                        self.logger.info(f"Synced commands to test guild: {guild.name}")
+                        result = await self.command_sync.sync(guild=guild)
+                        self.logger.info(f"Commands for test guild {guild.name}: {result.reason or 'synced'}")
             else:
                 # Sync globally in production
-                await self.tree.sync()
-                self.logger.info("Synced commands globally")
+                result = await self.command_sync.sync()
+                self.logger.info(f"Global commands: {result.reason or 'synced'}")
                 
         except Exception as e:
             self.logger.error("Failed to sync commands", error=str(e))
@@ -416,6 +426,8 @@ class ControBot(commands.Bot):
         self.logger.info("Cleaning up bot resources")
         
         try:
+            self.stop_metrics()
+            
             # Close database connection
             await close_database()
             
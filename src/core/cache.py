@@ -11,6 +11,10 @@ from datetime import timedelta
 import redis.asyncio as redis
 from .config import get_config
 from .logger import get_logger, LoggerMixin
+from .metrics import CACHE_REQUESTS
+
+_HITS = CACHE_REQUESTS.labels("core", "hit")
+_MISSES = CACHE_REQUESTS.labels("core", "miss")
 
 
 class CacheManager(LoggerMixin):
@@ -67,6 +71,7 @@ class CacheManager(LoggerMixin):
             try:
                 value = await self.redis_client.get(key)
                 if value is not None:
+                    _HITS.inc()
                     return json.loads(value)
             except Exception as e:
                 self.logger.warning(f"Redis get failed for key {key}: {e}")
@@ -78,9 +83,12 @@ class CacheManager(LoggerMixin):
                 if asyncio.get_event_loop().time() > self._memory_cache_ttl[key]:
                     del self._memory_cache[key]
                     del self._memory_cache_ttl[key]
+                    _MISSES.inc()
                     return default
+            _HITS.inc()
             return self._memory_cache[key]
         
+        _MISSES.inc()
         return default
     
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
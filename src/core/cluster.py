@@ -0,0 +1,178 @@
+"""
+Shard and cluster support for Contro Discord Bot
+
+``ClusterMixin`` gives an ``AutoShardedBot`` per shard stats, shard gauges
+and, when the process was started by the cluster launcher
+(src/bot/launcher.py), a connection to the launcher's IPC hub. Over that
+connection the cluster pushes its stats, applies cache invalidations other
+clusters broadcast, and runs owner commands such as extension reloads on
+every cluster at once.
+"""
+
+import asyncio
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import get_config
+from .ipc import IPCClient
+from .metrics import get_registry
+
+SHARD_LATENCY = get_registry().gauge(
+    "contro_shard_latency_seconds", "Gateway heartbeat latency per shard", ("shard",))
+SHARD_GUILDS = get_registry().gauge(
+    "contro_shard_guilds", "Guilds per shard", ("shard",))
+
+# Owner commands a cluster accepts over IPC
+OWNER_ACTIONS = ('reload', 'load', 'unload', 'sync_commands')
+
+
+def split_shards(shard_count: int, clusters: int) -> List[List[int]]:
+    """Split shard ids into ``clusters`` contiguous, nearly equal groups."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    groups, start = [], 0
+    for index in range(clusters):
+        end = start + size + (1 if index < extra else 0)
+        groups.append(list(range(start, end)))
+        start = end
+    return groups
+
+
+class ClusterMixin:
+    """Shard stats and inter-cluster messaging for an ``AutoShardedBot``.
+
+    Put it before ``commands.AutoShardedBot`` in the bases, call
+    ``start_cluster`` from ``setup_hook`` and ``stop_cluster`` on close.
+    """
+
+    cluster_id: Optional[int] = None
+    ipc: Optional[IPCClient] = None
+    _shard_stats_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def sharding_options() -> Dict[str, Any]:
+        """``shard_count``/``shard_ids`` keyword arguments for ``AutoShardedBot`` from the config."""
+        sharding = get_config().sharding
+        if sharding.shard_ids:
+            return {'shard_count': sharding.shard_count, 'shard_ids': sharding.shard_ids}
+        if sharding.shard_count:
+            return {'shard_count': sharding.shard_count}
+        return {}
+
+    @property
+    def is_primary_cluster(self) -> bool:
+        """The cluster that owns shard 0, or the only process; it does once-per-bot work like command sync."""
+        return self.cluster_id in (None, 0)
+
+    def start_cluster(self) -> None:
+        sharding = get_config().sharding
+        self.cluster_id = sharding.cluster_id
+        if sharding.ipc_port and self.cluster_id is not None and self.ipc is None:
+            self.ipc = IPCClient(sharding.ipc_host, sharding.ipc_port, sharding.ipc_secret, self.cluster_id)
+            self.ipc.add_handler('invalidate', self._on_ipc_invalidate)
+            self.ipc.add_handler('owner_command', self._on_ipc_owner_command)
+            self.ipc.start()
+        if self._shard_stats_task is None:
+            self._shard_stats_task = asyncio.create_task(self._publish_shard_stats(sharding.stats_interval))
+
+    async def stop_cluster(self) -> None:
+        if self._shard_stats_task is not None:
+            self._shard_stats_task.cancel()
+            self._shard_stats_task = None
+        if self.ipc is not None:
+            await self.ipc.close()
+            self.ipc = None
+
+    def shard_stats(self) -> Dict[str, Any]:
+        """Latency, guild count and state of each shard this process runs."""
+        guilds: Dict[int, int] = {}
+        for guild in self.guilds:
+            guilds[guild.shard_id] = guilds.get(guild.shard_id, 0) + 1
+        shards = {}
+        for shard_id, shard in sorted(self.shards.items()):
+            latency = shard.latency
+            shards[str(shard_id)] = {
+                'latency_ms': round(latency * 1000, 1) if math.isfinite(latency) else None,
+                'guilds': guilds.get(shard_id, 0),
+                'closed': shard.is_closed(),
+            }
+        return {
+            'cluster': self.cluster_id,
+            'pid': os.getpid(),
+            'shard_count': self.shard_count,
+            'guilds': len(self.guilds),
+            'shards': shards,
+            'updated_at': time.time(),
+        }
+
+    async def cluster_stats(self) -> Dict[str, Any]:
+        """Stats of every cluster, keyed by cluster id; just this process when it is not clustered."""
+        local = self.shard_stats()
+        if self.ipc is None or not self.ipc.connected:
+            return {str(self.cluster_id or 0): local}
+        try:
+            clusters = await self.ipc.request('stats')
+        except Exception as e:
+            self.logger.error(f"Failed to fetch cluster stats: {e}")
+            clusters = {}
+        # Our own entry is fresher than the last push
+        clusters[str(self.cluster_id)] = local
+        return clusters
+
+    def broadcast_invalidation(self, guild_id: int) -> None:
+        """Tell the other clusters that a guild's settings changed."""
+        if self.ipc is not None:
+            self.ipc.broadcast_nowait('invalidate', {'guild_id': guild_id})
+
+    async def run_owner_command(self, action: str, extension: Optional[str] = None, everywhere: bool = True) -> str:
+        """Run an owner action here and, with ``everywhere``, on every other cluster."""
+        if action not in OWNER_ACTIONS:
+            raise ValueError(f"Unknown action {action!r}")
+        if everywhere and self.ipc is not None:
+            await self.ipc.broadcast('owner_command', {'action': action, 'extension': extension})
+        return await self._apply_owner_command(action, extension)
+
+    async def _apply_owner_command(self, action: str, extension: Optional[str]) -> str:
+        if action == 'reload':
+            await self.reload_extension(extension)
+        elif action == 'load':
+            await self.load_extension(extension)
+        elif action == 'unload':
+            await self.unload_extension(extension)
+        elif action == 'sync_commands':
+            if not self.is_primary_cluster:
+                return "skipped"
+            command_sync = getattr(self, 'command_sync', None)
+            if command_sync is not None:
+                await command_sync.try_sync_commands()
+        return "ok"
+
+    async def _on_ipc_invalidate(self, data: Dict[str, Any]) -> None:
+        pipeline = getattr(self, 'message_pipeline', None)
+        if pipeline is not None:
+            pipeline.invalidate(data.get('guild_id'))
+
+    async def _on_ipc_owner_command(self, data: Dict[str, Any]) -> None:
+        action = data.get('action')
+        if action not in OWNER_ACTIONS:
+            self.logger.warning(f"Ignoring unknown owner command {action!r} from IPC")
+            return
+        result = await self._apply_owner_command(action, data.get('extension'))
+        self.logger.info(f"Owner command {action} {data.get('extension') or ''} from IPC: {result}")
+
+    async def _publish_shard_stats(self, interval: float) -> None:
+        await self.wait_until_ready()
+        while True:
+            try:
+                stats = self.shard_stats()
+                for shard_id, shard in stats['shards'].items():
+                    latency = shard['latency_ms']
+                    SHARD_LATENCY.labels(shard_id).set(latency / 1000 if latency is not None else float('nan'))
+                    SHARD_GUILDS.labels(shard_id).set(shard['guilds'])
+                if self.ipc is not None:
+                    await self.ipc.send('stats', data=stats)
+            except Exception as e:
+                self.logger.error(f"Failed to publish shard stats: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,243 @@
+"""
+Application command sync for Contro Discord Bot
+
+``tree.sync()`` uploads the whole command set and is heavily rate limited, so
+calling it on every restart is wasted work. ``CommandSyncManager`` builds the
+exact payload ``tree.sync()`` would send, in a canonical form, and only calls
+Discord when its hash differs from the one stored after the last successful
+sync. ``diff()`` compares the current tree with that stored state and lists
+added, removed and changed commands without calling Discord.
+
+State is kept per application and scope (global or a guild id) in a
+``command_sync`` Mongo collection, or in a JSON file when no database is
+configured or MongoDB cannot be reached.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from src.utils.database.connection import is_db_available
+
+logger = logging.getLogger('command_sync')
+
+DEFAULT_STATE_PATH = os.path.join('data', 'command_sync.json')
+
+
+def _command_key(payload: Dict[str, Any]) -> str:
+    return f"{payload.get('type', 1)}:{payload['name']}"
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+@dataclass
+class CommandDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        if self.empty:
+            return "no changes"
+        parts = []
+        for label, names in (("added", self.added), ("removed", self.removed), ("changed", self.changed)):
+            if names:
+                parts.append(f"{label}: {', '.join(names)}")
+        return "; ".join(parts)
+
+
+@dataclass
+class SyncResult:
+    scope: str
+    hash: str
+    synced: bool
+    diff: CommandDiff
+    reason: str = ""
+
+
+class FileSyncStore:
+    """Keeps sync state in a JSON file."""
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        return (await asyncio.to_thread(self._read)).get(key)
+
+    async def save(self, key: str, state: Dict[str, Any]) -> None:
+        def write():
+            data = self._read()
+            data[key] = state
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            temp = f"{self.path}.tmp"
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(temp, self.path)
+        await asyncio.to_thread(write)
+
+
+class MongoSyncStore:
+    """Keeps sync state in a collection of a sync pymongo database, queried off the event loop.
+
+    While the database is unavailable state goes to ``fallback`` instead, so a
+    restart during a MongoDB outage still skips unchanged syncs.
+    """
+
+    def __init__(self, db, collection: str = 'command_sync', fallback: Optional[FileSyncStore] = None):
+        self.db = db
+        self.collection = collection
+        self.fallback = fallback or FileSyncStore()
+
+    def _collection(self):
+        # Called on the worker thread, since a lazy database connects on first use
+        return self.db[self.collection] if is_db_available(self.db) else None
+
+    async def load(self, key: str) -> Optional[Dict[str, Any]]:
+        collection = await asyncio.to_thread(self._collection)
+        if collection is None:
+            return await self.fallback.load(key)
+        return await asyncio.to_thread(collection.find_one, {'_id': key}, {'_id': 0})
+
+    async def save(self, key: str, state: Dict[str, Any]) -> None:
+        collection = await asyncio.to_thread(self._collection)
+        if collection is None:
+            await self.fallback.save(key, state)
+            return
+        await asyncio.to_thread(collection.replace_one, {'_id': key}, state, upsert=True)
+
+
+class CommandSyncManager:
+    """Syncs a bot's command tree only when it changed since the last sync."""
+
+    def __init__(self, bot, store=None, sync_cooldown: float = 300):
+        self.bot = bot
+        self.store = store or FileSyncStore()
+        self.sync_cooldown = sync_cooldown  # between global syncs that do reach Discord
+        self.last_sync_time = 0.0
+        self.sync_calls = 0
+        self._lock = asyncio.Lock()
+
+    def _scope(self, guild: Optional[discord.abc.Snowflake]) -> str:
+        return f"guild:{guild.id}" if guild is not None else "global"
+
+    def _key(self, scope: str) -> str:
+        return f"{self.bot.application_id}:{scope}"
+
+    async def payload(self, guild: Optional[discord.abc.Snowflake] = None) -> Dict[str, Dict[str, Any]]:
+        """What ``tree.sync(guild=guild)`` would upload, keyed by command type and name."""
+        tree = self.bot.tree
+        commands = tree._get_all_commands(guild=guild)
+        translator = tree.translator
+        if translator:
+            payload = [await command.get_translated_payload(tree, translator) for command in commands]
+        else:
+            payload = [command.to_dict(tree) for command in commands]
+        return {_command_key(item): item for item in payload}
+
+    @staticmethod
+    def hash_payload(payload: Dict[str, Dict[str, Any]]) -> str:
+        return hashlib.sha256(canonical_json(payload).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def compare(previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]]) -> CommandDiff:
+        name = lambda key: key.split(':', 1)[1]  # noqa: E731
+        return CommandDiff(
+            added=sorted(name(key) for key in current.keys() - previous.keys()),
+            removed=sorted(name(key) for key in previous.keys() - current.keys()),
+            changed=sorted(
+                name(key) for key in current.keys() & previous.keys()
+                if canonical_json(current[key]) != canonical_json(previous[key])
+            ),
+        )
+
+    async def diff(self, guild: Optional[discord.abc.Snowflake] = None) -> CommandDiff:
+        """Dry run: what a sync would change compared with the last synced state."""
+        stored = await self._load(self._scope(guild))
+        return self.compare(stored.get('commands', {}) if stored else {}, await self.payload(guild))
+
+    async def sync(self, guild: Optional[discord.abc.Snowflake] = None, force: bool = False) -> SyncResult:
+        """Sync the tree for ``guild`` (or globally) if it changed since the last sync."""
+        scope = self._scope(guild)
+        async with self._lock:
+            current = await self.payload(guild)
+            digest = self.hash_payload(current)
+            stored = await self._load(scope)
+            diff = self.compare(stored.get('commands', {}) if stored else {}, current)
+
+            if not force and stored and stored.get('hash') == digest:
+                logger.info(f"Commands for {scope} unchanged ({digest[:12]}), skipping sync")
+                return SyncResult(scope, digest, False, diff, "unchanged")
+
+            if guild is None and not force:
+                cooldown_remaining = self.last_sync_time + self.sync_cooldown - time.time()
+                if cooldown_remaining > 0:
+                    logger.warning(f"Global command sync on cooldown. Try again in {cooldown_remaining:.1f} seconds")
+                    return SyncResult(scope, digest, False, diff, "cooldown")
+
+            logger.info(f"Syncing commands for {scope}: {diff.summary()}")
+            await self.bot.tree.sync(guild=guild)
+            self.sync_calls += 1
+            if guild is None:
+                self.last_sync_time = time.time()
+
+            try:
+                await self.store.save(self._key(scope), {
+                    'hash': digest,
+                    'commands': current,
+                    'synced_at': discord.utils.utcnow().isoformat(),
+                })
+            except Exception as e:
+                # The sync itself went through; the next start just syncs once more
+                logger.error(f"Failed to store command sync state for {scope}: {e}")
+            return SyncResult(scope, digest, True, diff)
+
+    async def try_sync_commands(self, bot=None, guild_id: Optional[int] = None) -> bool:
+        """Sync globally or to one guild, logging instead of raising. Returns whether it succeeded."""
+        guild = None
+        if guild_id:
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
+                logger.error(f"Could not find guild with ID {guild_id}")
+                return False
+        try:
+            result = await self.sync(guild)
+            return result.synced or result.reason == "unchanged"
+        except discord.HTTPException as e:
+            logger.error(f"Command sync failed due to Discord API error: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Command sync failed with unexpected error: {e}", exc_info=True)
+            return False
+
+    async def _load(self, scope: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.store.load(self._key(scope))
+        except Exception as e:
+            logger.error(f"Failed to read command sync state for {scope}: {e}")
+            return None
+
+
+def create_command_sync(bot, db=None) -> CommandSyncManager:
+    """A sync manager storing state in ``db.command_sync``, or on disk while there is no database."""
+    store = MongoSyncStore(db) if db is not None else FileSyncStore()
+    return CommandSyncManager(bot, store)
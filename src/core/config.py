@@ -4,7 +4,7 @@ Uses Pydantic for type-safe configuration with environment variable support
 """
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings
 
@@ -52,6 +52,13 @@ class LoggingConfig(BaseModel):
     backup_count: int = Field(default=5, env="LOG_BACKUP_COUNT")
     format: str = Field(default="%(asctime)s - %(name)s - %(levelname)s - %(message)s", env="LOG_FORMAT")
     colored: bool = Field(default=True, env="LOG_COLORED")
+    queue_enabled: bool = Field(default=True, env="LOG_QUEUE_ENABLED")
+    queue_size: int = Field(default=10000, env="LOG_QUEUE_SIZE")
+    drop_policy: str = Field(default="drop_oldest", env="LOG_DROP_POLICY")
+    # Logger name (or prefix) -> max records per second below WARNING
+    rate_limits: Dict[str, float] = Field(default_factory=dict, env="LOG_RATE_LIMITS")
+    # Logger name (or prefix) -> fraction of records below WARNING to keep
+    sample_rates: Dict[str, float] = Field(default_factory=dict, env="LOG_SAMPLE_RATES")
     
     @field_validator('level')
     @classmethod
@@ -61,6 +68,14 @@ class LoggingConfig(BaseModel):
             raise ValueError(f'Log level must be one of: {allowed}')
         return v.upper()
 
+    @field_validator('drop_policy')
+    @classmethod
+    def validate_drop_policy(cls, v):
+        allowed = ['drop_oldest', 'drop_newest']
+        if v.lower() not in allowed:
+            raise ValueError(f'Log drop policy must be one of: {allowed}')
+        return v.lower()
+
 
 class SecurityConfig(BaseModel):
     """Security configuration settings."""
@@ -89,6 +104,24 @@ class PerformanceConfig(BaseModel):
     max_concurrent_tasks: int = Field(default=100, env="PERFORMANCE_MAX_CONCURRENT_TASKS")
     task_timeout: int = Field(default=30, env="PERFORMANCE_TASK_TIMEOUT")
     memory_limit: int = Field(default=512, env="PERFORMANCE_MEMORY_LIMIT")
+    message_cache_guild_bytes: int = Field(default=1024 * 1024, env="PERFORMANCE_MESSAGE_CACHE_GUILD_BYTES")
+    message_cache_total_bytes: int = Field(default=64 * 1024 * 1024, env="PERFORMANCE_MESSAGE_CACHE_TOTAL_BYTES")
+    loop_stall_threshold: float = Field(default=0.5, env="PERFORMANCE_LOOP_STALL_THRESHOLD")
+    gateway_record_path: Optional[str] = Field(default=None, env="PERFORMANCE_GATEWAY_RECORD_PATH")
+    gateway_record_limit: int = Field(default=100000, env="PERFORMANCE_GATEWAY_RECORD_LIMIT")
+    import_profile: bool = Field(default=False, env="PERFORMANCE_IMPORT_PROFILE")
+
+
+class ShardingConfig(BaseModel):
+    """Sharding and cluster settings; the cluster launcher sets these for each process."""
+    shard_count: Optional[int] = Field(default=None, env="CONTRO_SHARD_COUNT")
+    shard_ids: Optional[List[int]] = Field(default=None, env="CONTRO_SHARD_IDS")
+    cluster_id: Optional[int] = Field(default=None, env="CONTRO_CLUSTER_ID")
+    cluster_count: int = Field(default=1, env="CONTRO_CLUSTER_COUNT")
+    ipc_host: str = Field(default="127.0.0.1", env="CONTRO_IPC_HOST")
+    ipc_port: Optional[int] = Field(default=None, env="CONTRO_IPC_PORT")
+    ipc_secret: str = Field(default="", env="CONTRO_IPC_SECRET")
+    stats_interval: float = Field(default=15.0, env="CONTRO_SHARD_STATS_INTERVAL")
 
 
 class ExternalServicesConfig(BaseModel):
@@ -104,6 +137,7 @@ class ExternalServicesConfig(BaseModel):
     reddit_username: Optional[str] = Field(default=None, env="REDDIT_USERNAME")
     spotify_client_id: Optional[str] = Field(default=None, env="SPOTIFY_CLIENT_ID")
     spotify_client_secret: Optional[str] = Field(default=None, env="SPOTIFY_CLIENT_SECRET")
+    steam_api_key: Optional[str] = Field(default=None, env="STEAM_API_KEY")
 
 
 class AdminConfig(BaseModel):
@@ -151,6 +185,7 @@ class Config(BaseSettings):
     security: SecurityConfig = Field(default_factory=SecurityConfig)
     features: FeatureConfig = Field(default_factory=FeatureConfig)
     performance: PerformanceConfig = Field(default_factory=PerformanceConfig)
+    sharding: ShardingConfig = Field(default_factory=ShardingConfig)
     external_services: ExternalServicesConfig = Field(default_factory=ExternalServicesConfig)
     admin: AdminConfig = Field(default_factory=AdminConfig)
     server: ServerConfig = Field(default_factory=ServerConfig)
@@ -172,6 +207,18 @@ class Config(BaseSettings):
             self.discord_premium_token = os.environ.get("CONTRO_PREMIUM_TOKEN", os.environ.get("DISCORD_PREMIUM_TOKEN", ""))
         if not self.database.url or self.database.url == "mongodb://localhost:27017":
             self.database.url = os.environ.get("DB_URL", "mongodb://localhost:27017")
+        # Set per process by the cluster launcher (src/bot/launcher.py)
+        if os.environ.get("CONTRO_SHARD_COUNT"):
+            self.sharding.shard_count = int(os.environ["CONTRO_SHARD_COUNT"])
+        if os.environ.get("CONTRO_SHARD_IDS"):
+            self.sharding.shard_ids = [int(shard) for shard in os.environ["CONTRO_SHARD_IDS"].split(",")]
+        if os.environ.get("CONTRO_CLUSTER_ID"):
+            self.sharding.cluster_id = int(os.environ["CONTRO_CLUSTER_ID"])
+            self.sharding.cluster_count = int(os.environ.get("CONTRO_CLUSTER_COUNT", "1"))
+        if os.environ.get("CONTRO_IPC_PORT"):
+            self.sharding.ipc_host = os.environ.get("CONTRO_IPC_HOST", self.sharding.ipc_host)
+            self.sharding.ipc_port = int(os.environ["CONTRO_IPC_PORT"])
+            self.sharding.ipc_secret = os.environ.get("CONTRO_IPC_SECRET", "")
 
     @field_validator('environment')
     @classmethod
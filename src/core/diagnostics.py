@@ -0,0 +1,174 @@
+"""
+Runtime diagnostics for Contro Discord Bot
+
+``LoopStallWatchdog`` notices when the event loop stops running callbacks for
+longer than a threshold and records the loop thread's stack while it is still
+stuck, which is the code that blocked it. ``SamplingProfiler`` samples the loop
+thread's stack for a while and produces collapsed stacks that flamegraph tools
+(flamegraph.pl, speedscope, inferno) read directly.
+
+Both work from a separate thread using ``sys._current_frames``, so the loop
+itself only pays for one heartbeat callback per interval.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import get_registry
+
+logger = logging.getLogger('diagnostics')
+
+LOOP_STALLS = get_registry().counter(
+    "contro_event_loop_stalls_total", "Times the event loop was blocked beyond the stall threshold")
+
+
+def _thread_stack(thread_id: int) -> List[str]:
+    frame = sys._current_frames().get(thread_id)
+    return traceback.format_stack(frame) if frame is not None else []
+
+
+class LoopStallWatchdog:
+    """Watches an event loop from a daemon thread and captures stacks of stalls.
+
+    The loop bumps a heartbeat every ``interval`` seconds. When the heartbeat
+    is older than ``threshold`` the watchdog grabs the loop thread's stack
+    once, and logs the stall with its full duration when the loop recovers.
+    """
+
+    def __init__(self, threshold: float = 0.5, interval: float = 0.1, history: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start watching the running loop. Must be called from the loop's thread."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._beat()
+        self._thread = threading.Thread(target=self._watch, name="loop-stall-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _beat(self) -> None:
+        self._heartbeat = time.monotonic()
+        if not self._stop.is_set():
+            self._handle = self._loop.call_later(self.interval, self._beat)
+
+    def _watch(self) -> None:
+        stall: Optional[Dict[str, Any]] = None
+        while not self._stop.wait(self.interval):
+            lag = time.monotonic() - self._heartbeat - self.interval
+            if lag > self.threshold:
+                if stall is None:
+                    # Still blocked, so the stack shows the code holding the loop
+                    stall = {
+                        'started_at': datetime.utcnow().isoformat(),
+                        'stack': "".join(_thread_stack(self._loop_thread_id)),
+                        'duration': lag,
+                    }
+                    self.stalls.append(stall)
+                    LOOP_STALLS.inc()
+                else:
+                    stall['duration'] = lag
+            elif stall is not None:
+                logger.warning(
+                    f"Event loop was blocked for {stall['duration']:.2f}s, stack at detection:\n{stall['stack']}"
+                )
+                stall = None
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval into collapsed stack counts."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float) -> None:
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        self.samples.clear()
+        self.sample_count = 0
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, args=(seconds,), name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self, seconds: float) -> None:
+        deadline = time.monotonic() + seconds
+        frame_labels: Dict[Any, str] = {}
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = frame_labels.get(code)
+                    if label is None:
+                        label = frame_labels[code] = (
+                            f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                        )
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[";".join(stack)] += 1
+                self.sample_count += 1
+            time.sleep(self.interval)
+        self.duration = time.monotonic() - self.started_at
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed stack format: ``frame;frame;frame count`` per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+async def profile_loop(seconds: float, profiler: SamplingProfiler) -> str:
+    """Run ``profiler`` for ``seconds`` (or until stopped) without blocking the loop."""
+    profiler.start(seconds)
+    await asyncio.get_running_loop().run_in_executor(None, profiler.wait)
+    return profiler.collapsed()
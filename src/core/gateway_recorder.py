@@ -0,0 +1,332 @@
+"""
+Gateway recorder for Contro Discord Bot
+
+Writes an anonymized copy of selected gateway dispatches to a JSON Lines
+file (gzip compressed when the path ends in ``.gz``) that
+``scripts/replay_gateway.py`` can replay offline into a bot with stubbed HTTP.
+
+The recorder wraps entries of the connection state's parser table, so it sees
+the same payload dicts the library parses, with no extra JSON decoding. Ids
+are remapped (keeping their timestamp bits), names, message text and
+component labels are replaced by placeholders of the same shape, and avatars, embeds and
+attachment URLs are dropped. The first time a guild shows up, a skeleton of
+it (channels and roles, no members) is written so replays can rebuild the
+guild cache.
+
+File format, one JSON object per line:
+    {"event": "RECORDING", "d": {...}}                       header
+    {"t": 0.0, "event": "GUILD_SNAPSHOT", "d": {...}}          guild skeleton
+    {"t": 1.234, "event": "MESSAGE_CREATE", "d": {...}}       dispatch
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger('gateway_recorder')
+
+RECORDING_VERSION = 1
+
+RECORDED_EVENTS = (
+    'MESSAGE_CREATE',
+    'PRESENCE_UPDATE',
+    'VOICE_STATE_UPDATE',
+    'GUILD_MEMBER_ADD',
+    'MESSAGE_REACTION_ADD',
+    'MESSAGE_REACTION_REMOVE',
+)
+
+# Keys whose values identify a person or leak content; kept as null so payloads still parse
+_BLANKED = frozenset({
+    'avatar', 'banner', 'avatar_decoration_data', 'accent_color', 'bio', 'pronouns', 'email', 'phone',
+    'session_id', 'nonce', 'token', 'primary_guild', 'collectibles', 'clan', 'interaction',
+    'interaction_metadata', 'application', 'activity', 'call', 'poll', 'message_snapshots',
+})
+_NAMES = frozenset({'username', 'global_name', 'nick', 'name'})
+_ID_LISTS = frozenset({'roles', 'mention_roles'})
+_TOKEN = re.compile(r"<(@[!&]?|#)(\d+)>|\w+")
+_COMMAND = re.compile(r"[^\w\s<]+\S*")
+
+
+def _is_snowflake(value: Any) -> bool:
+    return isinstance(value, str) and value.isdigit() and len(value) >= 15
+
+
+class Anonymizer:
+    """Consistently replaces ids, names and text in gateway payloads."""
+
+    def __init__(self):
+        self._ids: Dict[int, int] = {}
+        self._names: Dict[str, str] = {}
+
+    def snowflake(self, value) -> str:
+        original = int(value)
+        mapped = self._ids.get(original)
+        if mapped is None:
+            # Keep the timestamp bits so created_at and ordering still hold
+            mapped = self._ids[original] = ((original >> 22) << 22) | (len(self._ids) & 0x3FFFFF)
+        return str(mapped)
+
+    def name(self, value: str) -> str:
+        mapped = self._names.get(value)
+        if mapped is None:
+            mapped = self._names[value] = f"name{len(self._names)}"
+        return mapped
+
+    def text(self, content: str) -> str:
+        """Same length and word shape, mentions remapped, a leading command word kept."""
+        if not content:
+            return content
+        command = _COMMAND.match(content)
+        head = command.group(0) if command else ""
+
+        def replace(match):
+            if match.group(2):
+                return f"<{match.group(1)}{self.snowflake(match.group(2))}>"
+            return "x" * len(match.group(0))
+
+        return head + _TOKEN.sub(replace, content[len(head):])
+
+    def label(self, value: str) -> str:
+        """Same length and word shape, nothing kept."""
+        return _TOKEN.sub(lambda match: "x" * len(match.group(0)), value)
+
+    def payload(self, value: Any, key: Optional[str] = None) -> Any:
+        if isinstance(value, dict):
+            return {k: self._field(k, v) for k, v in value.items()}
+        if isinstance(value, list):
+            if key in _ID_LISTS:
+                return [self.snowflake(item) for item in value]
+            return [self.payload(item, key) for item in value]
+        return value
+
+    def _field(self, key: str, value: Any) -> Any:
+        if key in _BLANKED:
+            return None
+        if key == 'emoji' and isinstance(value, dict):
+            # Unicode emoji are not personal and listeners match on them
+            if value.get('id'):
+                return {'id': self.snowflake(value['id']), 'name': 'emoji', 'animated': value.get('animated', False)}
+            return {'id': None, 'name': value.get('name')}
+        if key == 'content' and isinstance(value, str):
+            return self.text(value)
+        if key in _NAMES and isinstance(value, str):
+            return self.name(value)
+        if key == 'embeds':
+            return []
+        if key == 'components' and isinstance(value, list):
+            return [self._component(item) for item in value if isinstance(item, dict)]
+        if key == 'attachments' and isinstance(value, list):
+            return [self._attachment(item) for item in value]
+        if key == 'activities' and isinstance(value, list):
+            return [{'type': item.get('type', 0), 'name': 'activity'} for item in value]
+        if (key == 'id' or key.endswith('_id')) and _is_snowflake(value):
+            return self.snowflake(value)
+        return self.payload(value, key)
+
+    def _component(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Keeps the layout (types, styles, nesting); text, custom ids, URLs and options are replaced."""
+        component = {'type': item.get('type')}
+        for key in ('style', 'disabled', 'min_values', 'max_values', 'min_length', 'max_length', 'required'):
+            if key in item:
+                component[key] = item[key]
+        for key in ('label', 'placeholder', 'value', 'content', 'title', 'description'):
+            if isinstance(item.get(key), str):
+                component[key] = self.label(item[key])
+        if isinstance(item.get('custom_id'), str):
+            component['custom_id'] = self.name(item['custom_id'])
+        if 'url' in item:
+            component['url'] = 'https://link.invalid/'
+        if isinstance(item.get('options'), list):
+            component['options'] = [
+                {'label': self.label(str(option.get('label', ''))), 'value': self.name(str(option.get('value', '')))}
+                for option in item['options'] if isinstance(option, dict)
+            ]
+        if isinstance(item.get('components'), list):
+            component['components'] = [self._component(child) for child in item['components'] if isinstance(child, dict)]
+        return component
+
+    def _attachment(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        attachment_id = self.snowflake(item['id'])
+        url = f"https://cdn.invalid/attachments/{attachment_id}"
+        return {
+            'id': attachment_id,
+            'filename': 'file',
+            'size': item.get('size', 0),
+            'url': url,
+            'proxy_url': url,
+            'content_type': item.get('content_type'),
+        }
+
+    def guild(self, guild) -> Dict[str, Any]:
+        """A guild skeleton from the cache: channels and roles, no members."""
+        return {
+            'id': self.snowflake(guild.id),
+            'name': self.name(guild.name),
+            'owner_id': self.snowflake(guild.owner_id) if guild.owner_id else None,
+            'member_count': guild.member_count,
+            'unavailable': False,
+            'channels': [
+                {
+                    'id': self.snowflake(channel.id),
+                    'type': channel.type.value,
+                    'name': f"channel{index}",
+                    'position': channel.position,
+                    'parent_id': self.snowflake(channel.category_id) if getattr(channel, 'category_id', None) else None,
+                    'permission_overwrites': [],
+                }
+                for index, channel in enumerate(guild.channels)
+            ],
+            'roles': [
+                {
+                    'id': self.snowflake(role.id),
+                    'name': role.name if role.is_default() else f"role{index}",
+                    'position': role.position,
+                    'permissions': str(role.permissions.value),
+                    'color': 0,
+                    'hoist': False,
+                    'managed': role.managed,
+                    'mentionable': False,
+                }
+                for index, role in enumerate(guild.roles)
+            ],
+            'members': [],
+            'voice_states': [],
+            'presences': [],
+            'emojis': [],
+            'stickers': [],
+            'features': [],
+            'threads': [],
+        }
+
+
+class _LineWriter(threading.Thread):
+    """Serializes and writes lines off the event loop."""
+
+    def __init__(self, path: str):
+        super().__init__(name="gateway-recorder", daemon=True)
+        opener = gzip.open if path.endswith('.gz') else open
+        self._file = opener(path, 'wt', encoding='utf-8')
+        self._queue: 'queue.SimpleQueue[Optional[Dict[str, Any]]]' = queue.SimpleQueue()
+
+    def put(self, line: Dict[str, Any]) -> None:
+        self._queue.put(line)
+
+    def close(self) -> None:
+        """Ask the thread to finish the queued lines and close the file; does not wait."""
+        self._queue.put(None)
+
+    def run(self) -> None:
+        try:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                self._file.write(json.dumps(line, separators=(',', ':'), ensure_ascii=False))
+                self._file.write('\n')
+        except Exception as e:
+            logger.error(f"Gateway recorder stopped writing: {e}")
+        finally:
+            self._file.close()
+
+
+class GatewayRecorder:
+    """Records anonymized gateway dispatches of a bot to a file."""
+
+    def __init__(self, path: str, events: Iterable[str] = RECORDED_EVENTS, max_events: int = 100_000):
+        self.path = path
+        self.events = tuple(event.upper() for event in events)
+        self.max_events = max_events
+        self.recorded = 0
+        self._anonymizer = Anonymizer()
+        self._guilds: Set[int] = set()
+        self._originals: Dict[str, Callable[[Any], None]] = {}
+        self._writer: Optional[_LineWriter] = None
+        self._closing: Optional[_LineWriter] = None
+        self._bot = None
+        self._started = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None
+
+    def start(self, bot) -> None:
+        if self.running:
+            return
+        self._bot = bot
+        self._writer = _LineWriter(self.path)
+        self._writer.start()
+        self._started = time.monotonic()
+        self._writer.put({'event': 'RECORDING', 'd': {
+            'version': RECORDING_VERSION,
+            'started_at': datetime.utcnow().isoformat(),
+            'events': list(self.events),
+        }})
+
+        # The websocket keeps a reference to this same dict, so swapping entries takes effect live
+        parsers = bot._connection.parsers
+        for event in self.events:
+            parser = parsers.get(event)
+            if parser is not None:
+                self._originals[event] = parser
+                parsers[event] = self._wrap(event, parser)
+        logger.info(f"Recording {', '.join(self._originals)} to {self.path}")
+
+    def stop(self) -> int:
+        """Restore the parsers and close the file in the background. Returns the number of recorded events.
+
+        Safe to call on the event loop; ``wait_closed()`` waits for the file to be written out.
+        """
+        if not self.running:
+            return self.recorded
+        parsers = self._bot._connection.parsers
+        for event, parser in self._originals.items():
+            parsers[event] = parser
+        self._originals.clear()
+        self._closing, self._writer = self._writer, None
+        self._closing.close()
+        logger.info(f"Recorded {self.recorded} gateway events to {self.path}")
+        return self.recorded
+
+    async def wait_closed(self, timeout: float = 5.0) -> None:
+        """Wait, off the event loop, until a stopped recording is written out."""
+        writer = self._closing
+        if writer is not None:
+            await asyncio.to_thread(writer.join, timeout)
+
+    def _wrap(self, event: str, parser: Callable[[Any], None]) -> Callable[[Any], None]:
+        def record(data):
+            if self._writer is not None:
+                try:
+                    self._record(event, data)
+                except Exception as e:
+                    logger.error(f"Could not record {event}: {e}")
+            parser(data)
+        return record
+
+    def _record(self, event: str, data: Dict[str, Any]) -> None:
+        guild_id = data.get('guild_id')
+        if not guild_id:
+            # DMs are not part of the guild traffic being replayed
+            return
+        offset = round(time.monotonic() - self._started, 4)
+
+        guild_id = int(guild_id)
+        if guild_id not in self._guilds:
+            guild = self._bot.get_guild(guild_id)
+            if guild is None:
+                return
+            self._guilds.add(guild_id)
+            self._writer.put({'t': offset, 'event': 'GUILD_SNAPSHOT', 'd': self._anonymizer.guild(guild)})
+
+        self._writer.put({'t': offset, 'event': event, 'd': self._anonymizer.payload(data)})
+        self.recorded += 1
+        if self.recorded >= self.max_events:
+            self.stop()
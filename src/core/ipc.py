@@ -0,0 +1,244 @@
+"""
+Inter-process channel between bot clusters for Contro Discord Bot
+
+When the cluster launcher (src/bot/launcher.py) runs several bot processes,
+it hosts an ``IPCServer`` and every cluster connects an ``IPCClient`` to it.
+Messages are JSON objects, one per line, over a local TCP connection that
+has to identify itself with the launcher's shared secret first.
+
+Clusters use it to:
+    * push their shard stats, which the hub keeps and hands out on request
+      (``request('stats')``), so any cluster can answer for all of them;
+    * broadcast events, such as cache invalidations and owner commands, to
+      the other clusters.
+"""
+
+import asyncio
+import hmac
+import itertools
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger('ipc')
+
+# Upper bound for one message; stats for a few hundred shards fit comfortably
+MAX_MESSAGE_BYTES = 4 * 1024 * 1024
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return json.dumps(message, separators=(',', ':'), default=str).encode('utf-8') + b'\n'
+
+
+class IPCServer:
+    """Hub run by the cluster launcher. Relays broadcasts and keeps the latest stats per cluster."""
+
+    def __init__(self, host: str, port: int, secret: str):
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.clusters: Dict[int, asyncio.StreamWriter] = {}
+        self.stats: Dict[int, Dict[str, Any]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_MESSAGE_BYTES)
+        if not self.port:
+            self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"IPC hub listening on {self.host}:{self.port}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self.clusters.values()):
+            writer.close()
+        # Closed writers end the connection handlers; cancelling them instead makes asyncio log noise
+        if self._connections:
+            _, pending = await asyncio.wait(list(self._connections), timeout=5)
+            for task in pending:
+                task.cancel()
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def broadcast(self, event: str, data: Dict[str, Any], origin: Optional[int] = None) -> int:
+        """Send ``event`` to every connected cluster except ``origin``. Returns how many received it."""
+        payload = _encode({'op': 'event', 'event': event, 'data': data, 'origin': origin})
+        sent = 0
+        for cluster_id, writer in list(self.clusters.items()):
+            if cluster_id == origin:
+                continue
+            try:
+                writer.write(payload)
+                await writer.drain()
+                sent += 1
+            except Exception as e:
+                logger.error(f"Failed to send {event} to cluster {cluster_id}: {e}")
+        return sent
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        cluster_id = None
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            hello = json.loads(await asyncio.wait_for(reader.readline(), timeout=10))
+            if hello.get('op') != 'identify' or not hmac.compare_digest(str(hello.get('secret', '')), self.secret):
+                logger.warning("Rejected an IPC connection with a bad handshake")
+                return
+            cluster_id = int(hello['cluster'])
+            previous = self.clusters.get(cluster_id)
+            if previous is not None:
+                previous.close()
+            self.clusters[cluster_id] = writer
+            logger.info(f"Cluster {cluster_id} connected")
+
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self._dispatch(cluster_id, json.loads(line), writer)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+            logger.warning(f"IPC connection from cluster {cluster_id} ended: {e}")
+        except Exception as e:
+            logger.error(f"IPC connection from cluster {cluster_id} failed: {e}")
+        finally:
+            if cluster_id is not None and self.clusters.get(cluster_id) is writer:
+                del self.clusters[cluster_id]
+                logger.info(f"Cluster {cluster_id} disconnected")
+            self._connections.discard(task)
+            writer.close()
+
+    async def _dispatch(self, cluster_id: int, message: Dict[str, Any], writer: asyncio.StreamWriter) -> None:
+        op = message.get('op')
+        if op == 'stats':
+            self.stats[cluster_id] = dict(message.get('data') or {}, received_at=time.time())
+        elif op == 'broadcast':
+            await self.broadcast(message['event'], message.get('data') or {}, origin=cluster_id)
+        elif op == 'request':
+            if message.get('query') == 'stats':
+                data = {str(cid): stats for cid, stats in sorted(self.stats.items())}
+            else:
+                data = {'error': f"unknown query {message.get('query')!r}"}
+            writer.write(_encode({'op': 'reply', 'nonce': message.get('nonce'), 'data': data}))
+            await writer.drain()
+        else:
+            logger.warning(f"Unknown IPC op {op!r} from cluster {cluster_id}")
+
+
+class IPCClient:
+    """A cluster's connection to the launcher's hub, reconnecting when it drops."""
+
+    def __init__(self, host: str, port: int, secret: str, cluster_id: int):
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.cluster_id = cluster_id
+        self._handlers: Dict[str, Handler] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._nonces = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._background: set = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def add_handler(self, event: str, handler: Handler) -> None:
+        """Run ``handler(data)`` when another cluster broadcasts ``event``."""
+        self._handlers[event] = handler
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def send(self, op: str, **fields) -> bool:
+        if not self.connected:
+            return False
+        try:
+            self._writer.write(_encode(dict(fields, op=op)))
+            await self._writer.drain()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send IPC {op}: {e}")
+            return False
+
+    async def broadcast(self, event: str, data: Dict[str, Any]) -> bool:
+        return await self.send('broadcast', event=event, data=data)
+
+    def broadcast_nowait(self, event: str, data: Dict[str, Any]) -> None:
+        """Broadcast from synchronous code running on the event loop."""
+        if not self.connected:
+            return
+        task = asyncio.get_running_loop().create_task(self.broadcast(event, data))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def request(self, query: str, timeout: float = 5.0) -> Any:
+        """Ask the hub for ``query`` (currently only 'stats') and wait for its reply."""
+        nonce = next(self._nonces)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = future
+        try:
+            if not await self.send('request', query=query, nonce=nonce):
+                raise ConnectionError("IPC hub is not connected")
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(nonce, None)
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_BYTES)
+                writer.write(_encode({'op': 'identify', 'cluster': self.cluster_id, 'secret': self.secret}))
+                await writer.drain()
+                self._writer = writer
+                delay = 1.0
+                logger.info(f"Connected to the IPC hub at {self.host}:{self.port}")
+                await self._read(reader)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"IPC connection lost: {e}")
+            finally:
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("hub closed the connection")
+            message = json.loads(line)
+            op = message.get('op')
+            if op == 'reply':
+                future = self._pending.get(message.get('nonce'))
+                if future is not None and not future.done():
+                    future.set_result(message.get('data'))
+            elif op == 'event':
+                handler = self._handlers.get(message.get('event'))
+                if handler is not None:
+                    task = asyncio.create_task(self._call(handler, message))
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+
+    async def _call(self, handler: Handler, message: Dict[str, Any]) -> None:
+        try:
+            await handler(message.get('data') or {})
+        except Exception as e:
+            logger.error(f"IPC handler for {message.get('event')} failed: {e}")
@@ -1,16 +1,42 @@
 """
 Logging system for Contro Discord Bot
 Provides structured logging with file and console output
+
+Records are handed to a bounded queue on the calling thread and formatted and
+written by a background ``QueueListener``, so file I/O, rotation and JSON
+encoding never run on the event loop.
 """
 
+import atexit
+import copy
 import logging
 import logging.handlers
+import queue
+import random
 import sys
 import json
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 from .config import get_config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+def _dumps(data: dict) -> str:
+    """Serialize a log entry, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=str)
+
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging."""
@@ -29,17 +55,15 @@ class JSONFormatter(logging.Formatter):
         # Add exception info if present
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry['exception'] = record.exc_text
         
         # Add extra fields
         for key, value in record.__dict__.items():
-            if key not in ['name', 'msg', 'args', 'levelname', 'levelno', 'pathname', 
-                          'filename', 'module', 'lineno', 'funcName', 'created', 
-                          'msecs', 'relativeCreated', 'thread', 'threadName', 
-                          'processName', 'process', 'getMessage', 'exc_info', 
-                          'exc_text', 'stack_info']:
+            if key not in _RECORD_ATTRS:
                 log_entry[key] = value
         
-        return json.dumps(log_entry, ensure_ascii=False)
+        return _dumps(log_entry)
 
 
 class ColoredFormatter(logging.Formatter):
@@ -63,8 +87,124 @@ class ColoredFormatter(logging.Formatter):
         return super().format(record)
 
 
+class LogRateLimiter(logging.Filter):
+    """Per-logger rate limiting and sampling for chatty, low-severity records.
+
+    Limits are looked up by logger name, falling back to the closest dotted
+    parent (``"cogs.levelling"`` covers ``"cogs.levelling.xp"``). WARNING and
+    above always pass.
+    """
+
+    def __init__(self, rate_limits: Optional[Dict[str, float]] = None,
+                 sample_rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rate_limits = dict(rate_limits or {})
+        self.sample_rates = dict(sample_rates or {})
+        # logger name -> (rate limit, sample rate) after prefix resolution
+        self._resolved: Dict[str, tuple] = {}
+        # logger name -> [tokens, last refill]
+        self._buckets: Dict[str, List[float]] = {}
+        self.rate_limited = 0
+        self.sampled_out = 0
+
+    def _lookup(self, table: Dict[str, float], name: str) -> Optional[float]:
+        while name:
+            if name in table:
+                return table[name]
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        name = record.name
+        limits = self._resolved.get(name)
+        if limits is None:
+            limits = self._resolved[name] = (
+                self._lookup(self.rate_limits, name),
+                self._lookup(self.sample_rates, name)
+            )
+        rate, sample = limits
+
+        if sample is not None and random.random() >= sample:
+            self.sampled_out += 1
+            return False
+
+        if rate is not None:
+            now = time.monotonic()
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                bucket = self._buckets[name] = [rate, now]
+            else:
+                bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                self.rate_limited += 1
+                return False
+            bucket[0] -= 1
+
+        return True
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue, drop_policy: str = "drop_oldest"):
+        super().__init__(log_queue)
+        self.drop_policy = drop_policy
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments here; formatting happens on the listener thread.
+        # Other handlers of the logger still see the caller's record, so change a copy
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frame references, render them while they are still valid
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if self.drop_policy != "drop_oldest":
+                self.dropped += 1
+                return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                return
+        self.enqueued += 1
+
+
+class BoundedQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop sentinel waits for room in a full queue."""
+
+    def enqueue_sentinel(self) -> None:
+        # The writer thread is still draining, so this only waits for one slot
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[BoundedQueueListener] = None
+_queue_handler: Optional[BoundedQueueHandler] = None
+_rate_limiter: Optional[LogRateLimiter] = None
+_listener_lock = threading.Lock()
+
+
 def setup_logging() -> None:
     """Setup the logging system."""
+    global _listener, _queue_handler, _rate_limiter
+
     config = get_config()
     
     # Create logs directory if it doesn't exist
@@ -76,7 +216,9 @@ def setup_logging() -> None:
     root_logger.setLevel(getattr(logging, config.logging.level))
     
     # Clear existing handlers
+    shutdown_logging()
     root_logger.handlers.clear()
+    handlers: List[logging.Handler] = []
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
@@ -94,7 +236,7 @@ def setup_logging() -> None:
         )
     
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # File handler (if enabled)
     if config.logging.file_enabled:
@@ -114,7 +256,25 @@ def setup_logging() -> None:
         )
         file_handler.setLevel(getattr(logging, config.logging.level))
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    _rate_limiter = None
+    if config.logging.rate_limits or config.logging.sample_rates:
+        _rate_limiter = LogRateLimiter(config.logging.rate_limits, config.logging.sample_rates)
+
+    if config.logging.queue_enabled:
+        # Hand records to a background thread instead of writing them on the event loop
+        log_queue = queue.Queue(maxsize=config.logging.queue_size)
+        with _listener_lock:
+            _queue_handler = BoundedQueueHandler(log_queue, config.logging.drop_policy)
+            _listener = BoundedQueueListener(log_queue, *handlers, respect_handler_level=True)
+            _listener.start()
+        handlers = [_queue_handler]
+
+    for handler in handlers:
+        if _rate_limiter is not None:
+            handler.addFilter(_rate_limiter)
+        root_logger.addHandler(handler)
     
     # Set specific logger levels
     logging.getLogger('discord').setLevel(logging.WARNING)
@@ -126,6 +286,38 @@ def setup_logging() -> None:
     logger.info(f"Logging system initialized - Level: {config.logging.level}")
 
 
+def shutdown_logging() -> None:
+    """Stop the background log writer, flushing whatever is still queued."""
+    global _listener, _queue_handler
+
+    with _listener_lock:
+        listener, _listener = _listener, None
+        handler, _queue_handler = _queue_handler, None
+
+    if handler is not None:
+        logging.getLogger().removeHandler(handler)
+    if listener is not None:
+        listener.stop()
+        for target in listener.handlers:
+            target.close()
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logging_stats() -> Dict[str, int]:
+    """Get counters for the queued logging pipeline."""
+    stats = {
+        'queued': _queue_handler is not None,
+        'enqueued': _queue_handler.enqueued if _queue_handler else 0,
+        'dropped': _queue_handler.dropped if _queue_handler else 0,
+        'queue_depth': _queue_handler.queue.qsize() if _queue_handler else 0,
+        'rate_limited': _rate_limiter.rate_limited if _rate_limiter else 0,
+        'sampled_out': _rate_limiter.sampled_out if _rate_limiter else 0,
+    }
+    return stats
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with the given name."""
     return logging.getLogger(name)
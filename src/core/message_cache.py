@@ -0,0 +1,235 @@
+"""
+Compact message cache for Contro Discord Bot
+
+Keeps just enough of recent guild messages to log deletes and edits from the
+raw gateway events: ids, author, content and attachment URLs. Records live in
+per-guild ring buffers bounded by a byte budget, so busy guilds keep their
+recent history without holding full ``discord.Message`` objects.
+
+The bot feeds the cache from ``on_message`` and the raw delete/edit events,
+then dispatches ``cached_message_delete``, ``cached_bulk_message_delete`` and
+``cached_message_edit`` with the cached records for cogs to listen to.
+"""
+
+import logging
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from .metrics import CACHE_REQUESTS
+
+logger = logging.getLogger('message_cache')
+
+# Rough cost of one record besides its strings: the slotted object, its ints
+# and the ring buffer entry pointing at it
+_RECORD_OVERHEAD = 200
+
+
+class CachedMessage:
+    """The parts of a message needed to log it after it is gone."""
+
+    __slots__ = ('id', 'guild_id', 'channel_id', 'author_id', 'content', 'attachments', 'size')
+
+    def __init__(self, message_id: int, guild_id: int, channel_id: int, author_id: int,
+                 content: str, attachments: Tuple[str, ...]):
+        self.id = message_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.content = content
+        self.attachments = attachments
+        self.size = _RECORD_OVERHEAD + sys.getsizeof(content) + sum(sys.getsizeof(url) for url in attachments)
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> 'CachedMessage':
+        return cls(
+            message.id,
+            message.guild.id,
+            message.channel.id,
+            message.author.id,
+            message.content or "",
+            tuple(attachment.url for attachment in message.attachments)
+        )
+
+    @property
+    def created_at(self) -> datetime:
+        # Derived from the snowflake instead of being stored
+        return discord.utils.snowflake_time(self.id)
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild_id}/{self.channel_id}/{self.id}"
+
+    def edited(self, data: Dict[str, Any]) -> 'CachedMessage':
+        """A copy with the content and attachments of a raw edit payload applied."""
+        content = data.get("content", self.content) or ""
+        if "attachments" in data:
+            attachments = tuple(item.get("url", "") for item in data["attachments"] if item.get("url"))
+        else:
+            attachments = self.attachments
+        return CachedMessage(self.id, self.guild_id, self.channel_id, self.author_id, content, attachments)
+
+
+class _GuildRing:
+    __slots__ = ('records', 'size')
+
+    def __init__(self):
+        self.records: 'OrderedDict[int, CachedMessage]' = OrderedDict()
+        self.size = 0
+
+    def pop_oldest(self) -> CachedMessage:
+        _, record = self.records.popitem(last=False)
+        self.size -= record.size
+        return record
+
+
+class MessageCache:
+    """Per-guild ring buffers of ``CachedMessage`` records with a byte budget.
+
+    Each guild may use up to ``guild_budget`` bytes; the oldest records are
+    dropped first. ``total_budget`` bounds all guilds together, and when it
+    is exceeded the guild that just grew gives up its oldest records.
+    """
+
+    def __init__(self, guild_budget: int = 1024 * 1024, total_budget: int = 64 * 1024 * 1024):
+        self.guild_budget = guild_budget
+        self.total_budget = total_budget
+        self._guilds: Dict[int, _GuildRing] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._hit_counter = CACHE_REQUESTS.labels("messages", "hit")
+        self._miss_counter = CACHE_REQUESTS.labels("messages", "miss")
+
+    def __len__(self) -> int:
+        return sum(len(ring.records) for ring in self._guilds.values())
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def add(self, message: discord.Message) -> Optional[CachedMessage]:
+        """Cache a guild message from a user. Bot and DM messages are skipped."""
+        if not message.guild or message.author.bot:
+            return None
+        return self._store(CachedMessage.from_message(message))
+
+    def _store(self, record: CachedMessage) -> CachedMessage:
+        ring = self._guilds.get(record.guild_id)
+        if ring is None:
+            ring = self._guilds[record.guild_id] = _GuildRing()
+
+        previous = ring.records.pop(record.id, None)
+        if previous is not None:
+            ring.size -= previous.size
+            self.size -= previous.size
+        ring.records[record.id] = record
+        ring.size += record.size
+        self.size += record.size
+        self._trim(ring)
+        return record
+
+    def _trim(self, ring: _GuildRing) -> None:
+        while ring.records and (ring.size > self.guild_budget or self.size > self.total_budget):
+            evicted = ring.pop_oldest()
+            self.size -= evicted.size
+            self.evictions += 1
+
+    def remove(self, guild_id: Optional[int], message_id: int) -> Optional[CachedMessage]:
+        """Drop a deleted message and return what was cached for it."""
+        ring = self._guilds.get(guild_id) if guild_id else None
+        record = ring.records.pop(message_id, None) if ring else None
+        if record is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None
+        ring.size -= record.size
+        self.size -= record.size
+        self.hits += 1
+        self._hit_counter.inc()
+        return record
+
+    def remove_many(self, guild_id: Optional[int], message_ids: Iterable[int]) -> List[CachedMessage]:
+        records = (self.remove(guild_id, message_id) for message_id in message_ids)
+        return [record for record in records if record is not None]
+
+    def apply_edit(self, guild_id: Optional[int], message_id: int,
+                   data: Dict[str, Any]) -> Tuple[Optional[CachedMessage], Optional[CachedMessage]]:
+        """Apply a raw edit payload. Returns the (before, after) records, or Nones if uncached.
+
+        The before record is left untouched, so listeners can compare the two.
+        """
+        ring = self._guilds.get(guild_id) if guild_id else None
+        before = ring.records.get(message_id) if ring else None
+        if before is None:
+            self.misses += 1
+            self._miss_counter.inc()
+            return None, None
+        self.hits += 1
+        self._hit_counter.inc()
+        if "content" not in data and "attachments" not in data:
+            # Embed unfurls and pin changes also arrive as edits
+            return before, before
+
+        after = before.edited(data)
+        ring.records[message_id] = after
+        ring.size += after.size - before.size
+        self.size += after.size - before.size
+        self._trim(ring)
+        return before, after
+
+    # ------------------------------------------------------------------
+    # Reads and cleanup
+    # ------------------------------------------------------------------
+    def get(self, guild_id: Optional[int], message_id: int) -> Optional[CachedMessage]:
+        ring = self._guilds.get(guild_id) if guild_id else None
+        return ring.records.get(message_id) if ring else None
+
+    def forget_guild(self, guild_id: int) -> None:
+        ring = self._guilds.pop(guild_id, None)
+        if ring is not None:
+            self.size -= ring.size
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'guilds': len(self._guilds),
+            'messages': len(self),
+            'bytes': self.size,
+            'total_budget': self.total_budget,
+            'guild_budget': self.guild_budget,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+
+
+def create_message_cache() -> MessageCache:
+    """Build a ``MessageCache`` with the budgets from the performance settings."""
+    try:
+        from .config import get_config
+        performance = get_config().performance
+        return MessageCache(performance.message_cache_guild_bytes, performance.message_cache_total_bytes)
+    except Exception as e:
+        logger.error(f"Could not read message cache settings, using defaults: {e}")
+        return MessageCache()
+
+
+def dispatch_raw_delete(bot, cache: MessageCache, payload) -> None:
+    """Update the cache for a raw delete and dispatch ``cached_message_delete``."""
+    record = cache.remove(payload.guild_id, payload.message_id)
+    bot.dispatch('cached_message_delete', payload, record)
+
+
+def dispatch_raw_bulk_delete(bot, cache: MessageCache, payload) -> None:
+    """Update the cache for a raw bulk delete and dispatch ``cached_bulk_message_delete``."""
+    records = cache.remove_many(payload.guild_id, payload.message_ids)
+    bot.dispatch('cached_bulk_message_delete', payload, records)
+
+
+def dispatch_raw_edit(bot, cache: MessageCache, payload) -> None:
+    """Update the cache for a raw edit and dispatch ``cached_message_edit``."""
+    before, after = cache.apply_edit(payload.guild_id, payload.message_id, payload.data)
+    bot.dispatch('cached_message_edit', payload, before, after)
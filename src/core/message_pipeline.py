@@ -0,0 +1,223 @@
+"""
+Central message pipeline for Contro Discord Bot
+
+Cogs register message stages here instead of adding their own ``on_message``
+listeners. For every guild the pipeline keeps a bitmap of the features that
+are enabled, so a message only runs the stages its guild actually uses, in a
+fixed order, with one shared context. Whatever a stage's resolver looked up to
+decide that (usually the guild's settings) is cached with the bitmap and handed
+to the stage, so enabled stages do not read their settings again per message.
+"""
+
+import enum
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger('message_pipeline')
+
+
+class Feature(enum.IntFlag):
+    """Message features that can be switched on per guild."""
+    NONE = 0
+    TICKETS = enum.auto()
+    CUSTOM_COMMANDS = enum.auto()
+    AUTOROLE = enum.auto()
+    LEVELLING = enum.auto()
+    AI_CHAT = enum.auto()
+
+
+# Lower runs first. Moderation-like stages belong before anything that rewards a message.
+STAGE_ORDER = {
+    Feature.TICKETS: 10,
+    Feature.CUSTOM_COMMANDS: 20,
+    Feature.AUTOROLE: 30,
+    Feature.LEVELLING: 40,
+    Feature.AI_CHAT: 50,
+}
+
+
+class MessageContext:
+    """State shared by every stage handling one message."""
+
+    __slots__ = ('message', 'bot', 'guild_id', 'features', 'stopped', 'data')
+
+    def __init__(self, bot, message: discord.Message, features: Feature,
+                 data: Optional[Dict[str, Any]] = None):
+        self.bot = bot
+        self.message = message
+        self.guild_id = message.guild.id
+        self.features = features
+        self.stopped = False
+        # Resolver results by stage name, plus anything stages share with later ones
+        self.data: Dict[str, Any] = dict(data) if data else {}
+
+    @property
+    def is_reply_to_bot(self) -> bool:
+        reference = self.message.reference
+        resolved = reference.resolved if reference else None
+        author = getattr(resolved, 'author', None)
+        return author is not None and self.bot.user is not None and author.id == self.bot.user.id
+
+    def stop(self) -> None:
+        """Skip the remaining stages for this message."""
+        self.stopped = True
+
+
+StageHandler = Callable[[MessageContext], Awaitable[None]]
+FeatureResolver = Callable[[int], Awaitable[Any]]
+
+
+class _Stage:
+    __slots__ = ('name', 'feature', 'order', 'handler', 'resolver', 'calls', 'total', 'max', 'errors')
+
+    def __init__(self, name: str, feature: Feature, order: int,
+                 handler: StageHandler, resolver: Optional[FeatureResolver]):
+        self.name = name
+        self.feature = feature
+        self.order = order
+        self.handler = handler
+        self.resolver = resolver
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+
+class MessagePipeline:
+    """Runs registered message stages for the features a guild has enabled."""
+
+    def __init__(self, bot, ttl: float = 300.0):
+        self.bot = bot
+        self.ttl = ttl
+        self._stages: List[_Stage] = []
+        # guild id -> (expires at, Feature, resolver results by stage name)
+        self._bitmaps: Dict[int, Tuple[float, Feature, Dict[str, Any]]] = {}
+        self.messages_dispatched = 0
+
+    # ------------------------------------------------------------------
+    # Registration
+    # ------------------------------------------------------------------
+    def register(self, name: str, feature: Feature, handler: StageHandler,
+                 resolver: Optional[FeatureResolver] = None, order: Optional[int] = None) -> None:
+        """Add a stage.
+
+        ``resolver(guild_id)`` decides whether the feature is on; without one
+        it always is. A truthy result other than ``True`` (the guild's
+        settings, say) reaches the stage as ``ctx.data[name]``. A resolver
+        that raises leaves the feature off for that message only.
+        """
+        self.unregister(name)
+        stage = _Stage(name, feature, STAGE_ORDER.get(feature, 100) if order is None else order, handler, resolver)
+        self._stages.append(stage)
+        self._stages.sort(key=lambda s: s.order)
+        self._bitmaps.clear()
+
+    def unregister(self, name: str) -> None:
+        before = len(self._stages)
+        self._stages = [stage for stage in self._stages if stage.name != name]
+        if len(self._stages) != before:
+            self._bitmaps.clear()
+
+    # ------------------------------------------------------------------
+    # Feature bitmaps
+    # ------------------------------------------------------------------
+    def invalidate(self, guild_id: Optional[int] = None) -> None:
+        """Re-resolve enabled features on the next message, for one guild or all of them."""
+        if guild_id is None:
+            self._bitmaps.clear()
+        else:
+            self._bitmaps.pop(int(guild_id), None)
+
+    async def features_for(self, guild_id: int) -> Feature:
+        return (await self._resolve(guild_id))[0]
+
+    async def _resolve(self, guild_id: int) -> Tuple[Feature, Dict[str, Any]]:
+        cached = self._bitmaps.get(guild_id)
+        now = time.monotonic()
+        if cached and cached[0] > now:
+            return cached[1], cached[2]
+
+        features = Feature.NONE
+        data: Dict[str, Any] = {}
+        failed = False
+        for stage in self._stages:
+            if stage.feature in features:
+                continue
+            if stage.resolver is None:
+                features |= stage.feature
+                continue
+            try:
+                result = await stage.resolver(guild_id)
+            except Exception as e:
+                logger.error(f"Error resolving {stage.name} for guild {guild_id}: {e}")
+                failed = True
+                continue
+            if result:
+                features |= stage.feature
+                if result is not True:
+                    data[stage.name] = result
+        # A failed lookup is retried on the next message instead of switching the feature off for the TTL
+        if not failed:
+            self._bitmaps[guild_id] = (now + self.ttl, features, data)
+        return features, data
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+    async def dispatch(self, message: discord.Message) -> Optional[MessageContext]:
+        """Run the enabled stages for a guild message."""
+        if message.author.bot or not message.guild or not self._stages:
+            return None
+
+        features, data = await self._resolve(message.guild.id)
+        if not features:
+            return None
+
+        self.messages_dispatched += 1
+        ctx = MessageContext(self.bot, message, features, data)
+        for stage in self._stages:
+            if ctx.stopped:
+                break
+            if stage.feature not in features:
+                continue
+
+            started = time.perf_counter()
+            try:
+                await stage.handler(ctx)
+            except Exception as e:
+                stage.errors += 1
+                logger.error(f"Message stage {stage.name} failed: {e}", exc_info=True)
+            elapsed = time.perf_counter() - started
+            stage.calls += 1
+            stage.total += elapsed
+            if elapsed > stage.max:
+                stage.max = elapsed
+        return ctx
+
+    def get_stage_timings(self) -> Dict[str, Dict[str, float]]:
+        """Get call counts and timings (in milliseconds) per stage."""
+        return {
+            stage.name: {
+                'order': stage.order,
+                'calls': stage.calls,
+                'errors': stage.errors,
+                'avg_ms': (stage.total / stage.calls * 1000) if stage.calls else 0.0,
+                'max_ms': stage.max * 1000,
+                'total_ms': stage.total * 1000,
+            }
+            for stage in self._stages
+        }
+
+
+def invalidate_features(bot, guild_id: int) -> None:
+    """Tell the bot's message pipeline that a guild's settings changed."""
+    pipeline = getattr(bot, 'message_pipeline', None)
+    if pipeline is not None:
+        pipeline.invalidate(guild_id)
+    # Other clusters may run the same guild's pipeline after a reshard, or hold it in their caches
+    broadcast = getattr(bot, 'broadcast_invalidation', None)
+    if broadcast is not None:
+        broadcast(guild_id)
@@ -0,0 +1,401 @@
+"""
+Metrics registry for Contro Discord Bot
+
+Counters, gauges and histograms kept in process and rendered in the
+Prometheus text format by the API's ``/metrics`` endpoint. Label values are
+resolved once into a child object that hot paths can keep, so recording a
+sample is a dict lookup plus an addition.
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger('metrics')
+
+# Seconds; covers fast cache reads up to slow API calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """A metric family; ``labels`` returns the child that holds the values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ('value', 'function')
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` at scrape time instead of tracking it."""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception as e:
+                logger.error(f"Gauge callback failed: {e}")
+                return float('nan')
+        return self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default.set_function(function)
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'started')
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def _samples(self):
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), list(child.counts)):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    """Named metric families. Asking for an existing name returns the same family."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        if not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return REGISTRY
+
+
+# ----------------------------------------------------------------------
+# Shared metric families
+# ----------------------------------------------------------------------
+LISTENER_SECONDS = REGISTRY.histogram(
+    "contro_listener_seconds", "Time spent in Discord event listeners", ("event", "listener"))
+COMMAND_SECONDS = REGISTRY.histogram(
+    "contro_command_seconds", "Command execution time", ("command", "kind"))
+COMMAND_ERRORS = REGISTRY.counter(
+    "contro_command_errors_total", "Commands that raised an error", ("command", "kind"))
+GATEWAY_EVENTS = REGISTRY.counter(
+    "contro_gateway_events_total", "Gateway events received by type", ("type",))
+MONGO_SECONDS = REGISTRY.histogram(
+    "contro_mongo_command_seconds", "MongoDB command latency", ("collection", "command"))
+MONGO_FAILURES = REGISTRY.counter(
+    "contro_mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command"))
+CACHE_REQUESTS = REGISTRY.counter(
+    "contro_cache_requests_total", "Cache lookups by result", ("cache", "result"))
+LOOP_LAG = REGISTRY.histogram(
+    "contro_event_loop_lag_seconds", "How late the event loop woke up a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "contro_queue_depth", "Items waiting in internal work queues", ("queue",))
+API_SECONDS = REGISTRY.histogram(
+    "contro_api_request_seconds", "API request handling time", ("endpoint", "method", "status"))
+
+
+def register_queue(name: str, depth: Callable[[], float]) -> None:
+    """Report the depth of a work queue at scrape time."""
+    QUEUE_DEPTH.labels(name).set_function(depth)
+
+
+# ----------------------------------------------------------------------
+# MongoDB command monitoring
+# ----------------------------------------------------------------------
+# Commands whose first field is not the collection name
+_NO_COLLECTION = frozenset({'ping', 'hello', 'ismaster', 'isMaster', 'buildInfo', 'endSessions',
+                            'saslStart', 'saslContinue', 'getMore', 'killCursors', 'abortTransaction',
+                            'commitTransaction', 'listCollections', 'listDatabases', 'serverStatus', 'dbStats'})
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records the latency of every MongoDB command per collection."""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, int], str] = {}
+
+    def started(self, event) -> None:
+        name = event.command_name
+        if name == 'getMore':
+            collection = event.command.get('collection', '')
+        elif name in _NO_COLLECTION:
+            collection = ''
+        else:
+            collection = event.command.get(name, '')
+        self._collections[(event.request_id, event.operation_id)] = collection if isinstance(collection, str) else ''
+
+    def succeeded(self, event) -> None:
+        collection = self._collections.pop((event.request_id, event.operation_id), '')
+        MONGO_SECONDS.labels(collection, event.command_name).observe(event.duration_micros / 1_000_000)
+
+    def failed(self, event) -> None:
+        collection = self._collections.pop((event.request_id, event.operation_id), '')
+        MONGO_SECONDS.labels(collection, event.command_name).observe(event.duration_micros / 1_000_000)
+        MONGO_FAILURES.labels(collection, event.command_name).inc()
+
+
+_mongo_listener: Optional[MongoCommandMetrics] = None
+
+
+def install_mongo_metrics() -> None:
+    """Monitor MongoDB clients created from now on. Safe to call more than once."""
+    global _mongo_listener
+    if _mongo_listener is None:
+        _mongo_listener = MongoCommandMetrics()
+        monitoring.register(_mongo_listener)
+
+
+# ----------------------------------------------------------------------
+# Event loop lag
+# ----------------------------------------------------------------------
+async def monitor_loop_lag(interval: float = 0.5) -> None:
+    """Sleep in a loop and record how late each wake-up was. Runs until cancelled."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(loop.time() - expected, 0.0))
+
+
+# ----------------------------------------------------------------------
+# Bot instrumentation
+# ----------------------------------------------------------------------
+class BotMetricsMixin:
+    """Times listeners and commands and counts gateway events for a ``commands.Bot``.
+
+    Put it before ``commands.Bot`` in the bases and call ``start_metrics``
+    from ``setup_hook``.
+    """
+
+    _loop_lag_task: Optional[asyncio.Task] = None
+
+    def start_metrics(self) -> None:
+        self.before_invoke(self._metrics_before_invoke)
+        self.after_invoke(self._metrics_after_invoke)
+        if self._loop_lag_task is None:
+            self._loop_lag_task = asyncio.create_task(monitor_loop_lag())
+        register_queue("log_records", _log_queue_depth)
+
+    def stop_metrics(self) -> None:
+        if self._loop_lag_task is not None:
+            self._loop_lag_task.cancel()
+            self._loop_lag_task = None
+
+    async def _run_event(self, coro, event_name: str, *args, **kwargs) -> None:
+        if event_name == 'on_socket_event_type':
+            # Fires for every gateway event; counting it is enough
+            return await super()._run_event(coro, event_name, *args, **kwargs)
+        child = LISTENER_SECONDS.labels(event_name, getattr(coro, '__qualname__', event_name))
+        started = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            child.observe(time.perf_counter() - started)
+
+    async def on_socket_event_type(self, event_type: str) -> None:
+        GATEWAY_EVENTS.labels(event_type).inc()
+
+    async def on_app_command_completion(self, interaction, command) -> None:
+        # Measured from when Discord created the interaction, so it includes gateway delay
+        elapsed = time.time() - interaction.created_at.timestamp()
+        COMMAND_SECONDS.labels(command.qualified_name, "app").observe(max(elapsed, 0.0))
+
+    async def _metrics_before_invoke(self, ctx) -> None:
+        ctx.metrics_started = time.perf_counter()
+
+    async def _metrics_after_invoke(self, ctx) -> None:
+        started = getattr(ctx, 'metrics_started', None)
+        if started is None or ctx.command is None:
+            return
+        name = ctx.command.qualified_name
+        COMMAND_SECONDS.labels(name, "prefix").observe(time.perf_counter() - started)
+        if ctx.command_failed:
+            COMMAND_ERRORS.labels(name, "prefix").inc()
+
+
+def _log_queue_depth() -> float:
+    from .logger import get_logging_stats
+    return get_logging_stats()['queue_depth']
@@ -0,0 +1,379 @@
+"""
+Durable timed actions for Contro Discord Bot
+
+Delayed work such as removing a temporary role, lifting a temporary ban or
+deleting an empty temporary channel used to sleep in a task of its own and
+was lost on every restart. ``ActionScheduler`` keeps all of it in one
+min-heap served by a single task. Actions are persisted to the
+``scheduled_actions`` collection, reloaded once the bot is ready, and
+dispatched in batches when due.
+
+Cogs register a coroutine per action name and schedule actions with a
+JSON-like payload (ids, not Discord objects):
+
+    bot.scheduler.register('custom_commands.unban', self._scheduled_unban)
+    bot.scheduler.schedule('custom_commands.unban', {'guild_id': g, 'user_id': u},
+                           delay=3600, guild_id=g)
+
+Writes are buffered and flushed in bulk every ``flush_interval`` seconds, so
+scheduling during a raid costs no database round trip per action. While the
+database is unreachable, loading and flushing are retried with a backoff.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import DeleteOne, ReplaceOne
+
+from src.utils.database.connection import is_db_available
+
+from .metrics import get_registry, register_queue
+
+logger = logging.getLogger('scheduler')
+
+ACTION_SECONDS = get_registry().histogram(
+    "contro_scheduled_action_seconds", "Time spent running scheduled actions", ("action", "result"))
+ACTION_LATENESS = get_registry().histogram(
+    "contro_scheduled_action_lateness_seconds", "How long after its due time an action ran",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0, 3600.0))
+
+# Actions run concurrently per dispatch round
+BATCH_SIZE = 100
+# Buffered writes are flushed at least this often
+FLUSH_INTERVAL = 1.0
+# A handler that raises is retried after RETRY_DELAY * 2**(attempts - 1) seconds
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 30.0
+HANDLER_TIMEOUT = 60.0
+# Loading or flushing against a failing store is retried after
+# STORE_RETRY_DELAY * 2**(failures - 1) seconds, at most STORE_MAX_RETRY_DELAY
+STORE_RETRY_DELAY = 5.0
+STORE_MAX_RETRY_DELAY = 300.0
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class ScheduledAction:
+    """One pending action."""
+
+    __slots__ = ('key', 'action', 'due', 'payload', 'guild_id', 'attempts', 'seq')
+
+    def __init__(self, key: str, action: str, due: float, payload: Dict[str, Any],
+                 guild_id: Optional[int] = None, attempts: int = 0, seq: int = 0):
+        self.key = key
+        self.action = action
+        self.due = due
+        self.payload = payload
+        self.guild_id = guild_id
+        self.attempts = attempts
+        self.seq = seq
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            '_id': self.key,
+            'action': self.action,
+            'due': datetime.fromtimestamp(self.due, tz=timezone.utc),
+            'payload': self.payload,
+            'guild_id': self.guild_id,
+            'attempts': self.attempts,
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> 'ScheduledAction':
+        due = doc['due']
+        if isinstance(due, datetime):
+            # pymongo returns naive UTC datetimes unless the client is tz aware
+            due = (due if due.tzinfo else due.replace(tzinfo=timezone.utc)).timestamp()
+        return cls(doc['_id'], doc['action'], float(due), doc.get('payload') or {},
+                   doc.get('guild_id'), doc.get('attempts', 0))
+
+
+class MongoActionStore:
+    """Persists actions to a collection of a sync pymongo database, queried off the event loop."""
+
+    def __init__(self, db, collection: str = 'scheduled_actions'):
+        # Resolved on the worker thread, since a lazy database connects on first use
+        self.db = db
+        self.collection = collection
+
+    def _collection(self):
+        # Called on the worker thread, since a lazy database connects on first use
+        if not is_db_available(self.db):
+            raise ConnectionError("database is not available")
+        return self.db[self.collection]
+
+    async def ensure_index(self) -> None:
+        await asyncio.to_thread(lambda: self._collection().create_index('due'))
+
+    async def load(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(lambda: list(self._collection().find({}).sort('due', 1)))
+
+    async def write(self, writes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Upsert actions mapped to a document and delete those mapped to None."""
+        operations = [
+            ReplaceOne({'_id': key}, doc, upsert=True) if doc is not None else DeleteOne({'_id': key})
+            for key, doc in writes.items()
+        ]
+        await asyncio.to_thread(lambda: self._collection().bulk_write(operations, ordered=False))
+
+
+class ActionScheduler:
+    """Runs registered handlers for persisted actions when they are due."""
+
+    def __init__(self, bot, store=None, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.bot = bot
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._handlers: Dict[str, Handler] = {}
+        self._pending: Dict[str, ScheduledAction] = {}
+        self._heap: List[Tuple[float, int, str]] = []  # (due, seq, key)
+        self._seq = itertools.count()
+        self._writes: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._wakeup = asyncio.Event()
+        self._next_flush = 0.0
+        self._flush_failures = 0
+        self._next_recover = 0.0
+        self._recover_failures = 0
+        self._recovered = store is None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics: Dict[str, int] = defaultdict(int)
+
+    # ------------------------------------------------------------------
+    # Registering and scheduling
+    # ------------------------------------------------------------------
+    def register(self, action: str, handler: Handler) -> None:
+        self._handlers[action] = handler
+
+    def unregister(self, action: str) -> None:
+        self._handlers.pop(action, None)
+
+    def schedule(self, action: str, payload: Dict[str, Any], delay: float = 0.0, *,
+                 key: Optional[str] = None, guild_id: Optional[int] = None) -> str:
+        """Run ``action`` with ``payload`` in ``delay`` seconds.
+
+        Scheduling again with the same ``key`` replaces the pending action,
+        which is how a timer is restarted. Returns the key.
+        """
+        key = key or uuid.uuid4().hex
+        entry = ScheduledAction(key, action, time.time() + max(delay, 0.0), payload, guild_id)
+        self._push(entry)
+        if self.store is not None:
+            self._writes[key] = entry.to_document()
+        self.metrics['scheduled'] += 1
+        return key
+
+    def cancel(self, key: str) -> bool:
+        """Drop a pending action. Returns whether it was pending."""
+        found = self._pending.pop(key, None) is not None
+        # Before recovery the stored copy may exist without being pending; afterwards every owned action is
+        if self.store is not None and (found or not self._recovered):
+            self._writes[key] = None
+        if found:
+            self.metrics['cancelled'] += 1
+            self._wakeup.set()
+        return found
+
+    def is_scheduled(self, key: str) -> bool:
+        return key in self._pending
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _push(self, entry: ScheduledAction) -> None:
+        entry.seq = next(self._seq)
+        self._pending[entry.key] = entry
+        heapq.heappush(self._heap, (entry.due, entry.seq, entry.key))
+        self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is None:
+            register_queue("scheduled_actions", self.pending_count)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop dispatching and write out anything still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        self._next_flush = time.monotonic() + self.flush_interval
+        if not self._writes:
+            return
+        writes, self._writes = self._writes, {}
+        try:
+            await self.store.write(writes)
+            self.metrics['flushed'] += len(writes)
+            self._flush_failures = 0
+        except Exception as e:
+            self._flush_failures += 1
+            delay = _retry_delay(self._flush_failures)
+            logger.error(f"Failed to persist {len(writes)} scheduled action changes, retrying in {delay:.0f}s: {e}")
+            self._next_flush = time.monotonic() + delay
+            # Keep them for the next flush unless they were superseded meanwhile
+            for key, doc in writes.items():
+                self._writes.setdefault(key, doc)
+
+    def _owns(self, guild_id: Optional[int]) -> bool:
+        """Whether this process runs the guild's shard, so clusters sharing the collection split the work."""
+        shard_ids = getattr(self.bot, 'shard_ids', None)
+        if guild_id is None:
+            return getattr(self.bot, 'is_primary_cluster', True)
+        if not shard_ids or not self.bot.shard_count:
+            return True
+        return (guild_id >> 22) % self.bot.shard_count in shard_ids
+
+    async def _recover(self) -> None:
+        """Load the stored actions; on failure the loop calls this again after a backoff."""
+        try:
+            await self.store.ensure_index()
+            docs = await self.store.load()
+        except Exception as e:
+            self._recover_failures += 1
+            delay = _retry_delay(self._recover_failures)
+            logger.error(f"Failed to load scheduled actions, retrying in {delay:.0f}s: {e}")
+            self._next_recover = time.monotonic() + delay
+            return
+
+        recovered = 0
+        for doc in docs:
+            try:
+                entry = ScheduledAction.from_document(doc)
+            except Exception as e:
+                logger.error(f"Skipping malformed scheduled action {doc.get('_id')}: {e}")
+                continue
+            # Anything scheduled since startup is newer than the stored copy
+            if entry.key in self._pending or entry.key in self._writes or not self._owns(entry.guild_id):
+                continue
+            self._push(entry)
+            recovered += 1
+        self._recovered = True
+        self.metrics['recovered'] += recovered
+        logger.info(f"Recovered {recovered} scheduled actions")
+
+    # ------------------------------------------------------------------
+    # Dispatching
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        # Handlers look up guilds and members, which only exist once the cache is filled
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                self._wakeup.clear()
+                if not self._recovered and time.monotonic() >= self._next_recover:
+                    await self._recover()
+                batch = self._pop_due(time.time())
+                if batch:
+                    await self._dispatch(batch)
+                # Finished actions are written right away, unless the store is failing
+                if self._writes and ((batch and not self._flush_failures) or time.monotonic() >= self._next_flush):
+                    await self.flush()
+                if len(batch) == self.batch_size:
+                    continue
+                await self._sleep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scheduler loop error: {e}")
+                await asyncio.sleep(1)
+
+    async def _sleep(self) -> None:
+        timeouts = []
+        if self._heap:
+            timeouts.append(self._heap[0][0] - time.time())
+        if self._writes:
+            timeouts.append(self._next_flush - time.monotonic())
+        if not self._recovered:
+            timeouts.append(self._next_recover - time.monotonic())
+        timeout = max(min(timeouts), 0.0) if timeouts else None
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _pop_due(self, now: float) -> List[ScheduledAction]:
+        batch = []
+        while self._heap and len(batch) < self.batch_size:
+            due, seq, key = self._heap[0]
+            entry = self._pending.get(key)
+            if entry is None or entry.seq != seq:
+                # Cancelled or rescheduled; the live entry has its own heap item
+                heapq.heappop(self._heap)
+                continue
+            if due > now:
+                break
+            heapq.heappop(self._heap)
+            del self._pending[key]
+            batch.append(entry)
+        return batch
+
+    async def _dispatch(self, batch: List[ScheduledAction]) -> None:
+        now = time.time()
+        for entry in batch:
+            ACTION_LATENESS.observe(max(now - entry.due, 0.0))
+        results = await asyncio.gather(*(self._call(entry) for entry in batch))
+
+        for entry, ok in zip(batch, results):
+            if entry.key in self._pending:
+                # Rescheduled while running; the new entry owns the stored document
+                continue
+            if ok:
+                if self.store is not None:
+                    self._writes[entry.key] = None
+                continue
+            entry.attempts += 1
+            if entry.attempts >= MAX_ATTEMPTS:
+                logger.error(f"Dropping scheduled {entry.action} {entry.key} after {entry.attempts} attempts")
+                self.metrics['dropped'] += 1
+                if self.store is not None:
+                    self._writes[entry.key] = None
+                continue
+            entry.due = time.time() + RETRY_DELAY * 2 ** (entry.attempts - 1)
+            self._push(entry)
+            if self.store is not None:
+                self._writes[entry.key] = entry.to_document()
+            self.metrics['retried'] += 1
+
+    async def _call(self, entry: ScheduledAction) -> bool:
+        handler = self._handlers.get(entry.action)
+        if handler is None:
+            logger.warning(f"No handler registered for scheduled action {entry.action}")
+            return False
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(handler(entry.payload), timeout=HANDLER_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Scheduled action {entry.action} ({entry.key}) failed: {e}")
+            ACTION_SECONDS.labels(entry.action, "error").observe(time.perf_counter() - started)
+            self.metrics['failed'] += 1
+            return False
+        ACTION_SECONDS.labels(entry.action, "ok").observe(time.perf_counter() - started)
+        self.metrics['dispatched'] += 1
+        return True
+
+    def get_metrics(self) -> Dict[str, int]:
+        metrics = dict(self.metrics)
+        metrics['pending'] = self.pending_count()
+        metrics['unflushed'] = len(self._writes)
+        return metrics
+
+
+def _retry_delay(failures: int) -> float:
+    return min(STORE_RETRY_DELAY * 2 ** (failures - 1), STORE_MAX_RETRY_DELAY)
+
+
+def create_scheduler(bot, db=None) -> ActionScheduler:
+    """A scheduler persisting to ``db.scheduled_actions``; without a database actions live in memory only."""
+    return ActionScheduler(bot, MongoActionStore(db) if db is not None else None)
@@ -0,0 +1,241 @@
+"""
+Startup helpers for Contro Discord Bot
+
+``lazy_import`` returns a module proxy that imports the real module on first
+attribute access, for heavy optional dependencies only a few commands use.
+``ImportProfiler`` times every module executed while it is installed and
+reports the slowest by self time, like ``python -X importtime`` but from
+inside the running bot. ``ExtensionLoader`` imports extension modules on worker
+threads and then loads them concurrently. No extension needs another one at
+setup time (cogs look each other up with ``get_cog`` when they handle an
+event), so they are not ordered.
+
+Startup phases are reported as ``contro_startup_seconds`` and per extension
+load times as ``contro_extension_load_seconds``.
+"""
+
+import asyncio
+import importlib
+import importlib.abc
+import importlib.util
+import logging
+import pkgutil
+import sys
+import threading
+import time
+import types
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .metrics import get_registry
+
+logger = logging.getLogger('startup')
+
+STARTUP_SECONDS = get_registry().gauge(
+    "contro_startup_seconds", "Time spent in each startup phase", ("phase",))
+EXTENSION_LOAD_SECONDS = get_registry().gauge(
+    "contro_extension_load_seconds", "Time to import and set up each extension", ("extension",))
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports ``name`` the first time an attribute is used."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = self.__dict__['_lazy_module'] = importlib.import_module(self.__name__)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_lazy_module'] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return ``name`` if it is already imported, otherwise a proxy that imports it on first use.
+
+    A missing dependency raises ImportError where it is first used rather than
+    when the importing cog loads.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader, profiler: 'ImportProfiler'):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Times module execution while installed on ``sys.meta_path``.
+
+    Self time excludes the modules a module imported; cumulative time
+    includes them.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self._local = threading.local()
+        self._finding = threading.local()
+
+    def __enter__(self) -> 'ImportProfiler':
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._finding, 'active', False):
+            return None
+        self._finding.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._finding.active = False
+
+    def _enter(self) -> None:
+        stack = getattr(self._local, 'children', None)
+        if stack is None:
+            stack = self._local.children = []
+        stack.append(0.0)
+
+    def _exit(self, name: str, elapsed: float) -> None:
+        stack = self._local.children
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        self.timings[name] = (elapsed - children, elapsed)
+
+    def report(self, limit: int = 25) -> str:
+        slowest = sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        lines = [f"{'self ms':>9} {'cumulative ms':>14}  module"]
+        lines += [f"{own * 1000:9.1f} {total * 1000:14.1f}  {name}" for name, (own, total) in slowest]
+        return "\n".join(lines)
+
+
+def _submodules(name: str) -> List[str]:
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return []
+    if spec is None or not spec.submodule_search_locations:
+        return []
+    return [info.name for info in pkgutil.iter_modules(spec.submodule_search_locations, prefix=f"{name}.")]
+
+
+class ExtensionLoader:
+    """Loads a bot's extensions concurrently."""
+
+    def __init__(self, bot, import_workers: int = 4):
+        self.bot = bot
+        self.import_workers = import_workers
+        self.failed: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+
+    async def load(self, extensions: Sequence[str]) -> List[str]:
+        """Load ``extensions`` and return the ones that loaded."""
+        started = time.perf_counter()
+        await self._preimport(extensions)
+        results = await asyncio.gather(*(self._load_one(name) for name in extensions))
+        loaded = [name for name, ok in zip(extensions, results) if ok]
+        STARTUP_SECONDS.labels("extensions").set(time.perf_counter() - started)
+        return loaded
+
+    async def _preimport(self, extensions: Sequence[str]) -> None:
+        """Import the modules of package extensions on threads so disk reads and native imports overlap.
+
+        ``load_extension`` executes the extension module itself again, so only
+        the modules it pulls in are imported here.
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.import_workers)
+
+        async def preimport(name: str):
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(importlib.import_module, name)
+                except Exception:
+                    # load_extension imports it again and reports the error
+                    pass
+
+        modules = [module for name in extensions for module in _submodules(name)]
+        await asyncio.gather(*(preimport(module) for module in modules))
+        STARTUP_SECONDS.labels("imports").set(time.perf_counter() - started)
+
+    async def _load_one(self, name: str) -> bool:
+        started = time.perf_counter()
+        try:
+            await self.bot.load_extension(name)
+            return True
+        except Exception as e:
+            self.failed[name] = str(e)
+            logger.error(f"Failed to load extension {name}: {e}")
+            return False
+        finally:
+            self.timings[name] = time.perf_counter() - started
+            EXTENSION_LOAD_SECONDS.labels(name).set(self.timings[name])
+
+
+def profile_imports(modules: Iterable[str], limit: int = 25) -> str:
+    """Import ``modules`` under an ``ImportProfiler`` and return its report."""
+    with ImportProfiler() as profiler:
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                logger.error(f"Failed to import {name}: {e}")
+    return profiler.report(limit)
+
+
+if __name__ == "__main__":
+    # python -m src.core.startup [module ...]: import-time report for the cogs (or the given modules)
+    import os
+
+    cogs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cogs')
+    targets = sys.argv[1:] or sorted(
+        f"src.cogs.{entry[:-3] if entry.endswith('.py') else entry}"
+        for entry in os.listdir(cogs_dir)
+        if (entry.endswith('.py') and entry not in ('__init__.py', 'base.py'))
+        or os.path.exists(os.path.join(cogs_dir, entry, '__init__.py'))
+    )
+    print(profile_imports([module for name in targets for module in [name, *_submodules(name)]]))
@@ -0,0 +1,311 @@
+import asyncio
+import bisect
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger('community.activity_counters')
+
+# Indexes into a member's counter record
+MESSAGES = 0
+VOICE_MINUTES = 1
+
+
+class HierarchicalTimerWheel:
+    """Hierarchical timer wheel driven by an integer tick.
+
+    Level 0 has one slot per tick, each higher level has one slot per full
+    turn of the level below it. Timers far in the future sit in a coarse slot
+    and cascade down as the wheel turns, so ``advance`` only touches the
+    timers that are due instead of every tracked member.
+    """
+
+    def __init__(self, slots: Tuple[int, ...] = (60, 24, 30)):
+        self.slots = slots
+        self.spans = [1]
+        for size in slots:
+            self.spans.append(self.spans[-1] * size)
+        self.levels: List[List[Dict[Hashable, int]]] = [[{} for _ in range(size)] for size in slots]
+        self.overflow: Dict[Hashable, int] = {}
+        self.now = 0
+        self._due: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._due
+
+    def schedule(self, key: Hashable, due_tick: int) -> None:
+        """Fire ``key`` at ``due_tick`` (at the next tick if that has already passed)."""
+        due_tick = max(due_tick, self.now + 1)
+        self._due[key] = due_tick
+        self._insert(key, due_tick)
+
+    def cancel(self, key: Hashable) -> None:
+        # Slots are cleaned lazily; a key whose due tick no longer matches is skipped
+        self._due.pop(key, None)
+
+    def due_tick(self, key: Hashable) -> Optional[int]:
+        return self._due.get(key)
+
+    def _insert(self, key: Hashable, due_tick: int) -> None:
+        delta = due_tick - self.now
+        for level, size in enumerate(self.slots):
+            if delta < self.spans[level + 1]:
+                self.levels[level][(due_tick // self.spans[level]) % size][key] = due_tick
+                return
+        self.overflow[key] = due_tick
+
+    def _cascade(self, level: int) -> None:
+        index = (self.now // self.spans[level]) % self.slots[level]
+        bucket, self.levels[level][index] = self.levels[level][index], {}
+        for key, due_tick in bucket.items():
+            if self._due.get(key) == due_tick:
+                self._insert(key, due_tick)
+
+    def advance(self, ticks: int = 1) -> List[Hashable]:
+        """Move the wheel forward and return the keys that became due."""
+        fired: List[Hashable] = []
+        for _ in range(ticks):
+            self.now += 1
+
+            if self.now % self.spans[-1] == 0 and self.overflow:
+                overflow, self.overflow = self.overflow, {}
+                for key, due_tick in overflow.items():
+                    if self._due.get(key) == due_tick:
+                        self._insert(key, due_tick)
+            # Cascade the coarsest level first so its timers can fall through
+            for level in range(len(self.slots) - 1, 0, -1):
+                if self.now % self.spans[level] == 0:
+                    self._cascade(level)
+
+            index = self.now % self.slots[0]
+            bucket, self.levels[0][index] = self.levels[0][index], {}
+            for key, due_tick in bucket.items():
+                if due_tick == self.now and self._due.get(key) == due_tick:
+                    del self._due[key]
+                    fired.append(key)
+        return fired
+
+
+class ThresholdTable:
+    """Sorted (threshold, role id) pairs of one trigger type in one guild."""
+
+    __slots__ = ('thresholds', 'role_ids', '_values')
+
+    def __init__(self, pairs: Iterable[Tuple[int, int]]):
+        ordered = sorted(pairs)
+        self.thresholds = [threshold for threshold, _ in ordered]
+        self.role_ids = [role_id for _, role_id in ordered]
+        self._values = frozenset(self.thresholds)
+
+    def __bool__(self) -> bool:
+        return bool(self.thresholds)
+
+    def hits(self, value: int) -> bool:
+        """Whether ``value`` is exactly one of the thresholds."""
+        return value in self._values
+
+    def roles_up_to(self, value: int) -> List[int]:
+        """Role ids of every threshold reached at ``value``."""
+        return self.role_ids[:bisect.bisect_right(self.thresholds, value)]
+
+    def next_after(self, value: int) -> Optional[int]:
+        """The lowest threshold above ``value``."""
+        index = bisect.bisect_right(self.thresholds, value)
+        return self.thresholds[index] if index < len(self.thresholds) else None
+
+
+class ActivityCounters:
+    """Message and voice-minute counters per member, checkpointed to Mongo in bulk.
+
+    Counters are ``[messages, voice_minutes]`` lists keyed by integer guild
+    and member ids. A member's stored totals are loaded the first time they
+    are seen; increments are buffered and written to ``autorole_counters`` as
+    ``$inc`` upserts by ``flush``. Voice sessions only remember the tick they
+    started on and are folded into the counter on leave or checkpoint.
+    """
+
+    def __init__(self, mongo_db):
+        self.mongo_db = mongo_db
+        self.wheel = HierarchicalTimerWheel()
+        self._counts: Dict[int, Dict[int, List[int]]] = defaultdict(dict)
+        self._pending: Dict[Tuple[int, int], List[int]] = {}
+        self._loading: Dict[Tuple[int, int], asyncio.Future] = {}
+        self._voice: Dict[Tuple[int, int], int] = {}  # (guild id, member id) -> tick the session started
+        self._last_seen: Dict[Tuple[int, int], int] = {}
+
+    @property
+    def collection(self):
+        return self.mongo_db['autorole_counters']
+
+    async def ensure_index(self) -> None:
+        await self.collection.create_index([("guild_id", 1), ("user_id", 1)], unique=True)
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    async def ensure_loaded(self, guild_id: int, user_id: int) -> List[int]:
+        """Get a member's counter, reading the stored totals on first use."""
+        record = self._counts[guild_id].get(user_id)
+        if record is not None:
+            return record
+
+        key = (guild_id, user_id)
+        future = self._loading.get(key)
+        if future is None:
+            future = self._loading[key] = asyncio.ensure_future(self._load(guild_id, user_id))
+            future.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _load(self, guild_id: int, user_id: int) -> List[int]:
+        doc = None
+        try:
+            doc = await self.collection.find_one(
+                {"guild_id": guild_id, "user_id": user_id},
+                {"messages": 1, "voice_minutes": 1}
+            )
+        except Exception as e:
+            logger.error(f"Failed to load activity counters for {user_id} in guild {guild_id}: {e}")
+        stored = [doc.get("messages", 0), doc.get("voice_minutes", 0)] if doc else [0, 0]
+        record = self._counts[guild_id].get(user_id)
+        if record is None:
+            record = self._counts[guild_id][user_id] = stored
+        else:
+            # Something was counted while the read was in flight, add the stored totals to it
+            record[MESSAGES] += stored[MESSAGES]
+            record[VOICE_MINUTES] += stored[VOICE_MINUTES]
+        return record
+
+    # ------------------------------------------------------------------
+    # Counting
+    # ------------------------------------------------------------------
+    def _add(self, guild_id: int, user_id: int, field: int, amount: int) -> int:
+        record = self._counts[guild_id].setdefault(user_id, [0, 0])
+        record[field] += amount
+        pending = self._pending.setdefault((guild_id, user_id), [0, 0])
+        pending[field] += amount
+        self._last_seen[(guild_id, user_id)] = self.wheel.now
+        return record[field]
+
+    def add_message(self, guild_id: int, user_id: int) -> int:
+        """Count one message. Returns the member's new total."""
+        return self._add(guild_id, user_id, MESSAGES, 1)
+
+    def voice_join(self, guild_id: int, user_id: int) -> None:
+        self._voice.setdefault((guild_id, user_id), self.wheel.now)
+        self._last_seen[(guild_id, user_id)] = self.wheel.now
+
+    def voice_leave(self, guild_id: int, user_id: int) -> int:
+        """Close a voice session. Returns the member's voice minutes."""
+        key = (guild_id, user_id)
+        started = self._voice.pop(key, None)
+        self.wheel.cancel(key)
+        if started is not None and self.wheel.now > started:
+            return self._add(guild_id, user_id, VOICE_MINUTES, self.wheel.now - started)
+        return self.voice_minutes(guild_id, user_id)
+
+    def in_voice(self, guild_id: int, user_id: int) -> bool:
+        return (guild_id, user_id) in self._voice
+
+    def messages(self, guild_id: int, user_id: int) -> int:
+        record = self._counts[guild_id].get(user_id)
+        return record[MESSAGES] if record else 0
+
+    def voice_minutes(self, guild_id: int, user_id: int) -> int:
+        """Voice minutes including the ongoing session."""
+        record = self._counts[guild_id].get(user_id)
+        minutes = record[VOICE_MINUTES] if record else 0
+        started = self._voice.get((guild_id, user_id))
+        if started is not None:
+            minutes += self.wheel.now - started
+        return minutes
+
+    def tick(self) -> List[Tuple[int, int]]:
+        """Advance one minute. Returns the (guild id, member id) timers that fired."""
+        return self.wheel.advance()
+
+    def schedule_voice_check(self, guild_id: int, user_id: int, threshold: int) -> None:
+        """Fire a timer when a member in voice reaches ``threshold`` minutes."""
+        remaining = threshold - self.voice_minutes(guild_id, user_id)
+        self.wheel.schedule((guild_id, user_id), self.wheel.now + remaining)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def checkpoint_sessions(self) -> None:
+        """Fold the minutes of ongoing voice sessions into the counters."""
+        now = self.wheel.now
+        for (guild_id, user_id), started in list(self._voice.items()):
+            if now > started:
+                self._add(guild_id, user_id, VOICE_MINUTES, now - started)
+                self._voice[(guild_id, user_id)] = now
+
+    async def flush(self) -> int:
+        """Write buffered increments in one bulk write. Returns the number of documents touched."""
+        self.checkpoint_sessions()
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"guild_id": guild_id, "user_id": user_id},
+                {
+                    "$inc": {"messages": deltas[MESSAGES], "voice_minutes": deltas[VOICE_MINUTES]},
+                    "$set": {"updated_at": now}
+                },
+                upsert=True
+            )
+            for (guild_id, user_id), deltas in pending.items()
+        ]
+
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to checkpoint {len(operations)} activity counters: {e}")
+            for key, deltas in pending.items():
+                merged = self._pending.setdefault(key, [0, 0])
+                merged[MESSAGES] += deltas[MESSAGES]
+                merged[VOICE_MINUTES] += deltas[VOICE_MINUTES]
+            return 0
+        return len(operations)
+
+    async def reset(self, guild_id: int, user_id: int) -> None:
+        """Forget a member's counters, in memory and in the database."""
+        key = (guild_id, user_id)
+        self._counts[guild_id].pop(user_id, None)
+        self._pending.pop(key, None)
+        self._last_seen.pop(key, None)
+        if key in self._voice:
+            self._voice[key] = self.wheel.now
+        self.wheel.cancel(key)
+        await self.collection.delete_one({"guild_id": guild_id, "user_id": user_id})
+
+    def evict_idle(self, idle_ticks: int) -> int:
+        """Drop flushed counters of members not seen for ``idle_ticks``. Returns how many were dropped."""
+        cutoff = self.wheel.now - idle_ticks
+        evicted = 0
+        for key, last_seen in list(self._last_seen.items()):
+            if last_seen > cutoff or key in self._pending or key in self._voice:
+                continue
+            guild_id, user_id = key
+            self._counts[guild_id].pop(user_id, None)
+            if not self._counts[guild_id]:
+                del self._counts[guild_id]
+            del self._last_seen[key]
+            evicted += 1
+        return evicted
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'members_cached': sum(len(members) for members in self._counts.values()),
+            'pending_documents': len(self._pending),
+            'voice_sessions': len(self._voice),
+            'timers': len(self.wheel),
+        }
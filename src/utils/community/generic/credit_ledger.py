@@ -0,0 +1,126 @@
+import asyncio
+import datetime
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateMany
+
+logger = logging.getLogger('community.credit_ledger')
+
+
+class CreditLedger:
+    """AI chat credits with atomic spends and a write-through balance cache.
+
+    Every change is a single conditional ``find_one_and_update`` (an update
+    pipeline, so a missing document is created with the guild's default
+    balance in the same round-trip). Concurrent spends cannot drive a balance
+    below zero, and the balance the database returned is written into the
+    cache, so an exhausted user is refused without touching the database.
+    A guild is served by a single cluster, so the cache only goes stale when
+    something outside the ledger edits ``perplexity_credits``.
+    """
+
+    def __init__(self, db, collection: str = "perplexity_credits", max_cached: int = 50000):
+        self.db = db
+        self.collection = collection
+        self.max_cached = max_cached
+        self._balances: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+
+    @property
+    def _collection(self):
+        return self.db[self.collection]
+
+    def _remember(self, key: Tuple[str, str], credits: int) -> None:
+        self._balances[key] = credits
+        self._balances.move_to_end(key)
+        while len(self._balances) > self.max_cached:
+            self._balances.popitem(last=False)
+
+    async def ensure_index(self) -> None:
+        # Unique, so two concurrent first spends of a user cannot upsert two documents
+        try:
+            await asyncio.to_thread(self._collection.create_index, [("guild_id", 1), ("user_id", 1)], unique=True)
+        except Exception as e:
+            logger.error(f"Could not create the {self.collection} index: {e}")
+
+    def cached(self, guild_id: int, user_id: int) -> Optional[int]:
+        return self._balances.get((str(guild_id), str(user_id)))
+
+    async def balance(self, guild_id: int, user_id: int, default: int) -> int:
+        """A user's credits; users without a document have the guild's default."""
+        key = (str(guild_id), str(user_id))
+        credits = self._balances.get(key)
+        if credits is not None:
+            self._balances.move_to_end(key)
+            return credits
+
+        document = await asyncio.to_thread(
+            self._collection.find_one, {"guild_id": key[0], "user_id": key[1]}, {"credits": 1})
+        credits = document.get("credits", default) if document else default
+        self._remember(key, credits)
+        return credits
+
+    async def spend(self, guild_id: int, user_id: int, default: int) -> bool:
+        """Take one credit. Returns False, without writing, when none are left."""
+        key = (str(guild_id), str(user_id))
+        if self._balances.get(key) == 0:
+            return False
+
+        current = {"$ifNull": ["$credits", default]}
+        has_credit = {"$gt": [current, 0]}
+        before = await asyncio.to_thread(
+            self._collection.find_one_and_update,
+            {"guild_id": key[0], "user_id": key[1]},
+            [{"$set": {
+                "credits": {"$cond": [has_credit, {"$subtract": [current, 1]}, current]},
+                "last_used": {"$cond": [has_credit, datetime.datetime.now().isoformat(), "$last_used"]},
+            }}],
+            projection={"credits": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        credits = before.get("credits", default) if before else default
+        self._remember(key, max(credits - 1, 0))
+        return credits > 0
+
+    async def adjust(self, guild_id: int, user_id: int, amount: int, default: int,
+                     maximum: Optional[int] = None) -> int:
+        """Add (or with a negative amount, remove) credits, clamped to 0..maximum. Returns the new balance."""
+        key = (str(guild_id), str(user_id))
+        credits = {"$max": [{"$add": [{"$ifNull": ["$credits", default]}, amount]}, 0]}
+        if maximum is not None:
+            credits = {"$min": [credits, maximum]}
+        after = await asyncio.to_thread(
+            self._collection.find_one_and_update,
+            {"guild_id": key[0], "user_id": key[1]},
+            [{"$set": {"credits": credits}}],
+            projection={"credits": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._remember(key, after["credits"])
+        return after["credits"]
+
+    async def reset(self, defaults: Dict[str, int]) -> int:
+        """Set every user of each guild back to that guild's default, in one bulk write."""
+        if not defaults:
+            return 0
+        operations = [
+            UpdateMany({"guild_id": str(guild_id)}, {"$set": {"credits": credits}})
+            for guild_id, credits in defaults.items()
+        ]
+        result = await asyncio.to_thread(self._collection.bulk_write, operations, ordered=False)
+        self._drop({str(guild_id) for guild_id in defaults})
+        return result.modified_count
+
+    def forget(self, guild_id: Optional[int] = None) -> None:
+        """Drop cached balances of one guild, or of every guild."""
+        if guild_id is None:
+            self._balances.clear()
+        else:
+            self._drop({str(guild_id)})
+
+    def _drop(self, guilds) -> None:
+        for key in [key for key in self._balances if key[0] in guilds]:
+            del self._balances[key]
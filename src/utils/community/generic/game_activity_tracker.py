@@ -0,0 +1,328 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import discord
+from pymongo import UpdateOne
+
+logger = logging.getLogger('community.game_activity_tracker')
+
+
+def playing_game(member: discord.Member) -> Optional[str]:
+    """Return the name of the game a member is playing, if any."""
+    for activity in member.activities:
+        if activity.type == discord.ActivityType.playing and activity.name:
+            return activity.name
+    return None
+
+
+class _GuildGames:
+    """In-memory game -> players view of one guild plus the changes not yet written."""
+
+    __slots__ = ('players', 'names', 'sessions', 'known_games', 'new_games',
+                 'started', 'stopped', 'seconds', 'left', 'dirty', 'needs_reset')
+
+    def __init__(self):
+        self.players: Dict[str, Set[int]] = defaultdict(set)      # name_lower -> member ids
+        self.names: Dict[str, str] = {}                          # name_lower -> display name
+        self.sessions: Dict[int, Tuple[str, float]] = {}         # member id -> (name_lower, started/checkpointed at)
+        self.known_games: Set[str] = set()                       # games already present in the document
+        self.new_games: Set[str] = set()
+        self.started: Dict[str, Set[int]] = defaultdict(set)
+        self.stopped: Dict[str, Set[int]] = defaultdict(set)
+        self.seconds: Dict[str, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        self.left: Set[int] = set()                              # members who left since the last flush was built
+        self.dirty = False
+        self.needs_reset = True
+
+
+class _TakenChanges:
+    """Changes of one guild that went into a flush, kept until the write is known to have worked."""
+
+    __slots__ = ('new_games', 'reset', 'started', 'stopped', 'seconds')
+
+    def __init__(self):
+        self.new_games: Set[str] = set()
+        self.reset = False
+        self.started: Dict[str, Set[int]] = {}
+        self.stopped: Dict[str, Set[int]] = {}
+        self.seconds: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+
+class FlushBatch:
+    """Bulk write operations built from the tracker, plus what they took out of it."""
+
+    __slots__ = ('operations', 'changes')
+
+    def __init__(self):
+        self.operations: List[UpdateOne] = []
+        self.changes: Dict[int, _TakenChanges] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.operations)
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+
+class GameActivityTracker:
+    """Tracks who plays what from presence deltas and flushes compact updates.
+
+    The ``games`` collection keeps one document per guild with a ``games``
+    array. Each entry holds ``active_players`` (member ids), ``player_count``,
+    ``total_time_played`` and ``player_time`` (member id -> minutes), all of
+    which are maintained with ``$addToSet``/``$pull``/``$inc`` instead of
+    rewriting the whole document.
+    """
+
+    def __init__(self):
+        self._guilds: Dict[int, _GuildGames] = {}
+
+    def _guild(self, guild_id: int) -> _GuildGames:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildGames()
+        return state
+
+    # ------------------------------------------------------------------
+    # State changes
+    # ------------------------------------------------------------------
+    def load_known_games(self, guild_id: int, names_lower) -> None:
+        """Register the games already stored for a guild so they are not pushed twice."""
+        self._guild(guild_id).known_games.update(names_lower)
+
+    def snapshot_guild(self, guild: discord.Guild) -> int:
+        """Seed the tracker from the current member activities. Returns the number of players found."""
+        state = self._guild(guild.id)
+        state.needs_reset = True
+        state.dirty = True
+        count = 0
+        for member in guild.members:
+            if member.bot:
+                continue
+            game = playing_game(member)
+            if game:
+                self.start(guild.id, member.id, game)
+                count += 1
+        return count
+
+    def on_presence(self, before: discord.Member, after: discord.Member) -> bool:
+        """Apply a presence change. Returns True if the played game changed."""
+        if after.bot:
+            return False
+        old_game = playing_game(before)
+        new_game = playing_game(after)
+        if old_game == new_game:
+            return False
+        if old_game:
+            self.stop(after.guild.id, after.id)
+        if new_game:
+            self.start(after.guild.id, after.id, new_game)
+        return True
+
+    def start(self, guild_id: int, member_id: int, game_name: str) -> None:
+        state = self._guild(guild_id)
+        name_lower = game_name.lower()
+
+        current = state.sessions.get(member_id)
+        if current and current[0] == name_lower:
+            return
+        if current:
+            self.stop(guild_id, member_id)
+
+        state.sessions[member_id] = (name_lower, time.monotonic())
+        state.players[name_lower].add(member_id)
+        state.names[name_lower] = game_name
+        state.stopped[name_lower].discard(member_id)
+        state.started[name_lower].add(member_id)
+        if name_lower not in state.known_games:
+            state.new_games.add(name_lower)
+        state.dirty = True
+
+    def stop(self, guild_id: int, member_id: int) -> None:
+        state = self._guild(guild_id)
+        session = state.sessions.pop(member_id, None)
+        if session is None:
+            return
+
+        name_lower, since = session
+        state.seconds[name_lower][member_id] += time.monotonic() - since
+        state.players[name_lower].discard(member_id)
+        state.started[name_lower].discard(member_id)
+        state.stopped[name_lower].add(member_id)
+        state.dirty = True
+
+    def forget_member(self, guild_id: int, member_id: int) -> None:
+        """Drop a member who left the guild, keeping the time already played out of the flush."""
+        state = self._guild(guild_id)
+        self.stop(guild_id, member_id)
+        for per_member in state.seconds.values():
+            per_member.pop(member_id, None)
+        state.left.add(member_id)
+
+    def forget_guild(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+    def _checkpoint_sessions(self, state: _GuildGames) -> None:
+        """Move time of ongoing sessions into the pending increments."""
+        now = time.monotonic()
+        for member_id, (name_lower, since) in state.sessions.items():
+            state.seconds[name_lower][member_id] += now - since
+            state.sessions[member_id] = (name_lower, now)
+            state.dirty = True
+
+    def build_batch(self, checkpoint: bool = True) -> FlushBatch:
+        """Take the pending changes of every guild out as bulk write operations.
+
+        If writing them fails, ``requeue(batch)`` puts the changes back for the next flush.
+        """
+        batch = FlushBatch()
+        now = datetime.utcnow()
+
+        for guild_id, state in self._guilds.items():
+            if checkpoint:
+                self._checkpoint_sessions(state)
+            state.left.clear()
+            if not state.dirty:
+                continue
+            taken = batch.changes[guild_id] = _TakenChanges()
+            batch.operations.extend(self._guild_operations(guild_id, state, now, taken))
+            state.dirty = False
+
+        return batch
+
+    def requeue(self, batch: FlushBatch) -> None:
+        """Put back the changes of a batch that could not be written; later changes take precedence."""
+        for guild_id, taken in batch.changes.items():
+            state = self._guilds.get(guild_id)
+            if state is None:
+                continue
+            state.known_games -= taken.new_games
+            state.new_games |= taken.new_games
+            state.needs_reset = state.needs_reset or taken.reset
+            for name_lower, members in taken.started.items():
+                # A member who stopped since is already queued as stopped
+                state.started[name_lower] |= members - state.stopped.get(name_lower, set()) - state.left
+            for name_lower, members in taken.stopped.items():
+                state.stopped[name_lower] |= members - state.started.get(name_lower, set())
+            for name_lower, per_member in taken.seconds.items():
+                for member_id, seconds in per_member.items():
+                    # Time of members who left meanwhile was dropped along with them
+                    if member_id not in state.left:
+                        state.seconds[name_lower][member_id] += seconds
+            state.dirty = True
+
+    def _guild_operations(self, guild_id: int, state: _GuildGames, now: datetime,
+                          taken: _TakenChanges) -> List[UpdateOne]:
+        operations: List[UpdateOne] = []
+
+        # Create the document, then any game entries it does not have yet. Each
+        # push only matches while the entry is missing, so a game pushed again
+        # (known_games not loaded after a failed seed, a requeued flush) is not duplicated
+        operations.append(UpdateOne(
+            {"guild_id": guild_id},
+            {"$setOnInsert": {"guild_id": guild_id, "enabled": True, "games": []}},
+            upsert=True
+        ))
+        for name_lower in sorted(state.new_games):
+            operations.append(UpdateOne(
+                {"guild_id": guild_id, "games.name_lower": {"$ne": name_lower}},
+                {"$push": {"games": {
+                    "name": state.names.get(name_lower, name_lower),
+                    "name_lower": name_lower,
+                    "active_players": [],
+                    "player_count": 0,
+                    "total_time_played": 0,
+                    "player_time": {},
+                    "first_added": now,
+                    "last_played": now
+                }}}
+            ))
+        taken.new_games = set(state.new_games)
+        state.known_games.update(state.new_games)
+        state.new_games.clear()
+
+        if state.needs_reset:
+            # Drop active players left over from before this process started
+            operations.append(UpdateOne(
+                {"guild_id": guild_id, "games.0": {"$exists": True}},
+                {"$set": {"games.$[].active_players": [], "games.$[].player_count": 0}}
+            ))
+            for name_lower, players in state.players.items():
+                state.started[name_lower] |= players
+            state.needs_reset = False
+            taken.reset = True
+
+        add_update: Dict[str, dict] = {"$set": {"last_updated": now}}
+        pull_update: Dict[str, dict] = {}
+        array_filters = []
+        touched = set(state.started) | set(state.stopped) | set(state.seconds)
+
+        for index, name_lower in enumerate(sorted(touched)):
+            ident = f"g{index}"
+            path = f"games.$[{ident}]"
+            array_filters.append({f"{ident}.name_lower": name_lower})
+
+            started = state.started.get(name_lower)
+            if started:
+                add_update.setdefault("$addToSet", {})[f"{path}.active_players"] = {"$each": sorted(started)}
+                add_update["$set"][f"{path}.last_played"] = now
+
+            stopped = state.stopped.get(name_lower)
+            if stopped:
+                pull_update.setdefault("$pull", {})[f"{path}.active_players"] = {"$in": sorted(stopped)}
+
+            add_update["$set"][f"{path}.player_count"] = len(state.players.get(name_lower, ()))
+
+            pending = state.seconds.get(name_lower)
+            if pending:
+                total_minutes = 0
+                for member_id, seconds in list(pending.items()):
+                    minutes = int(seconds // 60)
+                    if minutes <= 0:
+                        continue
+                    add_update.setdefault("$inc", {})[f"{path}.player_time.{member_id}"] = minutes
+                    total_minutes += minutes
+                    taken.seconds[name_lower][member_id] = minutes * 60
+                    # Carry the sub-minute remainder into the next flush
+                    pending[member_id] = seconds - minutes * 60
+                if total_minutes:
+                    add_update["$inc"][f"{path}.total_time_played"] = total_minutes
+
+        if array_filters:
+            operations.append(UpdateOne({"guild_id": guild_id}, add_update, array_filters=array_filters))
+            if pull_update:
+                # $pull on the same array as $addToSet has to go in its own update
+                pull_filters = [
+                    {f"g{index}.name_lower": name_lower}
+                    for index, name_lower in enumerate(sorted(touched))
+                    if f"games.$[g{index}].active_players" in pull_update["$pull"]
+                ]
+                operations.append(UpdateOne({"guild_id": guild_id}, pull_update, array_filters=pull_filters))
+
+        taken.started = {name_lower: set(members) for name_lower, members in state.started.items() if members}
+        taken.stopped = {name_lower: set(members) for name_lower, members in state.stopped.items() if members}
+        state.started.clear()
+        state.stopped.clear()
+        for name_lower in [n for n, per_member in state.seconds.items() if not any(s >= 1 for s in per_member.values())]:
+            state.seconds.pop(name_lower, None)
+        return operations
+
+    # ------------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------------
+    def current_players(self, guild_id: int) -> Dict[str, Set[int]]:
+        """Get the live game -> players view of a guild."""
+        state = self._guilds.get(guild_id)
+        if state is None:
+            return {}
+        return {name: set(players) for name, players in state.players.items() if players}
+
+    def display_name(self, guild_id: int, name_lower: str) -> str:
+        state = self._guilds.get(guild_id)
+        return state.names.get(name_lower, name_lower) if state else name_lower
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+from pymongo import UpdateOne
+
+logger = logging.getLogger('community.invite_snapshots')
+
+
+@dataclass
+class JoinAttribution:
+    """Result of working out how a member joined a guild."""
+    source: str  # "invite", "vanity", "widget" or "unknown"
+    code: Optional[str] = None
+    inviter_id: Optional[int] = None
+    inviter: Optional[discord.abc.User] = None
+    uses: Optional[int] = None
+    ambiguous: bool = False
+
+
+class _GuildInviteState:
+    """Per-guild snapshot plus the joins waiting on the next diff."""
+
+    __slots__ = ('invites', 'recently_deleted', 'vanity_uses', 'pending', 'flush_task', 'lock', 'primed')
+
+    def __init__(self):
+        self.invites: Dict[str, Dict[str, Any]] = {}
+        self.recently_deleted: Dict[str, Dict[str, Any]] = {}
+        self.vanity_uses: Optional[int] = None
+        self.pending: List[Tuple[discord.Member, asyncio.Future]] = []
+        self.flush_task: Optional[asyncio.Task] = None
+        self.lock = asyncio.Lock()
+        self.primed = False
+
+
+def _invite_entry(invite: discord.Invite) -> Dict[str, Any]:
+    return {
+        'uses': invite.uses or 0,
+        'creator': invite.inviter.id if invite.inviter else None,
+        'inviter': invite.inviter,
+        'created_at': invite.created_at,
+        'max_uses': invite.max_uses,
+        'max_age': invite.max_age
+    }
+
+
+def _resolve_unknown(joins: List[Tuple[discord.Member, asyncio.Future]]) -> None:
+    for _, future in joins:
+        if not future.done():
+            future.set_result(JoinAttribution(source="unknown"))
+
+
+class InviteSnapshotManager:
+    """Keeps a per-guild invite snapshot and attributes joins by diffing against it.
+
+    Joins that arrive within ``window`` seconds of each other share a single
+    ``guild.invites()`` call, so a raid of N joins costs one REST request instead
+    of N. Inviter statistics are buffered and written to ``invite_stats`` as
+    batched ``$inc`` upserts.
+    """
+
+    def __init__(self, bot, mongo_db, window: float = 1.5):
+        self.bot = bot
+        self.mongo_db = mongo_db
+        self.window = window
+        self._guilds: Dict[int, _GuildInviteState] = {}
+        self._pending_stats: Dict[Tuple[int, int], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.metrics: Dict[str, int] = defaultdict(int)
+
+    # ------------------------------------------------------------------
+    # Snapshot maintenance
+    # ------------------------------------------------------------------
+    def _state(self, guild_id: int) -> _GuildInviteState:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildInviteState()
+        return state
+
+    def get_snapshot(self, guild_id: int) -> Dict[str, Dict[str, Any]]:
+        """Get the cached invites for a guild (code -> invite info)."""
+        return self._state(guild_id).invites
+
+    async def prime(self, guild: discord.Guild) -> int:
+        """Fetch and cache every invite of a guild. Returns the number of invites cached."""
+        state = self._state(guild.id)
+        async with state.lock:
+            invites = await self._fetch_invites(guild)
+            state.invites = {invite.code: _invite_entry(invite) for invite in invites}
+            state.recently_deleted.clear()
+            state.vanity_uses = await self._fetch_vanity_uses(guild)
+            state.primed = True
+        return len(invites)
+
+    def forget(self, guild_id: int) -> None:
+        """Drop everything cached for a guild. Joins still waiting on a diff resolve as unknown."""
+        state = self._guilds.pop(guild_id, None)
+        if state is None:
+            return
+        if state.flush_task and not state.flush_task.done():
+            state.flush_task.cancel()
+        _resolve_unknown(state.pending)
+        state.pending = []
+
+    def close(self) -> None:
+        """Forget every guild, resolving the joins still waiting on a diff."""
+        for guild_id in list(self._guilds):
+            self.forget(guild_id)
+
+    def on_invite_create(self, invite: discord.Invite) -> None:
+        self._state(invite.guild.id).invites[invite.code] = _invite_entry(invite)
+
+    def on_invite_delete(self, invite: discord.Invite) -> None:
+        state = self._state(invite.guild.id)
+        entry = state.invites.pop(invite.code, None)
+        if entry is not None:
+            # Invites that hit max_uses are deleted right as the last member joins,
+            # keep the old entry around so the next diff can still credit it
+            state.recently_deleted[invite.code] = entry
+
+    # ------------------------------------------------------------------
+    # Join attribution
+    # ------------------------------------------------------------------
+    async def resolve_join(self, member: discord.Member) -> JoinAttribution:
+        """Work out which invite a member used. Joins in the same window share one fetch."""
+        self.metrics['joins_seen'] += 1
+        state = self._state(member.guild.id)
+        future = asyncio.get_running_loop().create_future()
+        state.pending.append((member, future))
+
+        if state.flush_task is None or state.flush_task.done():
+            state.flush_task = asyncio.create_task(self._flush_joins(member.guild))
+
+        return await future
+
+    async def _flush_joins(self, guild: discord.Guild) -> None:
+        await asyncio.sleep(self.window)
+        state = self._state(guild.id)
+
+        async with state.lock:
+            batch, state.pending = state.pending, []
+            if not batch:
+                return
+
+            try:
+                results = await self._attribute(guild, state, [member for member, _ in batch])
+            except asyncio.CancelledError:
+                # Forgotten mid-diff; the joins already taken off pending would wait forever
+                _resolve_unknown(batch)
+                raise
+            except Exception as e:
+                logger.error(f"Failed to attribute {len(batch)} joins in {guild.name} (ID: {guild.id}): {e}")
+                results = [JoinAttribution(source="unknown") for _ in batch]
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+        # Joins that arrived while we were diffing get their own window
+        if state.pending:
+            state.flush_task = asyncio.create_task(self._flush_joins(guild))
+
+    async def _attribute(self, guild: discord.Guild, state: _GuildInviteState,
+                         members: List[discord.Member]) -> List[JoinAttribution]:
+        invites = await self._fetch_invites(guild)
+        self.metrics['rest_calls_saved'] += max(len(members) - 1, 0)
+
+        current = {invite.code: invite for invite in invites}
+        previous = state.invites
+
+        if not state.primed:
+            # Without a baseline every use would look new, so just take the snapshot
+            state.invites = {code: _invite_entry(invite) for code, invite in current.items()}
+            state.vanity_uses = await self._fetch_vanity_uses(guild)
+            state.primed = True
+            self.metrics['unattributed'] += len(members)
+            return [JoinAttribution(source="unknown") for _ in members]
+
+        # Every extra use since the last snapshot is one join slot
+        slots: List[Tuple[str, Dict[str, Any], int]] = []
+        for code, invite in current.items():
+            old_uses = previous[code]['uses'] if code in previous else 0
+            delta = (invite.uses or 0) - old_uses
+            if delta > 0:
+                slots.extend([(code, _invite_entry(invite), invite.uses)] * delta)
+
+        for code, entry in state.recently_deleted.items():
+            if code in current:
+                continue
+            # Only invites that ran out of uses count; unlimited ones were revoked or expired
+            max_uses = entry.get('max_uses') or 0
+            delta = max_uses - entry['uses'] if max_uses else 0
+            if delta > 0:
+                slots.extend([(code, entry, max_uses)] * delta)
+
+        # Refresh the snapshot before resolving anything
+        state.invites = {code: _invite_entry(invite) for code, invite in current.items()}
+        state.recently_deleted.clear()
+
+        if len(slots) < len(members) and 'VANITY_URL' in guild.features:
+            vanity_uses = await self._fetch_vanity_uses(guild)
+            if vanity_uses is not None and state.vanity_uses is not None:
+                delta = vanity_uses - state.vanity_uses
+                slots.extend([("__vanity__", {}, vanity_uses)] * max(delta, 0))
+            state.vanity_uses = vanity_uses
+
+        # Attribution is only exact when every join maps to the same code
+        ambiguous = len({code for code, _, _ in slots}) > 1 and len(members) > 1
+
+        results = []
+        for index, member in enumerate(members):
+            if index >= len(slots):
+                self.metrics['unattributed'] += 1
+                results.append(JoinAttribution(source="unknown"))
+                continue
+
+            code, entry, uses = slots[index]
+            if code == "__vanity__":
+                self.metrics['vanity_joins'] += 1
+                results.append(JoinAttribution(source="vanity", code=guild.vanity_url_code, uses=uses))
+            elif entry.get('creator') is None:
+                # Widget and discovery invites are generated without an inviter
+                self.metrics['widget_joins'] += 1
+                results.append(JoinAttribution(source="widget", code=code, uses=uses, ambiguous=ambiguous))
+            else:
+                self.metrics['attributed'] += 1
+                results.append(JoinAttribution(
+                    source="invite",
+                    code=code,
+                    inviter_id=entry['creator'],
+                    inviter=entry.get('inviter'),
+                    uses=uses,
+                    ambiguous=ambiguous
+                ))
+        return results
+
+    async def _fetch_invites(self, guild: discord.Guild) -> List[discord.Invite]:
+        self.metrics['rest_calls'] += 1
+        return await guild.invites()
+
+    async def _fetch_vanity_uses(self, guild: discord.Guild) -> Optional[int]:
+        if 'VANITY_URL' not in guild.features:
+            return None
+        try:
+            self.metrics['rest_calls'] += 1
+            vanity = await guild.vanity_invite()
+            return vanity.uses if vanity else None
+        except (discord.Forbidden, discord.HTTPException):
+            return None
+
+    # ------------------------------------------------------------------
+    # Batched statistics
+    # ------------------------------------------------------------------
+    def record_stat(self, guild_id: int, user_id: int, **increments: int) -> None:
+        """Buffer an ``$inc`` for an inviter's ``invite_stats`` document."""
+        pending = self._pending_stats[(guild_id, user_id)]
+        for field, amount in increments.items():
+            pending[field] += amount
+
+    async def flush_stats(self) -> int:
+        """Write buffered invite statistics in one bulk write. Returns the number of documents touched."""
+        if not self._pending_stats:
+            return 0
+
+        pending, self._pending_stats = self._pending_stats, defaultdict(lambda: defaultdict(int))
+        operations = [
+            UpdateOne(
+                {"guild_id": guild_id, "user_id": user_id},
+                {"$inc": dict(increments)},
+                upsert=True
+            )
+            for (guild_id, user_id), increments in pending.items()
+        ]
+
+        started = time.perf_counter()
+        try:
+            await self.mongo_db.invite_stats.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(operations)} invite stat updates: {e}")
+            # Put the increments back so they go out with the next flush
+            for key, increments in pending.items():
+                for field, amount in increments.items():
+                    self._pending_stats[key][field] += amount
+            return 0
+
+        self.metrics['stats_flushes'] += 1
+        self.metrics['stats_documents_written'] += len(operations)
+        logger.debug(f"Flushed {len(operations)} invite stat updates in {time.perf_counter() - started:.3f}s")
+        return len(operations)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Get counters for joins handled and REST calls made/saved."""
+        metrics = dict(self.metrics)
+        metrics['guilds_tracked'] = len(self._guilds)
+        metrics['pending_stat_documents'] = len(self._pending_stats)
+        return metrics
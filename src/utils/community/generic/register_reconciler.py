@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+import discord
+
+from .role_assignment_engine import RoleAssignmentEngine
+
+logger = logging.getLogger('community.register_reconciler')
+
+# Age bucket stored per registered member
+AGE_UNKNOWN = 0
+AGE_ADULT = 1
+AGE_MINOR = 2
+
+
+def _age_bucket(age: Any) -> int:
+    if age is None or age == "":
+        return AGE_UNKNOWN
+    try:
+        return AGE_ADULT if int(age) >= 18 else AGE_MINOR
+    except (TypeError, ValueError):
+        return AGE_UNKNOWN
+
+
+def _role_id(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _GuildExpectations:
+    """Registered members of one guild and the roles they are expected to hold."""
+
+    __slots__ = ('members', 'base_roles', 'adult_role', 'minor_role', 'config_key', 'watermark', 'loaded')
+
+    def __init__(self):
+        self.members: Dict[int, int] = {}  # member id -> age bucket
+        self.base_roles: FrozenSet[int] = frozenset()
+        self.adult_role: Optional[int] = None
+        self.minor_role: Optional[int] = None
+        self.config_key: Optional[Tuple] = None
+        self.watermark: float = 0.0
+        self.loaded = False
+
+    def apply_settings(self, settings: Dict[str, Any]) -> bool:
+        """Take the role configuration from the ``register`` document. Returns True if it changed."""
+        base = frozenset(
+            role_id for role_id in (_role_id(settings.get("role_id")), _role_id(settings.get("bronze_role_id")))
+            if role_id
+        )
+        adult = _role_id(settings.get("adult_role_id"))
+        minor = _role_id(settings.get("minor_role_id"))
+        key = (base, adult, minor)
+        changed = key != self.config_key
+        self.base_roles, self.adult_role, self.minor_role, self.config_key = base, adult, minor, key
+        return changed
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_roles or self.adult_role or self.minor_role)
+
+    def expected(self, member_id: int) -> FrozenSet[int]:
+        bucket = self.members.get(member_id)
+        if bucket is None:
+            return frozenset()
+        if bucket == AGE_ADULT and self.adult_role:
+            return self.base_roles | {self.adult_role}
+        if bucket == AGE_MINOR and self.minor_role:
+            return self.base_roles | {self.minor_role}
+        return self.base_roles
+
+
+class RegisterReconciler:
+    """Keeps registered members' roles in line with the registration settings.
+
+    The expected roles of every registered member are kept in memory per
+    guild. Role changes are checked as they happen through ``on_member_update``
+    and the periodic sweep only reads ``register_log`` entries newer than the
+    last seen ``registered_at`` watermark. Fixes go through a
+    ``RoleAssignmentEngine`` so large guilds are repaired at a steady,
+    rate-limited pace.
+    """
+
+    def __init__(self, bot, role_engine: Optional[RoleAssignmentEngine] = None):
+        self.bot = bot
+        self.role_engine = role_engine or RoleAssignmentEngine(bot, guild_rate=(5, 10.0), global_rate=(20, 1.0))
+        self._guilds: Dict[int, _GuildExpectations] = {}
+        self._locks: Dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.metrics: Dict[str, int] = defaultdict(int)
+        self.last_sweep: Dict[int, Dict[str, Any]] = {}
+
+    def _state(self, guild_id: int) -> _GuildExpectations:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            state = self._guilds[guild_id] = _GuildExpectations()
+        return state
+
+    # ------------------------------------------------------------------
+    # Real-time checks
+    # ------------------------------------------------------------------
+    def record_registration(self, guild_id: int, user_id: int, age: Any) -> None:
+        """Track a registration made in this process without waiting for the next sweep."""
+        state = self._guilds.get(guild_id)
+        if state is None or not state.loaded:
+            return
+        # The watermark is left alone; the next sweep reads the entry again, which is harmless
+        state.members[user_id] = _age_bucket(age)
+
+    def check_member(self, member: discord.Member, delay: float = 0.0) -> bool:
+        """Queue the roles a registered member is missing. Returns True if a fix was queued."""
+        state = self._guilds.get(member.guild.id)
+        if state is None or not state.loaded or member.id not in state.members:
+            return False
+
+        missing = state.expected(member.id) - {role.id for role in member.roles}
+        roles = [role for role in (member.guild.get_role(role_id) for role_id in missing) if role]
+        if not roles:
+            return False
+
+        self.metrics['drift_detected'] += 1
+        self._submit(member, roles, delay)
+        return True
+
+    def forget_guild(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+        self._locks.pop(guild_id, None)
+        self.role_engine.forget_guild(guild_id)
+
+    # ------------------------------------------------------------------
+    # Sweep
+    # ------------------------------------------------------------------
+    async def sweep_guild(self, guild: discord.Guild, mongo_db, full: bool = False) -> Dict[str, Any]:
+        """Pick up new registrations and queue fixes for members whose roles drifted.
+
+        Only entries newer than the watermark are read, unless the guild has
+        not been loaded yet. The in-memory map is diffed against every member
+        when ``full`` is set, the guild was just loaded or the role settings changed.
+        """
+        async with self._locks[guild.id]:
+            started = time.perf_counter()
+            state = self._state(guild.id)
+            report = {'new_registrations': 0, 'checked': 0, 'queued': 0, 'full': full}
+
+            settings = await mongo_db["register"].find_one({"guild_id": guild.id})
+            if not settings:
+                self._guilds.pop(guild.id, None)
+                return report
+            if state.apply_settings(settings):
+                full = True
+            if not state.configured:
+                return report
+
+            query: Dict[str, Any] = {"guild_id": guild.id}
+            if state.loaded:
+                query["registered_at"] = {"$gt": state.watermark}
+            else:
+                full = True
+
+            changed = []
+            cursor = mongo_db["register_log"].find(query, {"user_id": 1, "age": 1, "registered_at": 1})
+            async for doc in cursor:
+                try:
+                    user_id = int(doc["user_id"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                state.members[user_id] = _age_bucket(doc.get("age"))
+                registered_at = doc.get("registered_at") or 0
+                if isinstance(registered_at, (int, float)):
+                    state.watermark = max(state.watermark, float(registered_at))
+                changed.append(user_id)
+            state.loaded = True
+            report['new_registrations'] = len(changed)
+            self.metrics['documents_read'] += len(changed)
+
+            member_ids = state.members.keys() if full else changed
+            for member_id in list(member_ids):
+                member = guild.get_member(member_id)
+                if member is None:
+                    continue
+                report['checked'] += 1
+                if self.check_member(member):
+                    report['queued'] += 1
+
+            report['full'] = full
+            report['registered'] = len(state.members)
+            report['seconds'] = round(time.perf_counter() - started, 3)
+            self.metrics['sweeps'] += 1
+            self.last_sweep[guild.id] = report
+            return report
+
+    # ------------------------------------------------------------------
+    # Fix queue
+    # ------------------------------------------------------------------
+    def _submit(self, member: discord.Member, roles, delay: float) -> None:
+        self.metrics['fixes_queued'] += 1
+        future = self.role_engine.submit(member, add=roles, reason="Registration role sync", delay=delay)
+        future.add_done_callback(self._fix_done)
+
+    def _fix_done(self, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None or not future.result():
+            self.metrics['fixes_failed'] += 1
+        else:
+            self.metrics['fixes_applied'] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get reconciliation counters plus the progress of queued fixes."""
+        metrics: Dict[str, Any] = dict(self.metrics)
+        done = metrics.get('fixes_applied', 0) + metrics.get('fixes_failed', 0)
+        metrics['fixes_pending'] = max(metrics.get('fixes_queued', 0) - done, 0)
+        metrics['guilds_tracked'] = len(self._guilds)
+        metrics['registered_members'] = sum(len(state.members) for state in self._guilds.values())
+        metrics['engine'] = self.role_engine.get_metrics()
+        return metrics
+
+    async def stop(self) -> None:
+        await self.role_engine.stop()
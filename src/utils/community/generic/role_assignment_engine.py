@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import discord
+
+logger = logging.getLogger('community.role_assignment_engine')
+
+
+class TokenBucket:
+    """Async token bucket mirroring a Discord rate-limit bucket."""
+
+    __slots__ = ('capacity', 'per', 'tokens', 'updated', 'waits')
+
+    def __init__(self, capacity: int, per: float):
+        self.capacity = capacity
+        self.per = per
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.waits = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / self.per)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        self._refill()
+        while self.tokens < 1:
+            self.waits += 1
+            await asyncio.sleep((1 - self.tokens) * self.per / self.capacity)
+            self._refill()
+        self.tokens -= 1
+
+
+class _PendingEdit:
+    """Role changes waiting to be applied to one member."""
+
+    __slots__ = ('member_id', 'add', 'remove', 'reasons', 'due', 'futures')
+
+    def __init__(self, member_id: int, due: float):
+        self.member_id = member_id
+        self.add: Set[int] = set()
+        self.remove: Set[int] = set()
+        self.reasons: List[str] = []
+        self.due = due
+        self.futures: List[asyncio.Future] = []
+
+
+class _GuildLane:
+    """Per-guild pending edits, their due times and the worker applying them."""
+
+    __slots__ = ('guild_id', 'pending', 'heap', 'wakeup', 'worker', 'bucket')
+
+    def __init__(self, guild_id: int, bucket: TokenBucket):
+        self.guild_id = guild_id
+        self.pending: Dict[int, _PendingEdit] = {}
+        self.heap: List[Tuple[float, int, int]] = []  # (due, seq, member id)
+        self.wakeup = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+        self.bucket = bucket
+
+
+class RoleAssignmentEngine:
+    """Applies role changes through one worker lane per guild.
+
+    Every add/remove submitted for a member before their edit is due is merged
+    into a single ``member.edit(roles=...)`` call. Delays (such as an AutoRole
+    join delay) are kept in a per-guild heap instead of sleeping inside a
+    shared queue, so one guild waiting never holds up another. Edits are
+    paced by a per-guild bucket for the member route and a global bucket
+    shared by all lanes, which keeps raids from running into 429s.
+    """
+
+    def __init__(self, bot, guild_rate: Tuple[int, float] = (10, 10.0),
+                 global_rate: Tuple[int, float] = (40, 1.0)):
+        self.bot = bot
+        self.guild_rate = guild_rate
+        self._lanes: Dict[int, _GuildLane] = {}
+        self._global_bucket = TokenBucket(*global_rate)
+        self._seq = itertools.count()
+        self._recent_edits: Deque[float] = deque(maxlen=1000)
+        self.metrics: Dict[str, int] = defaultdict(int)
+        self._closed = False
+
+    def _lane(self, guild_id: int) -> _GuildLane:
+        lane = self._lanes.get(guild_id)
+        if lane is None:
+            lane = self._lanes[guild_id] = _GuildLane(guild_id, TokenBucket(*self.guild_rate))
+        if lane.worker is None or lane.worker.done():
+            lane.worker = asyncio.create_task(self._run_lane(lane))
+        return lane
+
+    # ------------------------------------------------------------------
+    # Submitting
+    # ------------------------------------------------------------------
+    def submit(self, member: discord.Member, add: Iterable[discord.abc.Snowflake] = (),
+               remove: Iterable[discord.abc.Snowflake] = (), reason: Optional[str] = None,
+               delay: float = 0.0) -> asyncio.Future:
+        """Queue role changes for a member.
+
+        Returns a future resolving to True once the member's roles include the
+        requested changes, or False if the edit could not be made.
+        """
+        if self._closed:
+            raise RuntimeError("Role assignment engine is stopped")
+
+        lane = self._lane(member.guild.id)
+        due = time.monotonic() + max(delay, 0.0)
+        self.metrics['submitted'] += 1
+
+        edit = lane.pending.get(member.id)
+        if edit is None:
+            edit = lane.pending[member.id] = _PendingEdit(member.id, due)
+            heapq.heappush(lane.heap, (due, next(self._seq), member.id))
+        else:
+            self.metrics['coalesced'] += 1
+            if due > edit.due:
+                # Keep the longest delay; the stale heap entry is skipped when popped
+                edit.due = due
+                heapq.heappush(lane.heap, (due, next(self._seq), member.id))
+
+        # Later requests win when the same role is both added and removed
+        for role in add:
+            edit.add.add(role.id)
+            edit.remove.discard(role.id)
+        for role in remove:
+            edit.remove.add(role.id)
+            edit.add.discard(role.id)
+        if reason and reason not in edit.reasons:
+            edit.reasons.append(reason)
+
+        future = asyncio.get_running_loop().create_future()
+        edit.futures.append(future)
+        self.metrics['max_lane_depth'] = max(self.metrics['max_lane_depth'], len(lane.pending))
+        lane.wakeup.set()
+        return future
+
+    def pending_count(self, guild_id: Optional[int] = None) -> int:
+        if guild_id is not None:
+            lane = self._lanes.get(guild_id)
+            return len(lane.pending) if lane else 0
+        return sum(len(lane.pending) for lane in self._lanes.values())
+
+    def forget_member(self, guild_id: int, member_id: int) -> None:
+        """Drop pending changes of a member who left."""
+        lane = self._lanes.get(guild_id)
+        edit = lane.pending.pop(member_id, None) if lane else None
+        if edit:
+            self._resolve(edit, False)
+
+    def forget_guild(self, guild_id: int) -> None:
+        lane = self._lanes.pop(guild_id, None)
+        if lane is None:
+            return
+        if lane.worker and not lane.worker.done():
+            lane.worker.cancel()
+        for edit in lane.pending.values():
+            self._resolve(edit, False)
+
+    async def stop(self) -> None:
+        """Cancel every lane, failing anything still pending."""
+        self._closed = True
+        for guild_id in list(self._lanes):
+            self.forget_guild(guild_id)
+
+    # ------------------------------------------------------------------
+    # Lane worker
+    # ------------------------------------------------------------------
+    async def _run_lane(self, lane: _GuildLane) -> None:
+        while True:
+            lane.wakeup.clear()
+            now = time.monotonic()
+
+            # Drop heap entries superseded by a later due time or already applied
+            while lane.heap:
+                due, _, member_id = lane.heap[0]
+                edit = lane.pending.get(member_id)
+                if edit is None or edit.due != due:
+                    heapq.heappop(lane.heap)
+                    continue
+                break
+
+            if not lane.heap:
+                await lane.wakeup.wait()
+                continue
+
+            due, _, member_id = lane.heap[0]
+            if due > now:
+                try:
+                    await asyncio.wait_for(lane.wakeup.wait(), timeout=due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(lane.heap)
+            edit = lane.pending.pop(member_id)
+            try:
+                await self._apply(lane, edit)
+            except asyncio.CancelledError:
+                self._resolve(edit, False)
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error applying roles for member {member_id} in guild {lane.guild_id}: {e}")
+                self._resolve(edit, False)
+
+    async def _apply(self, lane: _GuildLane, edit: _PendingEdit) -> None:
+        guild = self.bot.get_guild(lane.guild_id)
+        member = guild.get_member(edit.member_id) if guild else None
+        if member is None:
+            self.metrics['member_missing'] += 1
+            self._resolve(edit, False)
+            return
+
+        current = {role.id for role in member.roles if not role.is_default()}
+        wanted = (current - edit.remove) | {rid for rid in edit.add if guild.get_role(rid) is not None}
+        if wanted == current:
+            self.metrics['noop'] += 1
+            self._resolve(edit, True)
+            return
+
+        await lane.bucket.acquire()
+        await self._global_bucket.acquire()
+
+        reason = "; ".join(edit.reasons) or None
+        try:
+            await member.edit(roles=[discord.Object(id=rid) for rid in wanted], reason=reason)
+        except discord.Forbidden:
+            logger.warning(f"Missing permissions to edit roles of {member} in {guild.name}")
+            self.metrics['failed'] += 1
+            self._resolve(edit, False)
+            return
+        except discord.HTTPException as e:
+            if e.status == 429 or e.status >= 500:
+                # Retry later instead of hammering the route
+                self.metrics['retried'] += 1
+                self._requeue(lane, edit, delay=5.0)
+                return
+            logger.error(f"Failed to edit roles of {member} in {guild.name}: {e}")
+            self.metrics['failed'] += 1
+            self._resolve(edit, False)
+            return
+
+        self.metrics['edits'] += 1
+        self.metrics['roles_added'] += len(wanted - current)
+        self.metrics['roles_removed'] += len(current - wanted)
+        self._recent_edits.append(time.monotonic())
+        self._resolve(edit, True)
+
+    def _requeue(self, lane: _GuildLane, edit: _PendingEdit, delay: float) -> None:
+        existing = lane.pending.get(edit.member_id)
+        if existing is not None:
+            # New changes arrived meanwhile; fold the failed edit into them
+            existing.add |= edit.add - existing.remove
+            existing.remove |= edit.remove - existing.add
+            existing.futures.extend(edit.futures)
+            existing.reasons.extend(r for r in edit.reasons if r not in existing.reasons)
+            return
+        edit.due = time.monotonic() + delay
+        lane.pending[edit.member_id] = edit
+        heapq.heappush(lane.heap, (edit.due, next(self._seq), edit.member_id))
+        lane.wakeup.set()
+
+    @staticmethod
+    def _resolve(edit: _PendingEdit, result: bool) -> None:
+        for future in edit.futures:
+            if not future.done():
+                future.set_result(result)
+        edit.futures.clear()
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def get_metrics(self) -> Dict[str, float]:
+        """Get counters plus the edit rate over the last minute."""
+        metrics: Dict[str, float] = dict(self.metrics)
+        now = time.monotonic()
+        recent = [t for t in self._recent_edits if now - t <= 60]
+        metrics['edits_per_minute'] = len(recent)
+        metrics['pending'] = self.pending_count()
+        metrics['active_lanes'] = sum(1 for lane in self._lanes.values() if lane.pending)
+        metrics['rate_limit_waits'] = self._global_bucket.waits + sum(
+            lane.bucket.waits for lane in self._lanes.values()
+        )
+        submitted = self.metrics.get('submitted', 0)
+        metrics['rest_calls_saved'] = max(submitted - self.metrics.get('edits', 0) - self.metrics.get('failed', 0), 0)
+        return metrics
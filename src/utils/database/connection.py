@@ -4,6 +4,7 @@ import logging
 from typing import Optional, Dict, List, Any, Union
 import dotenv
 import asyncio
+import threading
 import time
 from ..core.logger import logger
 import certifi
@@ -34,11 +35,23 @@ if not MONGO_URI:
     logger.warning("MongoDB URI not found in environment variables!")
     MONGO_URI = "mongodb://localhost:27017/"
 
+# One client serves every cog plus the threads behind asyncio.to_thread
+MAX_POOL_SIZE = int(os.getenv('DB_MAX_POOL_SIZE', '20'))
+MIN_POOL_SIZE = int(os.getenv('DB_MIN_POOL_SIZE', '1'))
+
+# While MongoDB is unreachable, a new connection is attempted at most this often
+RECONNECT_INTERVAL = 30.0
+_sync_retry_at = None  # monotonic time of the next sync reconnect; None before the first attempt
+_sync_reconnect = None  # thread of the sync reconnect in progress
+_sync_fallback = None
+_async_retry_at = 0.0
+
 # Global client instances
 sync_client = None
 sync_db = None
 async_client = None
 async_db = None
+_async_init_lock = asyncio.Lock()
 
 def initialize_sync_mongodb():
     """Initialize synchronous MongoDB connection"""
@@ -54,8 +67,8 @@ def initialize_sync_mongodb():
                 socketTimeoutMS=60000,           # Increased for Raspberry Pi
                 maxIdleTimeMS=45000,             # Reduced for Raspberry Pi
                 retryWrites=True,
-                maxPoolSize=3,                   # Reduced for Raspberry Pi
-                minPoolSize=1,                   # Added for Raspberry Pi
+                maxPoolSize=MAX_POOL_SIZE,       # Shared by every cog and worker thread
+                minPoolSize=MIN_POOL_SIZE,
                 waitQueueTimeoutMS=15000,        # Increased for Raspberry Pi
                 retryReads=True,
                 tls=True,
@@ -73,8 +86,8 @@ def initialize_sync_mongodb():
                 socketTimeoutMS=60000,           # Increased for Raspberry Pi
                 maxIdleTimeMS=45000,             # Reduced for Raspberry Pi
                 retryWrites=True,
-                maxPoolSize=3,                   # Reduced for Raspberry Pi
-                minPoolSize=1,                   # Added for Raspberry Pi
+                maxPoolSize=MAX_POOL_SIZE,       # Shared by every cog and worker thread
+                minPoolSize=MIN_POOL_SIZE,
                 waitQueueTimeoutMS=15000,        # Increased for Raspberry Pi
                 retryReads=True
             )
@@ -96,6 +109,16 @@ def initialize_sync_mongodb():
 
 async def initialize_async_mongodb():
     """Initialize asynchronous MongoDB connection using pymongo's async features"""
+    if async_db is not None:
+        # Every caller shares one client
+        return async_db
+    async with _async_init_lock:
+        if async_db is not None:
+            return async_db
+        # Connecting pings the server; keep that off the event loop
+        return await asyncio.to_thread(_connect_async_mongodb)
+
+def _connect_async_mongodb():
     global async_client, async_db
     
     try:
@@ -108,8 +131,8 @@ async def initialize_async_mongodb():
                 socketTimeoutMS=60000,           # Increased for Raspberry Pi
                 maxIdleTimeMS=45000,             # Reduced for Raspberry Pi
                 retryWrites=True,
-                maxPoolSize=3,                   # Reduced for Raspberry Pi
-                minPoolSize=1,                   # Added for Raspberry Pi
+                maxPoolSize=MAX_POOL_SIZE,       # Shared by every cog and worker thread
+                minPoolSize=MIN_POOL_SIZE,
                 waitQueueTimeoutMS=15000,        # Increased for Raspberry Pi
                 retryReads=True,
                 tls=True,
@@ -127,8 +150,8 @@ async def initialize_async_mongodb():
                 socketTimeoutMS=60000,           # Increased for Raspberry Pi
                 maxIdleTimeMS=45000,             # Reduced for Raspberry Pi
                 retryWrites=True,
-                maxPoolSize=3,                   # Reduced for Raspberry Pi
-                minPoolSize=1,                   # Added for Raspberry Pi
+                maxPoolSize=MAX_POOL_SIZE,       # Shared by every cog and worker thread
+                minPoolSize=MIN_POOL_SIZE,
                 waitQueueTimeoutMS=15000,        # Increased for Raspberry Pi
                 retryReads=True
             )
@@ -150,10 +173,7 @@ async def initialize_async_mongodb():
 
 def get_sync_db():
     """Get synchronous MongoDB database"""
-    global sync_db
-    if sync_db is None:
-        sync_db = initialize_sync_mongodb()
-    return sync_db
+    return get_shared_sync_db()
 
 def get_async_db():
     """Get asynchronous MongoDB database (should be initialized with ensure_async_db)"""
@@ -165,10 +185,16 @@ def get_async_db():
 
 async def ensure_async_db():
     """Ensure async database is initialized"""
-    global async_db
-    if async_db is None:
-        async_db = await initialize_async_mongodb()
-    return async_db
+    global _async_retry_at
+    if async_db is not None:
+        return async_db
+    if time.monotonic() < _async_retry_at:
+        return DummyAsyncDatabase()
+    # Sets async_db on success; a failed connection is retried after RECONNECT_INTERVAL
+    db = await initialize_async_mongodb()
+    if isinstance(db, DummyAsyncDatabase):
+        _async_retry_at = time.monotonic() + RECONNECT_INTERVAL
+    return db
 
 def get_sync_client():
     """Get synchronous MongoDB client"""
@@ -337,10 +363,71 @@ class DummySyncCollection:
         logger.debug(f"Dummy sync count_documents on collection {self.name}")
         return 0
 
+_shared_sync_lock = threading.Lock()
+
+def _reconnect_sync_mongodb():
+    global _sync_retry_at
+    # Sets sync_db on success
+    if isinstance(initialize_sync_mongodb(), DummySyncDatabase):
+        _sync_retry_at = time.monotonic() + RECONNECT_INTERVAL
+
+def get_shared_sync_db():
+    """Get the process-wide sync database, connecting once on first use.
+
+    If that connection fails a DummySyncDatabase is returned meanwhile and the
+    connection is retried on a background thread at most every
+    RECONNECT_INTERVAL seconds, so no caller (many query on the event loop)
+    waits for a retry.
+    """
+    global _sync_retry_at, _sync_reconnect, _sync_fallback
+    if sync_db is not None:
+        return sync_db
+    with _shared_sync_lock:
+        if sync_db is not None:
+            return sync_db
+        if _sync_retry_at is None:
+            db = initialize_sync_mongodb()
+            if not isinstance(db, DummySyncDatabase):
+                return db
+            _sync_retry_at = time.monotonic() + RECONNECT_INTERVAL
+        elif time.monotonic() >= _sync_retry_at and not (_sync_reconnect and _sync_reconnect.is_alive()):
+            _sync_retry_at = time.monotonic() + RECONNECT_INTERVAL
+            _sync_reconnect = threading.Thread(target=_reconnect_sync_mongodb, name="mongo-reconnect", daemon=True)
+            _sync_reconnect.start()
+        if _sync_fallback is None:
+            _sync_fallback = DummySyncDatabase()
+        return _sync_fallback
+
+class LazySyncDatabase:
+    """Stands in for the shared sync database until it is first used.
+
+    Cogs call initialize_mongodb() in __init__, which used to open a client
+    and block on a ping per cog while extensions loaded. The proxy defers that
+    to the first query and every cog shares one client.
+    """
+    
+    def __init__(self):
+        self._db = None
+    
+    def resolve(self):
+        if self._db is not None:
+            return self._db
+        db = get_shared_sync_db()
+        # Keep only a real database; while MongoDB is down every use retries
+        if not isinstance(db, DummySyncDatabase):
+            self._db = db
+        return db
+    
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+    
+    def __getitem__(self, collection_name: str):
+        return self.resolve()[collection_name]
+
 # Backward compatibility functions
 def initialize_mongodb():
-    """Legacy function for backward compatibility"""
-    return initialize_sync_mongodb()
+    """Legacy function for backward compatibility; connects lazily on the shared client"""
+    return LazySyncDatabase()
 
 async def test_async_connection():
     """Test async MongoDB connection"""
@@ -373,6 +460,8 @@ def get_collection(collection_name, db=None):
 
 def is_db_available(db):
     """Check if db is not None and not a DummySyncDatabase"""
+    if isinstance(db, LazySyncDatabase):
+        db = db.resolve()
     return db is not None and not isinstance(db, DummySyncDatabase)
 
 def get_database(db_name=None):
@@ -0,0 +1,235 @@
+"""
+Streaming text into Discord messages.
+
+``StreamRenderer`` shows a growing answer (an AI completion, a long report)
+by editing one message, paced by what is left of that message's edit
+rate-limit bucket instead of a fixed timer. Text past the 2000 character
+limit moves into follow-up messages at a line or word boundary.
+``iter_sse_text`` turns a server-sent-events stream of chat completion
+chunks into the text deltas the renderer consumes.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+import discord
+from discord.http import Route
+
+from src.core.metrics import get_registry
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 2000
+STREAM_MESSAGES = get_registry().counter(
+    "contro_stream_messages_total", "Messages sent or edited while streaming text", ("kind",))
+
+
+class SSEParser:
+    """Incremental server-sent-events parser.
+
+    Bytes can be fed in any split (network chunks or whole lines); each
+    complete ``data:`` payload is returned once its line is complete.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self.done = False
+
+    def feed(self, data: bytes) -> List[str]:
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        payloads = []
+        for line in lines:
+            line = line.rstrip(b"\r")
+            # Comments (":keep-alive") and other fields carry no content
+            if not line.startswith(b"data:"):
+                continue
+            payload = line[5:].lstrip(b" ").decode("utf-8", errors="replace")
+            if payload == "[DONE]":
+                self.done = True
+                continue
+            payloads.append(payload)
+        return payloads
+
+
+async def iter_sse_text(stream: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Content deltas of a streamed OpenAI-style chat completion."""
+    parser = SSEParser()
+    async for data in stream:
+        for payload in parser.feed(data):
+            try:
+                choices = json.loads(payload).get("choices") or ()
+            except ValueError:
+                logger.error(f"Skipping malformed stream chunk: {payload[:200]!r}")
+                continue
+            for choice in choices:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
+        if parser.done:
+            break
+
+
+def edit_budget(message: discord.Message) -> Optional[Tuple[int, float]]:
+    """(edits left, seconds until the bucket refills) of the bucket editing ``message``.
+
+    None until discord.py has seen the bucket's headers, and for webhook
+    (interaction follow-up) messages, whose limits are tracked elsewhere.
+    """
+    try:
+        http = message._state.http
+        buckets, hashes = http._buckets, http._bucket_hashes
+        route = Route('PATCH', '/channels/{channel_id}/messages/{message_id}',
+                      channel_id=message.channel.id, message_id=message.id)
+    except AttributeError:
+        return None
+    bucket_hash = hashes.get(route.key)
+    ratelimit = buckets.get(f"{bucket_hash or route.key}:{route.major_parameters}")
+    if ratelimit is None or ratelimit.expires is None:
+        return None
+    reset_in = ratelimit.expires - asyncio.get_running_loop().time()
+    if reset_in <= 0:
+        return ratelimit.limit, 0.0
+    return ratelimit.remaining, reset_in
+
+
+def split_point(text: str, limit: int) -> int:
+    """Where to cut ``text`` to at most ``limit`` characters: a newline, else a space, else hard."""
+    if len(text) <= limit:
+        return len(text)
+    floor = limit // 2
+    for separator in ("\n", " "):
+        index = text.rfind(separator, floor, limit)
+        if index != -1:
+            return index + 1
+    return limit
+
+
+class StreamRenderer:
+    """Edits a Discord message as text streams in, spilling into follow-ups.
+
+    Incoming text is kept as a list of chunks and only joined when a message
+    is edited. Edits run on a background task: right away when the bucket has
+    room, otherwise spread over what is left of its window (one edit is kept
+    in reserve for the final text), and never more often than
+    ``min_interval``.
+    """
+
+    def __init__(self, message: discord.Message,
+                 send: Optional[Callable[[str], Awaitable[discord.Message]]] = None, *,
+                 limit: int = MESSAGE_LIMIT - 10, min_interval: float = 1.0,
+                 max_interval: float = 5.0, default_interval: float = 1.5,
+                 empty_text: Optional[str] = None):
+        self.message = message
+        self.messages: List[discord.Message] = [message]
+        self.send = send or message.channel.send
+        self.limit = limit
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.empty_text = empty_text
+        self._parts: List[str] = []  # everything received
+        self._chunks: List[str] = []  # text of the message being edited
+        self._length = 0
+        self._rendered: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._dirty = asyncio.Event()
+        self._next_edit = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    async def render(self, deltas: AsyncIterable[str]) -> str:
+        """Stream ``deltas`` into the message and return the whole text."""
+        try:
+            async for delta in deltas:
+                await self.feed(delta)
+        finally:
+            await self.finish()
+        return self.text
+
+    async def feed(self, delta: str) -> None:
+        if not delta:
+            return
+        self._parts.append(delta)
+        self._chunks.append(delta)
+        self._length += len(delta)
+        if self._length > self.limit:
+            async with self._lock:
+                await self._overflow()
+        if self._task is None:
+            self._task = asyncio.create_task(self._edit_loop())
+        self._dirty.set()
+
+    async def finish(self) -> None:
+        """Stop scheduled edits and show the final text."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        async with self._lock:
+            if self._length or self.empty_text is None:
+                await self._edit()
+            elif len(self.messages) == 1:
+                await self._edit(self.empty_text)
+
+    async def _overflow(self) -> None:
+        """Close full messages at a clean boundary and continue in a new one."""
+        while self._length > self.limit:
+            current = "".join(self._chunks)
+            cut = split_point(current, self.limit)
+            head, tail = current[:cut], current[cut:]
+            # Keep an open code block valid on both sides of the split
+            if head.count("```") % 2:
+                head, tail = head + "\n```", "```\n" + tail
+            await self._edit(head)
+            self._chunks, self._length = [tail], len(tail)
+            try:
+                self.message = await self.send(tail[:self.limit] or "…")
+            except discord.HTTPException as e:
+                logger.error(f"Failed to send streamed follow-up message: {e}")
+                raise
+            STREAM_MESSAGES.labels("followup").inc()
+            self.messages.append(self.message)
+            self._rendered = tail[:self.limit]
+
+    async def _edit_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._dirty.wait()
+            delay = self._next_edit - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dirty.clear()
+            async with self._lock:
+                await self._edit()
+            self._next_edit = loop.time() + self._interval()
+
+    def _interval(self) -> float:
+        budget = edit_budget(self.message)
+        if budget is None:
+            return self.default_interval
+        remaining, reset_in = budget
+        if remaining <= 1:
+            interval = reset_in
+        else:
+            interval = reset_in / (remaining - 1)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    async def _edit(self, content: Optional[str] = None) -> None:
+        if content is None:
+            content = "".join(self._chunks)
+        if not content or content == self._rendered:
+            return
+        try:
+            await self.message.edit(content=content)
+            self._rendered = content
+            STREAM_MESSAGES.labels("edit").inc()
+        except discord.HTTPException as e:
+            logger.error(f"Failed to edit streamed message: {e}")
@@ -0,0 +1,371 @@
+"""
+Shared outbound HTTP client
+
+One ``aiohttp`` session for the whole bot instead of a session (or a blocking
+``requests`` call) per lookup. The connector keeps per-host connection limits
+and a DNS cache. GET responses that carry an ETag or Last-Modified header are
+kept in a byte-bounded LRU and revalidated with a conditional request, and
+``Cache-Control: max-age`` lets them be reused without a request at all. Each
+host has a circuit breaker, so a dead upstream fails fast instead of tying up
+commands until their timeouts. Requests, latency and cache use are exported
+as metrics.
+
+The bot owns the client (``bot.http_client``) and closes it on shutdown; code
+without a bot reference uses ``get_http_client()``, which returns the same
+instance.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlencode, urlsplit
+
+import aiohttp
+
+from src.core.metrics import get_registry
+
+logger = logging.getLogger('http_client')
+
+USER_AGENT = "ControBot"
+
+REQUEST_SECONDS = get_registry().histogram(
+    "contro_http_request_seconds", "Outbound HTTP request latency by host", ("host",))
+REQUESTS = get_registry().counter(
+    "contro_http_requests_total", "Outbound HTTP requests by host and outcome", ("host", "outcome"))
+CACHE_BYTES = get_registry().gauge(
+    "contro_http_cache_bytes", "Bytes held by the outbound HTTP response cache")
+
+# Hosts get their own metric label up to this many; the rest share "other"
+MAX_HOST_LABELS = 50
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class HTTPError(Exception):
+    """A request that did not produce a usable response."""
+
+
+class CircuitOpenError(HTTPError):
+    """The host failed repeatedly and is being skipped for now."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"{host} is unavailable, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class ResponseTooLarge(HTTPError):
+    pass
+
+
+class HTTPResponse:
+    """A fully read response."""
+
+    __slots__ = ("url", "status", "headers", "body", "from_cache")
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], body: bytes, from_cache: bool = False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise HTTPError(f"HTTP {self.status} from {self.url}")
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; lets one trial through after ``cooldown``."""
+
+    __slots__ = ("threshold", "cooldown", "failures", "opened_at", "trial")
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+
+    def check(self, host: str) -> None:
+        if self.opened_at is None:
+            return
+        waited = time.monotonic() - self.opened_at
+        if waited < self.cooldown or self.trial:
+            raise CircuitOpenError(host, max(self.cooldown - waited, 0.0))
+        # Half open: this request decides whether the host is back
+        self.trial = True
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.trial = False
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """A request ended without a verdict (it was cancelled); let the next one be the trial."""
+        self.trial = False
+
+
+class _CachedResponse:
+    __slots__ = ("status", "headers", "body", "etag", "last_modified", "fresh_until", "size")
+
+    def __init__(self, response: HTTPResponse, etag: Optional[str], last_modified: Optional[str],
+                 fresh_until: float):
+        self.status = response.status
+        self.headers = dict(response.headers)
+        self.body = response.body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh_until = fresh_until
+        self.size = len(response.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+
+class ResponseCache:
+    """LRU of cacheable GET responses, bounded by total body and header bytes."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 2 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[_CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: _CachedResponse) -> None:
+        self.discard(key)
+        if entry.size > self.max_entry_bytes:
+            return
+        self._entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+
+class HTTPClient:
+    """Pooled, caching, circuit-breaking outbound HTTP client."""
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, ttl_dns_cache: int = 300,
+                 timeout: float = 15.0, cache_bytes: int = 32 * 1024 * 1024,
+                 max_body_bytes: int = 16 * 1024 * 1024, failure_threshold: int = 5,
+                 cooldown: float = 30.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+        self.max_body_bytes = max_body_bytes
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.cache = ResponseCache(cache_bytes)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._host_labels: Dict[str, str] = {}
+        CACHE_BYTES.set_function(lambda: self.cache.bytes)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, created on first use inside the running loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.ttl_dns_cache, keepalive_timeout=30,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return breaker
+
+    def _host_label(self, host: str) -> str:
+        label = self._host_labels.get(host)
+        if label is None:
+            label = host if len(self._host_labels) < MAX_HOST_LABELS else "other"
+            self._host_labels[host] = label
+        return label
+
+    @staticmethod
+    def _cache_key(url: str, params: Optional[Mapping[str, Any]]) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+    async def request(self, method: str, url: str, *, params: Optional[Mapping[str, Any]] = None,
+                      headers: Optional[Mapping[str, str]] = None, json: Any = None, data: Any = None,
+                      timeout: Optional[float] = None, cache: bool = True,
+                      max_bytes: Optional[int] = None) -> HTTPResponse:
+        """Send a request and read the whole body.
+
+        Raises ``CircuitOpenError`` while the host is failing, ``HTTPError``
+        for oversized bodies, and aiohttp/timeout errors for transport
+        failures. Error statuses are returned, not raised.
+        """
+        host = urlsplit(url).hostname or ""
+        label = self._host_label(host)
+
+        cache_key = None
+        cached = None
+        request_headers = dict(headers or {})
+        if method == "GET" and cache:
+            cache_key = self._cache_key(url, params)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if cached.fresh_until > time.monotonic():
+                    REQUESTS.labels(label, "cache").inc()
+                    return HTTPResponse(url, cached.status, cached.headers, cached.body, from_cache=True)
+                if cached.etag:
+                    request_headers["If-None-Match"] = cached.etag
+                if cached.last_modified:
+                    request_headers["If-Modified-Since"] = cached.last_modified
+
+        breaker = self.breaker(host)
+        try:
+            breaker.check(host)
+        except CircuitOpenError:
+            REQUESTS.labels(label, "circuit_open").inc()
+            raise
+
+        started = time.perf_counter()
+        limit = max_bytes or self.max_body_bytes
+        try:
+            async with self.session.request(
+                method, url, params=params, headers=request_headers, json=json, data=data,
+                # timeout=None would disable the session's default instead of using it
+                timeout=aiohttp.ClientTimeout(total=timeout or self.timeout),
+            ) as response:
+                if response.content_length is not None and response.content_length > limit:
+                    raise ResponseTooLarge(f"{url} is {response.content_length} bytes, limit {limit}")
+                body = await response.content.read(limit + 1)
+                if len(body) > limit:
+                    raise ResponseTooLarge(f"{url} is over {limit} bytes")
+                result = HTTPResponse(str(response.url), response.status, response.headers, body)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception:
+            # Transport errors, timeouts and oversized bodies all count against the host
+            breaker.failure()
+            REQUESTS.labels(label, "error").inc()
+            raise
+        finally:
+            REQUEST_SECONDS.labels(label).observe(time.perf_counter() - started)
+
+        if result.status >= 500 or result.status == 429:
+            breaker.failure()
+        else:
+            breaker.success()
+
+        if result.status == 304 and cached is not None:
+            REQUESTS.labels(label, "revalidated").inc()
+            cached.fresh_until = self._fresh_until(result.headers)
+            return HTTPResponse(url, cached.status, cached.headers, cached.body, from_cache=True)
+        REQUESTS.labels(label, f"{result.status // 100}xx").inc()
+
+        if cache_key is not None and result.status == 200:
+            self._store(cache_key, result)
+        return result
+
+    def _fresh_until(self, headers: Mapping[str, str]) -> float:
+        match = _MAX_AGE.search(headers.get("Cache-Control", ""))
+        return time.monotonic() + int(match.group(1)) if match else 0.0
+
+    def _store(self, key: str, response: HTTPResponse) -> None:
+        cache_control = response.headers.get("Cache-Control", "")
+        if "no-store" in cache_control:
+            self.cache.discard(key)
+            return
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        fresh_until = 0.0 if "no-cache" in cache_control else self._fresh_until(response.headers)
+        if not etag and not last_modified and not fresh_until:
+            self.cache.discard(key)
+            return
+        self.cache.put(key, _CachedResponse(response, etag, last_modified, fresh_until))
+
+    async def get(self, url: str, **kwargs) -> HTTPResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HTTPResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def get_json(self, url: str, **kwargs) -> Any:
+        """Decoded JSON of a successful GET; raises ``HTTPError`` for error statuses."""
+        response = await self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_bytes(self, url: str, **kwargs) -> Optional[bytes]:
+        """Body of a successful GET, or None when the request failed for any reason."""
+        try:
+            response = await self.get(url, **kwargs)
+        except (HTTPError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"GET {url} failed: {e!r}")
+            return None
+        if not response.ok:
+            logger.warning(f"GET {url} returned HTTP {response.status}")
+            return None
+        return response.body
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cache_entries": len(self.cache),
+            "cache_bytes": self.cache.bytes,
+            "open_circuits": sorted(host for host, b in self._breakers.items() if b.opened_at is not None),
+        }
+
+
+_client: Optional[HTTPClient] = None
+
+
+def get_http_client() -> HTTPClient:
+    """The process-wide HTTP client (the one the bot owns and closes)."""
+    global _client
+    if _client is None:
+        _client = HTTPClient()
+    return _client
@@ -1,21 +1,30 @@
-import aiohttp
+import asyncio
 import logging
 import os
 import re
-from typing import Dict, Optional, List, Union, Any
+from typing import Dict, Iterable, Optional, List, Union, Any
 from ...core.config import get_config
+from .http import get_http_client
+from .steam_cache import SteamCache
 
 logger = logging.getLogger('steam')
 
 class SteamAPI:
     """
     Utility class for interacting with Steam API
+    
+    Answers are cached (see steam_cache.py): vanity names for a month,
+    profile summaries for minutes, owned games for hours.
     """
     
-    def __init__(self):
+    # GetPlayerSummaries accepts at most this many ids per request
+    SUMMARY_BATCH_SIZE = 100
+    
+    def __init__(self, cache: Optional[SteamCache] = None):
         config = get_config()
         self.api_key = config.external_services.steam_api_key
         self.base_url = "https://api.steampowered.com"
+        self.cache = cache or SteamCache()
         
         # Person states in Steam
         self.person_states = {
@@ -51,26 +60,32 @@ class SteamAPI:
             return vanity_url
         
         try:
-            url = f"{self.base_url}/ISteamUser/ResolveVanityURL/v1/"
-            params = {
-                "key": self.api_key,
-                "vanityurl": vanity_url
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        result = data.get("response", {})
-                        
-                        if result.get("success") == 1:
-                            return result.get("steamid")
-            
-            return None
+            # Vanity names are case-insensitive
+            return await self.cache.fetch("vanity", vanity_url.lower(), lambda: self._resolve_vanity_url(vanity_url))
         except Exception as e:
             logger.error(f"Error fetching Steam ID: {e}")
             return None
     
+    async def _resolve_vanity_url(self, vanity_url: str) -> Optional[str]:
+        url = f"{self.base_url}/ISteamUser/ResolveVanityURL/v1/"
+        params = {
+            "key": self.api_key,
+            "vanityurl": vanity_url
+        }
+        
+        data = await get_http_client().get_json(url, params=params)
+        result = data.get("response", {})
+        
+        if result.get("success") == 1:
+            return result.get("steamid")
+        return None
+    
+    async def _to_steam_id(self, steam_id_or_vanity: str) -> Optional[str]:
+        """Convert a vanity URL to a Steam ID if needed"""
+        if steam_id_or_vanity.isdigit():
+            return steam_id_or_vanity
+        return await self.get_steam_id_from_vanity_url(steam_id_or_vanity)
+    
     async def get_user_summary(self, steam_id_or_vanity: str) -> Optional[Dict]:
         """
         Get a user's Steam profile information
@@ -81,44 +96,63 @@ class SteamAPI:
         Returns:
             Dictionary with user information or None if not found
         """
+        summaries = await self.get_user_summaries([steam_id_or_vanity])
+        return summaries.get(steam_id_or_vanity)
+    
+    async def get_user_summaries(self, steam_ids_or_vanities: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Get the Steam profiles of many users, e.g. for a list of members
+        
+        Uncached profiles are fetched with one GetPlayerSummaries request per
+        100 ids, and profiles that other callers are already fetching are
+        waited for instead of requested again.
+        
+        Args:
+            steam_ids_or_vanities: Steam IDs or vanity URL names
+            
+        Returns:
+            Dictionary mapping each given ID or name to its user information;
+            users that were not found are left out
+        """
         if not self.api_key:
             logger.warning("Steam API key not configured")
-            return None
+            return {}
         
         try:
-            # Convert vanity URL to Steam ID if needed
-            if not steam_id_or_vanity.isdigit():
-                steam_id = await self.get_steam_id_from_vanity_url(steam_id_or_vanity)
-                if not steam_id:
-                    return None
-            else:
-                steam_id = steam_id_or_vanity
-            
-            url = f"{self.base_url}/ISteamUser/GetPlayerSummaries/v2/"
-            params = {
-                "key": self.api_key,
-                "steamids": steam_id
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        players = data.get("response", {}).get("players", [])
-                        
-                        if players:
-                            player = players[0]
-                            
-                            # Add readable persona state
-                            state = player.get("personastate", 0)
-                            player["personastate_name"] = self.person_states.get(state, "Unknown")
-                            
-                            return player
-            
-            return None
+            names = list(dict.fromkeys(steam_ids_or_vanities))
+            steam_ids = await asyncio.gather(*(self._to_steam_id(name) for name in names))
+            resolved = {name: steam_id for name, steam_id in zip(names, steam_ids) if steam_id}
+            players = await self.cache.fetch_many("summary", resolved.values(), self._fetch_summaries)
         except Exception as e:
             logger.error(f"Error fetching Steam user summary: {e}")
-            return None
+            return {}
+        
+        # Copies, so callers cannot change the cached profiles
+        return {
+            name: dict(players[steam_id])
+            for name, steam_id in resolved.items()
+            if players.get(steam_id)
+        }
+    
+    async def _fetch_summaries(self, steam_ids: List[str]) -> Dict[str, Dict]:
+        url = f"{self.base_url}/ISteamUser/GetPlayerSummaries/v2/"
+        batches = [
+            steam_ids[start:start + self.SUMMARY_BATCH_SIZE]
+            for start in range(0, len(steam_ids), self.SUMMARY_BATCH_SIZE)
+        ]
+        responses = await asyncio.gather(*(
+            get_http_client().get_json(url, params={"key": self.api_key, "steamids": ",".join(batch)})
+            for batch in batches
+        ))
+        
+        players = {}
+        for data in responses:
+            for player in data.get("response", {}).get("players", []):
+                # Add readable persona state
+                state = player.get("personastate", 0)
+                player["personastate_name"] = self.person_states.get(state, "Unknown")
+                players[player["steamid"]] = player
+        return players
     
     async def get_owned_games(self, steam_id_or_vanity: str) -> Optional[List[Dict]]:
         """
@@ -135,32 +169,36 @@ class SteamAPI:
             return None
         
         try:
-            # Convert vanity URL to Steam ID if needed
-            if not steam_id_or_vanity.isdigit():
-                steam_id = await self.get_steam_id_from_vanity_url(steam_id_or_vanity)
-                if not steam_id:
-                    return None
-            else:
-                steam_id = steam_id_or_vanity
-            
-            url = f"{self.base_url}/IPlayerService/GetOwnedGames/v1/"
-            params = {
-                "key": self.api_key,
-                "steamid": steam_id,
-                "include_appinfo": 1,
-                "include_played_free_games": 1
-            }
+            steam_id = await self._to_steam_id(steam_id_or_vanity)
+            if not steam_id:
+                return None
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        response_data = data.get("response", {})
-                        
-                        if "games" in response_data:
-                            return response_data["games"]
-            
-            return None
+            return await self.cache.fetch("games", steam_id, lambda: self._fetch_owned_games(steam_id))
         except Exception as e:
             logger.error(f"Error fetching owned games: {e}")
             return None
+    
+    async def _fetch_owned_games(self, steam_id: str) -> Optional[List[Dict]]:
+        url = f"{self.base_url}/IPlayerService/GetOwnedGames/v1/"
+        params = {
+            "key": self.api_key,
+            "steamid": steam_id,
+            "include_appinfo": 1,
+            "include_played_free_games": 1
+        }
+        
+        data = await get_http_client().get_json(url, params=params)
+        # Private libraries answer without a game list
+        return data.get("response", {}).get("games")
+
+
+_steam_api: Optional[SteamAPI] = None
+
+
+def get_steam_api() -> SteamAPI:
+    """The process-wide Steam client, cached on the shared Mongo database."""
+    global _steam_api
+    if _steam_api is None:
+        from ..database.connection import initialize_mongodb
+        _steam_api = SteamAPI(SteamCache(initialize_mongodb()))
+    return _steam_api
@@ -0,0 +1,211 @@
+"""
+Steam Web API data cache
+
+Vanity name resolutions, profile summaries and owned-game lists are kept in an
+in-process LRU in front of a Mongo collection with a TTL index, each for as
+long as that kind of data stays useful: vanity names almost never move,
+persona state changes within minutes, game libraries within hours. "Not
+found" answers (typos, private libraries) are cached briefly so they are not
+retried on every click. Concurrent lookups of the same key share one request,
+and lookups of many keys fetch only the ones that are neither cached nor
+already being fetched.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from pymongo import ReplaceOne
+
+from src.core.metrics import get_registry
+
+logger = logging.getLogger('steam_cache')
+
+LOOKUPS = get_registry().counter(
+    "contro_steam_cache_total", "Steam cache lookups by kind and outcome", ("kind", "outcome"))
+
+# Seconds an answer stays valid, by kind
+TTLS = {
+    "vanity": 30 * 24 * 3600,
+    "summary": 5 * 60,
+    "games": 6 * 3600,
+}
+# Seconds a "not found" answer stays valid, whatever the kind
+NEGATIVE_TTL = 5 * 60
+
+# After a Mongo error the persistent layer is skipped for this long
+MONGO_RETRY_SECONDS = 60.0
+
+
+class SteamCache:
+    """In-process LRU over a Mongo TTL collection, with in-flight coalescing."""
+
+    def __init__(self, db=None, collection: str = "steam_cache", max_entries: int = 5000):
+        self.db = db
+        self.collection = collection
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._index_ready = False
+        self._mongo_retry_at = 0.0
+
+    async def fetch(self, kind: str, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """The value of one key; ``fetch()`` returns it, or None when it does not exist."""
+        async def fetch_one(keys: List[str]) -> Dict[str, Any]:
+            value = await fetch()
+            return {} if value is None else {key: value}
+
+        return (await self.fetch_many(kind, [key], fetch_one))[key]
+
+    async def fetch_many(self, kind: str, keys: Iterable[str],
+                         fetch: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Values of ``keys`` (None for those that do not exist).
+
+        ``fetch`` is called once, with the keys that are neither cached nor
+        being fetched by another caller, and returns the values it found.
+        Keys it leaves out are cached as not found. Errors are not cached.
+        """
+        keys = list(dict.fromkeys(keys))
+        results = await self._lookup(kind, keys)
+
+        loop = asyncio.get_running_loop()
+        waiting: Dict[str, asyncio.Future] = {}
+        missing: List[str] = []
+        for key in keys:
+            if key in results:
+                continue
+            future = self._inflight.get((kind, key))
+            if future is not None:
+                waiting[key] = future
+                self._count(kind, "coalesced")
+            else:
+                self._inflight[(kind, key)] = loop.create_future()
+                missing.append(key)
+                self._count(kind, "miss")
+
+        if missing:
+            try:
+                fetched = await fetch(missing)
+            except BaseException as e:
+                for key in missing:
+                    future = self._inflight.pop((kind, key))
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Waiters see the error; if there are none it must not be logged as never retrieved
+                        future.exception()
+                raise
+            values = {key: fetched.get(key) for key in missing}
+            expires = {key: self._expiry(kind, value) for key, value in values.items()}
+            for key, value in values.items():
+                self._remember(kind, key, expires[key].timestamp(), value)
+                self._inflight.pop((kind, key)).set_result(value)
+            results.update(values)
+            await self._store(kind, values, expires)
+
+        for key, future in waiting.items():
+            results[key] = await asyncio.shield(future)
+        return results
+
+    def _count(self, kind: str, outcome: str) -> None:
+        LOOKUPS.labels(kind, outcome).inc()
+
+    @staticmethod
+    def _expiry(kind: str, value: Any) -> datetime:
+        ttl = TTLS[kind] if value is not None else NEGATIVE_TTL
+        return datetime.now(timezone.utc) + timedelta(seconds=ttl)
+
+    def _remember(self, kind: str, key: str, expires: float, value: Any) -> None:
+        self._entries[(kind, key)] = (expires, value)
+        self._entries.move_to_end((kind, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _lookup(self, kind: str, keys: List[str]) -> Dict[str, Any]:
+        """Live cached values of ``keys``, from memory and then from Mongo."""
+        found: Dict[str, Any] = {}
+        missing: List[str] = []
+        now = time.time()
+        for key in keys:
+            entry = self._entries.get((kind, key))
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end((kind, key))
+                found[key] = entry[1]
+                self._count(kind, "memory")
+            else:
+                missing.append(key)
+        if missing:
+            for key, value in (await self._load(kind, missing)).items():
+                found[key] = value
+                self._count(kind, "mongo")
+        return found
+
+    def _mongo_available(self) -> bool:
+        return self.db is not None and time.monotonic() >= self._mongo_retry_at
+
+    def _mongo_failed(self, action: str, error: Exception) -> None:
+        logger.error(f"Steam cache could not {action} Mongo, using memory only for now: {error}")
+        self._mongo_retry_at = time.monotonic() + MONGO_RETRY_SECONDS
+
+    def _collection(self):
+        """The cache collection, or None while the database is a fallback; call off the event loop."""
+        from ..database.connection import is_db_available
+        # A lazy database connects (or retries a failed connection) here
+        return self.db[self.collection] if is_db_available(self.db) else None
+
+    async def _load(self, kind: str, keys: List[str]) -> Dict[str, Any]:
+        if not self._mongo_available():
+            return {}
+
+        def find():
+            collection = self._collection()
+            if collection is None:
+                return None
+            return list(collection.find({
+                "_id": {"$in": [f"{kind}:{key}" for key in keys]},
+                "expires_at": {"$gt": datetime.now(timezone.utc)},
+            }))
+
+        try:
+            documents = await asyncio.to_thread(find)
+        except Exception as e:
+            self._mongo_failed("read from", e)
+            return {}
+        if documents is None:
+            # No database yet; check again after the retry interval
+            self._mongo_retry_at = time.monotonic() + MONGO_RETRY_SECONDS
+            return {}
+        found = {}
+        for document in documents:
+            key = document["_id"].split(":", 1)[1]
+            expires_at = document["expires_at"]
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            self._remember(kind, key, expires_at.timestamp(), document["value"])
+            found[key] = document["value"]
+        return found
+
+    async def _store(self, kind: str, values: Dict[str, Any], expires: Dict[str, datetime]) -> None:
+        if not values or not self._mongo_available():
+            return
+        try:
+            collection = await asyncio.to_thread(self._collection)
+            if collection is None:
+                self._mongo_retry_at = time.monotonic() + MONGO_RETRY_SECONDS
+                return
+            if not self._index_ready:
+                # Mongo drops documents once expires_at has passed
+                await asyncio.to_thread(collection.create_index, "expires_at", expireAfterSeconds=0)
+                self._index_ready = True
+            operations = [
+                ReplaceOne({"_id": f"{kind}:{key}"},
+                           {"kind": kind, "value": value, "expires_at": expires[key]}, upsert=True)
+                for key, value in values.items()
+            ]
+            await asyncio.to_thread(collection.bulk_write, operations, ordered=False)
+        except Exception as e:
+            self._mongo_failed("write to", e)
@@ -1,17 +1,22 @@
 """Image processing utilities."""
+import asyncio
+
 from PIL import Image, ImageChops, ImageDraw
-import requests
 
-def download_background(url):
+from src.utils.external.http import get_http_client
+
+def _write_file(filename, data):
+    with open(filename, "wb") as f:
+        f.write(data)
+
+async def download_background(url):
     """Download a background image from the specified URL."""
-    response = requests.get(url)
-    if response.status_code == 200:
-        background_filename = "../background.png"
-        with open(background_filename, "wb") as f:
-            f.write(response.content)
-        return background_filename
-    else:
+    content = await get_http_client().get_bytes(url)
+    if content is None:
         return None
+    background_filename = "../background.png"
+    await asyncio.to_thread(_write_file, background_filename, content)
+    return background_filename
 
 def circle(pfp, size=(215, 215)):
     """Create a circular profile picture."""
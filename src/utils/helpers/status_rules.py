@@ -0,0 +1,260 @@
+"""Compiled rule index for custom status rules."""
+import logging
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import discord
+
+from .text import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+# Activity fields a rule can read; "time" changes on every evaluation
+ACTIVITY_FIELDS = ("status_text", "game_name", "url", "activity_type")
+RULE_INPUTS = {
+    "status_text": frozenset({"status_text"}),
+    "keyword": frozenset({"status_text"}),
+    "game": frozenset({"game_name"}),
+    "url": frozenset({"url"}),
+    "activity_type": frozenset({"activity_type"}),
+    "time_based": frozenset({"time"}),
+}
+
+
+def extract_activity_data(member: discord.Member) -> Dict[str, Any]:
+    """Extract the fields status rules look at from a member's activity."""
+    data = {
+        "status_text": "",
+        "game_name": "",
+        "url": "",
+        "activity_type": "",
+        "timestamp": datetime.now()
+    }
+
+    activity = member.activity
+    if activity:
+        if isinstance(activity, discord.Game):
+            data["game_name"] = activity.name
+            data["activity_type"] = "playing"
+        elif isinstance(activity, discord.Streaming):
+            data["activity_type"] = "streaming"
+            data["url"] = activity.url
+        elif isinstance(activity, discord.Activity):
+            data["activity_type"] = activity.type.name
+            if activity.name:
+                data["status_text"] = activity.name
+            if getattr(activity, 'url', None):
+                data["url"] = activity.url
+
+        # Also check custom status
+        if getattr(activity, 'state', None):
+            data["status_text"] = activity.state
+
+    return data
+
+
+def activity_key(data: Dict[str, Any]) -> Tuple[str, str, str, str]:
+    """Compact, comparable form of the activity fields."""
+    return tuple(data.get(field) or "" for field in ACTIVITY_FIELDS)
+
+
+def changed_fields(before: Optional[Tuple[str, ...]], after: Tuple[str, ...]) -> FrozenSet[str]:
+    """Names of the activity fields that differ between two activity keys."""
+    if before is None:
+        return frozenset(field for field, value in zip(ACTIVITY_FIELDS, after) if value)
+    return frozenset(
+        field for field, old, new in zip(ACTIVITY_FIELDS, before, after) if old != new
+    )
+
+
+def _parse_time_to_minutes(time_str: str) -> int:
+    hours, minutes = map(int, time_str.split(':'))
+    return hours * 60 + minutes
+
+
+def _alternation(needles, flags=0) -> Optional[re.Pattern]:
+    needles = [n for n in needles if n]
+    if not needles:
+        return None
+    return re.compile("|".join(re.escape(n) for n in needles), flags)
+
+
+class CompiledRule:
+    """A status rule with its matchers precompiled."""
+
+    __slots__ = ('order', 'rule', 'id', 'name', 'type', 'inputs', 'check')
+
+    def __init__(self, order: int, rule: Dict[str, Any], check: Optional[Callable[[Dict[str, Any]], bool]]):
+        self.order = order
+        self.rule = rule
+        self.id = rule.get("id")
+        self.name = rule.get("name", "Unknown")
+        self.type = rule.get("type")
+        self.inputs = RULE_INPUTS.get(self.type, frozenset())
+        self.check = check
+
+
+class StatusRuleIndex:
+    """Per-guild rule index built once from the ``custom_status_rules`` document.
+
+    Substring conditions of every rule are merged into one keyword automaton
+    per field, regexes and URL matchers are compiled up front and
+    ``activity_type`` rules are bucketed by type, so a presence change costs
+    one pass over each changed field instead of one scan per rule.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.enabled = bool(settings.get("enabled", False))
+        self.cooldown_seconds = settings.get("settings", {}).get("cooldown_seconds", 30)
+        self.rules: List[CompiledRule] = []
+        self.by_input: Dict[str, List[CompiledRule]] = {}
+        self.by_activity_type: Dict[str, List[CompiledRule]] = {}
+        self.matchers: Dict[str, KeywordMatcher] = {
+            "status_text": KeywordMatcher(),
+            "game_name": KeywordMatcher(),
+            "url": KeywordMatcher(),
+        }
+        self._compile(settings.get("rules", []))
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _compile(self, rules: List[Dict[str, Any]]) -> None:
+        for order, rule in enumerate(rules):
+            if not rule.get("enabled", True):
+                continue
+            try:
+                compiled = self._compile_rule(order, rule)
+            except Exception as e:
+                logger.error(f"Skipping status rule {rule.get('name', 'Unknown')}: {e}")
+                continue
+            if compiled is None:
+                continue
+            self.rules.append(compiled)
+            for field in compiled.inputs:
+                self.by_input.setdefault(field, []).append(compiled)
+
+    def _compile_rule(self, order: int, rule: Dict[str, Any]) -> Optional[CompiledRule]:
+        rule_type = rule.get("type")
+        conditions = rule.get("conditions", {})
+
+        if rule_type == "status_text":
+            for phrase in conditions.get("status_contains") or []:
+                self.matchers["status_text"].add(phrase.lower(), order)
+            exact = frozenset(conditions.get("status_exact") or [])
+            pattern = None
+            if conditions.get("status_regex"):
+                try:
+                    pattern = re.compile(conditions["status_regex"], re.IGNORECASE)
+                except re.error:
+                    logger.error(f"Invalid regex pattern: {conditions['status_regex']}")
+
+            def check(data, exact=exact, pattern=pattern):
+                text = data["status_text"]
+                return bool(text) and (text in exact or (pattern is not None and pattern.search(text) is not None))
+            return CompiledRule(order, rule, check if exact or pattern else None)
+
+        if rule_type == "game":
+            for name in conditions.get("game_names") or []:
+                self.matchers["game_name"].add(name.lower(), order)
+            return CompiledRule(order, rule, None)
+
+        if rule_type == "url":
+            for keyword in conditions.get("url_keywords") or []:
+                self.matchers["url"].add(keyword.lower(), order)
+            domains = _alternation(conditions.get("url_domains") or [])
+            patterns = _alternation(conditions.get("url_patterns") or [])
+
+            def check(data, domains=domains, patterns=patterns):
+                url = data["url"]
+                if not url:
+                    return False
+                if patterns is not None and patterns.search(url):
+                    return True
+                if domains is not None:
+                    try:
+                        return domains.search(urlparse(url).netloc) is not None
+                    except ValueError:
+                        return False
+                return False
+            return CompiledRule(order, rule, check if domains or patterns else None)
+
+        if rule_type == "keyword":
+            keywords = conditions.get("keywords") or []
+            if conditions.get("case_sensitive", False):
+                pattern = _alternation(keywords)
+
+                def check(data, pattern=pattern):
+                    return pattern is not None and bool(data["status_text"]) and pattern.search(data["status_text"]) is not None
+                return CompiledRule(order, rule, check)
+            for keyword in keywords:
+                self.matchers["status_text"].add(keyword.lower(), order)
+            return CompiledRule(order, rule, None)
+
+        if rule_type == "activity_type":
+            compiled = CompiledRule(order, rule, None)
+            for activity_type in conditions.get("activity_types") or []:
+                self.by_activity_type.setdefault(activity_type, []).append(compiled)
+            return compiled
+
+        if rule_type == "time_based":
+            ranges = []
+            for time_range in conditions.get("time_ranges") or []:
+                ranges.append((
+                    _parse_time_to_minutes(time_range["start_time"]),
+                    _parse_time_to_minutes(time_range["end_time"]),
+                    frozenset(time_range["days_of_week"]) if "days_of_week" in time_range else None
+                ))
+
+            def check(data, ranges=tuple(ranges)):
+                now = data["timestamp"]
+                current_time = now.hour * 60 + now.minute
+                current_day = now.weekday()
+                for start, end, days in ranges:
+                    if days is not None and current_day not in days:
+                        continue
+                    if start <= end:
+                        if start <= current_time <= end:
+                            return True
+                    elif current_time >= start or current_time <= end:
+                        return True
+                return False
+            return CompiledRule(order, rule, check)
+
+        logger.warning(f"Unknown rule type: {rule_type}")
+        return None
+
+    def match(self, data: Dict[str, Any], changed: FrozenSet[str]) -> Optional[CompiledRule]:
+        """Return the first rule (in configured order) matching the activity.
+
+        Only rules reading one of the ``changed`` fields are considered;
+        time-based rules are always considered.
+        """
+        candidates = {}
+        for field in changed | {"time"}:
+            for rule in self.by_input.get(field, ()):
+                candidates[rule.order] = rule
+        if not candidates:
+            return None
+
+        hits = set()
+        for field, matcher in self.matchers.items():
+            if field in changed and matcher:
+                hits |= matcher.search((data.get(field) or "").lower())
+        for rule in self.by_activity_type.get(data.get("activity_type") or "", ()):
+            hits.add(rule.order)
+
+        for order in sorted(candidates):
+            rule = candidates[order]
+            if order in hits:
+                return rule
+            if rule.check is not None:
+                try:
+                    if rule.check(data):
+                        return rule
+                except Exception as e:
+                    logger.error(f"Error evaluating rule {rule.name}: {e}")
+        return None
@@ -1,6 +1,7 @@
 """Text formatting and manipulation utilities."""
 import re
-from typing import Optional, List
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
 import unicodedata
 
 
@@ -79,4 +80,75 @@ def title_case(text: str) -> str:
         else:
             result.append(word.capitalize())
     
-    return ' '.join(result) 
\ No newline at end of file
+    return ' '.join(result) 
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every registered keyword in one pass.
+
+    Each keyword is tagged with a hashable value (e.g. a rule id); ``search``
+    returns the set of tags whose keywords occur anywhere in the text.
+    """
+
+    def __init__(self, keywords: Iterable[Tuple[str, Hashable]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[Hashable]] = [set()]
+        self._built = False
+        for keyword, tag in keywords:
+            self.add(keyword, tag)
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def add(self, keyword: str, tag: Hashable) -> None:
+        """Register a keyword. Must be called before the first search."""
+        if not keyword:
+            return
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            node = nxt
+        self._out[node].add(tag)
+        self._built = False
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] |= self._out[self._fail[child]]
+        self._built = True
+
+    def search(self, text: str) -> Set[Hashable]:
+        """Return the tags of every keyword found in the text."""
+        if not text or len(self._goto) == 1:
+            return set()
+        if not self._built:
+            self._build()
+
+        found: Set[Hashable] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                found |= out[node]
+        return found
+
@@ -3,11 +3,12 @@ Imaging utilities for various image processing tasks.
 """
 import discord
 import io
-import aiohttp
 import logging
 from typing import Optional, Union, Tuple
 from PIL import Image, ImageDraw, ImageOps, ImageFilter
 
+from src.utils.external.http import get_http_client
+
 logger = logging.getLogger('imaging')
 
 async def download_background(url: str) -> Optional[bytes]:
@@ -21,12 +22,7 @@ async def download_background(url: str) -> Optional[bytes]:
         bytes: Image data or None if download fails
     """
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    return await resp.read()
-                logger.warning(f"Failed to download image: HTTP {resp.status}")
-                return None
+        return await get_http_client().get_bytes(url)
     except Exception as e:
         logger.error(f"Error downloading image: {e}")
         return None
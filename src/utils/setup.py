@@ -499,7 +499,11 @@ class ServerSetup(commands.Cog):
                 
         # Sync commands
         try:
-            await bot.tree.sync()
+            command_sync = getattr(bot, 'command_sync', None)
+            if command_sync is not None:
+                await command_sync.sync()
+            else:
+                await bot.tree.sync()
             print("Commands synced successfully")
         except Exception as e:
             print(f"Error syncing commands: {e}")
@@ -5,7 +5,9 @@ Provides advanced Turkish profanity detection with context awareness.
 
 import asyncio
 import discord
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 import logging
 from datetime import datetime
 
@@ -17,25 +19,151 @@ except ImportError:
 
 from src.utils.database.connection import get_async_db
 from src.utils.core.formatting import create_embed
+from src.core.metrics import get_registry, register_queue
+
+BATCH_SIZE = get_registry().histogram(
+    "contro_profanity_batch_size", "Messages per Sinkaf prediction batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+PREDICT_SECONDS = get_registry().histogram(
+    "contro_profanity_predict_seconds", "Time Sinkaf spent on one batch")
+CACHE_LOOKUPS = get_registry().counter(
+    "contro_profanity_cache_total", "Profanity verdict lookups by outcome", ("outcome",))
+
+
+class ProfanityBatcher:
+    """Runs a list-in, list-out model over micro-batches on a worker thread.
+    
+    Texts queue up on the event loop; a collector takes whatever is queued
+    (waiting ``max_wait`` seconds for more when the batch is not full) and
+    runs one ``predict`` call per batch of up to ``max_batch`` texts on a
+    single worker thread. While a batch runs, new texts keep queuing, so
+    batches grow with load. Verdicts are cached by normalized text, and a
+    text already waiting for a verdict is not queued twice.
+    """
+    
+    def __init__(self, predict: Callable[[List[str]], Sequence], max_batch: int = 32,
+                 max_wait: float = 0.005, cache_size: int = 10000):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, bool]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sinkaf")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.casefold().split())
+    
+    async def classify(self, text: str) -> bool:
+        """Whether the model flags ``text``"""
+        key = self.normalize(text)
+        verdict = self._cache.get(key)
+        if verdict is not None:
+            self._cache.move_to_end(key)
+            CACHE_LOOKUPS.labels("hit").inc()
+            return verdict
+        CACHE_LOOKUPS.labels("miss").inc()
+        
+        future = self._pending.get(key)
+        if future is None:
+            self._ensure_worker()
+            future = self._pending[key] = self._loop.create_future()
+            self._queue.put_nowait((key, text))
+        return await asyncio.shield(future)
+    
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            # First use, or the previous loop is gone (tests run one loop per case)
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._pending.clear()
+            self._task = loop.create_task(self._run())
+            register_queue("profanity_detection", lambda: self._queue.qsize() if self._queue else 0)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+            
+            texts = [text for _, text in batch]
+            started = loop.time()
+            try:
+                verdicts = await loop.run_in_executor(self._executor, self.predict, texts)
+                verdicts = [bool(verdict) for verdict in verdicts]
+                if len(verdicts) != len(texts):
+                    raise ValueError(f"model returned {len(verdicts)} verdicts for {len(texts)} texts")
+            except Exception as e:
+                for key, _ in batch:
+                    future = self._pending.pop(key, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                PREDICT_SECONDS.observe(loop.time() - started)
+                BATCH_SIZE.observe(len(batch))
+            
+            for (key, _), verdict in zip(batch, verdicts):
+                self._remember(key, verdict)
+                future = self._pending.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_result(verdict)
+    
+    def _drain(self, batch: List[Tuple[str, str]]):
+        while len(batch) < self.max_batch and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+    
+    def _remember(self, key: str, verdict: bool):
+        self._cache[key] = verdict
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        self._executor.shutdown(wait=False)
 
 
 class AIProfanityDetector:
     """AI-powered profanity detection using Sinkaf"""
     
-    def __init__(self):
-        self.sinkaf = None
+    def __init__(self, model=None, max_batch: int = 32, max_wait: float = 0.005):
+        self.sinkaf = model
+        self.batcher = None
         self.mongo_db = get_async_db()
         self.logger = logging.getLogger('ai_profanity')
         
-        if Sinkaf:
+        if self.sinkaf is None and Sinkaf:
             try:
                 self.sinkaf = Sinkaf()
                 self.logger.info("Sinkaf AI profanity detector initialized successfully")
             except Exception as e:
                 self.logger.error(f"Failed to initialize Sinkaf: {e}")
                 self.sinkaf = None
-        else:
+        elif self.sinkaf is None:
             self.logger.warning("Sinkaf not available - AI profanity detection disabled")
+        
+        if self.sinkaf is not None:
+            # Sinkaf expects a list of texts, so whole batches go through one call
+            self.batcher = ProfanityBatcher(self.sinkaf.tahmin, max_batch=max_batch, max_wait=max_wait)
     
     def is_available(self) -> bool:
         """Check if AI profanity detection is available"""
@@ -56,20 +184,15 @@ class AIProfanityDetector:
             return False, 0.0
         
         try:
-            # Sinkaf expects a list of texts
-            result = self.sinkaf.tahmin([text])
+            is_profanity = await self.batcher.classify(text)
             
-            if result and len(result) > 0:
-                is_profanity = result[0]
-                # Try to get confidence score if available
-                confidence = getattr(result, 'confidence', 1.0) if is_profanity else 0.0
-                
-                # Apply threshold
-                is_profane = is_profanity and confidence >= confidence_threshold
-                
-                return is_profane, confidence
+            # Sinkaf only gives a verdict, so a flagged text counts as fully confident
+            confidence = 1.0 if is_profanity else 0.0
             
-            return False, 0.0
+            # Apply threshold
+            is_profane = is_profanity and confidence >= confidence_threshold
+            
+            return is_profane, confidence
             
         except Exception as e:
             self.logger.error(f"Error in AI profanity detection: {e}")
@@ -1,12 +1,22 @@
+import asyncio
 import discord
 import logging
 from discord.ext import commands
 from src.utils.core.formatting import create_embed
 from src.utils.database.connection import initialize_mongodb
+from src.core.message_pipeline import invalidate_features
+from src.ai.providers.perplexity_client import get_perplexity_pool
+from src.core.config import get_config
 
 # Configure logger
 logger = logging.getLogger('perplexity_settings')
 
+def invalidate_chat_config(bot, guild_id):
+    """Make the chat cog re-read the guild's perplexity_config after a settings change"""
+    cog = bot.get_cog('PerplexityChat') if bot else None
+    if cog is not None:
+        cog.invalidate_config(guild_id)
+
 class PerplexitySettingsView(discord.ui.View):
     """Main view for Perplexity AI settings"""
     
@@ -52,6 +62,7 @@ class PerplexitySettingsView(discord.ui.View):
                 {"$set": {"allowed_channels": selected_channels}},
                 upsert=True
             )
+            invalidate_chat_config(self.bot, interaction.guild.id)
             
             await save_interaction.response.send_message(
                 embed=create_embed(f"✅ İzin verilen kanallar güncellendi. Seçilen kanal sayısı: {len(selected_channels)}", discord.Color.green()),
@@ -108,6 +119,7 @@ class PerplexitySettingsView(discord.ui.View):
                 {"$set": {"streaming": True}},
                 upsert=True
             )
+            invalidate_chat_config(self.bot, interaction.guild.id)
             
             await enable_interaction.response.send_message(
                 embed=create_embed("✅ Akan yanıt modu etkinleştirildi. AI yanıtları gerçek zamanlı olarak gönderilecek.", discord.Color.green()),
@@ -124,6 +136,7 @@ class PerplexitySettingsView(discord.ui.View):
                 {"$set": {"streaming": False}},
                 upsert=True
             )
+            invalidate_chat_config(self.bot, interaction.guild.id)
             
             await disable_interaction.response.send_message(
                 embed=create_embed("✅ Akan yanıt modu devre dışı bırakıldı. AI yanıtları tek seferde gönderilecek.", discord.Color.green()),
@@ -196,6 +209,8 @@ class PerplexitySettingsView(discord.ui.View):
                 {"$set": {"enabled": True}},
                 upsert=True
             )
+            invalidate_chat_config(self.bot, interaction.guild.id)
+            invalidate_features(self.bot, interaction.guild.id)
             
             await enable_interaction.response.send_message(
                 embed=create_embed("✅ AI sohbet etkinleştirildi.", discord.Color.green()),
@@ -212,6 +227,8 @@ class PerplexitySettingsView(discord.ui.View):
                 {"$set": {"enabled": False}},
                 upsert=True
             )
+            invalidate_chat_config(self.bot, interaction.guild.id)
+            invalidate_features(self.bot, interaction.guild.id)
             
             await disable_interaction.response.send_message(
                 embed=create_embed("✅ AI sohbet devre dışı bırakıldı.", discord.Color.green()),
@@ -263,8 +280,8 @@ class APIKeyModal(discord.ui.Modal, title="Perplexity API Anahtarı Ayarla"):
     
     api_key = discord.ui.TextInput(
         label="API Anahtarı",
-        placeholder="pplx-xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx",
-        required=True,
+        placeholder="pplx-... (boş bırakılırsa varsayılan anahtar kullanılır)",
+        required=False,
         style=discord.TextStyle.short
     )
     
@@ -273,24 +290,42 @@ class APIKeyModal(discord.ui.Modal, title="Perplexity API Anahtarı Ayarla"):
         self.bot = bot
         self.mongo_db = initialize_mongodb()
     
+    def _replace_key(self, guild_id: str, api_key: str):
+        """Store (or with an empty key remove) the guild's key; returns the old key if no guild uses it any more"""
+        config = self.mongo_db.perplexity_config
+        old = config.find_one({"guild_id": guild_id}, {"api_key": 1}) or {}
+        if api_key:
+            config.update_one({"guild_id": guild_id}, {"$set": {"api_key": api_key}}, upsert=True)
+        else:
+            config.update_one({"guild_id": guild_id}, {"$unset": {"api_key": ""}})
+        old_key = old.get("api_key")
+        # Guilds without a key of their own share the client of the default key
+        if old_key in (api_key, get_config().external_services.perplexity_api_key):
+            return None
+        if old_key and not config.find_one({"api_key": old_key}, {"_id": 1}):
+            return old_key
+        return None
+    
     async def on_submit(self, interaction: discord.Interaction):
         try:
+            api_key = self.api_key.value.strip()
             # Validate API key format
-            if not self.api_key.value.startswith("pplx-"):
+            if api_key and not api_key.startswith("pplx-"):
                 return await interaction.response.send_message(
                     embed=create_embed("❌ Geçersiz API anahtarı formatı. Perplexity API anahtarları 'pplx-' ile başlar.", discord.Color.red()),
                     ephemeral=True
                 )
             
             # Save to database
-            await self.mongo_db.perplexity_config.update_one(
-                {"guild_id": str(interaction.guild.id)},
-                {"$set": {"api_key": self.api_key.value}},
-                upsert=True
-            )
+            old_key = await asyncio.to_thread(self._replace_key, str(interaction.guild.id), api_key)
+            invalidate_chat_config(self.bot, interaction.guild.id)
+            if old_key:
+                # The pooled client of the old key holds its session until closed
+                await get_perplexity_pool().discard(old_key)
             
+            message = "✅ API anahtarı başarıyla kaydedildi." if api_key else "✅ API anahtarı kaldırıldı, varsayılan anahtar kullanılacak."
             await interaction.response.send_message(
-                embed=create_embed("✅ API anahtarı başarıyla kaydedildi.", discord.Color.green()),
+                embed=create_embed(message, discord.Color.green()),
                 ephemeral=True
             )
             
@@ -390,6 +425,7 @@ class CreditSettingsModal(discord.ui.Modal, title="AI Kredi Ayarları"):
                 }},
                 upsert=True
             )
+            invalidate_chat_config(self.bot, interaction.guild.id)
             
             await interaction.response.send_message(
                 embed=create_embed(f"✅ Kredi ayarları güncellendi:\n• Başlangıç Kredisi: {default_credits}\n• Maksimum Kredi: {max_credits}\n• Günlük Sıfırlama: {'Evet' if daily_reset else 'Hayır'}", discord.Color.green()),
@@ -449,25 +485,14 @@ class UserCreditsModal(discord.ui.Modal, title="Üye Kredisi Ekle/Çıkar"):
                         ephemeral=True
                     )
             
-            # Get current credits
-            user_data = await self.mongo_db.perplexity_credits.find_one({
-                "guild_id": str(interaction.guild.id),
-                "user_id": str(user_id)
-            })
-            
-            current_credits = user_data["credits"] if user_data else 0
-            
-            # Calculate new credits
-            new_credits = current_credits + credits_change
-            if new_credits < 0:
-                new_credits = 0
-            
-            # Update in database
-            await self.mongo_db.perplexity_credits.update_one(
-                {"guild_id": str(interaction.guild.id), "user_id": str(user_id)},
-                {"$set": {"credits": new_credits}},
-                upsert=True
-            )
+            # Update through the chat cog's ledger so its cached balance stays right
+            chat_cog = self.bot.get_cog('PerplexityChat')
+            if chat_cog is None:
+                return await interaction.response.send_message(
+                    embed=create_embed("❌ AI sohbet modülü yüklü değil.", discord.Color.red()),
+                    ephemeral=True
+                )
+            new_credits = await chat_cog.add_credits(interaction.guild.id, user_id, credits_change, capped=False)
             
             # Create response message
             if credits_change > 0:
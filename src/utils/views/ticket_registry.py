@@ -0,0 +1,269 @@
+"""
+In-memory registry of open tickets.
+
+Keeps a write-through mirror of the ``active_tickets`` collection keyed by
+channel and by creator so ticket buttons and the "already has a ticket" check
+never have to hit MongoDB. Until the mirror could be loaded (MongoDB was down
+at startup), lookups fall back to querying the collection and the load is
+retried in the background. Ticket numbers come from a per-guild counter
+document in ``ticket_counters`` that is incremented atomically.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+
+from src.utils.database import ensure_async_db, get_async_db
+from src.utils.database.connection import DummyAsyncDatabase
+
+logger = logging.getLogger('ticket_registry')
+
+# Statuses that still count as an open ticket for the per-user limit
+OPEN_STATUSES = ("open", "assigned", "pending")
+
+# Seconds between attempts to load the registry after a failed load
+RELOAD_INTERVAL = 30.0
+
+
+class TicketRegistry:
+    """Write-through cache of open tickets keyed by channel and by creator."""
+
+    def __init__(self):
+        self._by_channel: Dict[int, Dict[str, Any]] = {}
+        self._by_creator: Dict[Tuple[int, int], Set[int]] = {}
+        self._seeded_guilds: Set[int] = set()
+        self._load_lock = asyncio.Lock()
+        self._loaded = False
+        self._reload_task: Optional[asyncio.Task] = None
+        self._retry_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def load(self, force: bool = False) -> int:
+        """Load every active ticket into memory. Returns the number of tickets loaded.
+
+        The registry stays unloaded (and lookups keep asking the database)
+        when MongoDB is unavailable.
+        """
+        async with self._load_lock:
+            if self._loaded and not force:
+                return len(self._by_channel)
+
+            mongo_db = await ensure_async_db()
+            if isinstance(mongo_db, DummyAsyncDatabase):
+                logger.warning("MongoDB unavailable, ticket registry not loaded; lookups will query the database")
+                return 0
+            tickets = await mongo_db.active_tickets.find({}).to_list(length=None)
+
+            self._by_channel.clear()
+            self._by_creator.clear()
+            for ticket in tickets:
+                self._index(ticket)
+
+            self._loaded = True
+            logger.info(f"Loaded {len(self._by_channel)} active tickets into the registry")
+            return len(self._by_channel)
+
+    def _schedule_reload(self) -> None:
+        """Retry a failed load in the background, at most every RELOAD_INTERVAL seconds."""
+        if self._reload_task is not None and not self._reload_task.done():
+            return
+        if time.monotonic() < self._retry_at:
+            return
+        self._retry_at = time.monotonic() + RELOAD_INTERVAL
+        self._reload_task = asyncio.create_task(self._reload())
+
+    async def _reload(self) -> None:
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Failed to load ticket registry: {e}")
+
+    # ------------------------------------------------------------------
+    # Lookups (no database access once loaded)
+    # ------------------------------------------------------------------
+    async def get(self, channel_id: int) -> Optional[Dict[str, Any]]:
+        """Get the ticket stored for a channel."""
+        ticket = self._by_channel.get(channel_id)
+        if ticket is not None or self._loaded:
+            return ticket
+
+        self._schedule_reload()
+        mongo_db = get_async_db()
+        ticket = await mongo_db.active_tickets.find_one({"channel_id": channel_id})
+        if ticket:
+            self._index(ticket)
+        return ticket
+
+    async def is_ticket(self, channel_id: int) -> bool:
+        """Check whether a channel belongs to an active ticket."""
+        return await self.get(channel_id) is not None
+
+    async def get_for_creator(self, guild_id: int, user_id: int,
+                              statuses: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Get the active tickets a user opened in a guild, optionally filtered by status."""
+        if self._loaded:
+            channel_ids = self._by_creator.get((guild_id, user_id), ())
+            tickets = [self._by_channel[cid] for cid in channel_ids if cid in self._by_channel]
+        else:
+            self._schedule_reload()
+            mongo_db = get_async_db()
+            tickets = await mongo_db.active_tickets.find(
+                {"guild_id": guild_id, "user_id": user_id}
+            ).to_list(length=None)
+            for ticket in tickets:
+                self._index(ticket)
+        if statuses is not None:
+            statuses = set(statuses)
+            tickets = [t for t in tickets if t.get("status") in statuses]
+        return tickets
+
+    async def count_for_creator(self, guild_id: int, user_id: int,
+                                statuses: Optional[Iterable[str]] = OPEN_STATUSES) -> int:
+        """Count the open tickets a user has in a guild."""
+        return len(await self.get_for_creator(guild_id, user_id, statuses))
+
+    # ------------------------------------------------------------------
+    # Write-through mutations
+    # ------------------------------------------------------------------
+    async def add(self, ticket_data: Dict[str, Any]):
+        """Insert a ticket into ``active_tickets`` and register it."""
+        mongo_db = get_async_db()
+        result = await mongo_db.active_tickets.insert_one(ticket_data)
+        if result.inserted_id is not None:
+            ticket_data["_id"] = result.inserted_id
+        self._index(ticket_data)
+        return result
+
+    async def update(self, channel_id: int, fields: Dict[str, Any]) -> bool:
+        """Apply a ``$set`` to a ticket and mirror it in memory."""
+        mongo_db = get_async_db()
+        result = await mongo_db.active_tickets.update_one(
+            {"channel_id": channel_id},
+            {"$set": fields}
+        )
+        ticket = self._by_channel.get(channel_id)
+        if ticket is not None:
+            ticket.update(fields)
+        return result.matched_count > 0 or ticket is not None
+
+    async def increment(self, channel_id: int, field: str, amount: int = 1,
+                        set_fields: Optional[Dict[str, Any]] = None) -> None:
+        """Apply an ``$inc`` (and optional ``$set``) to a ticket and mirror it in memory."""
+        # Skip the round-trip entirely for channels that are not tickets
+        if self._loaded and channel_id not in self._by_channel:
+            return
+
+        update: Dict[str, Any] = {"$inc": {field: amount}}
+        if set_fields:
+            update["$set"] = set_fields
+
+        mongo_db = get_async_db()
+        await mongo_db.active_tickets.update_one({"channel_id": channel_id}, update)
+
+        ticket = self._by_channel.get(channel_id)
+        if ticket is not None:
+            ticket[field] = ticket.get(field, 0) + amount
+            if set_fields:
+                ticket.update(set_fields)
+
+    async def close(self, channel_id: int, close_data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Move a ticket from ``active_tickets`` to ``closed_tickets``.
+
+        Returns the closed ticket document, or None if the channel had no ticket.
+        """
+        ticket = self._by_channel.get(channel_id)
+        mongo_db = get_async_db()
+        if ticket is None:
+            ticket = await mongo_db.active_tickets.find_one({"channel_id": channel_id})
+            if not ticket:
+                return None
+
+        closed_ticket = dict(ticket)
+        if close_data:
+            closed_ticket.update(close_data)
+
+        await mongo_db.closed_tickets.insert_one(closed_ticket)
+        if closed_ticket.get("_id") is not None:
+            await mongo_db.active_tickets.delete_one({"_id": closed_ticket["_id"]})
+        else:
+            await mongo_db.active_tickets.delete_one({"channel_id": channel_id})
+
+        self.discard(channel_id)
+        return closed_ticket
+
+    async def remove(self, channel_id: int) -> None:
+        """Delete a ticket whose channel no longer exists."""
+        mongo_db = get_async_db()
+        await mongo_db.active_tickets.delete_one({"channel_id": channel_id})
+        self.discard(channel_id)
+
+    def discard(self, channel_id: int) -> None:
+        """Drop a ticket from memory only."""
+        ticket = self._by_channel.pop(channel_id, None)
+        if ticket is None:
+            return
+        key = (ticket.get("guild_id"), ticket.get("user_id"))
+        channels = self._by_creator.get(key)
+        if channels is not None:
+            channels.discard(channel_id)
+            if not channels:
+                del self._by_creator[key]
+
+    # ------------------------------------------------------------------
+    # Ticket numbering
+    # ------------------------------------------------------------------
+    async def next_ticket_number(self, guild_id: int) -> int:
+        """Atomically reserve the next ticket number for a guild."""
+        mongo_db = get_async_db()
+        if guild_id not in self._seeded_guilds:
+            await self._seed_counter(mongo_db, guild_id)
+
+        counter = await mongo_db.ticket_counters.find_one_and_update(
+            {"_id": guild_id},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    async def _seed_counter(self, mongo_db, guild_id: int) -> None:
+        """Make sure the counter starts after any ticket numbered before the counter existed."""
+        existing = await mongo_db.ticket_counters.find_one({"_id": guild_id})
+        if existing is None:
+            highest = 0
+            for collection in (mongo_db.active_tickets, mongo_db.closed_tickets):
+                last = await collection.find_one(
+                    {"guild_id": guild_id, "ticket_number": {"$exists": True}},
+                    sort=[("ticket_number", -1)]
+                )
+                if last:
+                    highest = max(highest, last["ticket_number"])
+
+            # $max keeps this safe if several shards or handlers seed at once
+            await mongo_db.ticket_counters.update_one(
+                {"_id": guild_id},
+                {"$max": {"seq": highest}},
+                upsert=True
+            )
+        self._seeded_guilds.add(guild_id)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _index(self, ticket: Dict[str, Any]) -> None:
+        channel_id = ticket.get("channel_id")
+        if channel_id is None:
+            return
+        self.discard(channel_id)
+        self._by_channel[channel_id] = ticket
+        key = (ticket.get("guild_id"), ticket.get("user_id"))
+        self._by_creator.setdefault(key, set()).add(channel_id)
+
+
+# Global registry instance
+ticket_registry = TicketRegistry()
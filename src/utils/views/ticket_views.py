@@ -14,6 +14,7 @@ from src.utils.common import error_embed, success_embed, info_embed, warning_emb
 from discord.ext import commands
 from ...bot.constants import Colors
 from ..database.db_manager import db_manager
+from .ticket_registry import ticket_registry, OPEN_STATUSES
 
 logger = logging.getLogger('ticket_views')
 
@@ -165,12 +166,7 @@ class TicketCreateModal(discord.ui.Modal, title="Create a New Ticket"):
 
     async def on_submit(self, interaction: discord.Interaction):
         # Check ticket limits
-        mongo_db = get_async_db()
-        existing_tickets = mongo_db.active_tickets.count_documents({
-            "guild_id": interaction.guild.id,
-            "user_id": interaction.user.id,
-            "status": {"$in": [TicketStatus.OPEN, TicketStatus.ASSIGNED, TicketStatus.PENDING]}
-        })
+        existing_tickets = await ticket_registry.count_for_creator(interaction.guild.id, interaction.user.id, OPEN_STATUSES)
         if existing_tickets >= self.department.max_tickets_per_user:
             await interaction.response.send_message(
                 embed=error_embed(
@@ -268,7 +264,7 @@ class TicketCreateModal(discord.ui.Modal, title="Create a New Ticket"):
             "last_activity": datetime.utcnow(),
             "form_responses": dynamic_field_values if dynamic_field_values else None
         }
-        result = mongo_db.active_tickets.insert_one(ticket_data)
+        result = await ticket_registry.add(ticket_data)
         
         # Send initial message to the new channel
         embed = create_embed(
@@ -306,30 +302,13 @@ class TicketCreateModal(discord.ui.Modal, title="Create a New Ticket"):
     
     async def _get_next_ticket_number(self, guild_id: int) -> int:
         """Get the next ticket number for this guild."""
-        mongo_db = get_async_db()
-        # Get the highest ticket number
-        last_ticket = mongo_db.active_tickets.find_one(
-            {"guild_id": guild_id},
-            sort=[("ticket_number", -1)]
-        )
-        if last_ticket and "ticket_number" in last_ticket:
-            return last_ticket["ticket_number"] + 1
-        # Check closed tickets too
-        last_closed = mongo_db.closed_tickets.find_one(
-            {"guild_id": guild_id},
-            sort=[("ticket_number", -1)]
-        )
-        if last_closed and "ticket_number" in last_closed:
-            return last_closed["ticket_number"] + 1
-        return 1
+        return await ticket_registry.next_ticket_number(guild_id)
     
     async def _assign_staff(self, channel: discord.TextChannel, staff_member: discord.Member, ticket_id):
         """Assign a staff member to the ticket."""
-        mongo_db = get_async_db()
-        
-        mongo_db.active_tickets.update_one(
-            {"_id": ticket_id},
-            {"$set": {"assigned_staff": staff_member.id, "status": TicketStatus.ASSIGNED}}
+        await ticket_registry.update(
+            channel.id,
+            {"assigned_staff": staff_member.id, "status": TicketStatus.ASSIGNED}
         )
         
         embed = info_embed(
@@ -387,12 +366,7 @@ class TicketView(discord.ui.View):
                 return
             
             # Check if user already has an open ticket
-            existing_ticket = await mongo_db.active_tickets.find_one({
-                "guild_id": interaction.guild.id,
-                "user_id": interaction.user.id
-            })
-            
-            if existing_ticket:
+            for existing_ticket in await ticket_registry.get_for_creator(interaction.guild.id, interaction.user.id):
                 channel_id = existing_ticket.get("channel_id")
                 channel = interaction.guild.get_channel(channel_id)
                 
@@ -407,7 +381,7 @@ class TicketView(discord.ui.View):
                     return
                 else:
                     # Ticket channel was deleted, remove from database
-                    await mongo_db.active_tickets.delete_one({"_id": existing_ticket["_id"]})
+                    await ticket_registry.remove(channel_id)
             
             # Get ticket category
             category_id = settings.get("category_id")
@@ -455,7 +429,7 @@ class TicketView(discord.ui.View):
                     await ticket_channel.set_permissions(role, read_messages=True, send_messages=True)
             
             # Save to database
-            await mongo_db.active_tickets.insert_one({
+            await ticket_registry.add({
                 "guild_id": interaction.guild.id,
                 "channel_id": ticket_channel.id,
                 "user_id": interaction.user.id,
@@ -502,7 +476,7 @@ class TicketControlView(discord.ui.View):
     async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Check if user has permission (either ticket creator or support role)
         mongo_db = get_async_db()
-        ticket = await mongo_db.active_tickets.find_one({"channel_id": interaction.channel.id})
+        ticket = await ticket_registry.get(interaction.channel.id)
         
         if not ticket:
             await interaction.response.send_message("This channel is not a valid ticket.", ephemeral=True)
@@ -537,20 +511,12 @@ class ConfirmCloseView(discord.ui.View):
     
     @discord.ui.button(label="Confirm", style=discord.ButtonStyle.danger, emoji="✅")
     async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-        mongo_db = get_async_db()
-        
-        # Mark ticket as closed in database
-        mongo_db.active_tickets.update_one(
-            {"channel_id": interaction.channel.id},
-            {"$set": {"status": "closed", "closed_at": discord.utils.utcnow().isoformat()}}
+        # Mark ticket as closed and move it to the closed tickets collection
+        await ticket_registry.close(
+            interaction.channel.id,
+            {"status": "closed", "closed_at": discord.utils.utcnow().isoformat()}
         )
         
-        # Move to closed tickets collection
-        ticket = await mongo_db.active_tickets.find_one({"channel_id": interaction.channel.id})
-        if ticket:
-            await mongo_db.closed_tickets.insert_one(ticket)
-            await mongo_db.active_tickets.delete_one({"_id": ticket["_id"]})
-        
         # Inform users
         embed = discord.Embed(
             title="Ticket Closed",
@@ -863,10 +829,8 @@ class AdvancedTicketManagementView(discord.ui.View):
     @discord.ui.button(label="Claim", style=discord.ButtonStyle.success, emoji="🎯", custom_id="ticket_claim", row=0)
     async def claim_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Claim the ticket."""
-        mongo_db = get_async_db()
-        
         # Check if user has permission
-        ticket = await mongo_db.active_tickets.find_one({"channel_id": interaction.channel.id})
+        ticket = await ticket_registry.get(interaction.channel.id)
         if not ticket:
             await interaction.response.send_message("Ticket not found.", ephemeral=True)
             return
@@ -881,9 +845,9 @@ class AdvancedTicketManagementView(discord.ui.View):
             return
         
         # Assign to current user
-        await mongo_db.active_tickets.update_one(
-            {"_id": ticket["_id"]},
-            {"$set": {"assigned_staff": interaction.user.id, "status": TicketStatus.ASSIGNED}}
+        await ticket_registry.update(
+            interaction.channel.id,
+            {"assigned_staff": interaction.user.id, "status": TicketStatus.ASSIGNED}
         )
         
         embed = success_embed(
@@ -901,7 +865,7 @@ class AdvancedTicketManagementView(discord.ui.View):
     async def transfer_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Transfer ticket to another staff member."""
         mongo_db = get_async_db()
-        ticket = await mongo_db.active_tickets.find_one({"channel_id": interaction.channel.id})
+        ticket = await ticket_registry.get(interaction.channel.id)
         
         if not ticket:
             await interaction.response.send_message("Ticket not found.", ephemeral=True)
@@ -1011,15 +975,11 @@ class PrioritySelect(discord.ui.Select):
     
     async def callback(self, interaction: discord.Interaction):
         new_priority = self.values[0]
-        mongo_db = get_async_db()
         
         # Update ticket priority
-        mongo_db.active_tickets.update_one(
-            {"channel_id": interaction.channel.id},
-            {"$set": {"priority": new_priority}}
-        )
+        updated = await ticket_registry.update(interaction.channel.id, {"priority": new_priority})
         
-        if result.modified_count > 0:
+        if updated:
             # Update channel name with new priority emoji
             priority_emoji = TicketPriority.EMOJIS.get(new_priority)
             current_name = interaction.channel.name
@@ -1095,10 +1055,9 @@ class StaffTransferSelect(discord.ui.Select):
             await interaction.response.send_message("Staff member not found.", ephemeral=True)
             return
         
-        mongo_db = get_async_db()
-        await mongo_db.active_tickets.update_one(
-            {"_id": self.ticket_id},
-            {"$set": {"assigned_staff": new_staff_id, "status": TicketStatus.ASSIGNED}}
+        await ticket_registry.update(
+            interaction.channel.id,
+            {"assigned_staff": new_staff_id, "status": TicketStatus.ASSIGNED}
         )
         
         embed = success_embed(
@@ -1131,7 +1090,7 @@ class TicketCloseModal(discord.ui.Modal, title="Close Ticket"):
         mongo_db = get_async_db()
         
         # Get ticket data
-        ticket = await mongo_db.active_tickets.find_one({"channel_id": interaction.channel.id})
+        ticket = await ticket_registry.get(interaction.channel.id)
         if not ticket:
             await interaction.response.send_message("Ticket not found.", ephemeral=True)
             return
@@ -1152,10 +1111,7 @@ class TicketCloseModal(discord.ui.Modal, title="Close Ticket"):
             "solution": self.solution.value
         }
         
-        await mongo_db.active_tickets.update_one(
-            {"_id": ticket["_id"]},
-            {"$set": close_data}
-        )
+        await ticket_registry.update(interaction.channel.id, close_data)
         
         # Send closing message
         embed = warning_embed(
@@ -1176,10 +1132,7 @@ class TicketCloseModal(discord.ui.Modal, title="Close Ticket"):
         await asyncio.sleep(10)
         
         # Move to closed tickets
-        closed_ticket = ticket.copy()
-        closed_ticket.update(close_data)
-        await mongo_db.closed_tickets.insert_one(closed_ticket)
-        await mongo_db.active_tickets.delete_one({"_id": ticket["_id"]})
+        await ticket_registry.close(interaction.channel.id, close_data)
         
         try:
             await interaction.channel.delete(reason=f"Ticket closed by {interaction.user}")
@@ -1405,16 +1358,12 @@ class TicketAutoClose:
                 "auto_closed": True
             }
             
-            await self.db.active_tickets.update_one(
-                {"_id": ticket["_id"]},
-                {"$set": close_data}
-            )
-            
             # Move to closed tickets
             closed_ticket = ticket.copy()
             closed_ticket.update(close_data)
             await self.db.closed_tickets.insert_one(closed_ticket)
             await self.db.active_tickets.delete_one({"_id": ticket["_id"]})
+            ticket_registry.discard(ticket.get("channel_id"))
             
             # Try to delete the channel
             from discord.utils import get
@@ -1553,16 +1502,14 @@ class TicketStatsView(discord.ui.View):
 # Add utility functions for ticket management
 async def update_ticket_activity(channel_id: int):
     """Update last activity time for a ticket."""
-    mongo_db = get_async_db()
-    await mongo_db.active_tickets.update_one(
-        {"channel_id": channel_id},
-        {"$set": {"last_activity": datetime.utcnow()}}
-    )
+    await ticket_registry.update(channel_id, {"last_activity": datetime.utcnow()})
 
 async def increment_ticket_messages(channel_id: int):
     """Increment message count for a ticket."""
-    mongo_db = get_async_db()
-    await mongo_db.active_tickets.update_one(
-        {"channel_id": channel_id},
-        {"$inc": {"messages_count": 1}}
+    await ticket_registry.increment(channel_id, "messages_count")
+
+async def record_ticket_message(channel_id: int):
+    """Bump message count and last activity for a ticket in a single write."""
+    await ticket_registry.increment(
+        channel_id, "messages_count", set_fields={"last_activity": datetime.utcnow()}
     ) 
@@ -0,0 +1,389 @@
+"""
+Synthetic Discord objects and in-process Mongo/Redis stand-ins for the benchmarks.
+
+The fakes carry just the attributes and coroutines the cogs touch on their
+hot paths. Sends, edits and role changes are counted instead of going to
+Discord, so a benchmark measures the bot's own work.
+"""
+
+import asyncio
+import io
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import discord
+from PIL import Image
+
+_ids = itertools.count(1_100_000_000_000_000_000)
+
+
+def snowflake() -> int:
+    return next(_ids)
+
+
+def _png_bytes(size: int = 128) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (size, size), (88, 101, 242, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+AVATAR_PNG = _png_bytes()
+
+
+class Counters:
+    """Side effects the cogs asked Discord for."""
+
+    def __init__(self):
+        self.sends = 0
+        self.edits = 0
+        self.role_edits = 0
+        self.fetches = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class FakeAsset:
+    def __init__(self, key: int):
+        self.url = f"https://cdn.discordapp.com/avatars/{key}/avatar.png"
+        self.key = str(key)
+
+    def with_size(self, size: int) -> 'FakeAsset':
+        return self
+
+    async def read(self) -> bytes:
+        return AVATAR_PNG
+
+
+class FakeRole:
+    def __init__(self, guild: 'FakeGuild', name: str, position: int = 1):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.position = position
+        self.mention = f"<@&{self.id}>"
+        self.managed = False
+        self.color = discord.Color.default()
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeMember:
+    def __init__(self, guild: 'FakeGuild', name: str, bot: bool = False):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.global_name = name
+        self.discriminator = "0"
+        self.bot = bot
+        self.roles: List[FakeRole] = [guild.default_role]
+        self.avatar = FakeAsset(self.id)
+        self.display_avatar = self.avatar
+        self.default_avatar = self.avatar
+        self.mention = f"<@{self.id}>"
+        self.created_at = datetime.now(timezone.utc) - timedelta(days=400)
+        self.joined_at = datetime.now(timezone.utc)
+        self.activities = ()
+        self.status = discord.Status.online
+        self.voice = None
+        self.guild_permissions = discord.Permissions.none()
+        self.top_role = guild.default_role
+
+    def __str__(self) -> str:
+        return self.name
+
+    async def add_roles(self, *roles, reason: Optional[str] = None, atomic: bool = True) -> None:
+        self.guild.counters.role_edits += 1
+        self.roles.extend(role for role in roles if role not in self.roles)
+
+    async def remove_roles(self, *roles, reason: Optional[str] = None, atomic: bool = True) -> None:
+        self.guild.counters.role_edits += 1
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def edit(self, *, roles=None, reason: Optional[str] = None, **kwargs) -> None:
+        self.guild.counters.role_edits += 1
+        if roles is not None:
+            wanted = {role.id for role in roles}
+            self.roles = [role for role in self.guild.roles.values() if role.id in wanted]
+
+
+class _Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeChannel:
+    def __init__(self, guild: 'FakeGuild', name: str):
+        self.id = snowflake()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.type = discord.ChannelType.text
+        self.members: List[FakeMember] = []
+        self.messages: Dict[int, 'FakeMessage'] = {}
+        # Only channels whose bot messages get fetched back keep them
+        self.keep_sent = False
+
+    def __str__(self) -> str:
+        return self.name
+
+    def typing(self) -> _Typing:
+        return _Typing()
+
+    def permissions_for(self, member) -> discord.Permissions:
+        return discord.Permissions.all()
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> 'FakeMessage':
+        self.guild.counters.sends += 1
+        return FakeMessage(self, self.guild.me, content or "", remember=self.keep_sent)
+
+    async def fetch_message(self, message_id: int) -> 'FakeMessage':
+        self.guild.counters.fetches += 1
+        message = self.messages.get(message_id)
+        if message is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Message")
+        return message
+
+    async def webhooks(self) -> list:
+        return []
+
+    async def create_webhook(self, name: str, **kwargs) -> 'FakeWebhook':
+        return FakeWebhook(self)
+
+
+class FakeWebhook:
+    def __init__(self, channel: FakeChannel):
+        self.id = snowflake()
+        self.channel = channel
+        self.name = "Contro Logs"
+
+    async def send(self, *args, **kwargs) -> None:
+        self.channel.guild.counters.sends += 1
+
+
+class _FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "fake"
+
+
+class FakeReaction:
+    def __init__(self, emoji: str, count: int):
+        self.emoji = emoji
+        self.count = count
+
+
+class FakeMessage:
+    def __init__(self, channel: FakeChannel, author: FakeMember, content: str, remember: bool = True):
+        self.id = snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.attachments: list = []
+        self.embeds: list = []
+        self.reactions: List[FakeReaction] = []
+        self.mentions: list = []
+        self.role_mentions: list = []
+        self.stickers: list = []
+        self.reference = None
+        self.type = discord.MessageType.default
+        self.created_at = datetime.now(timezone.utc)
+        self.jump_url = f"https://discord.com/channels/{self.guild.id}/{channel.id}/{self.id}"
+        if remember:
+            channel.messages[self.id] = self
+
+    async def reply(self, content: Optional[str] = None, **kwargs) -> 'FakeMessage':
+        return await self.channel.send(content, **kwargs)
+
+    async def edit(self, **kwargs) -> 'FakeMessage':
+        self.guild.counters.edits += 1
+        return self
+
+    async def delete(self, **kwargs) -> None:
+        self.channel.messages.pop(self.id, None)
+
+    async def add_reaction(self, emoji) -> None:
+        self.reactions.append(FakeReaction(str(emoji), 1))
+
+
+class FakeGuild:
+    def __init__(self, name: str = "Benchmark Guild", counters: Optional[Counters] = None):
+        self.id = snowflake()
+        self.name = name
+        self.counters = counters or Counters()
+        self.members: Dict[int, FakeMember] = {}
+        self.channels: Dict[int, FakeChannel] = {}
+        self.roles: Dict[int, FakeRole] = {}
+        self.default_role = FakeRole(self, "@everyone", position=0)
+        self.roles[self.default_role.id] = self.default_role
+        self.icon = None
+        self.voice_channels: List[FakeChannel] = []
+        self.text_channels: List[FakeChannel] = []
+        self.me = FakeMember(self, "Contro", bot=True)
+        self.owner_id = self.me.id
+
+    @property
+    def member_count(self) -> int:
+        return len(self.members)
+
+    def add_member(self, name: str, bot: bool = False) -> FakeMember:
+        member = FakeMember(self, name, bot=bot)
+        self.members[member.id] = member
+        return member
+
+    def add_channel(self, name: str) -> FakeChannel:
+        channel = FakeChannel(self, name)
+        self.channels[channel.id] = channel
+        self.text_channels.append(channel)
+        return channel
+
+    def add_role(self, name: str, position: int = 1) -> FakeRole:
+        role = FakeRole(self, name, position)
+        self.roles[role.id] = role
+        return role
+
+    def get_member(self, member_id: int) -> Optional[FakeMember]:
+        return self.members.get(int(member_id))
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(int(channel_id))
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles.get(int(role_id))
+
+    async def fetch_member(self, member_id: int) -> FakeMember:
+        self.counters.fetches += 1
+        member = self.get_member(member_id)
+        if member is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+        return member
+
+
+class FakeBot:
+    """Enough of ``commands.Bot`` for cogs that are constructed directly."""
+
+    def __init__(self, async_db=None):
+        self.user = FakeMember.__new__(FakeMember)
+        self.user.id = snowflake()
+        self.user.name = "Contro"
+        self.user.bot = True
+        self.user.avatar = FakeAsset(self.user.id)
+        self.user.display_avatar = self.user.avatar
+        self.user.mention = f"<@{self.user.id}>"
+        self.async_db = async_db
+        self.sync_db = None
+        self.guilds: List[FakeGuild] = []
+        self.cogs: Dict[str, Any] = {}
+        self.loop = asyncio.get_event_loop()
+        self.latency = 0.05
+        self.dispatched: Dict[str, int] = {}
+
+    def add_guild(self, guild: FakeGuild) -> FakeGuild:
+        self.guilds.append(guild)
+        return guild
+
+    def get_guild(self, guild_id: int) -> Optional[FakeGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        for guild in self.guilds:
+            channel = guild.get_channel(channel_id)
+            if channel is not None:
+                return channel
+        return None
+
+    def get_user(self, user_id: int) -> Optional[FakeMember]:
+        for guild in self.guilds:
+            member = guild.get_member(user_id)
+            if member is not None:
+                return member
+        return None
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def is_ready(self) -> bool:
+        return True
+
+    async def wait_until_ready(self) -> None:
+        return None
+
+    def dispatch(self, event: str, *args, **kwargs) -> None:
+        self.dispatched[event] = self.dispatched.get(event, 0) + 1
+
+
+def reaction_payload(message: FakeMessage, user: FakeMember, emoji: str = "⭐"):
+    """A stand-in for ``discord.RawReactionActionEvent``."""
+    return _Payload(
+        guild_id=message.guild.id,
+        channel_id=message.channel.id,
+        message_id=message.id,
+        user_id=user.id,
+        member=user,
+        emoji=discord.PartialEmoji(name=emoji),
+        event_type="REACTION_ADD",
+    )
+
+
+def raw_delete_payload(message: FakeMessage):
+    """A stand-in for ``discord.RawMessageDeleteEvent``."""
+    return _Payload(guild_id=message.guild.id, channel_id=message.channel.id,
+                    message_id=message.id, cached_message=None)
+
+
+class _Payload:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeSinkaf:
+    """Stand-in for the Sinkaf model when it is not installed.
+
+    ``tahmin`` costs a fixed overhead per call plus a little per text, spent
+    off the GIL like the real model's native code, so batching shows up in the
+    numbers the way it does with Sinkaf.
+    """
+
+    def __init__(self, call_seconds: float = 0.0005, text_seconds: float = 0.00002):
+        self.call_seconds = call_seconds
+        self.text_seconds = text_seconds
+        self.calls = 0
+
+    def tahmin(self, texts):
+        import time
+        self.calls += 1
+        time.sleep(self.call_seconds + self.text_seconds * len(texts))
+        return [("kötü" in text) for text in texts]
+
+
+# ----------------------------------------------------------------------
+# Database and cache stand-ins
+# ----------------------------------------------------------------------
+def sync_database(name: str = "contro_bench"):
+    """A pymongo-compatible in-memory database."""
+    import mongomock
+    return mongomock.MongoClient()[name]
+
+
+def async_database(name: str = "contro_bench"):
+    """A motor-compatible in-memory database."""
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()[name]
+
+
+async def install_fake_cache():
+    """Point the core cache manager at fakeredis."""
+    import fakeredis
+    from src.core import cache
+
+    manager = cache.CacheManager()
+    manager.redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    cache._cache_manager = manager
+    return manager
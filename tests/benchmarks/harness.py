@@ -0,0 +1,124 @@
+"""
+Timing harness for the benchmarks.
+
+A scenario is an async setup function that returns a ``handle(i)`` coroutine
+function; the harness calls it once per synthetic event. Latency is measured
+per event, allocations are measured in a separate pass under tracemalloc so
+they do not slow the timed pass down.
+"""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Handler = Callable[[int], Awaitable[Any]]
+Setup = Callable[[], Awaitable[Handler]]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    events: int
+    seconds: float
+    events_per_second: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+    peak_kib_per_event: float
+    retained_bytes_per_event: float
+    side_effects: Dict[str, int] = field(default_factory=dict)
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_scenario(name: str, setup: Setup, events: int, warmup: int = 50,
+                       allocation_events: int = 200, side_effects: Optional[Callable[[], Dict[str, int]]] = None
+                       ) -> BenchmarkResult:
+    """Time ``events`` calls of the scenario's handler after ``warmup`` untimed ones."""
+    handle = await setup()
+
+    for i in range(warmup):
+        await handle(i)
+
+    gc.collect()
+    latencies: List[float] = []
+    started = time.perf_counter()
+    for i in range(warmup, warmup + events):
+        event_started = time.perf_counter()
+        await handle(i)
+        latencies.append(time.perf_counter() - event_started)
+    elapsed = time.perf_counter() - started
+
+    # Allocation pass: peak is per event, retained is what the whole pass kept
+    peaks: List[int] = []
+    offset = warmup + events
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for i in range(offset, offset + allocation_events):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await handle(i)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return BenchmarkResult(
+        name=name,
+        events=events,
+        seconds=round(elapsed, 4),
+        events_per_second=round(events / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(_percentile(latencies, 0.50) * 1000, 4),
+        p99_ms=round(_percentile(latencies, 0.99) * 1000, 4),
+        max_ms=round(latencies[-1] * 1000, 4) if latencies else 0.0,
+        peak_kib_per_event=round(statistics.fmean(peaks) / 1024, 2) if peaks else 0.0,
+        retained_bytes_per_event=round((retained - baseline) / allocation_events, 1) if allocation_events else 0.0,
+        side_effects=side_effects() if side_effects else {},
+    )
+
+
+def save_results(results: List[BenchmarkResult], directory: str) -> str:
+    """Write results with some environment details to a timestamped JSON file."""
+    os.makedirs(directory, exist_ok=True)
+    payload = {
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [asdict(result) for result in results],
+    }
+    path = os.path.join(directory, f"benchmarks-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+
+def compare(results: List[BenchmarkResult], baseline_path: str, tolerance: float = 0.2) -> List[str]:
+    """Describe scenarios whose throughput dropped by more than ``tolerance`` against a saved run."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {entry['name']: entry for entry in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if not previous or not previous['events_per_second']:
+            continue
+        change = result.events_per_second / previous['events_per_second'] - 1
+        if change < -tolerance:
+            regressions.append(
+                f"{result.name}: {previous['events_per_second']:.0f} -> {result.events_per_second:.0f} events/s "
+                f"({change:+.0%})"
+            )
+    return regressions
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Run the gateway hot path benchmarks offline.
+
+    python tests/benchmarks/run_benchmarks.py
+    python tests/benchmarks/run_benchmarks.py --events 5000 --only levelling_messages
+    python tests/benchmarks/run_benchmarks.py --baseline tests/benchmarks/results/<previous>.json
+
+Results are printed as a table and saved to tests/benchmarks/results/.
+With ``--baseline`` the run exits non-zero when a scenario's throughput
+dropped by more than ``--tolerance`` against the saved run.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from tests.benchmarks.harness import compare, run_scenario, save_results  # noqa: E402
+from tests.benchmarks.scenarios import SCENARIOS, World, prepare, scratch_directory  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+async def run_all(names, events: int, warmup: int, allocation_events: int):
+    await prepare()
+    results = []
+    with open(os.devnull, "w") as devnull:
+        for name in names:
+            world = World()
+            try:
+                # Some cogs print on every event; keep that out of the report
+                with contextlib.redirect_stdout(devnull):
+                    result = await run_scenario(
+                        name, lambda: SCENARIOS[name](world), events, warmup=warmup,
+                        allocation_events=allocation_events, side_effects=world.side_effects,
+                    )
+            finally:
+                await world.close()
+            results.append(result)
+            print(
+                f"{result.name:<26} {result.events_per_second:>10.1f} ev/s  "
+                f"p50 {result.p50_ms:>8.3f} ms  p99 {result.p99_ms:>8.3f} ms  "
+                f"peak {result.peak_kib_per_event:>8.2f} KiB/ev  retained {result.retained_bytes_per_event:>8.1f} B/ev"
+            )
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=2000, help="timed events per scenario")
+    parser.add_argument("--warmup", type=int, default=100, help="untimed events before timing")
+    parser.add_argument("--allocation-events", type=int, default=200, help="events traced for allocations")
+    parser.add_argument("--only", action="append", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--baseline", help="saved results to compare throughput against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput drop against the baseline")
+    parser.add_argument("--log-level", default="WARNING", help="log level for the bot's loggers while running")
+    parser.add_argument("--no-save", action="store_true", help="do not write a results file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    with scratch_directory():
+        results = asyncio.run(run_all(args.only or list(SCENARIOS), args.events, args.warmup, args.allocation_events))
+
+    if not args.no_save:
+        print(f"\nSaved results to {save_results(results, RESULTS_DIR)}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Benchmark scenarios for the gateway hot paths.
+
+Each scenario builds the real cog against a ``World`` (fake bot, guild,
+members and in-memory Mongo/Redis) and returns a ``handle(i)`` coroutine that
+feeds it the i-th synthetic event the same way the bot would: messages go
+through the message pipeline, deletes through the message cache, reactions
+and joins straight to the cog listeners.
+"""
+
+import asyncio
+import contextlib
+import os
+import tempfile
+from typing import Any, Awaitable, Callable, Dict, List
+from unittest import mock
+
+from src.core.message_cache import MessageCache
+from src.core.message_pipeline import Feature, MessagePipeline
+
+from .fakes import (
+    FakeBot, FakeGuild, FakeMessage, FakeReaction, FakeSinkaf, async_database, install_fake_cache,
+    raw_delete_payload, reaction_payload, sync_database,
+)
+
+# A mix of chat, commands and keywords the seeded custom commands react to
+CONTENTS = (
+    "hello everyone",
+    "anyone up for a game tonight?",
+    "!rules",
+    "lol",
+    "I just finished the new season, no spoilers but the ending was something else",
+    "merhaba",
+    "https://example.com/some/link",
+    "ok",
+    "can a mod check the ticket I opened earlier, it has been a while",
+    "gg",
+)
+
+
+class World:
+    """One guild worth of fakes shared by a scenario."""
+
+    def __init__(self, members: int = 500, pool: int = 1024):
+        self.sync_db = sync_database()
+        self.async_db = async_database()
+        self.bot = FakeBot(self.async_db)
+        self.bot.sync_db = self.sync_db
+        self.guild = self.bot.add_guild(FakeGuild())
+        self.channel = self.guild.add_channel("general")
+        self.log_channel = self.guild.add_channel("logs")
+        self.members = [self.guild.add_member(f"member{i}") for i in range(members)]
+        self.messages = [
+            FakeMessage(self.channel, self.members[i % members], CONTENTS[i % len(CONTENTS)])
+            for i in range(pool)
+        ]
+        self.pipeline = MessagePipeline(self.bot)
+        self.bot.message_pipeline = self.pipeline
+        self.message_cache = MessageCache()
+        self.bot.message_cache = self.message_cache
+        self._cleanups: List[Callable[[], Any]] = []
+
+    def message(self, i: int) -> FakeMessage:
+        return self.messages[i % len(self.messages)]
+
+    def on_close(self, callback: Callable[[], Any]) -> None:
+        self._cleanups.append(callback)
+
+    def side_effects(self) -> Dict[str, int]:
+        effects = self.guild.counters.as_dict()
+        effects.update(self.bot.dispatched)
+        return effects
+
+    async def close(self) -> None:
+        for callback in reversed(self._cleanups):
+            result = callback()
+            if hasattr(result, "__await__"):
+                await result
+
+
+@contextlib.contextmanager
+def patched_mongodb(module, db):
+    """Constructors that call ``initialize_mongodb()`` get ``db`` instead of a real connection."""
+    with mock.patch.object(module, "initialize_mongodb", return_value=db):
+        yield
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    """Run in a temporary working directory, since cogs create data/ and resources/ folders."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="contro-bench-") as path:
+        os.chdir(path)
+        # The invites cog opens logs/invites.log when src.cogs.utility is imported,
+        # and the welcomer renders into data/Temp over data/Backgrounds
+        for folder in ("logs", os.path.join("data", "Temp"), os.path.join("data", "Backgrounds")):
+            os.makedirs(folder, exist_ok=True)
+        try:
+            yield path
+        finally:
+            os.chdir(previous)
+
+
+# ----------------------------------------------------------------------
+# Message pipeline
+# ----------------------------------------------------------------------
+async def levelling_messages(world: World):
+    """Message XP through the pipeline, with most members off cooldown."""
+    from src.cogs.community.leveling import Levelling
+
+    await world.async_db.levelling_settings.insert_one({
+        "guild_id": world.guild.id,
+        "enabled": True,
+        "message_xp_enabled": True,
+        "level_up_notifications": True,
+        "level_up_channel_id": world.channel.id,
+        "xp_multiplier": 1.0,
+        "cooldown_seconds": 60,
+    })
+    cog = Levelling(world.bot)
+    world.on_close(cog.check_voice_activity.cancel)
+    await cog.cog_load()
+
+    async def handle(i: int):
+        await world.pipeline.dispatch(world.message(i))
+    return handle
+
+
+async def custom_command_messages(world: World):
+    """Text commands and auto-responses matched against every message."""
+    from src.cogs.utility.custom_commands_manager import CustomCommandsManager
+
+    await world.async_db.custom_commands.insert_one({
+        "guild_id": str(world.guild.id),
+        "system_enabled": True,
+        "commands": [
+            {
+                "id": "rules",
+                "type": "text_command",
+                "enabled": True,
+                "trigger": {"prefix": "!rules"},
+                "permissions": {"everyone": True},
+                "response": {"type": "text", "content": "Read the rules, {user}"},
+            },
+            {
+                "id": "greeting",
+                "type": "auto_response",
+                "enabled": True,
+                "trigger": {"keywords": ["hello", "merhaba"]},
+                "cooldown": {"enabled": True, "seconds": 30},
+                "permissions": {"everyone": True},
+                "response": {"type": "text", "content": "Hi {user_mention}, welcome to {server_name}!"},
+            },
+        ],
+    })
+    cog = CustomCommandsManager(world.bot)
+    cog.mongo_db = world.async_db
+    world.on_close(lambda: cog.scheduler.shutdown(wait=False))
+    world.pipeline.register("custom_commands", Feature.CUSTOM_COMMANDS, cog.handle_message, cog.has_message_commands)
+
+    async def handle(i: int):
+        await world.pipeline.dispatch(world.message(i))
+    return handle
+
+
+async def autorole_messages(world: World):
+    """Message counting with message count rules configured."""
+    from src.cogs.community.autorole import AutoRole
+    from src.utils.community.generic.activity_counters import ActivityCounters
+
+    roles = [(count, world.guild.add_role(f"{count} messages")) for count in (5, 25, 100)]
+    await world.async_db.autorole_settings.insert_one({"guild_id": str(world.guild.id), "enabled": True})
+    await world.async_db.autorole_rules.insert_many([
+        {
+            "guild_id": str(world.guild.id),
+            "trigger": "message_count",
+            "enabled": True,
+            "condition": {"count": count},
+            "role_id": str(role.id),
+        }
+        for count, role in roles
+    ])
+    cog = AutoRole(world.bot)
+    cog._autorole_db = world.async_db
+    cog.counters = ActivityCounters(world.async_db)
+    world.on_close(cog.role_engine.stop)
+    world.pipeline.register("autorole", Feature.AUTOROLE, cog.handle_message, cog.counts_messages)
+
+    async def handle(i: int):
+        await world.pipeline.dispatch(world.message(i))
+    return handle
+
+
+# ----------------------------------------------------------------------
+# Listeners
+# ----------------------------------------------------------------------
+async def logging_deletes(world: World):
+    """Raw delete through the message cache into the message log."""
+    from src.cogs.moderation import logging as logging_cog
+
+    world.sync_db.logger.insert_one({
+        "guild_id": world.guild.id,
+        "enabled": True,
+        "channel_id": str(world.log_channel.id),
+        "message_channel_id": str(world.log_channel.id),
+        "events": {"message_delete": True},
+    })
+    with patched_mongodb(logging_cog, world.sync_db):
+        cog = logging_cog.EventLogger(world.bot)
+
+    async def handle(i: int):
+        message = world.message(i)
+        world.message_cache.add(message)
+        payload = raw_delete_payload(message)
+        record = world.message_cache.remove(payload.guild_id, payload.message_id)
+        await cog.on_cached_message_delete(payload, record)
+    return handle
+
+
+async def starboard_reactions(world: World):
+    """Star reactions that cross the threshold, then keep updating the post."""
+    from src.cogs.utility import starboard as starboard_cog
+
+    board = world.guild.add_channel("starboard")
+    board.keep_sent = True
+    world.sync_db.starboard.insert_one({
+        "guild_id": str(world.guild.id),
+        "enabled": True,
+        "channel_id": str(board.id),
+        "emoji": "⭐",
+        "threshold": 3,
+        "self_star": False,
+    })
+    with patched_mongodb(starboard_cog, world.sync_db):
+        cog = starboard_cog.Starboard(world.bot)
+
+    starred = world.messages[:50]
+    stargazers = world.members[-10:]
+
+    async def handle(i: int):
+        message = starred[i % len(starred)]
+        message.reactions = [FakeReaction("⭐", 3 + i // len(starred))]
+        await cog.on_raw_reaction_add(reaction_payload(message, stargazers[i % len(stargazers)]))
+    return handle
+
+
+async def welcomer_joins(world: World):
+    """Member joins with a welcome channel configured."""
+    from src.cogs.community import welcome
+
+    world.sync_db.welcomer.insert_one({
+        "guild_id": str(world.guild.id),
+        "enabled": True,
+        "channel_id": str(world.channel.id),
+        "description": "Welcome {mention} to {server}! You are our {member_count}th member.",
+    })
+    with patched_mongodb(welcome, world.sync_db):
+        cog = welcome.Welcomer(world.bot)
+
+    async def handle(i: int):
+        member = world.guild.add_member(f"newcomer{i}")
+        await cog.on_member_join(member)
+        # Keep the guild size steady so every join costs the same
+        world.guild.members.pop(member.id, None)
+    return handle
+
+
+# Messages arriving together in one profanity benchmark event
+PROFANITY_BURST = 64
+
+
+def profanity_batches(max_batch: int):
+    """Bursts of distinct messages through the batched AI profanity detector."""
+    async def scenario(world: World):
+        from src.utils.views import ai_moderation
+
+        try:
+            from sinkaf import Sinkaf
+            model = Sinkaf()
+        except ImportError:
+            model = FakeSinkaf()
+        detector = ai_moderation.AIProfanityDetector(model=model, max_batch=max_batch)
+        world.on_close(detector.batcher.close)
+
+        async def handle(i: int):
+            # Unique texts, so every message reaches the model instead of the verdict cache
+            await asyncio.gather(*(
+                detector.detect_profanity(f"{CONTENTS[j % len(CONTENTS)]} #{i}-{j}")
+                for j in range(PROFANITY_BURST)
+            ))
+        return handle
+    return scenario
+
+
+Scenario = Callable[[World], Awaitable[Callable[[int], Awaitable[Any]]]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "levelling_messages": levelling_messages,
+    "custom_command_messages": custom_command_messages,
+    "autorole_messages": autorole_messages,
+    "logging_deletes": logging_deletes,
+    "starboard_reactions": starboard_reactions,
+    "welcomer_joins": welcomer_joins,
+    "profanity_batch_1": profanity_batches(1),
+    "profanity_batch_16": profanity_batches(16),
+    "profanity_batch_64": profanity_batches(64),
+}
+
+
+async def prepare() -> None:
+    """Shared setup for every scenario run in this process."""
+    await install_fake_cache()
@@ -0,0 +1,42 @@
+"""
+Smoke runs of the benchmark scenarios with a handful of events, so the suite
+keeps working as the cogs change. Real numbers come from run_benchmarks.py.
+"""
+
+import asyncio
+import contextlib
+import os
+
+import pytest
+
+pytest.importorskip("mongomock_motor")
+pytest.importorskip("fakeredis")
+
+from tests.benchmarks.harness import run_scenario  # noqa: E402
+from tests.benchmarks.scenarios import SCENARIOS, World, prepare, scratch_directory  # noqa: E402
+
+# Scenarios whose events must reach Discord on every run
+EXPECTED_SENDS = {"custom_command_messages", "logging_deletes", "starboard_reactions", "welcomer_joins"}
+
+
+async def _run(name: str):
+    await prepare()
+    world = World(members=20, pool=64)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return await run_scenario(name, lambda: SCENARIOS[name](world), events=20, warmup=2,
+                                      allocation_events=5, side_effects=world.side_effects)
+    finally:
+        await world.close()
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_scenario_runs(name):
+    with scratch_directory():
+        result = asyncio.run(_run(name))
+
+    assert result.events == 20
+    assert result.events_per_second > 0
+    assert result.p50_ms <= result.p99_ms <= result.max_ms
+    if name in EXPECTED_SENDS:
+        assert result.side_effects["sends"] > 0
@@ -0,0 +1,97 @@
+"""
+CommandSyncManager: the tree is only uploaded when its payload changed since
+the last stored sync, and diff() names what changed. The state is kept in
+Mongo, and on disk while the database is unavailable.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import mongomock
+from discord import app_commands
+
+from src.core.command_sync import CommandSyncManager, FileSyncStore, MongoSyncStore
+from src.utils.database.connection import DummySyncDatabase
+
+
+def make_bot():
+    async def run():
+        client = discord.Client(intents=discord.Intents.none())
+        tree = app_commands.CommandTree(client)
+        synced = []
+
+        async def sync(guild=None):
+            synced.append(guild)
+            return []
+
+        tree.sync = sync
+        return SimpleNamespace(application_id=1, tree=tree, synced=synced)
+    return asyncio.run(run())
+
+
+def add_command(tree, name, description="test"):
+    async def callback(interaction: discord.Interaction):
+        pass
+    tree.add_command(app_commands.Command(name=name, description=description, callback=callback), override=True)
+
+
+def test_sync_only_when_commands_changed(tmp_path):
+    bot = make_bot()
+    add_command(bot.tree, "ping")
+    add_command(bot.tree, "help")
+    path = str(tmp_path / "sync.json")
+
+    async def run():
+        manager = CommandSyncManager(bot, FileSyncStore(path), sync_cooldown=0)
+        first = await manager.sync()
+        assert first.synced and first.diff.added == ["help", "ping"]
+
+        # A restart with the same commands reads the stored hash and skips the upload
+        restarted = CommandSyncManager(bot, FileSyncStore(path), sync_cooldown=0)
+        second = await restarted.sync()
+        assert not second.synced and second.reason == "unchanged"
+        assert len(bot.synced) == 1
+
+        bot.tree.remove_command("help")
+        add_command(bot.tree, "ping", description="changed")
+        add_command(bot.tree, "stats")
+        diff = await restarted.diff()
+        assert (diff.added, diff.removed, diff.changed) == (["stats"], ["help"], ["ping"])
+        assert (await restarted.sync()).synced
+        assert len(bot.synced) == 2
+
+    asyncio.run(run())
+
+
+def test_global_sync_cooldown_and_force(tmp_path):
+    bot = make_bot()
+    add_command(bot.tree, "ping")
+
+    async def run():
+        manager = CommandSyncManager(bot, FileSyncStore(str(tmp_path / "sync.json")), sync_cooldown=300)
+        assert (await manager.sync()).synced
+        add_command(bot.tree, "help")
+        result = await manager.sync()
+        assert not result.synced and result.reason == "cooldown"
+        assert (await manager.sync(force=True)).synced
+        assert len(bot.synced) == 2
+
+    asyncio.run(run())
+
+
+def test_state_falls_back_to_disk_while_mongo_is_unavailable(tmp_path):
+    store = MongoSyncStore(DummySyncDatabase(), fallback=FileSyncStore(str(tmp_path / "sync.json")))
+    db = mongomock.MongoClient()["command_sync_test"]
+
+    async def run():
+        await store.save("app:global", {"hash": "abc"})
+        assert await store.load("app:global") == {"hash": "abc"}
+        assert (tmp_path / "sync.json").exists()
+
+        store.db = db
+        await store.save("app:global", {"hash": "def"})
+        assert db.command_sync.find_one({"_id": "app:global"}) == {"_id": "app:global", "hash": "def"}
+        assert await store.load("app:global") == {"hash": "def"}
+
+    asyncio.run(run())
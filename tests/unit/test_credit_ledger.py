@@ -0,0 +1,63 @@
+"""
+CreditLedger: spends never take a balance below zero, an exhausted user is
+refused from the cache, and adjustments and resets keep the cache in step.
+"""
+
+import asyncio
+
+import mongomock
+import pytest
+
+from src.utils.community.generic.credit_ledger import CreditLedger
+
+
+class Unreachable:
+    def __getitem__(self, name):
+        raise AssertionError("the database should not be queried")
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient()["credits_test"]
+
+
+def test_spends_stop_at_zero(db):
+    async def run():
+        ledger = CreditLedger(db)
+        assert [await ledger.spend(1, 10, default=2) for _ in range(2)] == [True, True]
+        # A second ledger (another process) sees the stored balance, not the default
+        other = CreditLedger(db)
+        assert not await other.spend(1, 10, default=2)
+        assert db.perplexity_credits.find_one({"guild_id": "1", "user_id": "10"})["credits"] == 0
+
+        # Exhausted users are refused from the cache
+        ledger.db = Unreachable()
+        assert not await ledger.spend(1, 10, default=2)
+        assert await ledger.balance(1, 10, default=2) == 0
+
+    asyncio.run(run())
+
+
+def test_adjust_clamps_and_updates_the_cache(db):
+    async def run():
+        ledger = CreditLedger(db)
+        assert await ledger.balance(1, 10, default=5) == 5
+        assert await ledger.adjust(1, 10, 10, default=5, maximum=8) == 8
+        assert await ledger.adjust(1, 10, -20, default=5) == 0
+        assert ledger.cached(1, 10) == 0
+        assert db.perplexity_credits.find_one({"guild_id": "1", "user_id": "10"})["credits"] == 0
+
+    asyncio.run(run())
+
+
+def test_reset_restores_guild_defaults(db):
+    async def run():
+        ledger = CreditLedger(db)
+        await ledger.spend(1, 10, default=3)
+        await ledger.spend(2, 20, default=3)
+        assert await ledger.reset({1: 7}) == 1
+        assert ledger.cached(1, 10) is None
+        assert ledger.cached(2, 20) == 2
+        assert await ledger.balance(1, 10, default=3) == 7
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+"""
+The shared sync database: a failed connection is not cached and is retried on
+a background thread after RECONNECT_INTERVAL.
+"""
+
+import asyncio
+
+import mongomock
+import pytest
+
+from src.utils.database import connection
+
+
+@pytest.fixture
+def mongo_down(monkeypatch):
+    """MongoDB unreachable until the returned switch is flipped."""
+    state = {"up": False, "attempts": 0}
+    db = mongomock.MongoClient()["connection_test"]
+
+    def connect():
+        state["attempts"] += 1
+        if not state["up"]:
+            return connection.DummySyncDatabase()
+        connection.sync_db = db
+        return db
+
+    monkeypatch.setattr(connection, "sync_db", None)
+    monkeypatch.setattr(connection, "_sync_retry_at", None)
+    monkeypatch.setattr(connection, "_sync_reconnect", None)
+    monkeypatch.setattr(connection, "initialize_sync_mongodb", connect)
+    state["db"] = db
+    return state
+
+
+def reconnect(monkeypatch, state):
+    """Bring MongoDB back and let the next use start the retry; waits for it."""
+    state["up"] = True
+    monkeypatch.setattr(connection, "_sync_retry_at", 0.0)
+    connection.get_shared_sync_db()
+    connection._sync_reconnect.join(timeout=5)
+
+
+def test_lazy_database_retries_after_failed_connection(mongo_down, monkeypatch):
+    lazy = connection.initialize_mongodb()
+    assert not connection.is_db_available(lazy)
+    assert mongo_down["attempts"] == 1
+
+    # Within the interval no new connection is attempted
+    assert not connection.is_db_available(lazy)
+    assert mongo_down["attempts"] == 1
+
+    # After it, the retry runs in the background and the caller gets the fallback meanwhile
+    monkeypatch.setattr(connection, "_sync_retry_at", 0.0)
+    started = connection._sync_reconnect
+    assert not connection.is_db_available(lazy)
+    assert connection._sync_reconnect is not started
+    connection._sync_reconnect.join(timeout=5)
+    assert mongo_down["attempts"] == 2
+
+    reconnect(monkeypatch, mongo_down)
+    assert connection.is_db_available(lazy)
+    assert lazy.resolve() is mongo_down["db"]
+    assert mongo_down["attempts"] == 3
+
+
+def test_get_sync_db_does_not_keep_the_dummy(mongo_down, monkeypatch):
+    assert isinstance(connection.get_sync_db(), connection.DummySyncDatabase)
+    assert connection.sync_db is None
+
+    reconnect(monkeypatch, mongo_down)
+    assert connection.get_sync_db() is mongo_down["db"]
+
+
+def test_ensure_async_db_does_not_keep_the_dummy(monkeypatch):
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        return connection.DummyAsyncDatabase()
+
+    monkeypatch.setattr(connection, "async_db", None)
+    monkeypatch.setattr(connection, "_async_retry_at", 0.0)
+    monkeypatch.setattr(connection, "_connect_async_mongodb", connect)
+
+    async def run():
+        assert isinstance(await connection.ensure_async_db(), connection.DummyAsyncDatabase)
+        assert connection.async_db is None
+        await connection.ensure_async_db()
+        assert len(attempts) == 1
+        monkeypatch.setattr(connection, "_async_retry_at", 0.0)
+        await connection.ensure_async_db()
+        assert len(attempts) == 2
+
+    asyncio.run(run())
+
@@ -0,0 +1,84 @@
+"""
+GameActivityTracker: flushed operations add each game entry once, even when
+the stored games were never loaded (a failed seed) and the push is repeated,
+and a batch that failed to write is sent again with the next flush.
+"""
+
+import time
+
+import mongomock
+
+from src.utils.community.generic.game_activity_tracker import GameActivityTracker
+
+GUILD = 1
+
+
+def apply_entries(collection, operations):
+    """Apply the document and game entry updates; mongomock cannot apply the $[] updates of the rest."""
+    for operation in operations:
+        if "$[" not in str(operation._doc):
+            collection.update_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+
+
+def stored_games(collection):
+    return [game["name_lower"] for game in collection.find_one({"guild_id": GUILD})["games"]]
+
+
+def test_games_are_pushed_once_without_known_games():
+    collection = mongomock.MongoClient()["games_test"]["games"]
+
+    first = GameActivityTracker()
+    first.start(GUILD, 10, "Chess")
+    apply_entries(collection, first.build_batch().operations)
+    assert stored_games(collection) == ["chess"]
+
+    # A second process whose seed failed does not know Chess is stored
+    second = GameActivityTracker()
+    second.start(GUILD, 11, "Chess")
+    second.start(GUILD, 12, "Go")
+    operations = second.build_batch().operations
+    apply_entries(collection, operations)
+    # A repeated write sends the same pushes again
+    apply_entries(collection, operations)
+    assert stored_games(collection) == ["chess", "go"]
+
+
+def test_player_updates_target_entries_by_name():
+    tracker = GameActivityTracker()
+    tracker.load_known_games(GUILD, ["chess"])
+    tracker.start(GUILD, 10, "Chess")
+    tracker.build_batch()
+    tracker.stop(GUILD, 10)
+
+    operations = tracker.build_batch().operations
+    pushes = [op for op in operations if "$push" in op._doc]
+    assert pushes == []
+    pull = next(op for op in operations if "$pull" in op._doc)
+    assert pull._doc["$pull"] == {"games.$[g0].active_players": {"$in": [10]}}
+    assert pull._array_filters == [{"g0.name_lower": "chess"}]
+
+
+def test_failed_batch_is_requeued(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+    tracker = GameActivityTracker()
+    tracker.start(GUILD, 10, "Chess")
+    tracker.start(GUILD, 11, "Chess")
+    clock[0] += 120
+
+    failed = tracker.build_batch()
+    # A member leaves while the write is in flight, then the write fails
+    tracker.forget_member(GUILD, 11)
+    tracker.requeue(failed)
+
+    operations = tracker.build_batch(checkpoint=False).operations
+    pushes = [op._doc["$push"]["games"]["name_lower"] for op in operations if "$push" in op._doc]
+    assert pushes == ["chess"]
+    add = next(op._doc for op in operations if "$addToSet" in op._doc)
+    assert add["$addToSet"] == {"games.$[g0].active_players": {"$each": [10]}}
+    assert add["$inc"] == {"games.$[g0].player_time.10": 2, "games.$[g0].total_time_played": 2}
+    pull = next(op._doc for op in operations if "$pull" in op._doc)
+    assert pull["$pull"] == {"games.$[g0].active_players": {"$in": [11]}}
+
+    # Once written, nothing is sent again
+    assert not tracker.build_batch(checkpoint=False)
@@ -0,0 +1,59 @@
+"""
+GatewayRecorder: component text is scrubbed, and reaching max_events stops
+the recording without waiting for the writer on the event loop.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+from src.core.gateway_recorder import Anonymizer, GatewayRecorder
+
+
+def test_components_are_scrubbed():
+    anonymizer = Anonymizer()
+    payload = anonymizer.payload({'components': [{
+        'type': 1,
+        'components': [
+            {'type': 2, 'style': 1, 'label': 'Secret plan', 'custom_id': 'ticket:close:123'},
+            {'type': 2, 'style': 5, 'label': 'Site', 'url': 'https://example.com/private'},
+            {'type': 3, 'custom_id': 'menu', 'placeholder': 'Pick one',
+             'options': [{'label': 'Alice', 'value': 'alice'}]},
+        ],
+    }]})
+    text = json.dumps(payload)
+    for leaked in ('Secret', 'ticket:close', 'example.com', 'Pick', 'Alice', 'alice'):
+        assert leaked not in text
+
+    row = payload['components'][0]
+    assert [item['type'] for item in row['components']] == [2, 2, 3]
+    assert row['components'][0]['label'] == 'xxxxxx xxxx'
+    assert row['components'][0]['style'] == 1
+
+
+def test_max_events_stops_without_joining(tmp_path, monkeypatch):
+    joined = []
+    guild = SimpleNamespace(id=111111111111111111, name='guild', owner_id=None, member_count=1,
+                            channels=[], roles=[])
+    seen = []
+    bot = SimpleNamespace(_connection=SimpleNamespace(parsers={'MESSAGE_CREATE': seen.append}),
+                          get_guild=lambda guild_id: guild)
+    path = tmp_path / 'recording.jsonl'
+    recorder = GatewayRecorder(str(path), events=['MESSAGE_CREATE'], max_events=2)
+
+    async def run():
+        recorder.start(bot)
+        writer = recorder._writer
+        monkeypatch.setattr(writer, 'join', lambda *args: joined.append(args))
+        for index in range(3):
+            bot._connection.parsers['MESSAGE_CREATE']({'guild_id': str(guild.id), 'content': f'hello {index}'})
+        # The limit stopped the recording from inside the parser, without a join
+        assert not recorder.running
+        assert joined == []
+        assert len(seen) == 3
+        monkeypatch.undo()
+        await recorder.wait_closed()
+
+    asyncio.run(run())
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['event'] for line in lines] == ['RECORDING', 'GUILD_SNAPSHOT', 'MESSAGE_CREATE', 'MESSAGE_CREATE']
@@ -0,0 +1,123 @@
+"""
+HTTPClient against a local aiohttp server: default timeout, the circuit
+breaker's half-open trial, and conditional revalidation of cached responses.
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.utils.external.http import CircuitOpenError, HTTPClient, ResponseTooLarge
+
+
+async def _serve(client_test):
+    hits = {"etag": 0}
+
+    async def slow(request):
+        await asyncio.sleep(5)
+        return web.Response(text="late")
+
+    async def big(request):
+        return web.Response(body=b"x" * 4096)
+
+    async def ok(request):
+        return web.Response(text="ok")
+
+    async def fail(request):
+        return web.Response(status=500)
+
+    async def etag(request):
+        hits["etag"] += 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.Response(text="body", headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/big", big)
+    app.router.add_get("/ok", ok)
+    app.router.add_get("/fail", fail)
+    app.router.add_get("/etag", etag)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        await client_test(server, hits)
+    finally:
+        await server.close()
+
+
+def test_requests_without_timeout_use_the_default():
+    async def check(server, hits):
+        client = HTTPClient(timeout=0.2)
+        try:
+            started = time.monotonic()
+            with pytest.raises(asyncio.TimeoutError):
+                await client.get(str(server.make_url("/slow")))
+            assert time.monotonic() - started < 2
+        finally:
+            await client.close()
+
+    asyncio.run(_serve(check))
+
+
+def test_oversized_trial_does_not_keep_the_circuit_open():
+    async def check(server, hits):
+        client = HTTPClient(failure_threshold=1, cooldown=0.05)
+        try:
+            with pytest.raises(ResponseTooLarge):
+                await client.get(str(server.make_url("/big")), max_bytes=10)
+            with pytest.raises(CircuitOpenError):
+                await client.get(str(server.make_url("/ok")))
+
+            await asyncio.sleep(0.06)
+            # The half-open trial fails too, which reopens the circuit...
+            with pytest.raises(ResponseTooLarge):
+                await client.get(str(server.make_url("/big")), max_bytes=10)
+            await asyncio.sleep(0.06)
+            # ...but only for the cooldown
+            response = await client.get(str(server.make_url("/ok")))
+            assert response.text() == "ok"
+            assert not client.stats()["open_circuits"]
+        finally:
+            await client.close()
+
+    asyncio.run(_serve(check))
+
+
+def test_cancelled_trial_releases_the_circuit():
+    async def check(server, hits):
+        client = HTTPClient(failure_threshold=1, cooldown=0.05)
+        try:
+            assert (await client.get(str(server.make_url("/fail")))).status == 500
+            await asyncio.sleep(0.06)
+
+            trial = asyncio.create_task(client.get(str(server.make_url("/slow"))))
+            await asyncio.sleep(0.05)
+            trial.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await trial
+
+            response = await client.get(str(server.make_url("/ok")))
+            assert response.ok
+        finally:
+            await client.close()
+
+    asyncio.run(_serve(check))
+
+
+def test_etag_revalidation_serves_the_cached_body():
+    async def check(server, hits):
+        client = HTTPClient()
+        try:
+            first = await client.get(str(server.make_url("/etag")))
+            second = await client.get(str(server.make_url("/etag")))
+            assert first.text() == second.text() == "body"
+            assert not first.from_cache and second.from_cache
+            assert hits["etag"] == 2
+        finally:
+            await client.close()
+
+    asyncio.run(_serve(check))
@@ -0,0 +1,74 @@
+"""
+InviteSnapshotManager: joins in one window are attributed by diffing a single
+invites fetch, several invites used in the same window are flagged ambiguous,
+and joins still waiting when a guild is forgotten resolve as unknown.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.utils.community.generic.invite_snapshots import InviteSnapshotManager
+
+
+class FakeGuild:
+    def __init__(self, uses):
+        self.id = 1
+        self.name = "guild"
+        self.features = []
+        self.uses = uses
+        self.fetches = 0
+
+    async def invites(self):
+        self.fetches += 1
+        return [
+            SimpleNamespace(code=code, uses=uses, inviter=SimpleNamespace(id=inviter_id),
+                            created_at=None, max_uses=0, max_age=0)
+            for code, (inviter_id, uses) in self.uses.items()
+        ]
+
+
+def join(manager, guild, count):
+    return asyncio.gather(*(manager.resolve_join(SimpleNamespace(guild=guild)) for _ in range(count)))
+
+
+def test_joins_in_one_window_share_a_fetch():
+    async def run():
+        guild = FakeGuild({"abc": (10, 0)})
+        manager = InviteSnapshotManager(None, None, window=0.01)
+        await manager.prime(guild)
+
+        guild.uses["abc"] = (10, 2)
+        results = await join(manager, guild, 2)
+        assert [(r.source, r.code, r.inviter_id, r.ambiguous) for r in results] == [("invite", "abc", 10, False)] * 2
+        assert guild.fetches == 2  # the prime and one diff for both joins
+
+    asyncio.run(run())
+
+
+def test_two_invites_used_in_one_window_are_ambiguous():
+    async def run():
+        guild = FakeGuild({"abc": (10, 0), "xyz": (20, 5)})
+        manager = InviteSnapshotManager(None, None, window=0.01)
+        await manager.prime(guild)
+
+        guild.uses = {"abc": (10, 1), "xyz": (20, 6)}
+        results = await join(manager, guild, 2)
+        assert sorted(r.code for r in results) == ["abc", "xyz"]
+        assert all(r.source == "invite" and r.ambiguous for r in results)
+
+    asyncio.run(run())
+
+
+def test_forgotten_guild_resolves_waiting_joins():
+    async def run():
+        guild = FakeGuild({"abc": (10, 0)})
+        manager = InviteSnapshotManager(None, None, window=10)
+        await manager.prime(guild)
+
+        waiting = join(manager, guild, 2)
+        await asyncio.sleep(0)
+        manager.forget(guild.id)
+        results = await asyncio.wait_for(waiting, timeout=1)
+        assert [r.source for r in results] == ["unknown", "unknown"]
+
+    asyncio.run(run())
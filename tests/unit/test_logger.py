@@ -0,0 +1,27 @@
+"""
+BoundedQueueHandler: queued records carry the merged message and rendered
+traceback, while the caller's record is left for the logger's other handlers.
+"""
+
+import logging
+import queue
+import sys
+
+from src.core.logger import BoundedQueueHandler
+
+
+def test_prepare_leaves_the_callers_record_alone():
+    handler = BoundedQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed %s", ("job",), exc_info)
+
+    prepared = handler.prepare(record)
+
+    assert prepared is not record
+    assert prepared.msg == "failed job" and prepared.args is None
+    assert prepared.exc_info is None and "ValueError: boom" in prepared.exc_text
+    assert record.msg == "failed %s" and record.args == ("job",)
+    assert record.exc_info is exc_info
@@ -0,0 +1,96 @@
+"""
+MessagePipeline: per-guild feature resolution, the resolver results handed to
+stages, and not caching a resolver that failed.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from src.core.message_pipeline import Feature, MessagePipeline, invalidate_features
+
+
+def _message(guild_id=1):
+    return SimpleNamespace(
+        author=SimpleNamespace(bot=False, id=5),
+        guild=SimpleNamespace(id=guild_id),
+        content="hello",
+        reference=None,
+    )
+
+
+class _Resolver:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def __call__(self, guild_id):
+        self.calls += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _pipeline(resolver, seen):
+    bot = SimpleNamespace()
+    pipeline = MessagePipeline(bot)
+    bot.message_pipeline = pipeline
+
+    async def stage(ctx):
+        seen.append(ctx.data.get("levelling"))
+
+    pipeline.register("levelling", Feature.LEVELLING, stage, resolver)
+    return bot, pipeline
+
+
+def test_resolver_result_reaches_the_stage_and_is_cached():
+    settings = {"enabled": True, "xp_multiplier": 2.0}
+    resolver = _Resolver(settings)
+    seen = []
+    _, pipeline = _pipeline(resolver, seen)
+
+    async def run():
+        await pipeline.dispatch(_message())
+        await pipeline.dispatch(_message())
+
+    asyncio.run(run())
+    assert seen == [settings, settings]
+    assert resolver.calls == 1
+
+
+def test_disabled_feature_skips_the_stage():
+    seen = []
+    _, pipeline = _pipeline(_Resolver(None), seen)
+    assert asyncio.run(pipeline.dispatch(_message())) is None
+    assert seen == []
+
+
+def test_failed_resolution_is_not_cached():
+    settings = {"enabled": True}
+    resolver = _Resolver(RuntimeError("database down"), settings)
+    seen = []
+    _, pipeline = _pipeline(resolver, seen)
+
+    async def run():
+        await pipeline.dispatch(_message())
+        await pipeline.dispatch(_message())
+
+    asyncio.run(run())
+    # The first message ran without the feature, the second re-resolved it
+    assert resolver.calls == 2
+    assert seen == [settings]
+
+
+def test_invalidate_features_re_resolves_the_guild():
+    resolver = _Resolver({"enabled": True}, None)
+    seen = []
+    bot, pipeline = _pipeline(resolver, seen)
+
+    async def run():
+        await pipeline.dispatch(_message())
+        invalidate_features(bot, 1)
+        await pipeline.dispatch(_message())
+
+    asyncio.run(run())
+    assert resolver.calls == 2
+    assert seen == [{"enabled": True}]
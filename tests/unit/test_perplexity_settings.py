@@ -0,0 +1,63 @@
+"""
+APIKeyModal closes the pooled client of a key the guild replaced or removed,
+unless another guild still uses it.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import mongomock
+
+from src.utils.views import perplexity_settings
+from src.utils.views.perplexity_settings import APIKeyModal
+
+
+class FakePool:
+    def __init__(self):
+        self.discarded = []
+
+    async def discard(self, api_key):
+        self.discarded.append(api_key)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, *args, **kwargs):
+        self.sent.append(kwargs.get('embed'))
+
+
+def submit(db, guild_id, value):
+    async def run():
+        modal = APIKeyModal(bot=None)
+        modal.mongo_db = db
+        modal.api_key._value = value
+        interaction = SimpleNamespace(guild=SimpleNamespace(id=guild_id), response=FakeResponse())
+        await modal.on_submit(interaction)
+    asyncio.run(run())
+
+
+def test_replaced_and_removed_keys_are_discarded(monkeypatch):
+    db = mongomock.MongoClient()['perplexity_test']
+    pool = FakePool()
+    monkeypatch.setattr(perplexity_settings, 'get_perplexity_pool', lambda: pool)
+
+    submit(db, 1, 'pplx-old')
+    assert pool.discarded == []
+    submit(db, 1, 'pplx-new')
+    assert pool.discarded == ['pplx-old']
+    submit(db, 1, '')
+    assert pool.discarded == ['pplx-old', 'pplx-new']
+    assert 'api_key' not in db.perplexity_config.find_one({'guild_id': '1'})
+
+
+def test_key_still_used_by_another_guild_is_kept(monkeypatch):
+    db = mongomock.MongoClient()['perplexity_test']
+    pool = FakePool()
+    monkeypatch.setattr(perplexity_settings, 'get_perplexity_pool', lambda: pool)
+
+    submit(db, 1, 'pplx-shared')
+    submit(db, 2, 'pplx-shared')
+    submit(db, 1, 'pplx-own')
+    assert pool.discarded == []
@@ -0,0 +1,66 @@
+"""
+ResponseCache: answers are served from memory and Mongo, concurrent calls
+share one computation, and rejected or failed answers are not cached.
+"""
+
+import asyncio
+
+import mongomock
+import pytest
+
+from src.ai.providers.response_cache import ResponseCache, cache_key
+
+
+def test_prompt_whitespace_does_not_change_the_key():
+    assert cache_key("analyze", "m", "hello  \n world") == cache_key("analyze", "m", "hello world")
+    assert cache_key("analyze", "m", "hello") != cache_key("generate", "m", "hello")
+
+
+def test_concurrent_calls_share_one_computation_and_survive_a_restart():
+    db = mongomock.MongoClient()["ai_cache_test"]
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        cache = ResponseCache(db)
+        results = await asyncio.gather(*(cache.get_or_compute("analyze", "m", "prompt", compute, ttl=60)
+                                         for _ in range(3)))
+        assert results == ["answer"] * 3
+        assert len(calls) == 1
+        assert cache.stats["coalesced"] == 2
+        assert await cache.get_or_compute("analyze", "m", "prompt", compute, ttl=60) == "answer"
+        assert cache.stats["memory"] == 1
+
+        restarted = ResponseCache(db)
+        assert await restarted.get_or_compute("analyze", "m", "prompt", compute, ttl=60) == "answer"
+        assert restarted.stats["mongo"] == 1
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+
+def test_rejected_and_failed_answers_are_not_cached():
+    answers = iter(["", "good"])
+
+    async def compute():
+        return next(answers)
+
+    async def failing():
+        raise RuntimeError("provider down")
+
+    async def run():
+        cache = ResponseCache()
+        assert await cache.get_or_compute("generate", "m", "p", compute, ttl=60, validate=bool) == ""
+        assert await cache.get_or_compute("generate", "m", "p", compute, ttl=60, validate=bool) == "good"
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("generate", "m", "other", failing, ttl=60)
+        assert await cache.get_or_compute("generate", "m", "other", compute_again, ttl=60) == "later"
+
+    async def compute_again():
+        return "later"
+
+    asyncio.run(run())
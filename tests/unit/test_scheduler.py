@@ -0,0 +1,195 @@
+"""
+ActionScheduler: due actions run once, rescheduling and cancelling by key,
+recovery of persisted actions after a restart, retries of failed handlers,
+and backing off while the store is unavailable.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.core import scheduler as scheduler_module
+from src.core.scheduler import ActionScheduler, MongoActionStore
+from src.utils.database.connection import DummySyncDatabase
+
+
+class FakeBot:
+    shard_ids = None
+    shard_count = None
+    is_primary_cluster = True
+
+    async def wait_until_ready(self):
+        pass
+
+
+class MemoryStore:
+    def __init__(self, documents=None):
+        self.documents = dict(documents or {})
+
+    async def ensure_index(self):
+        pass
+
+    async def load(self):
+        return sorted(self.documents.values(), key=lambda doc: doc['due'])
+
+    async def write(self, writes):
+        for key, doc in writes.items():
+            if doc is None:
+                self.documents.pop(key, None)
+            else:
+                self.documents[key] = doc
+
+
+class FailingStore(MemoryStore):
+    """Raises until ``failures`` calls of each kind have failed."""
+
+    def __init__(self, documents=None, failures=0):
+        super().__init__(documents)
+        self.failures = failures
+        self.loads = 0
+        self.writes = 0
+
+    async def load(self):
+        self.loads += 1
+        if self.loads <= self.failures:
+            raise ConnectionError("database is not available")
+        return await super().load()
+
+    async def write(self, writes):
+        self.writes += 1
+        if self.writes <= self.failures:
+            raise ConnectionError("database is not available")
+        await super().write(writes)
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_actions_run_when_due_and_can_be_replaced_or_cancelled():
+    ran = []
+
+    async def handler(payload):
+        ran.append(payload['n'])
+
+    async def run():
+        scheduler = ActionScheduler(FakeBot(), MemoryStore(), flush_interval=0.01)
+        scheduler.register('test', handler)
+        scheduler.start()
+        scheduler.schedule('test', {'n': 1}, delay=0.05, key='timer')
+        scheduler.schedule('test', {'n': 2}, delay=0.05, key='timer')  # restarts the timer
+        scheduler.schedule('test', {'n': 3}, delay=0.05, key='cancelled')
+        assert scheduler.cancel('cancelled')
+        await wait_for(lambda: ran)
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        assert ran == [2]
+        assert scheduler.store.documents == {}
+
+    asyncio.run(run())
+
+
+def test_persisted_actions_survive_a_restart():
+    ran = []
+
+    async def handler(payload):
+        ran.append(payload['n'])
+
+    async def run():
+        store = MemoryStore()
+        first = ActionScheduler(FakeBot(), store)
+        first.schedule('test', {'n': 1}, delay=0.05, key='a', guild_id=1)
+        first.schedule('test', {'n': 2}, delay=3600, key='b', guild_id=1)
+        await first.flush()
+        assert set(store.documents) == {'a', 'b'}
+
+        second = ActionScheduler(FakeBot(), store, flush_interval=0.01)
+        second.register('test', handler)
+        second.start()
+        await wait_for(lambda: ran)
+        await second.stop()
+        assert ran == [1]
+        assert second.is_scheduled('b')
+        assert set(store.documents) == {'b'}
+
+    asyncio.run(run())
+
+
+def test_failed_handler_is_retried_with_backoff(monkeypatch):
+    attempts = []
+
+    async def handler(payload):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise RuntimeError("not yet")
+
+    monkeypatch.setattr(scheduler_module, 'RETRY_DELAY', 0.02)
+
+    async def run():
+        scheduler = ActionScheduler(FakeBot(), MemoryStore(), flush_interval=0.01)
+        scheduler.register('test', handler)
+        scheduler.start()
+        scheduler.schedule('test', {}, key='flaky')
+        await wait_for(lambda: len(attempts) == 3)
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        assert scheduler.metrics['retried'] == 2
+        assert scheduler.metrics['dispatched'] == 1
+        assert not scheduler.is_scheduled('flaky')
+        assert scheduler.store.documents == {}
+
+    asyncio.run(run())
+
+
+def test_recovery_is_retried_until_the_store_answers(monkeypatch):
+    ran = []
+
+    async def handler(payload):
+        ran.append(payload['n'])
+
+    monkeypatch.setattr(scheduler_module, 'STORE_RETRY_DELAY', 0.01)
+
+    async def run():
+        seed = ActionScheduler(FakeBot(), MemoryStore())
+        seed.schedule('test', {'n': 1}, key='a', guild_id=1)
+        await seed.flush()
+
+        store = FailingStore(seed.store.documents, failures=2)
+        scheduler = ActionScheduler(FakeBot(), store, flush_interval=0.01)
+        scheduler.register('test', handler)
+        scheduler.start()
+        await wait_for(lambda: ran)
+        await scheduler.stop()
+        assert store.loads == 3
+        assert ran == [1]
+
+    asyncio.run(run())
+
+
+def test_flush_backs_off_while_the_store_fails(monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'STORE_RETRY_DELAY', 0.05)
+
+    async def run():
+        store = FailingStore(failures=2)
+        scheduler = ActionScheduler(FakeBot(), store, flush_interval=0.001)
+        scheduler.start()
+        scheduler.schedule('test', {}, delay=3600, key='later')
+        await wait_for(lambda: store.writes == 1)
+        # The next attempts wait 0.05s, then 0.1s, instead of every flush interval
+        await asyncio.sleep(0.03)
+        assert store.writes == 1
+        await wait_for(lambda: 'later' in store.documents)
+        await scheduler.stop()
+        assert store.writes == 3
+
+    asyncio.run(run())
+
+
+def test_mongo_store_rejects_an_unavailable_database():
+    store = MongoActionStore(DummySyncDatabase())
+    with pytest.raises(ConnectionError):
+        asyncio.run(store.load())
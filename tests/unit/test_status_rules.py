@@ -0,0 +1,69 @@
+"""
+StatusRuleIndex: first match in configured order, only rules reading a
+changed field are evaluated, and bad rules are skipped rather than fatal.
+"""
+
+from datetime import datetime
+
+from src.utils.helpers.status_rules import StatusRuleIndex, activity_key, changed_fields
+
+
+def data(**fields):
+    values = {"status_text": "", "game_name": "", "url": "", "activity_type": "",
+              "timestamp": datetime(2024, 1, 1, 12, 0)}
+    values.update(fields)
+    return values
+
+
+def index(*rules):
+    return StatusRuleIndex({"enabled": True, "rules": [dict(rule, id=str(order)) for order, rule in enumerate(rules)]})
+
+
+def test_first_matching_rule_in_order_wins():
+    rules = index(
+        {"name": "regex", "type": "status_text", "conditions": {"status_regex": r"^dev\b"}},
+        {"name": "keyword", "type": "keyword", "conditions": {"keywords": ["Stream"]}},
+        {"name": "contains", "type": "status_text", "conditions": {"status_contains": ["stream"]}},
+    )
+    activity = data(status_text="Live STREAM tonight")
+    assert rules.match(activity, changed_fields(None, activity_key(activity))).name == "keyword"
+    activity = data(status_text="dev stream")
+    assert rules.match(activity, changed_fields(None, activity_key(activity))).name == "regex"
+
+
+def test_only_rules_reading_changed_fields_are_evaluated():
+    rules = index(
+        {"name": "game", "type": "game", "conditions": {"game_names": ["chess"]}},
+        {"name": "url", "type": "url", "conditions": {"url_domains": ["twitch.tv"]}},
+    )
+    before = data(game_name="Chess Online")
+    after = data(game_name="Chess Online", url="https://twitch.tv/someone")
+    changed = changed_fields(activity_key(before), activity_key(after))
+    assert changed == {"url"}
+    assert rules.match(after, changed).name == "url"
+    assert rules.match(after, frozenset()) is None
+
+
+def test_activity_type_case_sensitive_and_time_rules():
+    rules = index(
+        {"name": "night", "type": "time_based",
+         "conditions": {"time_ranges": [{"start_time": "22:00", "end_time": "02:00"}]}},
+        {"name": "exact case", "type": "keyword", "conditions": {"keywords": ["LFG"], "case_sensitive": True}},
+        {"name": "listening", "type": "activity_type", "conditions": {"activity_types": ["listening"]}},
+    )
+    assert rules.match(data(status_text="lfg"), frozenset({"status_text"})) is None
+    assert rules.match(data(status_text="LFG now"), frozenset({"status_text"})).name == "exact case"
+    assert rules.match(data(activity_type="listening"), frozenset({"activity_type"})).name == "listening"
+    late = data(activity_type="listening", timestamp=datetime(2024, 1, 1, 23, 30))
+    assert rules.match(late, frozenset()).name == "night"
+
+
+def test_disabled_unknown_and_broken_rules_are_skipped():
+    rules = index(
+        {"name": "off", "type": "game", "enabled": False, "conditions": {"game_names": ["chess"]}},
+        {"name": "mystery", "type": "telepathy", "conditions": {}},
+        {"name": "broken", "type": "time_based", "conditions": {"time_ranges": [{"start_time": "noon"}]}},
+        {"name": "on", "type": "game", "conditions": {"game_names": ["chess"]}},
+    )
+    assert [rule.name for rule in rules.rules] == ["on"]
+    assert rules.match(data(game_name="chess"), frozenset({"game_name"})).name == "on"
@@ -0,0 +1,114 @@
+"""
+SteamCache: request coalescing, batching of missing keys, not-found caching,
+and picking up the database once a failed connection is retried.
+"""
+
+import asyncio
+
+import pytest
+
+from src.utils.database import connection
+from src.utils.external import steam_cache
+from src.utils.external.steam_cache import SteamCache
+
+
+class FakeCollection:
+    """The parts of a pymongo collection SteamCache uses."""
+
+    def __init__(self):
+        self.documents = {}
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+    def find(self, query):
+        ids = query["_id"]["$in"]
+        return [self.documents[_id] for _id in ids if _id in self.documents]
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            document = dict(operation._doc, _id=operation._filter["_id"])
+            self.documents[document["_id"]] = document
+
+
+def test_concurrent_lookups_share_one_fetch():
+    calls = []
+
+    async def fetch(keys):
+        calls.append(list(keys))
+        await asyncio.sleep(0.01)
+        return {key: f"profile {key}" for key in keys if key != "missing"}
+
+    async def run():
+        cache = SteamCache()
+        first, second = await asyncio.gather(
+            cache.fetch_many("summary", ["a", "b"], fetch),
+            cache.fetch_many("summary", ["b", "c", "missing"], fetch),
+        )
+        assert first == {"a": "profile a", "b": "profile b"}
+        assert second == {"b": "profile b", "c": "profile c", "missing": None}
+        assert calls == [["a", "b"], ["c", "missing"]]
+
+        # Found and not-found answers are both served from memory now
+        assert await cache.fetch_many("summary", ["a", "missing"], fetch) == {"a": "profile a", "missing": None}
+        assert len(calls) == 2
+
+    asyncio.run(run())
+
+
+def test_errors_are_not_cached():
+    attempts = []
+
+    async def fetch():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("steam down")
+        return "profile"
+
+    async def run():
+        cache = SteamCache()
+        with pytest.raises(RuntimeError):
+            await cache.fetch("summary", "a", fetch)
+        assert await cache.fetch("summary", "a", fetch) == "profile"
+
+    asyncio.run(run())
+
+
+def test_database_is_used_once_a_failed_connection_is_retried(monkeypatch):
+    collection = FakeCollection()
+    state = {"up": False}
+
+    def connect():
+        if not state["up"]:
+            return connection.DummySyncDatabase()
+        connection.sync_db = {"steam_cache": collection}
+        return connection.sync_db
+
+    monkeypatch.setattr(connection, "sync_db", None)
+    monkeypatch.setattr(connection, "_sync_retry_at", None)
+    monkeypatch.setattr(connection, "_sync_reconnect", None)
+    monkeypatch.setattr(connection, "initialize_sync_mongodb", connect)
+
+    async def fetch(keys):
+        return {key: f"games {key}" for key in keys}
+
+    async def run():
+        cache = SteamCache(connection.initialize_mongodb())
+        await cache.fetch_many("games", ["a"], fetch)
+        assert collection.documents == {}
+
+        state["up"] = True
+        monkeypatch.setattr(connection, "_sync_retry_at", 0.0)
+        connection.get_shared_sync_db()
+        connection._sync_reconnect.join(timeout=5)
+        monkeypatch.setattr(steam_cache, "MONGO_RETRY_SECONDS", 0.0)
+        cache._mongo_retry_at = 0.0
+        await cache.fetch_many("games", ["b"], fetch)
+        assert collection.documents["games:b"]["value"] == "games b"
+
+        # A fresh process finds it in Mongo without fetching
+        async def unreachable(keys):
+            raise AssertionError("should come from Mongo")
+        assert await SteamCache(connection.initialize_mongodb()).fetch_many("games", ["b"], unreachable) == {"b": "games b"}
+
+    asyncio.run(run())
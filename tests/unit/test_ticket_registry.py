@@ -0,0 +1,90 @@
+"""
+TicketRegistry: loading, the database fallback before it is loaded, and
+retrying a load that failed because MongoDB was unavailable.
+"""
+
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from src.utils.database import connection  # noqa: E402
+from src.utils.views.ticket_registry import TicketRegistry  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    db = mongomock_motor.AsyncMongoMockClient()["tickets_test"]
+    monkeypatch.setattr(connection, "async_db", db)
+    return db
+
+
+@pytest.fixture
+def no_mongo(monkeypatch):
+    monkeypatch.setattr(connection, "async_db", None)
+    monkeypatch.setattr(connection, "_async_retry_at", 0.0)
+    monkeypatch.setattr(connection, "_connect_async_mongodb", lambda: connection.DummyAsyncDatabase())
+
+
+def test_load_indexes_active_tickets(mongo):
+    async def run():
+        await mongo.active_tickets.insert_many([
+            {"channel_id": 1, "guild_id": 10, "user_id": 100, "status": "open"},
+            {"channel_id": 2, "guild_id": 10, "user_id": 100, "status": "closed"},
+        ])
+        registry = TicketRegistry()
+        assert await registry.load() == 2
+        assert registry.loaded
+        assert await registry.is_ticket(1)
+        assert not await registry.is_ticket(3)
+        assert await registry.count_for_creator(10, 100) == 1
+
+    asyncio.run(run())
+
+
+def test_failed_load_is_not_marked_loaded(no_mongo):
+    async def run():
+        registry = TicketRegistry()
+        assert await registry.load() == 0
+        assert not registry.loaded
+
+    asyncio.run(run())
+
+
+def test_lookups_fall_back_to_database_until_loaded(no_mongo, monkeypatch):
+    async def run():
+        registry = TicketRegistry()
+        await registry.load()
+        assert not registry.loaded
+
+        # MongoDB comes back after the failed startup load
+        db = mongomock_motor.AsyncMongoMockClient()["tickets_test"]
+        monkeypatch.setattr(connection, "async_db", db)
+        await db.active_tickets.insert_many([
+            {"channel_id": 1, "guild_id": 10, "user_id": 100, "status": "open"},
+            {"channel_id": 2, "guild_id": 10, "user_id": 200, "status": "open"},
+        ])
+
+        ticket = await registry.get(1)
+        assert ticket is not None and ticket["user_id"] == 100
+        assert await registry.count_for_creator(10, 200) == 1
+
+        # The lookup also scheduled a reload, which completes the registry
+        await registry._reload_task
+        assert registry.loaded
+        assert await registry.is_ticket(2)
+
+    asyncio.run(run())
+
+
+def test_reload_is_throttled(no_mongo):
+    async def run():
+        registry = TicketRegistry()
+        assert await registry.get(1) is None
+        first = registry._reload_task
+        await first
+        assert await registry.get(1) is None
+        assert registry._reload_task is first
+
+    asyncio.run(run())